@@ -0,0 +1,56 @@
+""" Time of a broadcast command to a fleet, sequential vs concurrent. """
+
+import argparse
+import time
+from fossbot_lib.common.fleet.controller import Fleet
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyFossBot
+
+class RemoteRobot:
+    '''
+    Class RemoteRobot(robot,round_trip) -> A dummy robot behind a network link:
+    every call takes round_trip seconds more.
+    '''
+    def __init__(self, robot: DummyFossBot, round_trip: float) -> None:
+        self.robot = robot
+        self.round_trip = round_trip
+
+    def __getattr__(self, name: str):
+        method = getattr(self.robot, name)
+        def remote(*args, **kwargs):
+            time.sleep(self.round_trip)
+            return method(*args, **kwargs)
+        return remote
+
+def benchmark(count: int, round_trip: float, method: str) -> dict:
+    '''
+    Measures a call of method on count remote robots, one robot after the other
+    and through a fleet.
+    Param: count: the number of robots.
+           round_trip: the round trip time of a robot (seconds).
+           method: the called method (without arguments).
+    Returns: a dictionary with the measured times (in seconds).
+    '''
+    robots = [RemoteRobot(DummyFossBot(seed=index), round_trip) for index in range(count)]
+    start = time.perf_counter()
+    for robot in robots:
+        getattr(robot, method)()
+    sequential = time.perf_counter() - start
+
+    fleet = Fleet(robots)
+    fleet.call(method)      # starts the threads of the pool
+    result = fleet.call(method)
+    fleet.close()
+    stats = result.get_stats()
+    return {'sequential': sequential, 'fleet': stats['wall'],
+            'mean latency': stats['mean_latency'], 'max latency': stats['max_latency']}
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__)
+    PARSER.add_argument('--robots', type=int, default=30)
+    PARSER.add_argument('--round-trip', type=float, default=0.02,
+                        help='round trip time of a robot (seconds)')
+    PARSER.add_argument('--method', default='stop')
+    ARGS = PARSER.parse_args()
+    RESULT = benchmark(ARGS.robots, ARGS.round_trip, ARGS.method)
+    for name, value in RESULT.items():
+        print(f'{name:>12}: {value * 1000:8.2f} ms')
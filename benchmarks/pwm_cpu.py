@@ -0,0 +1,47 @@
+""" CPU usage of each real robot PWM backend. """
+
+import argparse
+import time
+from fossbot_lib.real_robot import control, pwm
+
+def benchmark(backend: str, pins: tuple, freq: float, duty: float, seconds: float) -> float:
+    '''
+    Measures the CPU usage of this process while PWM outputs are running.
+    (the pigpio daemon of the hardware backend runs in its own process and is not counted)
+    Param: backend: the backend name (see pwm.BACKENDS).
+           pins: the gpio pins to drive.
+           freq: the PWM frequency (Hz).
+           duty: the duty cycle (0-100).
+           seconds: the duration of the measurement.
+    Returns: the CPU usage (in % of one core).
+    '''
+    outputs = [pwm.create_pwm(backend, pin, freq) for pin in pins]
+    for output in outputs:
+        output.start(duty)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    for output in outputs:
+        output.stop()
+    return cpu / wall * 100
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__)
+    PARSER.add_argument('backends', nargs='*', default=sorted(pwm.BACKENDS))
+    PARSER.add_argument('--pins', type=int, nargs='+', default=[23, 25],
+                        help='gpio pins (BCM), default: the motor speed pins')
+    PARSER.add_argument('--freq', type=float, default=17)
+    PARSER.add_argument('--duty', type=float, default=50)
+    PARSER.add_argument('--seconds', type=float, default=5)
+    ARGS = PARSER.parse_args()
+    control.start_lib()
+    for BACKEND in ARGS.backends:
+        try:
+            USAGE = benchmark(BACKEND, tuple(ARGS.pins), ARGS.freq, ARGS.duty, ARGS.seconds)
+        except (ImportError, ConnectionError) as error:
+            print(f'{BACKEND:>10}: not available ({type(error).__name__})')
+            continue
+        print(f'{BACKEND:>10}: {USAGE:6.2f} % cpu')
+    control.clean()
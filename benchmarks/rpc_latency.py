@@ -0,0 +1,48 @@
+""" Call rate of a remote robot on loopback: sequential, pipelined and batched calls. """
+
+import argparse
+import time
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyFossBot
+from fossbot_lib.remote_robot.fossbot import FossBot as RemoteFossBot
+from fossbot_lib.remote_robot.server import RobotServer
+
+def benchmark(count: int, address) -> dict:
+    '''
+    Measures count calls of get_distance on a dummy robot served on loopback.
+    Param: count: the number of calls.
+           address: the server address: a (host, port) tuple or a Unix socket path.
+    Returns: a dictionary with the mean time of a call (in seconds) for each mode.
+    '''
+    server = RobotServer(DummyFossBot(seed=0), address)
+    server.start()
+    robot = RemoteFossBot(server.get_address())
+    robot.get_distance()    # warm up the connection
+
+    start = time.perf_counter()
+    for _ in range(count):
+        robot.get_distance()
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    futures = [robot.call_async('get_distance') for _ in range(count)]
+    for future in futures:
+        future.result()
+    pipelined = time.perf_counter() - start
+
+    start = time.perf_counter()
+    robot.batch([('get_distance',)] * count)
+    batched = time.perf_counter() - start
+
+    robot.close()
+    server.close()
+    return {'sequential': sequential / count, 'pipelined': pipelined / count,
+            'batched': batched / count}
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__)
+    PARSER.add_argument('--calls', type=int, default=5000)
+    PARSER.add_argument('--unix', help='the path of a Unix socket, instead of TCP')
+    ARGS = PARSER.parse_args()
+    RESULT = benchmark(ARGS.calls, ARGS.unix or ('127.0.0.1', 0))
+    for name, value in RESULT.items():
+        print(f'{name:>10}: {value * 1e6:8.1f} us per call')
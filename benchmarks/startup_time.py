@@ -0,0 +1,57 @@
+""" Startup time benchmark of each FossBot backend. """
+
+import argparse
+import importlib
+import time
+from fossbot_lib.common.data_structures import configuration
+
+BACKENDS = {
+    'dummy': 'fossbot_lib.dummy_robot.fossbot',
+    'sim': 'fossbot_lib.coppeliasim_robot.fossbot',
+    'real': 'fossbot_lib.real_robot.fossbot',
+}
+
+def build_parameters(backend: str, path: str) -> configuration.RobotParameters:
+    '''
+    Builds the robot parameters of a backend from a yaml file.
+    Param: backend: the backend name (dummy, sim or real).
+           path: the path to the parameters file.
+    Returns: the parameters (None for the dummy backend).
+    '''
+    if backend == 'dummy':
+        return None
+    if backend == 'sim':
+        return configuration.SimRobotParameters.from_file(path)
+    return configuration.RobotParameters.from_file(path)
+
+def benchmark(backend: str, path: str) -> dict:
+    '''
+    Measures import, construction and warmup time of a backend.
+    Param: backend: the backend name (dummy, sim or real).
+           path: the path to the parameters file.
+    Returns: a dictionary with the measured times (in seconds).
+    '''
+    start = time.perf_counter()
+    module = importlib.import_module(BACKENDS[backend])
+    import_time = time.perf_counter() - start
+
+    parameters = build_parameters(backend, path)
+    start = time.perf_counter()
+    robot = module.FossBot(parameters) if parameters is not None else module.FossBot()
+    construct_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    robot.warmup()
+    warmup_time = time.perf_counter() - start
+    robot.exit()
+    return {'import': import_time, 'construct': construct_time, 'warmup': warmup_time}
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__)
+    PARSER.add_argument('backend', choices=sorted(BACKENDS))
+    PARSER.add_argument('--parameters', default='admin_parameters.yaml',
+                        help='path to the parameters file (not used by dummy)')
+    ARGS = PARSER.parse_args()
+    RESULT = benchmark(ARGS.backend, ARGS.parameters)
+    for name, value in RESULT.items():
+        print(f'{name:>10}: {value * 1000:8.2f} ms')
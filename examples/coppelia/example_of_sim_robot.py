@@ -3,9 +3,9 @@ import time
 import os
 import pathlib
 #from fossbot_lib.coppeliasim_robot import control
-from fossbot_lib.parameters_parser.parser import load_parameters
 from fossbot_lib.common.data_structures import configuration
 from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.common.behaviors.engine import BehaviorEngine
 from fossbot_lib.coppeliasim_robot.sim_gym import Environment
 from fossbot_lib.coppeliasim_robot.fossbot import FossBot as SimuFossBot
 
@@ -39,17 +39,18 @@ def ultimate_test(robot: robot_interface.FossBotInterface) -> None:
     change_color(robot)
 
 def follow_line(robot: robot_interface.FossBotInterface) -> None:
-    '''Follows black line.'''
-    while True:
-        middle = robot.check_on_line(1)
-        right = robot.check_on_line(2)
-        left = robot.check_on_line(3)
-        if middle:
+    '''Follows black line (steers only when a line sensor changes).'''
+    engine = BehaviorEngine(robot)
+    def steer(snapshot: dict) -> None:
+        if snapshot['line_1']:
             robot.move_forward()
-        elif right:
+        elif snapshot['line_2']:
             robot.rotate_clockwise()
-        elif left:
+        elif snapshot['line_3']:
             robot.rotate_counterclockwise()
+    for sensor_id in (1, 2, 3):
+        engine.on_line(sensor_id, steer, edge='both')
+    engine.run()
 
 def change_color(robot: robot_interface.FossBotInterface) -> None:
     ''' Changes the color of a led for some times '''
@@ -170,11 +171,10 @@ def test_saves(robot: robot_interface.FossBotInterface, environment: Environment
 
 def move_until_obstacle(robot: robot_interface.FossBotInterface):
     '''Moves robot until obstacle is detected.'''
+    engine = BehaviorEngine(robot)
+    engine.on_obstacle(None, lambda snapshot: engine.stop())
     robot.just_move()
-    while True:
-        if robot.check_for_obstacle():
-            #robot.stop()
-            break
+    engine.run()
 
 def test_timer(robot: robot_interface.FossBotInterface, count_time: int) -> None:
     '''
@@ -193,21 +193,7 @@ def test_timer(robot: robot_interface.FossBotInterface, count_time: int) -> None
 
 if __name__ == "__main__":
     # Load parameters from yml file
-    FILE_PARAM = load_parameters()
-
-    # Simulation robot test ===========================================
-    SIM_IDS = configuration.SimRobotIds(**FILE_PARAM["simulator_ids"])
-    SIM_PARAM = configuration.SimRobotParameters(
-        sensor_distance=configuration.SensorDistance(**FILE_PARAM["sensor_distance"]),
-        motor_left_speed=configuration.MotorLeftSpeed(**FILE_PARAM["motor_left"]),
-        motor_right_speed=configuration.MotorRightSpeed(**FILE_PARAM["motor_right"]),
-        default_step=configuration.DefaultStep(**FILE_PARAM["step"]),
-        light_sensor=configuration.LightSensor(**FILE_PARAM["light_sensor"]),
-        line_sensor_left=configuration.LineSensorLeft(**FILE_PARAM["line_sensor_left"]),
-        line_sensor_center=configuration.LineSensorCenter(**FILE_PARAM["line_sensor_center"]),
-        line_sensor_right=configuration.LineSensorRight(**FILE_PARAM["line_sensor_right"]),
-        rotate_90=configuration.Rotate90(**FILE_PARAM["rotate_90"]),
-        simulation=SIM_IDS)
+    SIM_PARAM = configuration.SimRobotParameters.from_file()
 
     # Create a simu robot
     SIM_ROBOT = SimuFossBot(parameters=SIM_PARAM)
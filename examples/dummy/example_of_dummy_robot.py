@@ -1,6 +1,5 @@
 """ Example of a dummy robot"""
 
-import time
 # from fossbot_lib.parameters_parser.parser import load_parameters
 # from fossbot_lib.common.data_structures import configuration
 from fossbot_lib.common.interfaces import robot_interface
@@ -9,10 +8,16 @@ from fossbot_lib.dummy_robot.fossbot import FossBot as DummyBot
 def main(robot: robot_interface.FossBotInterface) -> None:
     """ A simple robot routine """
     robot.just_move()
-    time.sleep(10)
+    while not robot.check_for_obstacle():
+        robot.wait(0.1)
     robot.stop()
 
 if __name__ == "__main__":
-    # Create a real robot
-    dummy = DummyBot()
+    # Create a dummy robot, whose obstacle comes closer by 10 cm per reading
+    dummy = DummyBot(seed=1)
+    dummy.sensors.set_trace('distance', range(100, 0, -10))
     main(dummy)
+    # Check the commands of the routine
+    print(dummy.log.get_entries())
+    assert dummy.log.count('wait') == 9
+    assert dummy.log.get_entries()[-1][1] == 'stop'
@@ -1,7 +1,6 @@
 """ Example of a real and simulated robot"""
 
 import time
-from parameters_parser.parser import load_parameters
 from common.data_structures import configuration
 from common.interfaces import robot_interface
 from real_robot.fossbot import FossBot as RealFossBot
@@ -53,19 +52,7 @@ def follow_line(robot: robot_interface.FossBotInterface) -> None:
 
 if __name__ == "__main__":
     # Load parameters from yml file
-    FILE_PARAM = load_parameters()
-
-    # Real robot test ================================================
-    REAL_PARAM = configuration.RobotParameters(
-        sensor_distance=configuration.SensorDistance(**FILE_PARAM["sensor_distance"]),
-        motor_left_speed=configuration.MotorLeftSpeed(**FILE_PARAM["motor_left"]),
-        motor_right_speed=configuration.MotorRightSpeed(**FILE_PARAM["motor_right"]),
-        default_step=configuration.DefaultStep(**FILE_PARAM["step"]),
-        light_sensor=configuration.LightSensor(**FILE_PARAM["light_sensor"]),
-        line_sensor_left=configuration.LineSensorLeft(**FILE_PARAM["line_sensor_left"]),
-        line_sensor_center=configuration.LineSensorCenter(**FILE_PARAM["line_sensor_center"]),
-        line_sensor_right=configuration.LineSensorRight(**FILE_PARAM["line_sensor_right"]),
-        rotate_90=configuration.Rotate90(**FILE_PARAM["rotate_90"]))
+    REAL_PARAM = configuration.RobotParameters.from_file()
 
     # Create a real robot
     REAL_ROBOT = RealFossBot(parameters=REAL_PARAM)
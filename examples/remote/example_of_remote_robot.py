@@ -0,0 +1,74 @@
+""" Example of a robot driven over the network (remote_robot server and client) """
+
+import argparse
+import time
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyBot
+from fossbot_lib.remote_robot import protocol
+from fossbot_lib.remote_robot.fossbot import FossBot as RemoteFossBot
+from fossbot_lib.remote_robot.server import RobotServer
+
+def main(robot: RemoteFossBot) -> None:
+    """ A simple remote routine: plain, pipelined and batched calls, and a stream """
+    robot.move_distance(10)
+    print(f'Ultrasonic distance: {robot.get_distance():.1f} cm')
+    # pipelined: all the requests are sent before the first reply
+    futures = [robot.call_async('check_on_line', sensor_id) for sensor_id in (1, 2, 3)]
+    print(f'On line: {[future.result() for future in futures]}')
+    # batched: one frame each way
+    light, dark = robot.batch([('get_light_sensor',), ('check_for_dark',)])
+    print(f'Light Sensor: {light:.1f}, Dark: {dark}')
+    # streamed: the server pushes the readings
+    stream = robot.subscribe('get_distance', rate=50)
+    time.sleep(0.5)
+    stream.close()
+    print(f'Streamed distances: {len(stream.get_history(100))}, newest {stream.get_value():.1f} cm')
+
+def serve(backend: str, address) -> None:
+    '''Serves a robot until interrupted (for example on the Raspberry Pi of the robot).'''
+    robot: robot_interface.FossBotInterface
+    if backend == 'real':
+        from fossbot_lib.real_robot.fossbot import FossBot as RealFossBot
+        robot = RealFossBot(parameters=configuration.RobotParameters.from_file())
+    else:
+        robot = DummyBot(seed=1)
+    server = RobotServer(robot, address)
+    print(f'Serving the {backend} robot on {server.get_address()}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.close()
+    robot.exit()
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__)
+    PARSER.add_argument('--serve', choices=['real', 'dummy'],
+                        help='serve a robot instead of driving one')
+    PARSER.add_argument('--host', default='127.0.0.1',
+                        help='the server address (0.0.0.0 to serve on all interfaces)')
+    PARSER.add_argument('--port', type=int, default=protocol.DEFAULT_PORT)
+    PARSER.add_argument('--unix', help='the path of a Unix socket, instead of TCP')
+    PARSER.add_argument('--loopback', action='store_true',
+                        help='serve a dummy robot in this process and drive it')
+    ARGS = PARSER.parse_args()
+    ADDRESS = ARGS.unix or (ARGS.host, ARGS.port)
+
+    if ARGS.serve:
+        serve(ARGS.serve, ADDRESS)
+    elif ARGS.loopback:
+        DUMMY = DummyBot(seed=1)
+        SERVER = RobotServer(DUMMY, ARGS.unix or ('127.0.0.1', 0))
+        SERVER.start()
+        REMOTE_ROBOT = RemoteFossBot(SERVER.get_address(), timeout=5)
+        main(REMOTE_ROBOT)
+        REMOTE_ROBOT.exit()
+        SERVER.close()
+        # the commands reached the dummy robot
+        assert DUMMY.log.count('move_distance') == 1
+        assert DUMMY.log.get_entries()[-1][1] == 'stop'
+    else:
+        REMOTE_ROBOT = RemoteFossBot(ADDRESS, timeout=5)
+        main(REMOTE_ROBOT)
+        REMOTE_ROBOT.exit()
@@ -0,0 +1,64 @@
+""" Example of the automated calibration of the real robot (motors, turns, line sensors),
+on a virtual board with unequal motors or (with --real) on the robot """
+
+import argparse
+from fossbot_lib.common.calibration.calibrator import Calibrator
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.real_robot import hal
+from fossbot_lib.real_robot.fossbot import FossBot as RealFossBot
+
+def place(board: hal.VirtualBoard, surface: str, readings: tuple) -> None:
+    """ Places the robot over a surface (on a virtual board: sets the floor sensor readings) """
+    if board is None:
+        input(f'Place every floor sensor over the {surface}, then press enter.')
+        return
+    for channel, value in zip((1, 2, 3), readings):
+        board.set_adc(channel, value)
+
+def main(calibrator: Calibrator, board: hal.VirtualBoard) -> None:
+    """ Calibrates the motors, then the turns (they depend on the motor speeds), then the line """
+    calibrator.calibrate_balance()
+    calibrator.calibrate_turns()
+    place(board, 'line', (800, 760, 820))
+    calibrator.sample_surface('line')
+    place(board, 'floor', (200, 260, 150))
+    calibrator.sample_surface('floor')
+    calibrator.calibrate_line()
+    report = calibrator.get_report()
+    print(f"Motors: left {report['motor_left_speed']}, right {report['motor_right_speed']}, "
+          f"drift {report['drift']:.1f} degrees per meter")
+    print(f"rotate_90: {report['rotate_90']} steps, turns {report['turn_90']:.1f} "
+          f"+- {report['turn_error']:.1f} degrees")
+    print(f"Distance error: +- {report['distance_error']:.1f} cm")
+    for name, error in report['line_error'].items():
+        print(f'{name}: {report[name]}, wrong checks {error:.2%}')
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__)
+    PARSER.add_argument('--path', default='admin_parameters.yaml',
+                        help='the parameters file to calibrate')
+    PARSER.add_argument('--real', action='store_true',
+                        help='calibrate the robot itself (not a virtual board)')
+    PARSER.add_argument('--save', action='store_true',
+                        help='write the calibrated parameters to the parameters file')
+    ARGS = PARSER.parse_args()
+
+    # Use a virtual board whose left motor is faster, before creating the robot
+    BOARD = None
+    if not ARGS.real:
+        BOARD = hal.VirtualBoard()
+        BOARD.attach_wheel('right', speed_pin=23, terma_pin=27, termb_pin=22, encoder_pin=21,
+                           max_step_rate=60)
+        BOARD.attach_wheel('left', speed_pin=25, terma_pin=17, termb_pin=24, encoder_pin=20,
+                           max_step_rate=70)
+        BOARD.attach_ultrasonic(trig_pin=6, echo_pin=5)
+        hal.set_board(BOARD)
+
+    ROBOT = RealFossBot(parameters=configuration.RobotParameters.from_file(ARGS.path))
+    CALIBRATOR = Calibrator(ROBOT, ARGS.path)
+    main(CALIBRATOR, BOARD)
+    if ARGS.save:
+        CALIBRATOR.save()
+    ROBOT.exit()
+    if BOARD is not None:
+        BOARD.close()
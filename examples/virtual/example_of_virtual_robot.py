@@ -0,0 +1,40 @@
+""" Example of the real robot code running on a virtual board (no Raspberry Pi needed) """
+
+import time
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.real_robot import hal
+from fossbot_lib.real_robot.fossbot import FossBot as RealFossBot
+
+def main(robot: robot_interface.FossBotInterface, board: hal.VirtualBoard) -> None:
+    """ A simple robot routine, timed on the virtual board """
+    robot.get_pose()    # the dead reckoning starts on first use
+    start = time.perf_counter()
+    robot.move_distance(10)
+    print(f'move_distance(10): {time.perf_counter() - start:.2f} s, '
+          f'steps: {robot.odometer_right.get_total_steps()}')
+    robot.rotate_clockwise_90()
+    robot.rotate_degrees(45)
+    print(f'Heading after rotate_degrees(45): {robot.get_heading():.1f}')
+    pose = robot.get_pose()
+    print(f"Pose: x {pose['x']:.1f} cm, y {pose['y']:.1f} cm, theta {pose['theta']:.1f} degrees")
+    print(f'Ultrasonic distance: {robot.get_distance():.1f} cm')
+    board.set_distance(None)
+    print(f'Lost echo distance: {robot.get_distance()} cm')
+    board.set_adc(1, 800)
+    print(f'MiddleSensor: {robot.get_floor_sensor(1)}, On Line? => {robot.check_on_line(1)}')
+    print(f"Gyroscope z: {robot.get_gyroscope(axis='z')}")
+
+if __name__ == "__main__":
+    # Load parameters from yml file
+    REAL_PARAM = configuration.RobotParameters.from_file()
+
+    # Use a virtual board wired like the FossBot, before creating the robot
+    BOARD = hal.VirtualBoard.fossbot()
+    BOARD.set_distance(42.0)
+    hal.set_board(BOARD)
+
+    VIRTUAL_ROBOT = RealFossBot(parameters=REAL_PARAM)
+    main(VIRTUAL_ROBOT, BOARD)
+    VIRTUAL_ROBOT.exit()
+    BOARD.close()
@@ -0,0 +1,254 @@
+"""
+Event driven behaviors of a robot (handlers dispatched from one shared sensor poll)
+"""
+
+import math
+import threading
+import time
+from typing import Callable
+from fossbot_lib.common.data_structures import loop_stats
+from fossbot_lib.common.interfaces import robot_interface
+
+EDGES = ('rising', 'falling', 'both')
+# horizontal acceleration (m/s^2) taken as a collision on robots without a collision sensor
+COLLISION_ACCELERATION = 15.0
+
+class Binding:
+    '''
+    Class Binding(reading,condition,handler,edge,pulse) -> A handler registered on a condition.
+    Param: reading: the snapshot key of the reading the condition is evaluated on.
+           condition: condition(value) -> bool.
+           handler: handler(snapshot), called when the condition changes.
+           edge: the changes that call the handler ('rising', 'falling' or 'both').
+           pulse: if True, the condition is an event (true once per occurrence), so
+                  every tick it is true calls the handler.
+    '''
+    def __init__(self, reading: str, condition: Callable, handler: Callable,
+                 edge: str = 'rising', pulse: bool = False) -> None:
+        if edge not in EDGES:
+            print(f'Unknown edge {edge}, use one of {EDGES}.')
+            raise ValueError
+        self.reading = reading
+        self.condition = condition
+        self.handler = handler
+        self.edge = edge
+        self.pulse = pulse
+        self.state = False
+
+    def update(self, snapshot: dict) -> bool:
+        '''
+        Evaluates the condition on a snapshot.
+        Returns: True if the handler must be called.
+        '''
+        previous = False if self.pulse else self.state
+        self.state = bool(self.condition(snapshot[self.reading]))
+        if self.state == previous:
+            return False
+        return self.edge == 'both' or (self.edge == 'rising') == self.state
+
+
+class BehaviorEngine:
+    '''
+    Class BehaviorEngine(robot,rate) -> Runs the event handlers of a robot program.
+    Handlers are registered on conditions of the sensors. At every tick the engine
+    reads each sensor needed by the registered conditions once into a snapshot,
+    evaluates all the conditions against that snapshot and only then calls the
+    handlers of the conditions that changed (by default, when they become true).
+    Handlers are called as handler(snapshot), in the engine thread, in the order
+    they were registered and at most once per tick. The snapshot is a dictionary of the readings of the tick
+    and its 'time' (perf_counter seconds).
+    Functions:
+    on_line(sensor_id,handler,edge) Calls handler when a floor sensor reaches the line.
+    on_obstacle(dist,handler,edge) Calls handler when an obstacle comes closer than dist.
+    on_dark(handler,edge) Calls handler when the light sensor detects dark.
+    on_noise(handler) Calls handler at every noise detection.
+    on_collision(handler,edge,threshold) Calls handler when the robot collides.
+    on(reading,read,condition,handler,edge,pulse) Registers a handler on any reading.
+    remove(binding) Removes a registered handler.
+    tick() Reads the sensors once and calls the handlers of the changed conditions.
+    run(duration,until) Runs the engine in the calling thread.
+    start() Runs the engine in a background thread.
+    stop() Stops the engine.
+    get_stats() Returns the timing statistics of the ticks.
+    '''
+    def __init__(self, robot: robot_interface.FossBotInterface, rate: float = 50) -> None:
+        self.robot = robot
+        self.period = 1 / rate
+        self.readers = {}       # snapshot key -> read() of the sensor
+        self.bindings = []
+        self.snapshot = {}
+        self.stats = loop_stats.LoopStats(self.period)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.error = None       # exception raised by a handler of the background thread
+
+    def on(self, reading: str, read: Callable, condition: Callable, handler: Callable,
+           edge: str = 'rising', pulse: bool = False) -> Binding:
+        '''
+        Registers a handler on a condition of any reading.
+        Param: reading: the snapshot key of the reading (shared by all its conditions).
+               read: read() -> the reading, called once per tick.
+               condition: condition(reading) -> bool.
+               handler: handler(snapshot).
+               edge: the changes that call the handler ('rising', 'falling' or 'both').
+               pulse: if True, every tick the condition is true calls the handler.
+        Returns: the registered binding.
+        '''
+        binding = Binding(reading, condition, handler, edge, pulse)
+        self.readers.setdefault(reading, read)
+        self.bindings = self.bindings + [binding]     # the running tick keeps its list
+        return binding
+
+    def remove(self, binding: Binding) -> None:
+        '''
+        Removes a registered handler.
+        Param: binding: the binding returned by its registration.
+        '''
+        bindings = [other for other in self.bindings if other is not binding]
+        self.readers = {reading: read for reading, read in self.readers.items()
+                        if any(other.reading == reading for other in bindings)}
+        self.bindings = bindings
+
+    def on_line(self, sensor_id: int, handler: Callable, edge: str = 'rising') -> Binding:
+        '''
+        Calls handler when a floor sensor reaches the black line.
+        Param: sensor_id: the id of the floor - line sensor.
+               handler: handler(snapshot).
+               edge: 'falling' to call it when the sensor leaves the line, 'both' for both.
+        '''
+        return self.on(f'line_{sensor_id}', lambda: self.robot.check_on_line(sensor_id),
+                       bool, handler, edge)
+
+    def on_obstacle(self, dist: float, handler: Callable, edge: str = 'rising') -> Binding:
+        '''
+        Calls handler when an obstacle comes closer than dist.
+        Param: dist: the distance in cm (None: the obstacle threshold of the robot).
+               handler: handler(snapshot).
+               edge: 'falling' to call it when the obstacle goes away, 'both' for both.
+        '''
+        if dist is None:
+            return self.on('obstacle', self.robot.check_for_obstacle, bool, handler, edge)
+        return self.on('distance', self.robot.get_distance, lambda value: value <= dist,
+                       handler, edge)
+
+    def on_dark(self, handler: Callable, edge: str = 'rising') -> Binding:
+        '''
+        Calls handler when the light sensor detects dark.
+        Param: handler: handler(snapshot).
+               edge: 'falling' to call it when the light comes back, 'both' for both.
+        '''
+        return self.on('dark', self.robot.check_for_dark, bool, handler, edge)
+
+    def on_noise(self, handler: Callable) -> Binding:
+        '''
+        Calls handler at every noise detection.
+        Param: handler: handler(snapshot).
+        '''
+        return self.on('noise', self.robot.get_noise_detection, bool, handler, pulse=True)
+
+    def on_collision(self, handler: Callable, edge: str = 'rising',
+                     threshold: float = COLLISION_ACCELERATION) -> Binding:
+        '''
+        Calls handler when the robot collides: from the collision sensor of the
+        simulated robot, else when the horizontal acceleration exceeds threshold.
+        Param: handler: handler(snapshot).
+               edge: 'falling' to call it when the collision ends, 'both' for both.
+               threshold: the acceleration of a collision (m/s^2).
+        '''
+        check_collision = getattr(self.robot, 'check_collision', None)
+        if check_collision is not None:
+            return self.on('collision', check_collision, bool, handler, edge)
+        return self.on('acceleration', self.__horizontal_acceleration,
+                       lambda value: value >= threshold, handler, edge)
+
+    def __horizontal_acceleration(self) -> float:
+        '''Returns the magnitude of the horizontal acceleration of the robot.'''
+        return math.hypot(self.robot.get_acceleration('x'), self.robot.get_acceleration('y'))
+
+    def tick(self) -> dict:
+        '''
+        Reads every needed sensor once, evaluates all the conditions on the readings
+        and calls the handlers of the changed conditions.
+        Returns: the snapshot of the tick.
+        '''
+        bindings = self.bindings
+        snapshot = {'time': time.perf_counter()}
+        for reading, read in self.readers.items():
+            snapshot[reading] = read()
+        handlers = []
+        for binding in bindings:
+            if binding.update(snapshot) and binding.handler not in handlers:
+                handlers.append(binding.handler)
+        self.snapshot = snapshot
+        for handler in handlers:
+            handler(snapshot)
+        return snapshot
+
+    def run(self, duration: float = None, until: Callable = None) -> None:
+        '''
+        Runs the engine in the calling thread, a tick per period, until stop() is
+        called (for example by a handler).
+        Param: duration: stop after this time (seconds).
+               until: until(snapshot) -> bool, stop after the first tick it returns True.
+        '''
+        self.stopping.clear()
+        self.__loop(duration, until)
+
+    def __loop(self, duration: float = None, until: Callable = None) -> None:
+        '''Runs the ticks until stopped.'''
+        deadline = None if duration is None else time.perf_counter() + duration
+        next_tick = time.perf_counter()
+        while not self.stopping.is_set():
+            self.stats.tick()
+            snapshot = self.tick()
+            self.stats.done()
+            if until is not None and until(snapshot):
+                break
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            next_tick += self.period
+            if next_tick < now:
+                next_tick = now     # overrun: do not try to catch up
+            self.stopping.wait(next_tick - now)
+
+    def __run_background(self) -> None:
+        '''Runs the engine in the background thread, keeping the error of a handler.'''
+        try:
+            self.__loop()
+        except Exception as error:     # pylint: disable=broad-except
+            print(f'Behavior handler failed: {error!r}')
+            self.error = error
+
+    def start(self) -> None:
+        '''Runs the engine in a background thread (stopped by stop()).'''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.error = None
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.__run_background, daemon=True,
+                                       name='behaviors')
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''
+        Stops the engine (waits for the background thread, unless called by a handler).
+        Raises the error of a handler that ended the background thread.
+        '''
+        self.stopping.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+            self.thread = None
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+
+    def get_stats(self) -> dict:
+        '''
+        Returns: the timing statistics of the ticks (see loop_stats.LoopStats), with
+                 the number of sensor readings per tick.
+        '''
+        stats = self.stats.get_stats()
+        stats['readings'] = len(self.readers)
+        return stats
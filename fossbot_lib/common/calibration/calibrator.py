@@ -0,0 +1,296 @@
+"""
+Automated calibration of the motors, the turns and the line sensors of a robot
+"""
+
+import math
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from functools import partial
+from typing import Callable
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.parameters_parser import parser
+
+SURFACES = ('line', 'floor')
+# steps of the right wheel of the turns of the turn sweep
+TURN_STEPS = (6, 9, 12, 15)
+
+def _line_sensors(parameters: configuration.RobotParameters) -> dict:
+    '''Returns the parameter of the threshold of every floor sensor id.'''
+    if isinstance(parameters, configuration.SimRobotParameters):
+        ids = parameters.simulation
+        return {ids.sensor_middle_id: 'line_sensor_center',
+                ids.sensor_right_id: 'line_sensor_right',
+                ids.sensor_left_id: 'line_sensor_left'}
+    return {1: 'line_sensor_center', 2: 'line_sensor_right', 3: 'line_sensor_left'}
+
+def _line_scale(parameters: configuration.RobotParameters) -> float:
+    '''Returns the parameter value of a floor sensor reading of 1.'''
+    # the simulator readings are fractions, its thresholds are in %
+    return 100 if isinstance(parameters, configuration.SimRobotParameters) else 1
+
+def _fit_line(points: list) -> tuple:
+    '''
+    Least squares fit of a line.
+    Param: points: (x, y) tuples (at least two different x).
+    Returns: (slope, offset, rms of the residuals).
+    '''
+    xs, ys = [point[0] for point in points], [point[1] for point in points]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in points)
+             / sum((x - mean_x) ** 2 for x in xs))
+    offset = mean_y - slope * mean_x
+    rms = math.sqrt(statistics.fmean((y - slope * x - offset) ** 2 for x, y in points))
+    return slope, offset, rms
+
+def _miss_rate(threshold: float, mean: float, deviation: float) -> float:
+    '''Returns the share of normal readings (mean, deviation) beyond the threshold.'''
+    if deviation == 0:
+        return 0.0
+    return 0.5 * math.erfc(abs(threshold - mean) / deviation / math.sqrt(2))
+
+
+class Calibrator:
+    '''
+    Class Calibrator(robot,path,settle,timeout) -> Calibrates the parameters of a real or
+    simulated robot.
+    The calibration starts from the parameters of the file, as loaded (the parameters
+    held by a simulated robot carry its scene paths). Every routine runs a scripted sweep,
+    fits the parameters to the measurements, applies them to the robot
+    (robot.update_parameters) and adds them, with the accuracy to expect from them, to
+    the report. save() writes the calibrated parameters back to the parameters file.
+    Turns are measured by the heading of the robot (the gyroscope alone on the real
+    robot, the scene orientation in the simulator), distances by the odometers.
+    Balance the motors before the turns, the steps of a turn depend on the motor speeds.
+    In the simulator rotate_90 is a heading target, not a number of steps: the turn sweep
+    is reported but rotate_90 is kept.
+    Param: robot: the robot (real_robot or coppeliasim_robot FossBot).
+           path: the parameters file of the robot.
+           settle: the wait after every stop for the robot to come to rest (seconds).
+           timeout: the longest run of a motion of a sweep (seconds).
+    Functions:
+    calibrate_turns(steps,repeats) Fits rotate_90 to turns in place.
+    calibrate_balance(steps,trials,tolerance) Balances the motor speeds driving straight.
+    sample_surface(surface,count,interval) Samples the floor sensors over a known surface.
+    calibrate_line() Fits the line thresholds to the sampled surfaces.
+    get_parameters() Returns the calibrated parameters.
+    get_report() Returns the calibrated values and their expected accuracy.
+    save() Writes the calibrated parameters to the parameters file.
+    '''
+    def __init__(self, robot: robot_interface.FossBotInterface,
+                 path: str = "admin_parameters.yaml", settle: float = 0.3,
+                 timeout: float = 10) -> None:
+        self.robot = robot
+        self.path = path
+        self.settle = settle
+        self.timeout = timeout
+        self.parameters = type(robot.parameters).from_file(path)
+        self.calibrated = set()     # names of the calibrated parameters
+        self.samples = {surface: {sensor_id: [] for sensor_id in _line_sensors(self.parameters)}
+                        for surface in SURFACES}
+        self.report = {}
+        odometer = robot.odometer_right
+        self.step_distance = math.pi * odometer.wheel_diameter / odometer.sensor_disc
+
+    def __apply(self, **values) -> None:
+        '''Sets parameter values (by parameter name) and applies them to the robot.'''
+        self.parameters = replace(self.parameters, **{
+            name: replace(getattr(self.parameters, name), value=value)
+            for name, value in values.items()})
+        self.calibrated.update(values)
+        self.robot.update_parameters(self.parameters)
+
+    def __steps(self) -> tuple:
+        '''Returns the steps of the left and the right odometer.'''
+        return (self.robot.odometer_left.get_total_steps(),
+                self.robot.odometer_right.get_total_steps())
+
+    def __run(self, start: Callable, steps: int) -> tuple:
+        '''
+        Starts a motion, stops it after steps of the right wheel and lets the robot settle.
+        Returns: the steps of the left and the right wheel (with the coasting ones)
+                 and the change of heading (degrees).
+        '''
+        heading = self.robot.get_heading()
+        left, right = self.__steps()
+        deadline = time.perf_counter() + self.timeout
+        start()
+        while self.robot.odometer_right.get_total_steps() - right < steps:
+            if time.perf_counter() > deadline:
+                self.robot.stop()
+                print(f'The right wheel did not reach {steps} steps, check the motor speeds.')
+                raise RuntimeError
+            time.sleep(0.001)
+        self.robot.stop()
+        self.robot.wait(self.settle)
+        new_left, new_right = self.__steps()
+        return new_left - left, new_right - right, self.robot.get_heading() - heading
+
+    @contextmanager
+    def __gyro_heading(self):
+        '''Measures the heading with the gyroscope alone (the odometry is being calibrated).'''
+        estimator = getattr(self.robot, 'heading_estimator', None)
+        if estimator is None:
+            yield
+            return
+        weight, estimator.filter.gyro_weight = estimator.filter.gyro_weight, 1.0
+        try:
+            yield
+        finally:
+            estimator.filter.gyro_weight = weight
+
+    def calibrate_turns(self, steps: tuple = TURN_STEPS, repeats: int = 1) -> dict:
+        '''
+        Turns in place both ways for every number of steps of the right wheel, fits the
+        turned angle to the steps (the offset is the coasting) and sets rotate_90 to
+        the steps closest to 90 degrees (rotate_90 turns stop after rotate_90 + 1 steps).
+        Param: steps: the steps of the turns (at least two different ones).
+               repeats: the turns of each number of steps in each direction.
+        Returns: the turn part of the report.
+        '''
+        points = []
+        with self.__gyro_heading():
+            for count in steps:
+                for _ in range(repeats):
+                    for dir_id in (0, 1):
+                        _, _, turned = self.__run(partial(self.robot.just_rotate, dir_id), count)
+                        points.append((count, abs(turned)))
+        slope, offset, rms = _fit_line(points)
+        if slope <= 0:
+            print('The robot did not turn during the turn sweep.')
+            raise RuntimeError
+        result = {
+            'turn_degrees_per_step': slope,
+            'turn_coast': offset,
+            'wheel_base': 2 * self.step_distance / math.radians(slope),
+        }
+        if not isinstance(self.parameters, configuration.SimRobotParameters):
+            rotate_90 = max(round((90 - offset) / slope) - 1, 1)
+            turn = slope * (rotate_90 + 1) + offset
+            result.update({'rotate_90': rotate_90, 'turn_90': turn,
+                           'turn_error': math.hypot(turn - 90, rms)})
+            self.__apply(rotate_90=rotate_90)
+        self.report.update(result)
+        return result
+
+    def calibrate_balance(self, steps: int = 80, trials: int = 5,
+                          tolerance: float = 0.01) -> dict:
+        '''
+        Drives straight forward and back (to the start) for steps of the right wheel,
+        compares the steps of both wheels and slows the faster / speeds up the slower
+        motor by the square root of their ratio, until they match within tolerance.
+        Param: steps: the steps of the right wheel of each run.
+               trials: the most runs forward and back.
+               tolerance: the accepted mismatch of the wheels (0.01: 1%).
+        Returns: the balance part of the report.
+        '''
+        if trials < 1:
+            print(f'The balance needs at least one trial, got {trials}.')
+            raise ValueError
+        with self.__gyro_heading():
+            for _ in range(trials):
+                forward = self.__run(partial(self.robot.just_move, 'forward'), steps)
+                reverse = self.__run(partial(self.robot.just_move, 'reverse'), steps)
+                left, right = forward[0] + reverse[0], forward[1] + reverse[1]
+                if not left or not right:
+                    print('A wheel did not turn during the balance sweep.')
+                    raise RuntimeError
+                ratio = left / right
+                if abs(ratio - 1) <= tolerance:
+                    break
+                correction = math.sqrt(ratio)
+                self.__apply(
+                    motor_left_speed=min(
+                        round(self.parameters.motor_left_speed.value / correction, 2), 100),
+                    motor_right_speed=min(
+                        round(self.parameters.motor_right_speed.value * correction, 2), 100))
+        coast = (right / 2 - steps) * self.step_distance
+        distance = 2 * steps * self.step_distance
+        result = {
+            'motor_left_speed': self.parameters.motor_left_speed.value,
+            'motor_right_speed': self.parameters.motor_right_speed.value,
+            'balance': ratio,
+            'coast': coast,
+            # a distance is counted in whole steps, and the robot coasts after the stop
+            'distance_error': abs(coast) + self.step_distance / 2,
+            'drift': (abs(forward[2]) + abs(reverse[2])) / distance * 100,
+        }
+        self.report.update(result)
+        return result
+
+    def sample_surface(self, surface: str, count: int = 50, interval: float = 0.01) -> None:
+        '''
+        Samples all the floor sensors, placed over a known surface.
+        Param: surface: 'line' (every sensor over the line) or 'floor' (none over it).
+               count: the readings of each sensor.
+               interval: the time between readings (seconds).
+        '''
+        if surface not in SURFACES:
+            print(f'Unknown surface {surface}, use one of {SURFACES}.')
+            raise ValueError
+        samples = self.samples[surface]
+        for _ in range(count):
+            for sensor_id, readings in samples.items():
+                readings.append(self.robot.get_floor_sensor(sensor_id))
+            self.robot.wait(interval)
+
+    def calibrate_line(self) -> dict:
+        '''
+        Sets the threshold of every floor sensor between its line and floor readings
+        (sample_surface both first), at the same number of standard deviations from both.
+        Returns: the line part of the report, with the expected share of wrong line
+                 checks of each sensor.
+        '''
+        values, errors = {}, {}
+        scale = _line_scale(self.parameters)
+        for sensor_id, name in _line_sensors(self.parameters).items():
+            line, floor = self.samples['line'][sensor_id], self.samples['floor'][sensor_id]
+            if len(line) < 2 or len(floor) < 2:
+                print('Sample the line and the floor first (see sample_surface).')
+                raise RuntimeError
+            line_mean, floor_mean = statistics.fmean(line), statistics.fmean(floor)
+            line_deviation, floor_deviation = statistics.pstdev(line), statistics.pstdev(floor)
+            if line_mean == floor_mean:
+                print(f'Floor sensor {sensor_id} reads the same on the line and the floor.')
+                raise ValueError
+            spread = line_deviation + floor_deviation
+            threshold = ((line_mean * floor_deviation + floor_mean * line_deviation) / spread
+                         if spread else (line_mean + floor_mean) / 2)
+            values[name] = round(threshold * scale, 1) if scale != 1 else round(threshold)
+            errors[name] = max(_miss_rate(threshold, line_mean, line_deviation),
+                               _miss_rate(threshold, floor_mean, floor_deviation))
+        self.__apply(**values)
+        result = {**values, 'line_error': errors}
+        self.report.update(result)
+        return result
+
+    def get_parameters(self) -> configuration.RobotParameters:
+        '''Returns the calibrated parameters.'''
+        return self.parameters
+
+    def get_report(self) -> dict:
+        '''
+        Returns the calibrated values and their expected accuracy: the turn of a rotate_90
+        (turn_90) and its error (turn_error) in degrees, the distance error of a move
+        (distance_error) in cm, the heading drift driving straight (drift) in degrees per
+        meter and the share of wrong line checks of each floor sensor (line_error).
+        '''
+        return dict(self.report)
+
+    def save(self) -> None:
+        '''
+        Writes the calibrated parameters to the parameters file (the other values
+        are kept, the comments are not).
+        '''
+        path = self.path
+        file_param = parser.load_parameters(path)
+        if file_param is None:
+            print(f'Parameters file {path} not found.')
+            raise FileNotFoundError
+        for name in self.calibrated:
+            section = configuration.SECTIONS[name][0]
+            file_param[section]['value'] = getattr(self.parameters, name).value
+        type(self.parameters).from_dict(file_param)     # never write an invalid file
+        parser.save_parameters(file_param, path)
@@ -0,0 +1,172 @@
+"""
+Columnar log of robot calls (recorded on a robot, replayed elsewhere)
+"""
+
+import json
+import math
+import sys
+import time
+from array import array
+
+MAGIC = 'fossbot-call-log'
+VERSION = 2     # 2: calls that raised (version 1 logs read the same)
+COLUMNS = (('times', 'd'), ('durations', 'd'), ('methods', 'H'), ('args', 'I'),
+           ('values', 'd'), ('results', 'i'))
+
+class CallLog:
+    '''
+    Class CallLog() -> Columnar log of the calls of a robot program.
+    Every call is a row of: its start time (perf_counter seconds since the log
+    started), its duration, the method, its arguments and its result. Numeric
+    results are kept in a float column, other results and the argument tuples are
+    JSON encoded once in an interned table, so repeated calls cost a few bytes.
+    A call that raised keeps the exception type and message instead of a result.
+    Functions:
+    record(method,args,result,start,end) Logs a call.
+    record_error(method,args,error,start,end) Logs a call that raised.
+    get_entries(method) Returns the logged calls.
+    get_error(index) Returns the exception of a logged call.
+    save(path) Writes the log to a file.
+    load(path) Reads a log from a file (class method).
+    '''
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.start_wall = time.time()
+        self.method_names = []
+        self.method_codes = {}
+        self.table = []        # interned JSON strings (arguments and results)
+        self.table_index = {}
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __intern(self, value) -> int:
+        '''Returns the table index of the JSON encoding of value.'''
+        text = json.dumps(value)
+        index = self.table_index.get(text)
+        if index is None:
+            index = self.table_index[text] = len(self.table)
+            self.table.append(text)
+        return index
+
+    def __record_call(self, method: str, args: tuple, start: float, end: float) -> None:
+        '''Logs the time, the duration, the method and the arguments of a call.'''
+        code = self.method_codes.get(method)
+        if code is None:
+            code = self.method_codes[method] = len(self.method_names)
+            self.method_names.append(method)
+        self.times.append(start - self.start)
+        self.durations.append(end - start)
+        self.methods.append(code)
+        self.args.append(self.__intern(list(args)))
+
+    def record(self, method: str, args: tuple, result, start: float, end: float) -> None:
+        '''
+        Logs a call.
+        Param: method: the method name.
+               args: its arguments (JSON serializable).
+               result: its result (JSON serializable).
+               start: the perf_counter time of the call.
+               end: the perf_counter time of its return.
+        '''
+        self.__record_call(method, args, start, end)
+        if isinstance(result, (int, float)) and not isinstance(result, bool):
+            self.values.append(result)
+            self.results.append(-1)
+        else:
+            self.values.append(math.nan)
+            self.results.append(self.__intern(result))
+
+    def record_error(self, method: str, args: tuple, error: Exception,
+                     start: float, end: float) -> None:
+        '''
+        Logs a call that raised.
+        Param: method: the method name.
+               args: its arguments (JSON serializable).
+               error: the exception it raised.
+               start: the perf_counter time of the call.
+               end: the perf_counter time it raised.
+        '''
+        self.__record_call(method, args, start, end)
+        self.values.append(math.nan)
+        # results below -1 refer to the table entry of the exception: -2 - index
+        self.results.append(-2 - self.__intern([type(error).__name__, str(error)]))
+
+    def get_entry(self, index: int) -> tuple:
+        '''
+        Returns a logged call: (time, duration, method, args, result),
+        the result of a call that raised is None (see get_error).
+        Param: index: the row of the call.
+        '''
+        reference = self.results[index]
+        if reference == -1:
+            result = self.values[index]
+        elif reference < 0:
+            result = None
+        else:
+            result = json.loads(self.table[reference])
+        return (self.times[index], self.durations[index], self.method_names[self.methods[index]],
+                tuple(json.loads(self.table[self.args[index]])), result)
+
+    def get_error(self, index: int) -> tuple:
+        '''
+        Returns the exception of a logged call: (type name, message), None if it returned.
+        Param: index: the row of the call.
+        '''
+        reference = self.results[index]
+        if reference >= -1:
+            return None
+        return tuple(json.loads(self.table[-2 - reference]))
+
+    def get_entries(self, method: str = None) -> list:
+        '''
+        Returns the logged calls: tuples of (time, duration, method, args, result), oldest first.
+        Param: method: only calls of this method (default: all).
+        '''
+        code = self.method_codes.get(method)
+        if method is not None and code is None:
+            return []
+        return [self.get_entry(index) for index in range(len(self.times))
+                if code is None or self.methods[index] == code]
+
+    def save(self, path: str) -> None:
+        '''
+        Writes the log to a file: a JSON header line, then the raw columns.
+        Param: path: the file path.
+        '''
+        header = {'format': MAGIC, 'version': VERSION, 'byteorder': sys.byteorder,
+                  'start_wall': self.start_wall,
+                  'count': len(self.times), 'methods': self.method_names, 'table': self.table,
+                  'columns': [[name, typecode] for name, typecode in COLUMNS]}
+        with open(path, 'wb') as log_file:
+            log_file.write(json.dumps(header).encode('utf-8') + b'\n')
+            for name, _ in COLUMNS:
+                getattr(self, name).tofile(log_file)
+
+    @classmethod
+    def load(cls, path: str) -> 'CallLog':
+        '''
+        Reads a log from a file.
+        Param: path: the file path.
+        Returns: the log.
+        '''
+        with open(path, 'rb') as log_file:
+            header = json.loads(log_file.readline())
+            if header.get('format') != MAGIC:
+                print(f'{path} is not a call log.')
+                raise ValueError
+            log = cls()
+            log.start_wall = header['start_wall']
+            log.method_names = header['methods']
+            log.method_codes = {name: code for code, name in enumerate(log.method_names)}
+            log.table = header['table']
+            log.table_index = {text: index for index, text in enumerate(log.table)}
+            for name, typecode in header['columns']:
+                column = array(typecode)
+                column.fromfile(log_file, header['count'])
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+                setattr(log, name, column)
+        return log
+
+    def __len__(self) -> int:
+        return len(self.times)
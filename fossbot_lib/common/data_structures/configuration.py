@@ -2,72 +2,56 @@
 Robot configuration dataclasses
 """
 
-from dataclasses import dataclass
+import os
+from dataclasses import MISSING, dataclass, field, fields
+from types import MappingProxyType
+from typing import Mapping
+from fossbot_lib.parameters_parser.parser import load_parameters
 
-@dataclass
-class DefaultStep:
-    """ Default distance in cm for 1 step """
+@dataclass(frozen=True, slots=True)
+class Parameter:
+    """ A parameter of the parameters file """
     name: str
-    value: int
-    default: int
+    value: float
+    default: float
+
+@dataclass(frozen=True, slots=True)
+class DefaultStep(Parameter):
+    """ Default distance in cm for 1 step """
 
-@dataclass
-class MotorRightSpeed:
+@dataclass(frozen=True, slots=True)
+class MotorRightSpeed(Parameter):
     """ Default right motor speed """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class MotorLeftSpeed:
+@dataclass(frozen=True, slots=True)
+class MotorLeftSpeed(Parameter):
     """ Default left motor speed """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class SensorDistance:
+@dataclass(frozen=True, slots=True)
+class SensorDistance(Parameter):
     """ Min distance for obstacle detection """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class LightSensor:
+@dataclass(frozen=True, slots=True)
+class LightSensor(Parameter):
     """ Light Sensor """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class LineSensorLeft:
+@dataclass(frozen=True, slots=True)
+class LineSensorLeft(Parameter):
     """ Line Sensor left """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class LineSensorCenter:
+@dataclass(frozen=True, slots=True)
+class LineSensorCenter(Parameter):
     """ Line Sensor center """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class LineSensorRight:
+@dataclass(frozen=True, slots=True)
+class LineSensorRight(Parameter):
     """ Line Sensor right """
-    name: str
-    value: int
-    default: int
 
-@dataclass
-class Rotate90:
+@dataclass(frozen=True, slots=True)
+class Rotate90(Parameter):
     """ Rotate 90 degrees """
-    name: str
-    value: int
-    default: int
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SimRobotIds:
     """ Ids for simulation """
     client_id: int
@@ -94,9 +78,70 @@ class SimRobotIds:
     sensor_left_id: int = 3
 
 
-@dataclass
+# field of RobotParameters -> (section of the parameters file, class, lowest value, highest value)
+SECTIONS = {
+    'sensor_distance': ('sensor_distance', SensorDistance, 0, None),
+    'motor_left_speed': ('motor_left', MotorLeftSpeed, 0, 100),
+    'motor_right_speed': ('motor_right', MotorRightSpeed, 0, 100),
+    'default_step': ('step', DefaultStep, 0, None),
+    'light_sensor': ('light_sensor', LightSensor, 0, 1024),
+    'line_sensor_left': ('line_sensor_left', LineSensorLeft, 0, 1024),
+    'line_sensor_center': ('line_sensor_center', LineSensorCenter, 0, 1024),
+    'line_sensor_right': ('line_sensor_right', LineSensorRight, 0, 1024),
+    'rotate_90': ('rotate_90', Rotate90, 1, None),
+}
+SIMULATION_SECTION = 'simulator_ids'
+
+_FILE_CACHE = {}    # (class, absolute path) -> ((mtime, size), parameters)
+
+def _is_number(value) -> bool:
+    '''Returns True if value is an int or a float (not a bool).'''
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_parameter(section: str, values, low: float, high: float) -> list:
+    '''Returns the problems of a parameter section (name, value, default).'''
+    if not isinstance(values, dict):
+        return [f'{section}: missing, or not a mapping']
+    problems = [f'{section}: unknown key {key}' for key in values
+                if key not in ('name', 'value', 'default')]
+    if not isinstance(values.get('name'), str):
+        problems.append(f'{section}.name: expected a text')
+    for key in ('value', 'default'):
+        value = values.get(key)
+        if not _is_number(value):
+            problems.append(f'{section}.{key}: expected a number, got {value!r}')
+        elif key == 'value' and (value < low or (high is not None and value > high)):
+            problems.append(f'{section}.value: {value} is out of range '
+                            f'[{low}, {"..." if high is None else high}]')
+    return problems
+
+def _check_simulation(values) -> list:
+    '''Returns the problems of the simulator ids section.'''
+    if not isinstance(values, dict):
+        return [f'{SIMULATION_SECTION}: missing, or not a mapping']
+    problems = []
+    known = {ids_field.name: ids_field for ids_field in fields(SimRobotIds)}
+    for key, value in values.items():
+        if key not in known:
+            problems.append(f'{SIMULATION_SECTION}: unknown key {key}')
+        elif key.endswith('_id'):
+            if value is not None and not isinstance(value, int):
+                problems.append(f'{SIMULATION_SECTION}.{key}: expected an integer, got {value!r}')
+        elif not isinstance(value, str):
+            problems.append(f'{SIMULATION_SECTION}.{key}: expected a text, got {value!r}')
+    for name, ids_field in known.items():
+        if name not in values and name != 'client_id' and ids_field.default is MISSING:
+            problems.append(f'{SIMULATION_SECTION}.{name}: missing')
+    return problems
+
+
+@dataclass(frozen=True, slots=True)
 class RobotParameters:
-    """ Dataclass for all real robot parameters """
+    """
+    Dataclass for all real robot parameters.
+    The derived values (line_thresholds, dark_threshold, motor_left_duty,
+    motor_right_duty) are computed once, in the scale of the robot readings.
+    """
     sensor_distance: SensorDistance
     motor_left_speed: MotorLeftSpeed
     motor_right_speed: MotorRightSpeed
@@ -106,8 +151,129 @@ class RobotParameters:
     line_sensor_center: LineSensorCenter
     line_sensor_right: LineSensorRight
     rotate_90: Rotate90
+    # derived values
+    line_thresholds: Mapping = field(init=False, repr=False, compare=False)
+    dark_threshold: float = field(init=False, repr=False, compare=False)
+    motor_left_duty: float = field(init=False, repr=False, compare=False)
+    motor_right_duty: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        for name, value in self._derive().items():
+            object.__setattr__(self, name, value)
+
+    def _derive(self) -> dict:
+        '''
+        Returns the derived values: the line thresholds by sensor id and the dark
+        threshold in adc readings, the motor duty cycles in %.
+        '''
+        return {
+            'line_thresholds': MappingProxyType({1: self.line_sensor_center.value,
+                                                 2: self.line_sensor_right.value,
+                                                 3: self.line_sensor_left.value}),
+            'dark_threshold': self.light_sensor.value,
+            'motor_left_duty': self.motor_left_speed.value,
+            'motor_right_duty': self.motor_right_speed.value,
+        }
+
+    @classmethod
+    def validate(cls, file_param) -> list:
+        '''
+        Checks the contents of a parameters file.
+        Param: file_param: the parsed parameters file.
+        Returns: the list of problems (empty if the parameters are valid).
+        '''
+        if not isinstance(file_param, dict):
+            return ['the parameters file is empty, or not a mapping']
+        problems = []
+        for section, _, low, high in SECTIONS.values():
+            problems += _check_parameter(section, file_param.get(section), low, high)
+        return problems
+
+    @classmethod
+    def _build(cls, file_param: dict) -> dict:
+        '''Returns the constructor arguments of the parameters of a (valid) file.'''
+        return {name: parameter_class(**file_param[section])
+                for name, (section, parameter_class, _, _) in SECTIONS.items()}
 
-@dataclass
+    @classmethod
+    def from_dict(cls, file_param: dict) -> 'RobotParameters':
+        '''
+        Builds the parameters from the contents of a parameters file.
+        Param: file_param: the parsed parameters file.
+        Returns: the parameters (raises ValueError if they are not valid).
+        '''
+        problems = cls.validate(file_param)
+        if problems:
+            for problem in problems:
+                print(f'Invalid parameter {problem}')
+            raise ValueError
+        return cls(**cls._build(file_param))
+
+    @classmethod
+    def from_file(cls, path: str = "admin_parameters.yaml") -> 'RobotParameters':
+        '''
+        Loads the parameters from a yaml file. The parameters are cached by path
+        and modification time, so loading an unchanged file again is free.
+        Param: path: the path to the parameters file.
+        Returns: the parameters (raises ValueError if they are not valid).
+        '''
+        key = (cls, os.path.abspath(path))
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            print(f'Parameters file {path} not found.')
+            raise
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _FILE_CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        parameters = cls.from_dict(load_parameters(path))
+        _FILE_CACHE[key] = (version, parameters)
+        return parameters
+
+
+@dataclass(frozen=True, slots=True)
 class SimRobotParameters(RobotParameters):
-    """ Dataclass for all simulated robot parameters """
+    """
+    Dataclass for all simulated robot parameters.
+    The derived values are in the scale of the simulator readings.
+    """
     simulation: SimRobotIds
+
+    def _derive(self) -> dict:
+        '''
+        Returns the derived values: the line thresholds by sensor id and the dark
+        threshold as fractions of the full reading, the motor speeds as fractions
+        of the maximum velocity.
+        '''
+        ids = self.simulation
+        return {
+            'line_thresholds': MappingProxyType({
+                ids.sensor_middle_id: self.line_sensor_center.value / 100,
+                ids.sensor_right_id: self.line_sensor_right.value / 100,
+                ids.sensor_left_id: self.line_sensor_left.value / 100}),
+            'dark_threshold': self.light_sensor.value / 1024,
+            'motor_left_duty': self.motor_left_speed.value / 100,
+            'motor_right_duty': self.motor_right_speed.value / 100,
+        }
+
+    @classmethod
+    def validate(cls, file_param) -> list:
+        '''
+        Checks the contents of a parameters file (with its simulator ids).
+        Param: file_param: the parsed parameters file.
+        Returns: the list of problems (empty if the parameters are valid).
+        '''
+        # explicit super(): the slots dataclass replaces the class of the zero-argument form
+        problems = super(SimRobotParameters, cls).validate(file_param)
+        if isinstance(file_param, dict):
+            problems += _check_simulation(file_param.get(SIMULATION_SECTION))
+        return problems
+
+    @classmethod
+    def _build(cls, file_param: dict) -> dict:
+        '''Returns the constructor arguments of the parameters of a (valid) file.'''
+        arguments = super(SimRobotParameters, cls)._build(file_param)
+        arguments['simulation'] = SimRobotIds(**{'client_id': None,    # set on connection
+                                                 **file_param[SIMULATION_SECTION]})
+        return arguments
@@ -0,0 +1,58 @@
+"""
+Latched event counters
+"""
+
+import time
+from fossbot_lib.common.data_structures import ring_buffer
+
+class EventLatch:
+    '''
+    Class EventLatch(history) -> Counts timestamped events, so none is missed between polls.
+    Events are recorded by a single producer (for example an interrupt callback),
+    readers never lock. The timestamps of the newest events are kept in a ring buffer.
+    Functions:
+    record(timestamp) Records an event.
+    consume() Returns True if events happened since the previous consume().
+    get_events(since) Returns the timestamps of the events after since.
+    get_count() Returns the number of recorded events.
+    get_last_time() Returns the timestamp of the newest event.
+    '''
+    __slots__ = ('times', 'consumed')
+
+    def __init__(self, history: int = 64) -> None:
+        self.times = ring_buffer.RingBuffer(history, 'd')
+        self.consumed = 0
+
+    def record(self, timestamp: float = None) -> None:
+        '''
+        Records an event.
+        Param: timestamp: the perf_counter time of the event (default: now).
+        '''
+        self.times.append(time.perf_counter() if timestamp is None else timestamp)
+
+    def consume(self) -> bool:
+        '''Returns True if events happened since the previous consume() (the latch is cleared).'''
+        count = self.times.count
+        latched = count > self.consumed
+        self.consumed = count
+        return latched
+
+    def get_events(self, since: float = None) -> list:
+        '''
+        Returns the timestamps of the kept events (oldest first).
+        Param: since: only events after this perf_counter time (default: all kept events).
+        '''
+        times = self.times.last(self.times.size)
+        if since is None:
+            return times
+        return [stamp for stamp in times if stamp > since]
+
+    def get_count(self) -> int:
+        '''Returns the number of recorded events.'''
+        return self.times.count
+
+    def get_last_time(self) -> float:
+        '''Returns the perf_counter time of the newest event (None if there is none).'''
+        if self.times.count == 0:
+            return None
+        return self.times.latest()
@@ -0,0 +1,42 @@
+"""
+Heading estimation from a gyroscope and wheel odometry
+"""
+
+class HeadingFilter:
+    '''
+    Class HeadingFilter(gyro_weight) -> Complementary filter of the robot heading.
+    The gyroscope is precise over short periods but drifts, the odometry does not
+    drift but slips in turns: every update integrates the gyroscope and pulls the
+    result towards the odometry heading by (1 - gyro_weight). Updates are O(1).
+    Headings are in degrees, counterclockwise positive (not wrapped).
+    Functions:
+    update(gyro_delta,odometry_delta) Adds the rotation measured since the last update.
+    reset(heading) Sets the heading.
+    '''
+    __slots__ = ('gyro_weight', 'heading', 'odometry_heading', 'updates')
+
+    def __init__(self, gyro_weight: float = 0.98) -> None:
+        self.gyro_weight = gyro_weight
+        self.reset()
+
+    def update(self, gyro_delta: float, odometry_delta: float) -> float:
+        '''
+        Adds the rotation measured since the last update.
+        Param: gyro_delta: the integrated gyroscope rotation (degrees).
+               odometry_delta: the rotation of the wheel odometry (degrees).
+        Returns: the new heading.
+        '''
+        self.odometry_heading += odometry_delta
+        self.heading = (self.gyro_weight * (self.heading + gyro_delta)
+                        + (1 - self.gyro_weight) * self.odometry_heading)
+        self.updates += 1
+        return self.heading
+
+    def reset(self, heading: float = 0.0) -> None:
+        '''
+        Sets the heading.
+        Param: heading: the new heading (degrees).
+        '''
+        self.heading = heading
+        self.odometry_heading = heading
+        self.updates = 0
@@ -0,0 +1,67 @@
+"""
+Timing statistics of fixed rate loops
+"""
+
+import time
+
+class LoopStats:
+    '''
+    Class LoopStats(period) -> Timing statistics of a fixed rate loop.
+    Functions:
+    tick() Records the start of an iteration.
+    done() Records the end of the work of an iteration.
+    get_stats() Returns the collected statistics.
+    reset() Forgets the collected statistics.
+    '''
+    def __init__(self, period: float) -> None:
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        '''Forgets the collected statistics.'''
+        self.iterations = 0
+        self.overruns = 0
+        self.last_start = None
+        self.period_sum = 0.0
+        self.period_min = float('inf')
+        self.period_max = 0.0
+        self.work_sum = 0.0
+        self.work_max = 0.0
+
+    def tick(self) -> None:
+        '''Records the start of an iteration.'''
+        now = time.perf_counter()
+        if self.last_start is not None:
+            period = now - self.last_start
+            self.period_sum += period
+            self.period_min = min(self.period_min, period)
+            self.period_max = max(self.period_max, period)
+        self.last_start = now
+        self.iterations += 1
+
+    def done(self) -> None:
+        '''Records the end of the work of an iteration (after tick()).'''
+        work = time.perf_counter() - self.last_start
+        self.work_sum += work
+        self.work_max = max(self.work_max, work)
+        if work > self.period:
+            self.overruns += 1
+
+    def get_stats(self) -> dict:
+        '''
+        Returns: a dictionary with the number of iterations, the mean / min / max
+                 period and the mean / max work time of an iteration (in seconds),
+                 and the overruns (iterations whose work took longer than the period).
+        '''
+        periods = max(self.iterations - 1, 1)
+        iterations = max(self.iterations, 1)
+        return {
+            'iterations': self.iterations,
+            'target_period': self.period,
+            'mean_period': self.period_sum / periods,
+            'min_period': self.period_min if self.iterations > 1 else 0.0,
+            'max_period': self.period_max,
+            'mean_work': self.work_sum / iterations,
+            'max_work': self.work_max,
+            'overruns': self.overruns,
+        }
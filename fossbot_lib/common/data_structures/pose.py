@@ -0,0 +1,74 @@
+"""
+Dead reckoning of the robot pose
+"""
+
+import math
+import time
+from fossbot_lib.common.data_structures import ring_buffer
+
+FIELDS = ('time', 'x', 'y', 'theta')
+
+class PoseTracker:
+    '''
+    Class PoseTracker(wheel_base,history) -> Incremental dead reckoning of a differential robot.
+    Every update integrates a small motion (O(1), midpoint rule) into the pose (x, y, theta),
+    which is stored as one tuple, so readers always see a consistent pose without locking.
+    Each pose is also kept in a ring buffer of history poses.
+    x and y are in cm, theta in degrees (counterclockwise positive, not wrapped).
+    Written by a single producer thread (for example the gpio callback thread).
+    Functions:
+    update(left,right) Integrates the distances traveled by the wheels.
+    advance(distance,rotation) Integrates a distance and a rotation.
+    get_pose() Returns the current pose.
+    get_history(count) Returns the newest poses.
+    reset(x,y,theta) Sets the pose.
+    '''
+    def __init__(self, wheel_base: float = None, history: int = 256) -> None:
+        self.wheel_base = wheel_base
+        self.history = ring_buffer.RingBuffer(history, None)
+        self.reset()
+
+    def update(self, left: float, right: float) -> tuple:
+        '''
+        Integrates the distances traveled by the wheels (needs the wheel base).
+        Param: left: the signed distance of the left wheel (cm).
+               right: the signed distance of the right wheel (cm).
+        Returns: the new pose.
+        '''
+        return self.advance((left + right) / 2, math.degrees((right - left) / self.wheel_base))
+
+    def advance(self, distance: float, rotation: float) -> tuple:
+        '''
+        Integrates a distance and a rotation.
+        Param: distance: the signed distance traveled by the robot center (cm).
+               rotation: the rotation (degrees, counterclockwise positive).
+        Returns: the new pose.
+        '''
+        _, x, y, theta = self.pose
+        middle = math.radians(theta + rotation / 2)
+        pose = (time.perf_counter(), x + distance * math.cos(middle),
+                y + distance * math.sin(middle), theta + rotation)
+        self.pose = pose
+        self.history.append(pose)
+        return pose
+
+    def get_pose(self) -> dict:
+        '''Returns the current pose: a dictionary with time (perf_counter seconds), x, y and theta.'''
+        return dict(zip(FIELDS, self.pose))
+
+    def get_history(self, count: int) -> list:
+        '''
+        Returns the newest poses (oldest first).
+        Param: count: the number of poses.
+        '''
+        return [dict(zip(FIELDS, pose)) for pose in self.history.last(count)]
+
+    def reset(self, x: float = 0.0, y: float = 0.0, theta: float = 0.0) -> None:
+        '''
+        Sets the pose (the history is cleared).
+        Param: x, y: the position (cm).
+               theta: the heading (degrees).
+        '''
+        self.history.clear()
+        self.pose = (time.perf_counter(), x, y, theta)
+        self.history.append(self.pose)
@@ -0,0 +1,61 @@
+"""
+Fixed size ring buffers
+"""
+
+from array import array
+
+class RingBuffer:
+    '''
+    Class RingBuffer(size,typecode) -> Fixed size ring buffer.
+    Stores numbers in an array of typecode, or any objects (like tuples) if typecode is None.
+    Written by a single producer thread (for example a gpio callback),
+    appends are O(1) and readers never lock: the write counter is advanced
+    only after the value is stored, so readers see complete values.
+    Functions:
+    append(value) Stores a value, overwriting the oldest one when full.
+    last(count) Returns the newest count values (oldest first).
+    latest() Returns the newest value.
+    clear() Forgets all the stored values.
+    '''
+    __slots__ = ('size', 'data', 'count')
+
+    def __init__(self, size: int, typecode: str = 'd') -> None:
+        self.size = size
+        if typecode is None:
+            self.data = [None] * size
+        else:
+            self.data = array(typecode, bytes(array(typecode).itemsize * size))
+        self.count = 0     # total number of appended values
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def append(self, value) -> None:
+        '''
+        Stores a value, overwriting the oldest one when the buffer is full.
+        Param: value: the value to be stored.
+        '''
+        count = self.count
+        self.data[count % self.size] = value
+        self.count = count + 1
+
+    def latest(self):
+        '''Returns the newest value (None if the buffer is empty).'''
+        count = self.count
+        if count == 0:
+            return None
+        return self.data[(count - 1) % self.size]
+
+    def last(self, count: int) -> list:
+        '''
+        Returns the newest values.
+        Param: count: the number of values requested.
+        Returns: up to count values, oldest first.
+        '''
+        end = self.count
+        count = min(count, end, self.size)
+        return [self.data[i % self.size] for i in range(end - count, end)]
+
+    def clear(self) -> None:
+        '''Forgets all the stored values.'''
+        self.count = 0
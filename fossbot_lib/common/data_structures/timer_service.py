@@ -0,0 +1,89 @@
+"""
+Monotonic named timers
+"""
+
+import time
+from typing import Callable
+
+class TimerService:
+    '''
+    Class TimerService(clock) -> Named stopwatches on a monotonic clock.
+    Times are kept as integer nanoseconds of the clock (time.perf_counter_ns by default,
+    which never jumps with wall clock changes) and returned as float seconds.
+    Functions:
+    now() Returns the clock time in seconds.
+    start(name) Starts (or restarts) a timer.
+    stop(name) Stops a timer.
+    is_running(name) Returns True if a timer is running.
+    elapsed(name) Returns the seconds since a timer started.
+    lap(name) Records a lap and returns its split time.
+    get_laps(name) Returns the split times of the recorded laps.
+    '''
+    def __init__(self, clock: Callable[[], int] = time.perf_counter_ns) -> None:
+        self.clock = clock
+        self.starts = {}    # name -> start time (ns)
+        self.laps = {}      # name -> [last lap time (ns), split times (s)]
+
+    def now(self) -> float:
+        '''Returns the clock time in seconds.'''
+        return self.clock() * 1e-9
+
+    def start(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer, its laps are cleared.
+        Param: name: the timer name.
+        '''
+        now = self.clock()
+        self.starts[name] = now
+        self.laps[name] = [now, []]
+
+    def stop(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
+        self.starts.pop(name, None)
+        self.laps.pop(name, None)
+
+    def is_running(self, name: str = 'default') -> bool:
+        '''
+        Returns True if a timer is running.
+        Param: name: the timer name.
+        '''
+        return name in self.starts
+
+    def elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the seconds since a timer started (0 if it is not running).
+        Param: name: the timer name.
+        '''
+        start = self.starts.get(name)
+        if start is None:
+            return 0.0
+        return (self.clock() - start) * 1e-9
+
+    def lap(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a running timer.
+        Param: name: the timer name.
+        Returns: the split time, seconds since the previous lap (or the start).
+        '''
+        laps = self.laps.get(name)
+        if laps is None:
+            print(f'Timer {name} not started')
+            raise KeyError
+        now = self.clock()
+        split = (now - laps[0]) * 1e-9
+        laps[0] = now
+        laps[1].append(split)
+        return split
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the split times (seconds) of the recorded laps of a timer.
+        Param: name: the timer name.
+        '''
+        laps = self.laps.get(name)
+        if laps is None:
+            return []
+        return list(laps[1])
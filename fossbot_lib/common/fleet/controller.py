@@ -0,0 +1,190 @@
+"""
+Fleet of robots driven together (commands and sensor reads fanned out concurrently)
+"""
+
+import math
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from fossbot_lib.common.interfaces import robot_interface
+
+class FleetResult:
+    '''
+    Class FleetResult(method,names) -> Results of a call on every robot of a fleet.
+    The results, errors and latencies are kept in the order of the robots.
+    Functions:
+    get(name) Returns the result of a robot (raises its error).
+    get_values() Returns the numeric results as an array.
+    get_errors() Returns the errors of the failed robots.
+    get_latency(name) Returns the latency of the call on a robot.
+    get_stats() Returns the latency statistics of the call.
+    ok() Returns True if the call succeeded on every robot.
+    '''
+    def __init__(self, method: str, names: list) -> None:
+        self.method = method
+        self.names = names
+        self.results = [None] * len(names)
+        self.errors = [None] * len(names)
+        self.latencies = array('d', [math.nan]) * len(names)   # seconds, nan if unfinished
+        self.wall = 0.0         # seconds from the first send to the last reply
+
+    def get(self, name):
+        '''
+        Returns the result of a robot.
+        Param: name: the robot name.
+        '''
+        index = self.names.index(name)
+        if self.errors[index] is not None:
+            raise self.errors[index]
+        return self.results[index]
+
+    def get_values(self) -> array:
+        '''
+        Returns the results as an array of floats, in the order of the robots
+        (nan for failed robots and results that are not numbers).
+        '''
+        return array('d', (float(result) if error is None and isinstance(result, (int, float))
+                           else math.nan for result, error in zip(self.results, self.errors)))
+
+    def get_errors(self) -> dict:
+        '''Returns a dictionary of the errors of the failed robots, by name.'''
+        return {name: error for name, error in zip(self.names, self.errors) if error is not None}
+
+    def get_latency(self, name) -> float:
+        '''
+        Returns the latency (seconds) of the call on a robot.
+        Param: name: the robot name.
+        '''
+        return self.latencies[self.names.index(name)]
+
+    def ok(self) -> bool:
+        '''Returns True if the call succeeded on every robot.'''
+        return all(error is None for error in self.errors)
+
+    def get_stats(self) -> dict:
+        '''
+        Returns: a dictionary with the number of robots and failures, the mean /
+                 min / max latency of the finished calls, the slowest robot and the
+                 wall time of the whole call (seconds).
+        '''
+        finished = [(latency, name) for latency, name in zip(self.latencies, self.names)
+                    if not math.isnan(latency)]
+        latencies = [latency for latency, _ in finished]
+        return {
+            'robots': len(self.names),
+            'failed': len(self.get_errors()),
+            'mean_latency': sum(latencies) / len(latencies) if latencies else math.nan,
+            'min_latency': min(latencies, default=math.nan),
+            'max_latency': max(latencies, default=math.nan),
+            'slowest': max(finished)[1] if finished else None,
+            'wall': self.wall,
+        }
+
+    def __repr__(self) -> str:
+        return f'FleetResult({self.method}, {dict(zip(self.names, self.results))})'
+
+
+class Fleet:
+    '''
+    Class Fleet(robots,timeout) -> Drives many robots of any backend together.
+    Every call is sent to all the robots at once from a thread pool (a thread
+    per robot), so a call on N networked robots takes about one round trip instead
+    of N. Calls on the same robot never overlap. Any method of the robot interface
+    can be called on the fleet (fleet.stop(), fleet.get_distance()...) and returns
+    a FleetResult. Failures of single robots are kept in the result, not raised.
+    Param: robots: a list of robots (named robot_0, robot_1...) or a dictionary of
+                   robots by name.
+           timeout: the time (seconds) to wait for the replies of a call (None: no limit);
+                    robots that did not reply fail with a TimeoutError.
+    Functions:
+    call(method,*args,**kwargs) Calls a method with the same arguments on every robot.
+    call_each(method,arguments) Calls a method with different arguments on every robot.
+    select(names) Returns a fleet of some of the robots.
+    close() Stops the thread pool.
+    '''
+    def __init__(self, robots, timeout: float = None) -> None:
+        if not isinstance(robots, dict):
+            robots = {f'robot_{index}': robot for index, robot in enumerate(robots)}
+        if not robots:
+            print('A fleet needs at least one robot.')
+            raise ValueError
+        self.names = list(robots)
+        self.robots = list(robots.values())
+        self.timeout = timeout
+        self.locks = [threading.Lock() for _ in self.robots]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.robots),
+                                           thread_name_prefix='fleet')
+
+    def __len__(self) -> int:
+        return len(self.robots)
+
+    def __getitem__(self, name) -> robot_interface.FossBotInterface:
+        return self.robots[self.names.index(name)]
+
+    def __getattr__(self, name: str):
+        if not name.startswith('_') and callable(getattr(robot_interface.FossBotInterface,
+                                                         name, None)):
+            return partial(self.call, name)
+        raise AttributeError(name)
+
+    def __call_robot(self, index: int, method: str, args: tuple, kwargs: dict) -> tuple:
+        '''Calls a method of a robot. Returns (result, error, latency).'''
+        with self.locks[index]:
+            start = time.perf_counter()
+            try:
+                result = getattr(self.robots[index], method)(*args, **kwargs)
+            except Exception as error:     # pylint: disable=broad-except
+                return None, error, time.perf_counter() - start
+            return result, None, time.perf_counter() - start
+
+    def call(self, method: str, *args, **kwargs) -> FleetResult:
+        '''
+        Calls a method with the same arguments on every robot, concurrently.
+        Param: method: the method name.
+               args, kwargs: its arguments.
+        Returns: the results (FleetResult).
+        '''
+        return self.call_each(method, [args] * len(self.robots), **kwargs)
+
+    def call_each(self, method: str, arguments: list, **kwargs) -> FleetResult:
+        '''
+        Calls a method with different arguments on every robot, concurrently.
+        Param: method: the method name.
+               arguments: the tuples of positional arguments of the robots (in
+                          the order of the robots).
+               kwargs: keyword arguments, the same for every robot.
+        Returns: the results (FleetResult).
+        '''
+        if len(arguments) != len(self.robots):
+            print(f'Expected the arguments of {len(self.robots)} robots, got {len(arguments)}.')
+            raise ValueError
+        result = FleetResult(method, self.names)
+        start = time.perf_counter()
+        futures = [self.executor.submit(self.__call_robot, index, method, tuple(args), kwargs)
+                   for index, args in enumerate(arguments)]
+        wait(futures, timeout=self.timeout)
+        result.wall = time.perf_counter() - start
+        for index, future in enumerate(futures):
+            if future.done():
+                result.results[index], result.errors[index], result.latencies[index] = \
+                    future.result()
+            else:
+                result.errors[index] = TimeoutError(f'{self.names[index]} did not reply '
+                                                    f'to {method} in {self.timeout} s')
+        return result
+
+    def select(self, names: list) -> 'Fleet':
+        '''
+        Returns a fleet of some of the robots, with its own thread pool (calls on a
+        robot still never overlap with the calls of this fleet).
+        Param: names: the robot names.
+        '''
+        fleet = Fleet({name: self[name] for name in names}, self.timeout)
+        fleet.locks = [self.locks[self.names.index(name)] for name in names]
+        return fleet
+
+    def close(self) -> None:
+        '''Stops the thread pool (waits for the running calls).'''
+        self.executor.shutdown(wait=True)
@@ -8,28 +8,43 @@ class TimerInterface(ABC):
     '''
     Class timer()
     Functions:
-    stop_timer() Stops a timer.
-    start_timer() Starts a timer.
-    elapsed() Prints elapsed time from start.
-    get_elapsed() Returns the elapsed time between start time and that moment in sec.
+    stop_timer(name) Stops a timer.
+    start_timer(name) Starts a timer.
+    elapsed(name) Prints elapsed time from start.
+    get_elapsed(name) Returns the elapsed time between start time and that moment in sec.
+    lap(name) Records a lap and returns its split time in sec.
+    get_laps(name) Returns the split times of the recorded laps.
+    now() Returns the time of the timer clock in sec.
     '''
 
     @abstractmethod
-    def stop_timer(self) -> None:
+    def stop_timer(self, name: str = 'default') -> None:
         '''Stops timer.'''
 
     @abstractmethod
-    def start_timer(self) -> None:
+    def start_timer(self, name: str = 'default') -> None:
         '''Starts timer.'''
 
     @abstractmethod
-    def elapsed(self) -> None:
+    def elapsed(self, name: str = 'default') -> None:
         '''Prints elapsed time from start.'''
 
     @abstractmethod
-    def get_elapsed(self) -> int:
+    def get_elapsed(self, name: str = 'default') -> float:
         '''Returns the elapsed time in seconds.'''
 
+    @abstractmethod
+    def lap(self, name: str = 'default') -> float:
+        '''Records a lap, returns the seconds since the previous lap (or the start).'''
+
+    @abstractmethod
+    def get_laps(self, name: str = 'default') -> list:
+        '''Returns the split times (seconds) of the recorded laps.'''
+
+    @abstractmethod
+    def now(self) -> float:
+        '''Returns the time of the timer clock in seconds.'''
+
 class MotorInterface(ABC):
     """
     Interface for Motor control.
@@ -73,6 +88,8 @@ class OdometerInterface(ABC):
     count_revolutions() Increases the counter of revolutions.
     get_revolutions() Returns the number of revolutions.
     get_distance() Returns the traveled distance in cm.
+    get_velocity() Returns the wheel speed in cm/s.
+    get_rpm() Returns the wheel speed in revolutions per minute.
     reset() Resets the steps counter.
     '''
 
@@ -92,6 +109,14 @@ class OdometerInterface(ABC):
     def get_distance(self) -> float:
         ''' Return the total distance traveled so far (in cm). '''
 
+    @abstractmethod
+    def get_velocity(self) -> float:
+        ''' Returns the wheel speed (in cm/s) computed from the recent steps. '''
+
+    @abstractmethod
+    def get_rpm(self) -> float:
+        ''' Returns the wheel speed in revolutions per minute. '''
+
     @abstractmethod
     def reset(self) -> None:
         ''' Reset the total traveled distance and revolutions. '''
@@ -155,12 +180,20 @@ class NoiseInterface(ABC):
     '''
     Interface for noise (detection).
     Functions:
-    detect_noise(): Returns True only if noise is detected.
+    detect_noise(): Returns True only if noise was detected since the previous call.
+    get_noise_events(since) Returns the times of the noise events.
     '''
     @abstractmethod
     def detect_noise(self) -> bool:
         '''
-        Returns True only if noise was detected.
+        Returns True only if noise was detected since the previous call (latched).
+        '''
+
+    @abstractmethod
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the times of the newest noise events (oldest first).
+        Param: since: only events after this time.perf_counter() time.
         '''
 
 # Hardware section
@@ -195,6 +228,42 @@ class GenOutputInterface(ABC):
         Set Low the output pin
         '''
 
+class PWMInterface(ABC):
+    '''
+    Interface for a PWM output.
+    Functions:
+    start(duty) Starts the output with a duty cycle.
+    set_duty_cycle(duty) Changes the duty cycle (0-100).
+    set_frequency(freq) Changes the frequency (Hz).
+    stop() Stops the output.
+    '''
+    @abstractmethod
+    def start(self, duty: float) -> None:
+        '''
+        Starts the output with a duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+
+    @abstractmethod
+    def set_duty_cycle(self, duty: float) -> None:
+        '''
+        Changes the duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+
+    @abstractmethod
+    def set_frequency(self, freq: float) -> None:
+        '''
+        Changes the frequency.
+        Param: freq: the frequency (Hz).
+        '''
+
+    @abstractmethod
+    def stop(self) -> None:
+        '''
+        Stops the output.
+        '''
+
 class LedRGBInterface(ABC):
     '''
     Interface for Led control.
@@ -209,3 +278,46 @@ class LedRGBInterface(ABC):
         Param: color: the wanted color
         For closing the led, use color == 'closed'
         '''
+
+class AudioPlayerInterface(ABC):
+    '''
+    Interface for a long-lived audio player.
+    Functions:
+    start() Starts the audio backend ahead of the first sound.
+    preload(audio_path) Loads a sound into the player's cache.
+    play(audio_path,wait) Plays a sound (blocks until it ends only if wait is True).
+    stop() Stops the sound that is currently playing.
+    is_playing() Returns True while a sound is playing.
+    close() Releases the audio resources.
+    '''
+
+    @abstractmethod
+    def start(self) -> None:
+        '''Starts the audio backend ahead of the first sound.'''
+
+    @abstractmethod
+    def preload(self, audio_path: str) -> None:
+        '''
+        Loads a sound into the player's cache so the first play starts without delay.
+        Param: audio_path: the path to the wanted mp3 file.
+        '''
+
+    @abstractmethod
+    def play(self, audio_path: str, wait: bool = True) -> None:
+        '''
+        Plays mp3 file specified by input audio_path.
+        Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends.
+        '''
+
+    @abstractmethod
+    def stop(self) -> None:
+        '''Stops the sound that is currently playing.'''
+
+    @abstractmethod
+    def is_playing(self) -> bool:
+        '''Returns True while a sound is playing.'''
+
+    @abstractmethod
+    def close(self) -> None:
+        '''Releases the audio resources.'''
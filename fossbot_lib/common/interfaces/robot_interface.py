@@ -7,6 +7,12 @@ from abc import ABC, abstractmethod
 class FossBotInterface(ABC):
     """ FossBot Interface """
 
+    @abstractmethod
+    def warmup(self) -> None:
+        '''
+        Initializes all devices and subsystems now, instead of on first use.
+        '''
+
     # movement
     @abstractmethod
     def just_move(self, direction: str = "forward") -> None:
@@ -123,6 +129,37 @@ class FossBotInterface(ABC):
         Rotates robot 90 degrees counterclockwise.
         '''
 
+    @abstractmethod
+    def rotate_degrees(self, angle: float) -> None:
+        '''
+        Rotates robot by an angle, stopping on the estimated heading.
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+        '''
+
+    # heading
+    @abstractmethod
+    def get_heading(self) -> float:
+        '''
+        Returns the estimated heading of the robot in degrees
+        (counterclockwise positive, not wrapped).
+        '''
+
+    # pose
+    @abstractmethod
+    def get_pose(self) -> dict:
+        '''
+        Returns the dead reckoning pose of the robot: a dictionary with time,
+        x, y (cm) and theta (degrees, counterclockwise positive).
+        '''
+
+    @abstractmethod
+    def get_pose_history(self, count: int) -> list:
+        '''
+        Returns the newest poses (oldest first).
+        Param: count: the number of poses.
+        '''
+
     # ultrasonic sensor
     @abstractmethod
     def get_distance(self) -> float:
@@ -134,10 +171,11 @@ class FossBotInterface(ABC):
 
     # sound
     @abstractmethod
-    def play_sound(self, audio_path: str) -> None:
+    def play_sound(self, audio_path: str, wait: bool = True) -> None:
         '''
         Plays mp3 file specified by input audio_path.
         Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends, else returns immediately.
         '''
 
     # floor sensors
@@ -200,6 +238,13 @@ class FossBotInterface(ABC):
     def get_noise_detection(self) -> bool:
         """ Returns True only if noise is detected. """
 
+    @abstractmethod
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the times (time.perf_counter() seconds) of the newest noise events.
+        Param: since: only events after this time.
+        '''
+
     # exit
     @abstractmethod
     def exit(self) -> None:
@@ -207,13 +252,37 @@ class FossBotInterface(ABC):
 
     # timer:
     @abstractmethod
-    def stop_timer(self) -> None:
-        '''Stops the timer.'''
+    def stop_timer(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
 
     @abstractmethod
-    def start_timer(self) -> None:
-        '''Starts the timer.'''
+    def start_timer(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer.
+        Param: name: the timer name.
+        '''
 
     @abstractmethod
-    def get_elapsed(self) -> int:
-        '''Returns the time from start.'''
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the time from start (seconds).
+        Param: name: the timer name.
+        '''
+
+    @abstractmethod
+    def lap_timer(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a timer.
+        Param: name: the timer name.
+        Returns: the seconds since the previous lap (or the start).
+        '''
+
+    @abstractmethod
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the split times (seconds) of the recorded laps of a timer.
+        Param: name: the timer name.
+        '''
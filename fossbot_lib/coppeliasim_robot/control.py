@@ -3,11 +3,15 @@ Implementation of simulated control.
 """
 
 import math
+import os
+import threading
 import time
-from datetime import datetime
+from collections import OrderedDict
+from typing import Callable
+import pygame
 from fossbot_lib.common.interfaces import control_interfaces
-from fossbot_lib.common.data_structures import configuration
-from fossbot_lib.coppeliasim_robot import sim
+from fossbot_lib.common.data_structures import configuration, event_latch, ring_buffer, timer_service
+from fossbot_lib.coppeliasim_robot import sim, sim_clock
 
 # General Functions
 def init_component(client_id: int, component_name: str) -> int:
@@ -86,46 +90,59 @@ def get_object_children(client_id: int, object_name: str = '/', print_all=False)
 
 class Timer(control_interfaces.TimerInterface):
     '''
-    Class timer()
+    Class Timer(clock) -> Named timers on a monotonic clock (time.perf_counter_ns by default).
     Functions:
-    stop_timer() Stops a timer.
-    start_timer() Starts a timer.
-    elapsed() Prints elapsed time from start.
-    get_elapsed() Returns the elapsed time between start time and that moment in sec.
+    stop_timer(name) Stops a timer.
+    start_timer(name) Starts a timer.
+    elapsed(name) Prints elapsed time from start.
+    get_elapsed(name) Returns the elapsed time between start time and that moment in sec.
+    lap(name) Records a lap and returns its split time in sec.
+    get_laps(name) Returns the split times of the recorded laps.
+    now() Returns the time of the timer clock in sec.
     '''
-    def __init__(self):
-        self.start = 0
+    def __init__(self, clock: Callable[[], int] = time.perf_counter_ns) -> None:
+        self.service = timer_service.TimerService(clock)
 
-    def stop_timer(self) -> None:
+    def stop_timer(self, name: str = 'default') -> None:
         '''Stops timer.'''
-        self.start = 0
+        self.service.stop(name)
 
-    def start_timer(self) -> None:
+    def start_timer(self, name: str = 'default') -> None:
         '''Starts timer.'''
-        self.start = datetime.now()
+        self.service.start(name)
 
-    def elapsed(self) -> None:
+    def elapsed(self, name: str = 'default') -> None:
         '''Prints elapsed time from start.'''
-        if self.start == 0:
+        if not self.service.is_running(name):
             print("Timer not started")
         else:
-            dif = datetime.now() - self.start
-            print(f'The elapsed time in sec is {dif}')
+            print(f'The elapsed time in sec is {self.service.elapsed(name):.6f}')
 
-    def get_elapsed(self) -> int:
-        '''Returns the elapsed time in seconds.'''
-        if self.start == 0:
-            return 0
-        else:
-            format_data = "%d/%m/%y %H:%M:%S"
-            start_time = datetime.strptime(self.start.strftime(format_data), format_data)
-            now_time = datetime.now().strftime(format_data)
-            now_time = datetime.strptime(now_time, format_data)
-            elapsed = now_time - start_time
-            elapsed = elapsed.total_seconds()
-            elapsed = int(elapsed)
-            return elapsed
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''Returns the elapsed time in seconds (0 if the timer is not started).'''
+        return self.service.elapsed(name)
+
+    def lap(self, name: str = 'default') -> float:
+        '''Records a lap, returns the seconds since the previous lap (or the start).'''
+        return self.service.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''Returns the split times (seconds) of the recorded laps.'''
+        return self.service.get_laps(name)
 
+    def now(self) -> float:
+        '''Returns the time of the timer clock in seconds.'''
+        return self.service.now()
+
+class SimTimer(Timer):
+    '''
+    Class SimTimer(clock) -> Named timers on the simulation clock (a sim_clock.SimClock),
+    so they follow the simulated world even when the simulation runs slower or faster
+    than real time, and stop while it is paused.
+    '''
+    def __init__(self, clock: sim_clock.SimClock) -> None:
+        self.clock = clock
+        super().__init__(clock.now_ns)
 
 class Motor(control_interfaces.MotorInterface):
     """
@@ -200,13 +217,21 @@ class Motor(control_interfaces.MotorInterface):
 class Odometer(control_interfaces.OdometerInterface):
     '''
     Class Odometer(sim_param, motor_name) -> Odometer control.
+    Every steps reading is stored with its time, so the wheel speed is
+    computed from the readings of the last velocity_window seconds.
+    reset() only moves an offset, the step counter of the scene is never reset
+    (so the total steps can be followed by a pose tracker).
     Functions:
     count_revolutions() Increases the counter of revolutions.
     get_revolutions() Returns the number of revolutions.
     get_distance() Returns the traveled distance in cm.
+    get_total_steps() Returns the steps of the scene counter.
+    get_velocity() Returns the wheel speed in cm/s.
+    get_rpm() Returns the wheel speed in revolutions per minute.
     reset() Resets the steps counter.
     '''
-    def __init__(self, sim_param: configuration.SimRobotParameters, motor_name: str) -> None:
+    def __init__(self, sim_param: configuration.SimRobotParameters, motor_name: str,
+                 history: int = 32, velocity_window: float = 0.5) -> None:
         self.sensor_disc = 20   #by default 20 lines sensor disc
         self.steps = 0
         self.wheel_diameter = 6.65  #by default the wheel diameter is 6.6
@@ -214,6 +239,10 @@ class Odometer(control_interfaces.OdometerInterface):
         self.client_id = sim_param.simulation.client_id
         self.param = sim_param
         self.motor_name = motor_name
+        self.velocity_window = velocity_window
+        self.offset = 0     # scene steps at the last reset
+        self.sample_times = ring_buffer.RingBuffer(history, 'd')
+        self.sample_steps = ring_buffer.RingBuffer(history, 'q')
 
     def count_revolutions(self) -> None:
         '''Increase total steps by one.'''
@@ -222,16 +251,22 @@ class Odometer(control_interfaces.OdometerInterface):
                 self.client_id, self.motor_name,
                 'count_revolutions')
             if res == sim.simx_return_ok and len(steps)>=1:
-                self.steps = steps[0]
+                self.steps = steps[0] - self.offset
                 break
 
-    def get_steps(self) -> int:
-        ''' Returns total number of steps. '''
+    def get_total_steps(self) -> int:
+        ''' Returns the steps of the scene counter (not affected by reset). '''
         while True:
             res, steps, _, _, _ = exec_vrep_script(self.client_id, self.motor_name, 'get_steps')
             if res == sim.simx_return_ok and len(steps)>=1:
-                self.steps = steps[0]
-                return self.steps
+                self.sample_times.append(time.perf_counter())
+                self.sample_steps.append(steps[0])
+                return steps[0]
+
+    def get_steps(self) -> int:
+        ''' Returns total number of steps. '''
+        self.steps = self.get_total_steps() - self.offset
+        return self.steps
 
     def get_revolutions(self) -> float:
         ''' Returns total number of revolutions. '''
@@ -252,13 +287,36 @@ class Odometer(control_interfaces.OdometerInterface):
         #self.__print_distance(distance) # used only for debugging
         return round(distance, self.precision)
 
+    def get_step_rate(self) -> float:
+        '''
+        Returns the steps per second over the readings of the last velocity_window seconds
+        (reads the steps once, to add a fresh reading).
+        '''
+        self.get_steps()
+        times = self.sample_times.last(self.sample_times.size)
+        steps = self.sample_steps.last(self.sample_steps.size)
+        oldest = len(times) - 1
+        while oldest > 0 and times[-1] - times[oldest - 1] <= self.velocity_window:
+            oldest -= 1
+        if times[-1] == times[oldest]:
+            return 0.0
+        return (steps[-1] - steps[oldest]) / (times[-1] - times[oldest])
+
+    def get_velocity(self) -> float:
+        ''' Returns the wheel speed (in cm/s) computed from the recent steps. '''
+        circumference = self.wheel_diameter * math.pi
+        return self.get_step_rate() / self.sensor_disc * circumference
+
+    def get_rpm(self) -> float:
+        ''' Returns the wheel speed in revolutions per minute. '''
+        return self.get_step_rate() / self.sensor_disc * 60
+
     def reset(self) -> None:
         ''' Reset the total traveled distance and revolutions. '''
-        while True:
-            res, _, _, _, _ = exec_vrep_script(self.client_id, self.motor_name, 'reset_steps')
-            if res == sim.simx_return_ok:
-                break
+        self.offset = self.get_total_steps()
         self.steps = 0
+        self.sample_times.clear()
+        self.sample_steps.clear()
 
 class UltrasonicSensor(control_interfaces.UltrasonicSensorInterface):
     '''
@@ -402,23 +460,72 @@ class AnalogueReadings(control_interfaces.AnalogueReadingsInterface):
 
 class Noise(control_interfaces.NoiseInterface):
     '''
-    Class Noise() -> Handles Noise Detection.
+    Class Noise(sim_param,rate,history) -> Handles Noise Detection.
+    A background thread polls the noise flag of the gui rate times per second and
+    counts its rising edges, so noise between calls is never missed
+    (it starts on first use, call start() to listen from the beginning).
     Functions:
-    detect_noise() Returns True only if noise is detected.
+    start() Starts listening.
+    stop() Stops listening.
+    detect_noise() Returns True only if noise was detected since the previous call.
+    get_noise_events(since) Returns the times of the noise events.
     '''
-    def __init__(self, sim_param: configuration.SimRobotParameters) -> None:
+    def __init__(self, sim_param: configuration.SimRobotParameters, rate: float = 20,
+                 history: int = 64) -> None:
         self.client_id = sim_param.simulation.client_id
         self.gui_name = sim_param.simulation.foss_gui
+        self.period = 1 / rate
+        self.events = event_latch.EventLatch(history)
+        self.thread = None
+        self.halt = threading.Event()
+
+    def __read_flag(self) -> bool:
+        '''Reads the noise flag of the gui (one script call, None if it failed).'''
+        res, noise_made, _, _, _ = exec_vrep_script(self.client_id, self.gui_name, 'get_noise_gui')
+        if res == sim.simx_return_ok and len(noise_made) >= 1:
+            return bool(noise_made[0])
+        return None
+
+    def __listen(self) -> None:
+        '''Records the rising edges of the noise flag until stop().'''
+        previous = False
+        while not self.halt.is_set():
+            flag = self.__read_flag()
+            if flag is not None:
+                if flag and not previous:
+                    self.events.record()
+                previous = flag
+            self.halt.wait(self.period)
+
+    def start(self) -> None:
+        '''Starts listening.'''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.halt.clear()
+        self.thread = threading.Thread(target=self.__listen, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''Stops listening.'''
+        self.halt.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
 
     def detect_noise(self) -> bool:
         '''
-        Returns True only if noise was detected.
+        Returns True only if noise was detected since the previous call (latched).
+        '''
+        self.start()
+        return self.events.consume()
+
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the times of the newest noise events (oldest first).
+        Param: since: only events after this time.perf_counter() time.
         '''
-        for i in range(10):
-            res, noise_made, _, _, _ = exec_vrep_script(self.client_id, self.gui_name, 'get_noise_gui')
-            if res == sim.simx_return_ok and len(noise_made) >= 1:
-                return bool(noise_made[0])
-        return False
+        self.start()
+        return self.events.get_events(since)
 
 # Hardware section
 class GenInput(control_interfaces.GenInputInterface):
@@ -499,3 +606,80 @@ class LedRGB(control_interfaces.LedRGBInterface):
                                 'set_color_led', in_floats=color_rbg)
             if res == sim.simx_return_ok:
                 break
+
+
+class AudioPlayer(control_interfaces.AudioPlayerInterface):
+    '''
+    Class AudioPlayer(cache_size) -> Plays sounds through pygame.mixer.Sound objects.
+    Decoded sounds are kept in an LRU cache, so playing a sound again does not reload it.
+    Functions:
+    start() Initializes the pygame mixer.
+    preload(audio_path) Decodes a sound into the cache.
+    play(audio_path,wait) Plays a sound (blocks until it ends only if wait is True).
+    stop() Stops the sound that is currently playing.
+    is_playing() Returns True while a sound is playing.
+    close() Empties the cache and stops the mixer.
+    '''
+    def __init__(self, cache_size: int = 16) -> None:
+        self.cache_size = cache_size
+        self.sounds = OrderedDict()   # LRU of decoded sounds
+        self.channel = None
+
+    def __load(self, audio_path: str) -> pygame.mixer.Sound:
+        '''
+        Returns the decoded sound of audio_path (decoding it only on cache miss).
+        Param: audio_path: the path to the wanted mp3 file.
+        '''
+        audio_path = os.path.normpath(audio_path)
+        sound = self.sounds.get(audio_path)
+        if sound is not None:
+            self.sounds.move_to_end(audio_path)
+            return sound
+        self.start()
+        sound = pygame.mixer.Sound(audio_path)
+        self.sounds[audio_path] = sound
+        if len(self.sounds) > self.cache_size:
+            self.sounds.popitem(last=False)
+        return sound
+
+    def start(self) -> None:
+        '''Initializes the pygame mixer (only the mixer, not every pygame subsystem).'''
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    def preload(self, audio_path: str) -> None:
+        '''
+        Decodes a sound into the cache so the first play starts without delay.
+        Param: audio_path: the path to the wanted mp3 file.
+        '''
+        self.__load(audio_path)
+
+    def play(self, audio_path: str, wait: bool = True) -> None:
+        '''
+        Plays mp3 file specified by input audio_path.
+        Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends.
+        '''
+        sound = self.__load(audio_path)
+        self.channel = sound.play()
+        if wait and self.channel is not None:
+            time.sleep(sound.get_length())
+            while self.channel.get_busy():
+                time.sleep(0.01)
+
+    def stop(self) -> None:
+        '''Stops the sound that is currently playing.'''
+        if self.channel is not None:
+            self.channel.stop()
+
+    def is_playing(self) -> bool:
+        '''Returns True while a sound is playing.'''
+        return self.channel is not None and bool(self.channel.get_busy())
+
+    def close(self) -> None:
+        '''Empties the cache and stops the mixer.'''
+        self.stop()
+        self.channel = None
+        self.sounds.clear()
+        if pygame.mixer.get_init():
+            pygame.mixer.quit()
@@ -2,12 +2,14 @@
 Simulated robot implementation.
 """
 
+import math
 import time
-import os
-import pygame
-from fossbot_lib.common.data_structures import configuration
+from dataclasses import replace
+from functools import cached_property
+from fossbot_lib.common.data_structures import configuration, pose
 from fossbot_lib.common.interfaces import robot_interface
-from fossbot_lib.coppeliasim_robot import control
+from fossbot_lib.coppeliasim_robot import control, sim_clock
+from fossbot_lib.parameters_parser import watcher
 
 try:
     from fossbot_lib.coppeliasim_robot import sim
@@ -21,21 +23,25 @@ except FileNotFoundError:
     print('')
 
 class FossBot(robot_interface.FossBotInterface):
-    """ Sim robot """
-    def __init__(self, parameters: configuration.SimRobotParameters) -> None:
+    """
+    Sim robot.
+    The audio mixer is initialized on first use, call warmup() to initialize it in advance.
+    Waits and timers follow the simulation time (sim_time=False: real time),
+    so programs behave the same at any simulation speed.
+    """
+    def __init__(self, parameters: configuration.SimRobotParameters, sim_time: bool = True) -> None:
         self.client_id = self.__connect_vrep()
         if self.client_id == -1:
             print('Failed connecting to remote API server')
             raise ConnectionError
         print('Connected to remote API server')
         self.parameters = self.__load_fossbot_paths(parameters)
-        self.parameters.simulation.client_id = self.client_id
         self.motor_left = control.Motor(
             self.parameters, self.parameters.simulation.left_motor_name,
-            self.parameters.motor_left_speed.value / 100)
+            self.parameters.motor_left_duty)
         self.motor_right = control.Motor(
             self.parameters, self.parameters.simulation.right_motor_name,
-            self.parameters.motor_right_speed.value / 100)
+            self.parameters.motor_right_duty)
         self.ultrasonic = control.UltrasonicSensor(self.parameters)
         self.odometer_right = control.Odometer(
             self.parameters, self.parameters.simulation.right_motor_name)
@@ -45,9 +51,29 @@ class FossBot(robot_interface.FossBotInterface):
         self.accelerometer = control.Accelerometer(self.parameters)
         self.rgb_led = control.LedRGB(self.parameters)
         self.noise = control.Noise(self.parameters)
-        self.timer = control.Timer()
-        pygame.init()
-        pygame.mixer.init()
+        self.clock = None
+        if sim_time:
+            self.clock = sim_clock.SimClock(self.client_id)
+            self.timer = control.SimTimer(self.clock)
+        else:
+            self.timer = control.Timer()
+        self.heading = 0.0
+        self.last_degrees = None
+        self.pose_tracker = pose.PoseTracker()
+        self.pose_reading = None    # (left steps, right steps, heading) of the last pose update
+        self.parameter_watcher = None
+
+    @cached_property
+    def audio(self) -> control.AudioPlayer:
+        '''Audio player (its mixer is initialized on first use).'''
+        return control.AudioPlayer()
+
+    def warmup(self) -> None:
+        '''
+        Initializes the audio mixer and starts listening for noise now, instead of on first use.
+        '''
+        self.audio.start()
+        self.noise.start()
 
     def __connect_vrep(self) -> int:
         '''
@@ -63,24 +89,28 @@ class FossBot(robot_interface.FossBotInterface):
         '''
         Loads paramameters (paths) to match paths in scene.
         Param: parameters: the simulation parameters.
-        Returns: the parameters match paths in scene.
-        '''
-        fossbot_name = parameters.simulation.fossbot_name
-        body_name = parameters.simulation.body_name
-        parameters.simulation.accelerometer_name = f'{fossbot_name}/{body_name}/{parameters.simulation.accelerometer_name}'
-        parameters.simulation.left_motor_name = f'{fossbot_name}/{parameters.simulation.left_motor_name}'
-        parameters.simulation.right_motor_name = f'{fossbot_name}/{parameters.simulation.right_motor_name}'
-        parameters.simulation.light_sensor_name = f'{fossbot_name}/{body_name}/{parameters.simulation.light_sensor_name}'
-        parameters.simulation.sensor_middle_name = f'{fossbot_name}/{parameters.simulation.sensor_middle_name}'
-        parameters.simulation.sensor_right_name = f'{fossbot_name}/{parameters.simulation.sensor_right_name}'
-        parameters.simulation.sensor_left_name = f'{fossbot_name}/{parameters.simulation.sensor_left_name}'
-        parameters.simulation.ultrasonic_name = f'{fossbot_name}/{parameters.simulation.ultrasonic_shape}/{parameters.simulation.ultrasonic_name}'
-        parameters.simulation.gyroscope_name = f'{fossbot_name}/{body_name}/{parameters.simulation.gyroscope_name}'
-        parameters.simulation.led_name = f'{fossbot_name}/{body_name}/{parameters.simulation.led_name}'
-        parameters.simulation.rot_name = f'{fossbot_name}/{body_name}/{parameters.simulation.rot_name}'
-        parameters.simulation.body_name = f'{fossbot_name}/{parameters.simulation.body_name}'
-        parameters.simulation.col_detector_name = f'{fossbot_name}/{body_name}/{parameters.simulation.col_detector_name}'
-        return parameters
+        Returns: a copy of the parameters, with the paths in scene and the client id.
+        '''
+        ids = parameters.simulation
+        fossbot_name = ids.fossbot_name
+        body_name = ids.body_name
+        # the parameters are frozen: the paths go in a copy
+        return replace(parameters, simulation=replace(
+            ids,
+            accelerometer_name=f'{fossbot_name}/{body_name}/{ids.accelerometer_name}',
+            left_motor_name=f'{fossbot_name}/{ids.left_motor_name}',
+            right_motor_name=f'{fossbot_name}/{ids.right_motor_name}',
+            light_sensor_name=f'{fossbot_name}/{body_name}/{ids.light_sensor_name}',
+            sensor_middle_name=f'{fossbot_name}/{ids.sensor_middle_name}',
+            sensor_right_name=f'{fossbot_name}/{ids.sensor_right_name}',
+            sensor_left_name=f'{fossbot_name}/{ids.sensor_left_name}',
+            ultrasonic_name=f'{fossbot_name}/{ids.ultrasonic_shape}/{ids.ultrasonic_name}',
+            gyroscope_name=f'{fossbot_name}/{body_name}/{ids.gyroscope_name}',
+            led_name=f'{fossbot_name}/{body_name}/{ids.led_name}',
+            rot_name=f'{fossbot_name}/{body_name}/{ids.rot_name}',
+            body_name=f'{fossbot_name}/{ids.body_name}',
+            col_detector_name=f'{fossbot_name}/{body_name}/{ids.col_detector_name}',
+            client_id=self.client_id))
 
     # movement
     def just_move(self, direction: str = "forward") -> None:
@@ -88,6 +118,7 @@ class FossBot(robot_interface.FossBotInterface):
         Move forward/backwards.
         Param: direction: the direction to be headed to.
         """
+        self.__track_pose()
         self.odometer_right.reset()
         self.odometer_left.reset()
         self.motor_right.move(direction=direction)
@@ -126,10 +157,13 @@ class FossBot(robot_interface.FossBotInterface):
 
     def wait(self, time_s: int) -> None:
         '''
-        Waits (sleeps) for an amount of time.
+        Waits (sleeps) for an amount of time (simulation time, if sim_time).
         Param: time_s: the time (seconds) of sleep.
         '''
-        time.sleep(time_s)
+        if self.clock is None:
+            time.sleep(time_s)
+        else:
+            self.clock.sleep(time_s)
 
     # moving forward
     def move_forward_distance(self, dist: float) -> None:
@@ -182,6 +216,7 @@ class FossBot(robot_interface.FossBotInterface):
         if dir_id not in [0, 1]:
             print('Uknown Direction!')
             raise RuntimeError
+        self.__track_pose()
         self.odometer_right.reset()
         self.odometer_left.reset()
         left_dir = "forward" if dir_id == 1 else "reverse"
@@ -230,6 +265,120 @@ class FossBot(robot_interface.FossBotInterface):
             diff = abs(tar_pos - d)
         self.stop()
 
+    def rotate_degrees(self, angle: float, timeout: float = 10.0, stall_time: float = 1.0) -> None:
+        '''
+        Rotates robot by an angle, stopping on the heading (see get_heading).
+        The heading is read once per simulation step (sim_time) or every 10 ms.
+        If the heading is not reached in time, or does not change for stall_time
+        (for example the robot is stuck or the simulation is paused), the robot is
+        stopped and TimeoutError is raised.
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+               timeout: the longest rotation (seconds, simulation time if sim_time).
+               stall_time: the longest time without progress (seconds).
+        '''
+        if angle == 0:
+            return
+        target = self.get_heading() + angle
+        sign = 1 if angle > 0 else -1
+        self.just_rotate(0 if angle > 0 else 1)
+        now = start = progress_time = self.__now()
+        best = remaining = (target - self.get_heading()) * sign
+        while remaining > 0:
+            now = self.__next_step(now, stall_time)
+            if now is None or now - start > timeout or now - progress_time > stall_time:
+                self.stop()
+                print(f'The robot did not reach the heading {target:.1f} '
+                      f'(heading {self.heading:.1f}).')
+                raise TimeoutError
+            remaining = (target - self.get_heading()) * sign
+            if remaining < best - 0.1:
+                best, progress_time = remaining, now
+        self.stop()
+
+    def __now(self) -> float:
+        '''Returns the simulation time (sim_time) or the real time in seconds.'''
+        if self.clock is None:
+            return time.perf_counter()
+        return self.clock.now()
+
+    def __next_step(self, last: float, timeout: float) -> float:
+        '''
+        Waits for the next simulation step (sim_time) or 10 ms.
+        Param: last: a time (seconds) of the current step.
+               timeout: the longest real time to wait (seconds).
+        Returns: the time, None if the simulation time did not advance.
+        '''
+        if self.clock is None:
+            time.sleep(0.01)
+            return time.perf_counter()
+        # the clock resolution is 1 ms, so this returns at the first step after last
+        if not self.clock.sleep_until(last + 0.001, timeout):
+            return None
+        return self.clock.now()
+
+    # heading
+    def get_heading(self) -> float:
+        '''
+        Returns the heading of the robot in degrees (counterclockwise positive,
+        not wrapped), unwrapped incrementally from the simulator orientation.
+        The heading is 0 when it is first requested.
+        '''
+        degrees = self.__get_degrees()
+        if self.last_degrees is not None:
+            self.heading += (degrees - self.last_degrees + 180) % 360 - 180
+        self.last_degrees = degrees
+        return self.heading
+
+    # pose
+    def __update_pose(self) -> None:
+        '''
+        Integrates the motion since the last update: the distance from the step
+        counters of the scene (signed by the motor directions), the rotation from the heading.
+        '''
+        reading = (self.odometer_left.get_total_steps(), self.odometer_right.get_total_steps(),
+                   self.get_heading())
+        previous, self.pose_reading = self.pose_reading, reading
+        if previous is None:
+            return
+        distance = 0.0
+        for odometer, motor, steps, old in zip(
+                (self.odometer_left, self.odometer_right), (self.motor_left, self.motor_right),
+                reading, previous):
+            sign = 1 if motor.direction == 'forward' else -1
+            distance += sign * (steps - old) * odometer.wheel_diameter * math.pi / odometer.sensor_disc
+        self.pose_tracker.advance(distance / 2, reading[2] - previous[2])
+
+    def __track_pose(self) -> None:
+        '''Updates the pose before the motor directions change (if the pose is tracked).'''
+        if self.pose_reading is not None:
+            self.__update_pose()
+
+    def get_pose(self) -> dict:
+        '''
+        Returns the dead reckoning pose of the robot: a dictionary with time,
+        x, y (cm) and theta (degrees, counterclockwise positive).
+        The pose is (0, 0, 0) when it is first requested, it is then updated at every
+        call and before every change of direction.
+        '''
+        self.__update_pose()
+        return self.pose_tracker.get_pose()
+
+    def get_pose_history(self, count: int) -> list:
+        '''
+        Returns the newest poses (oldest first, one per update).
+        Param: count: the number of poses.
+        '''
+        return self.pose_tracker.get_history(count)
+
+    def reset_pose(self, x: float = 0.0, y: float = 0.0, theta: float = 0.0) -> None:
+        '''
+        Sets the pose.
+        Param: x, y: the position (cm).
+               theta: the heading (degrees).
+        '''
+        self.pose_tracker.reset(x, y, theta)
+
     def rotate_clockwise(self) -> None:
         '''
         Rotates robot clockwise.
@@ -267,16 +416,13 @@ class FossBot(robot_interface.FossBotInterface):
         return False
 
     # sound
-    def play_sound(self, audio_path: str) -> None:
+    def play_sound(self, audio_path: str, wait: bool = True) -> None:
         '''
         Plays mp3 file specified by input audio_path.
         Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends, else returns immediately.
         '''
-        audio_path = os.path.normpath(audio_path)
-        pygame.mixer.music.load(audio_path)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
+        self.audio.play(audio_path, wait=wait)
 
     # floor sensors
     def get_floor_sensor(self, sensor_id: int) -> float:
@@ -299,26 +445,11 @@ class FossBot(robot_interface.FossBotInterface):
         Param: sensor_id: the id of the wanted floor - line sensor.
         Returns: True if sensor is on line, else False.
         '''
-        mid_id = self.parameters.simulation.sensor_middle_id
-        left_id = self.parameters.simulation.sensor_left_id
-        right_id = self.parameters.simulation.sensor_right_id
-
-        if sensor_id not in [mid_id, left_id, right_id]:
+        threshold = self.parameters.line_thresholds.get(sensor_id)
+        if threshold is None:
             print(f'Sensor id {sensor_id} is out of bounds.')
             return False
-
-        read = self.analogue_reader.get_reading(sensor_id)
-        #print(read)
-        if sensor_id == mid_id:
-            if read <= self.parameters.line_sensor_center.value / 100:
-                return True
-        elif sensor_id == left_id:
-            if read <= self.parameters.line_sensor_left.value / 100:
-                return True
-        elif sensor_id == right_id:
-            if read <= self.parameters.line_sensor_right.value / 100:
-                return True
-        return False
+        return bool(self.analogue_reader.get_reading(sensor_id) <= threshold)
 
     # accelerometer
     def get_acceleration(self, axis: str) -> float:
@@ -371,7 +502,7 @@ class FossBot(robot_interface.FossBotInterface):
         '''
         light_id = self.parameters.simulation.light_sensor_id
         # grey == 50%, white == 100%, black <= 10%
-        grey_color = self.parameters.light_sensor.value / 1024
+        grey_color = self.parameters.dark_threshold
         value = self.analogue_reader.get_reading(light_id)
         print(self.__transf_1024(value))
         return bool(value < grey_color)
@@ -383,11 +514,54 @@ class FossBot(robot_interface.FossBotInterface):
         print(state)
         return state
 
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the times (time.perf_counter() seconds) of the newest noise events.
+        Param: since: only events after this time.
+        '''
+        return self.noise.get_noise_events(since)
+
     # exit
+    # parameters
+    def update_parameters(self, parameters: configuration.SimRobotParameters) -> None:
+        '''
+        Swaps in new parameters while running (the thresholds are read from the
+        parameters on every check, the motors take the new speeds from the next move).
+        Param: parameters: the new simulation parameters, as loaded from the file or
+                           a copy of the parameters of this robot (whose ids are
+                           already the paths in scene).
+        '''
+        if parameters.simulation != self.parameters.simulation:
+            parameters = self.__load_fossbot_paths(parameters)
+        self.parameters = parameters
+        self.motor_left.def_speed = self.parameters.motor_left_duty
+        self.motor_right.def_speed = self.parameters.motor_right_duty
+
+    def watch_parameters(self, path: str = "admin_parameters.yaml") -> watcher.ParameterWatcher:
+        '''
+        Reloads the parameters whenever the parameters file changes (see
+        parameters_parser.watcher), until exit.
+        Param: path: the parameters file.
+        Returns: the watcher.
+        '''
+        if self.parameter_watcher is None:
+            self.parameter_watcher = watcher.ParameterWatcher(path, type(self.parameters))
+            self.parameter_watcher.subscribe(self.update_parameters)
+            self.parameter_watcher.start()
+            self.update_parameters(self.parameter_watcher.get())
+        return self.parameter_watcher
+
     def exit(self) -> None:
         """ Exits. """
+        if self.parameter_watcher is not None:
+            self.parameter_watcher.stop()
         self.stop()
         self.rgb_set_color('closed')
+        self.noise.stop()
+        if self.clock is not None:
+            self.clock.stop()
+        if 'audio' in self.__dict__:
+            self.audio.close()
         sim.simxFinish(self.client_id)
         print('Program ended.')
 
@@ -436,16 +610,40 @@ class FossBot(robot_interface.FossBotInterface):
                 break
 
     # timer:
-    def stop_timer(self) -> None:
-        '''Stops the timer.'''
-        self.timer.stop_timer()
+    def stop_timer(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.stop_timer(name)
 
-    def start_timer(self) -> None:
-        '''Starts the timer.'''
-        self.timer.start_timer()
+    def start_timer(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.start_timer(name)
 
-    def get_elapsed(self) -> int:
-        '''Returns the time from start.'''
-        value = self.timer.get_elapsed()
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the time from start (seconds).
+        Param: name: the timer name.
+        '''
+        value = self.timer.get_elapsed(name)
         print('elapsed time in sec:', value)
         return value
+
+    def lap_timer(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a timer.
+        Param: name: the timer name.
+        Returns: the seconds since the previous lap (or the start).
+        '''
+        return self.timer.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the split times (seconds) of the recorded laps of a timer.
+        Param: name: the timer name.
+        '''
+        return self.timer.get_laps(name)
@@ -0,0 +1,169 @@
+"""
+Simulation time of the simulated robot (waits and scheduling in simulation time)
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Iterator
+from fossbot_lib.coppeliasim_robot import sim
+
+class SimClock:
+    '''
+    Class SimClock(client_id,signal_name,min_sleep,max_sleep) -> Clock of the simulation.
+    A streamed signal read makes the simulator reply at every simulation step, and every
+    reply carries the simulation time of the server (simxGetLastCmdTime), so reading the
+    clock is a local call, without a round trip. Waits sleep (in real time) the remaining
+    simulation time scaled by the measured real time factor, so programs behave the same
+    at any simulation speed. The resolution is one simulation step.
+    Functions:
+    now() Returns the simulation time in seconds.
+    now_ns() Returns the simulation time in nanoseconds.
+    get_rate() Returns the measured real time factor.
+    sleep_until(target,timeout) Blocks until the simulation time reaches target.
+    sleep(seconds,timeout) Blocks for an amount of simulation time.
+    every(period) Iterates at a fixed simulation time period.
+    schedule(delay,action) Runs action when an amount of simulation time has passed.
+    stop() Stops the scheduling thread and the streaming.
+    '''
+    def __init__(self, client_id: int, signal_name: str = 'fossbot_clock',
+                 min_sleep: float = 0.001, max_sleep: float = 0.05) -> None:
+        self.client_id = client_id
+        self.signal_name = signal_name
+        self.min_sleep = min_sleep
+        self.max_sleep = max_sleep
+        self.rate = 1.0             # simulated seconds per real second
+        self.last_ms = None         # last seen simulation time (ms)
+        self.last_real = None       # real time it was first seen
+        self.tasks = []             # heap of (simulation time, id, action, future)
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.halt = False
+        # the signal needs not exist, its streamed replies only carry the simulation time
+        sim.simxGetFloatSignal(client_id, signal_name, sim.simx_opmode_streaming)
+
+    def __update(self) -> int:
+        '''Reads the simulation time of the last reply (ms) and updates the real time factor.'''
+        sim_ms = sim.simxGetLastCmdTime(self.client_id)
+        if sim_ms == 0 and self.last_ms is None:
+            sim.simxGetPingTime(self.client_id)    # nothing received yet
+            sim_ms = sim.simxGetLastCmdTime(self.client_id)
+        if sim_ms != self.last_ms:
+            real = time.perf_counter()
+            if self.last_ms is not None and sim_ms > self.last_ms:
+                measured = (sim_ms - self.last_ms) / 1000 / (real - self.last_real)
+                self.rate += 0.2 * (measured - self.rate)
+            self.last_ms = sim_ms
+            self.last_real = real
+        return sim_ms
+
+    def now(self) -> float:
+        '''Returns the simulation time in seconds.'''
+        return self.__update() / 1000
+
+    def now_ns(self) -> int:
+        '''Returns the simulation time in nanoseconds.'''
+        return self.__update() * 1_000_000
+
+    def get_rate(self) -> float:
+        '''Returns the measured real time factor (simulated seconds per real second).'''
+        return self.rate
+
+    def __sleep_time(self, remaining: float) -> float:
+        '''Returns the real time to sleep for remaining simulated seconds.'''
+        return min(max(remaining / max(self.rate, 1e-3), self.min_sleep), self.max_sleep)
+
+    def sleep_until(self, target: float, timeout: float = None) -> bool:
+        '''
+        Blocks until the simulation time reaches target.
+        Param: target: the simulation time (seconds).
+               timeout: the longest real time to wait (seconds, default: no limit,
+                        a stopped simulation blocks forever).
+        Returns: True if target was reached, False on timeout.
+        '''
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            remaining = target - self.now()
+            if remaining <= 0:
+                return True
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(self.__sleep_time(remaining))
+
+    def sleep(self, seconds: float, timeout: float = None) -> bool:
+        '''
+        Blocks for an amount of simulation time.
+        Param: seconds: the simulation time to wait.
+               timeout: the longest real time to wait (seconds, default: no limit).
+        Returns: True if the time passed, False on timeout.
+        '''
+        return self.sleep_until(self.now() + seconds, timeout)
+
+    def every(self, period: float) -> Iterator[float]:
+        '''
+        Iterates at a fixed simulation time period (missed periods are skipped).
+        Param: period: the period in simulated seconds.
+        Returns: an iterator of the simulation times of the iterations.
+        '''
+        next_time = self.now()
+        while True:
+            yield next_time
+            next_time += period
+            now = self.now()
+            if next_time < now:
+                next_time += (int((now - next_time) / period) + 1) * period
+            self.sleep_until(next_time)
+
+    def schedule(self, delay: float, action: Callable) -> Future:
+        '''
+        Runs action (from the clock thread) when an amount of simulation time has passed.
+        Param: delay: the simulation time to wait (seconds).
+               action: the function to run.
+        Returns: a future of the result of action.
+        '''
+        future = Future()
+        with self.condition:
+            heapq.heappush(self.tasks, (self.now() + delay, next(self.counter), action, future))
+            if self.thread is None:
+                self.halt = False
+                self.thread = threading.Thread(target=self.__run_tasks, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return future
+
+    def __run_tasks(self) -> None:
+        '''Runs the scheduled actions at their simulation times until stop().'''
+        while True:
+            with self.condition:
+                if self.halt:
+                    return
+                if not self.tasks:
+                    self.condition.wait()
+                    continue
+                target, _, action, future = self.tasks[0]
+                remaining = target - self.now()
+                if remaining > 0:
+                    self.condition.wait(self.__sleep_time(remaining))
+                    continue
+                heapq.heappop(self.tasks)
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(action())
+                except Exception as error:
+                    future.set_exception(error)
+
+    def stop(self) -> None:
+        '''Stops the scheduling thread (pending actions are cancelled) and the streaming.'''
+        with self.condition:
+            self.halt = True
+            for _, _, _, future in self.tasks:
+                future.cancel()
+            self.tasks = []
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        sim.simxGetFloatSignal(self.client_id, self.signal_name, sim.simx_opmode_discontinue)
@@ -3,6 +3,7 @@
 import os
 import random
 import time
+from functools import partial
 from fossbot_lib.coppeliasim_robot import control
 from fossbot_lib.common.interfaces import robot_interface,sim_gym_interface
 
@@ -198,16 +199,24 @@ class Environment(sim_gym_interface.EnvironmentInterface):
         Param: robot: the instance of fossbot to be teleported.
                time_diff: the time to check successfull teleportation.
         '''
+        clock = getattr(robot, 'clock', None)
+        if clock is None:
+            get_time = partial(self.get_simulation_time, robot)
+        else:
+            get_time = clock.now     # no round trip per check
         while True:
             print('Teleporting...')
             self.teleport_random(robot, in_bounds=True)
-            target_time = self.get_simulation_time(robot) + time_diff
-            while self.get_simulation_time(robot) < target_time:
+            target_time = get_time() + time_diff
+            while get_time() < target_time:
                 if robot.check_collision():
                     print('Teleporting...')
                     self.teleport_random(robot, in_bounds=True)
-                    target_time = self.get_simulation_time(robot) + time_diff
-            time.sleep(time_diff*0.5)
+                    target_time = get_time() + time_diff
+            if clock is None:
+                time.sleep(time_diff*0.5)
+            else:
+                clock.sleep(time_diff*0.5)
             robot.reset_orientation()
             if not robot.check_collision() and robot.check_in_bounds() and robot.check_orientation():
                 break
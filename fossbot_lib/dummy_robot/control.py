@@ -1,158 +1,230 @@
 """
 Implementation for control (dummy).
+Sensors read scripted or seeded traces (see dummy_robot.traces), actuators are logged.
 """
-import random
+import math
+from fossbot_lib.common.data_structures import event_latch, timer_service
 from fossbot_lib.common.interfaces import control_interfaces
+from fossbot_lib.dummy_robot import traces
 
 
 class Timer(control_interfaces.TimerInterface):
     '''
-    Class timer()
+    Class Timer(clock) -> Named timers on the virtual clock.
     Functions:
-    stop_timer() Stops a timer.
-    start_timer() Starts a timer.
-    elapsed() Prints elapsed time from start.
-    get_elapsed() Returns the elapsed time between start time and that moment in sec.
+    stop_timer(name) Stops a timer.
+    start_timer(name) Starts a timer.
+    elapsed(name) Prints elapsed time from start.
+    get_elapsed(name) Returns the elapsed time between start time and that moment in sec.
+    lap(name) Records a lap and returns its split time in sec.
+    get_laps(name) Returns the split times of the recorded laps.
+    now() Returns the time of the timer clock in sec.
     '''
+    def __init__(self, clock: traces.VirtualClock) -> None:
+        self.service = timer_service.TimerService(clock.now_ns)
 
-    def stop_timer(self) -> None:
+    def stop_timer(self, name: str = 'default') -> None:
         '''Stops timer.'''
-        print('Timer stopped.')
+        self.service.stop(name)
 
-    def start_timer(self) -> None:
+    def start_timer(self, name: str = 'default') -> None:
         '''Starts timer.'''
-        print('Timer started.')
+        self.service.start(name)
 
-    def elapsed(self) -> None:
+    def elapsed(self, name: str = 'default') -> None:
         '''Prints elapsed time from start.'''
-        print('Printing elapsed time.')
+        if not self.service.is_running(name):
+            print("Timer not started")
+        else:
+            print(f'The elapsed time in sec is {self.service.elapsed(name):.6f}')
 
-    def get_elapsed(self) -> int:
-        '''Returns the elapsed time in seconds.'''
-        return random.randint(0, 10000)
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''Returns the elapsed time in seconds (0 if the timer is not started).'''
+        return self.service.elapsed(name)
+
+    def lap(self, name: str = 'default') -> float:
+        '''Records a lap, returns the seconds since the previous lap (or the start).'''
+        return self.service.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''Returns the split times (seconds) of the recorded laps.'''
+        return self.service.get_laps(name)
+
+    def now(self) -> float:
+        '''Returns the time of the timer clock in seconds.'''
+        return self.service.now()
 
 class Motor(control_interfaces.MotorInterface):
     """
-    Motor() -> Motor control.
+    Motor(log,clock,name) -> Motor control (commands are logged as name.command).
     Functions:
     dir_control(direction) Change motor direction to input direction.
     move(direction) Start moving motor with default speed towards input direction.
     set_speed(speed) Set speed immediately 0-100 range.
     stop() Stops the motor.
     """
+    def __init__(self, log: traces.ActuatorLog, clock: traces.VirtualClock,
+                 name: str = 'motor') -> None:
+        self.log = log
+        self.clock = clock
+        self.name = name
+
+    def __record(self, command: str, value: float = math.nan, text: str = None) -> None:
+        '''Logs a command of the motor.'''
+        self.clock.advance()
+        self.log.record(self.clock.now(), f'{self.name}.{command}', value, text)
+
     def set_speed(self, speed: int) -> None:
         '''
         Set speed immediately 0-100 range.
         Param: speed: the range 0 - 100 that speed will be changed to.
         '''
-        print('Speed set.')
+        self.__record('set_speed', speed)
 
     def dir_control(self, direction: str) -> None:
         '''
         Change motor direction to input direction.
         Param: direction: the direction to be headed to.
         '''
-        print(f'Direction changed to {direction}.')
+        self.__record('dir_control', text=direction)
 
     def move(self, direction: str = "forward") -> None:
         '''
         Start moving motor with default speed towards input direction.
         Param: direction: the direction to be headed to.
         '''
-        print(f'Moving {direction}.')
+        self.__record('move', text=direction)
 
     def stop(self) -> None:
         '''Stops the motor.'''
-        print('Stopping.')
+        self.__record('stop')
 
 
 class Odometer(control_interfaces.OdometerInterface):
     '''
-    Class Odometer() -> Odometer control.
+    Class Odometer(sensors,side) -> Odometer control (reads the steps_side and
+    velocity_side channels).
     Functions:
     count_revolutions() Increases the counter of revolutions.
     get_revolutions() Returns the number of revolutions.
     get_distance() Returns the traveled distance in cm.
+    get_velocity() Returns the wheel speed in cm/s.
+    get_rpm() Returns the wheel speed in revolutions per minute.
     reset() Resets the steps counter.
     '''
+    def __init__(self, sensors: traces.SensorTraces, side: str = 'left') -> None:
+        self.sensors = sensors
+        self.steps_channel = f'steps_{side}'
+        self.velocity_channel = f'velocity_{side}'
+        self.sensor_disc = 20
+        self.wheel_diameter = 6.65
+        self.offset = 0
+        self.counted = 0
+
     def count_revolutions(self) -> None:
         '''Increase total steps by one.'''
-        print('Steps increased.')
+        self.counted += 1
 
     def get_steps(self) -> int:
         ''' Returns total number of steps. '''
-        return random.randint(0, 1000)
+        return int(self.sensors.read(self.steps_channel)) + self.counted - self.offset
 
     def get_revolutions(self) -> float:
         ''' Returns total number of revolutions. '''
-        return random.random()
+        return self.get_steps() / self.sensor_disc
 
     def get_distance(self) -> float:
         ''' Return the total distance traveled so far (in cm). '''
-        return random.random()
+        return self.get_revolutions() * self.wheel_diameter * math.pi
+
+    def get_velocity(self) -> float:
+        ''' Returns the wheel speed (in cm/s) computed from the recent steps. '''
+        return self.sensors.read(self.velocity_channel)
+
+    def get_rpm(self) -> float:
+        ''' Returns the wheel speed in revolutions per minute. '''
+        return self.get_velocity() / (self.wheel_diameter * math.pi) * 60
 
     def reset(self) -> None:
         ''' Reset the total traveled distance and revolutions. '''
-        print('Steps reset.')
+        self.offset = int(self.sensors.peek(self.steps_channel)) + self.counted
 
 
 class UltrasonicSensor(control_interfaces.UltrasonicSensorInterface):
     '''
-    Class UltrasonicSensor() -> Ultrasonic sensor control.
+    Class UltrasonicSensor(sensors) -> Ultrasonic sensor control (distance channel).
     Functions:
     get_distance() return distance in cm.
     '''
+    def __init__(self, sensors: traces.SensorTraces) -> None:
+        self.sensors = sensors
+
     def get_distance(self) -> float:
         '''
         Gets the distance to the closest obstacle.
         Returns: the distance to the closest obstacle (in cm).
         '''
-        return random.random()
+        return self.sensors.read('distance')
 
 
 class AnalogueReadings(control_interfaces.AnalogueReadingsInterface):
     '''
-    Class AnalogueReadings() -> Handles Analogue Readings.
+    Class AnalogueReadings(sensors) -> Handles Analogue Readings
+    (pin 0: light channel, pins 1-3: floor_1 - floor_3 channels).
     Functions:
     get_reading(pin) Gets reading of a specific sensor specified by input pin.
     '''
+    def __init__(self, sensors: traces.SensorTraces) -> None:
+        self.sensors = sensors
+
     def get_reading(self, pin: int) -> float:
         '''
         Gets reading of a specific sensor specified by input pin.
         Param: pin: the pin of the sensor.
         Returns: the reading of the requested sensor.
         '''
-        return random.random()
+        if pin == 0:
+            return self.sensors.read('light')
+        return self.sensors.read(f'floor_{pin}')
 
 
 class LedRGB(control_interfaces.LedRGBInterface):
     '''
-    Class LedRGB() -> Led control
+    Class LedRGB(log,clock) -> Led control (logged as rgb_set_color).
     set_on(color): sets led to input color.
     '''
+    def __init__(self, log: traces.ActuatorLog, clock: traces.VirtualClock) -> None:
+        self.log = log
+        self.clock = clock
+
     def set_on(self, color: str) -> None:
         '''
         Changes the color of a led
         Param: color: the wanted color
         For closing the led, use color == 'closed'
         '''
-        print(f'Color {color} set.')
+        self.clock.advance()
+        self.log.record(self.clock.now(), 'rgb_set_color', text=color)
 
 
 class Accelerometer(control_interfaces.AccelerometerInterface):
     '''
-    Class Accelerometer() -> Handles accelerometer and gyroscope.
+    Class Accelerometer(sensors) -> Handles accelerometer and gyroscope
+    (accel_x - accel_z and gyro_x - gyro_z channels).
     Functions:
     get_acceleration(dimension) Returns the acceleration for a specific dimension.
     get_gyro(dimension) Returns the gyroscope for a specific dimension.
     '''
+    def __init__(self, sensors: traces.SensorTraces) -> None:
+        self.sensors = sensors
+
     def get_acceleration(self, dimension: str) -> float:
         '''
         Gets the acceleration for a specific dimension.
         Param: dimension: the dimension requested.
         Returns: the acceleration for a specific dimension.
         '''
-        return random.random()
+        return self.sensors.read(f'accel_{dimension}')
 
 
     def get_gyro(self, dimension: str) -> float:
@@ -161,48 +233,76 @@ class Accelerometer(control_interfaces.AccelerometerInterface):
         Param: dimension: the dimension requested.
         Returns: the gyroscope for a specific dimension.
         '''
-        return random.random()
+        return self.sensors.read(f'gyro_{dimension}')
 
 class Noise(control_interfaces.NoiseInterface):
     '''
-    Class Noise() -> Handles Noise Detection.
+    Class Noise(sensors,clock,history) -> Handles Noise Detection (noise channel,
+    a reading of 1 is a noise event).
     Functions:
     detect_noise(): Returns True only if noise was detected.
+    get_noise_events(since) Returns the times of the noise events.
     '''
+    def __init__(self, sensors: traces.SensorTraces, clock: traces.VirtualClock,
+                 history: int = 64) -> None:
+        self.sensors = sensors
+        self.clock = clock
+        self.events = event_latch.EventLatch(history)
+
     def detect_noise(self) -> bool:
         '''
         Returns True only if noise was detected.
         '''
-        return bool(random.randint(0, 1))
+        if self.sensors.read('noise'):
+            self.events.record(self.clock.now())
+        return self.events.consume()
+
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the (virtual) times of the newest noise events (oldest first).
+        Param: since: only events after this time.
+        '''
+        return self.events.get_events(since)
 
 # Hardware section
 class GenInput(control_interfaces.GenInputInterface):
     '''
-    Class GenInput().
+    Class GenInput(sensors) (input channel).
     Functions:
     get_state(): Returns state 0 or 1.
     '''
+    def __init__(self, sensors: traces.SensorTraces) -> None:
+        self.sensors = sensors
+
     def get_state(self) -> int:
         '''
         Returns state 0 or 1
         '''
-        return random.randint(0, 1)
+        return int(self.sensors.read('input'))
 
 class GenOutput(control_interfaces.GenOutputInterface):
     '''
-    Class GenOutput()
+    Class GenOutput(log,clock,name) (logged as name.set_on / name.set_off)
     Functions:
     set_on() set High the output pin
     set_off() set Low the output pin
     '''
+    def __init__(self, log: traces.ActuatorLog, clock: traces.VirtualClock,
+                 name: str = 'output') -> None:
+        self.log = log
+        self.clock = clock
+        self.name = name
+
     def set_on(self) -> None:
         '''
         Set High the output pin
         '''
-        print('GenOutput was set on.')
+        self.clock.advance()
+        self.log.record(self.clock.now(), f'{self.name}.set_on')
 
     def set_off(self) -> None:
         '''
         Set Low the output pin
         '''
-        print('GenOutput was set off.')
+        self.clock.advance()
+        self.log.record(self.clock.now(), f'{self.name}.set_off')
@@ -1,19 +1,68 @@
 """
 Implementation for dummy robot.
 """
-import random
+import math
+from fossbot_lib.common.data_structures import configuration, pose
 from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.dummy_robot import control, traces
 
 
 class FossBot(robot_interface.FossBotInterface):
-    """ Dummy robot """
+    """
+    Dummy robot, for reproducible runs of robot programs at full CPU speed.
+    Sensors read the channels of sensors (a traces.SensorTraces): scripted traces
+    (set_trace, load_csv, load_npz) or seeded uniform readings. Every command is
+    recorded in log (a traces.ActuatorLog). Time is virtual (see traces.VirtualClock):
+    wait() advances it instead of sleeping, readings and commands take tick seconds.
+    The pose follows the commanded distances and rotations.
+    Param: parameters: the robot parameters (the thresholds of the check functions),
+                       default thresholds if None.
+           seed: the seed of the unscripted readings.
+           tick: the virtual time of a reading or command (seconds).
+           verbose: if True, prints every command.
+    """
+
+    def __init__(self, parameters: configuration.RobotParameters = None, seed: int = 0,
+                 tick: float = 0.001, verbose: bool = False) -> None:
+        self.parameters = parameters
+        self.clock = traces.VirtualClock(tick)
+        self.sensors = traces.SensorTraces(seed, self.clock)
+        self.log = traces.ActuatorLog(verbose)
+        self.motor_left = control.Motor(self.log, self.clock, 'motor_left')
+        self.motor_right = control.Motor(self.log, self.clock, 'motor_right')
+        self.odometer_left = control.Odometer(self.sensors, 'left')
+        self.odometer_right = control.Odometer(self.sensors, 'right')
+        self.ultrasonic = control.UltrasonicSensor(self.sensors)
+        self.analogue_reader = control.AnalogueReadings(self.sensors)
+        self.accelerometer = control.Accelerometer(self.sensors)
+        self.rgb_led = control.LedRGB(self.log, self.clock)
+        self.noise = control.Noise(self.sensors, self.clock)
+        self.timer = control.Timer(self.clock)
+        self.pose_tracker = pose.PoseTracker()
+
+    def __record(self, command: str, value: float = math.nan, text: str = None) -> None:
+        '''Logs a command (one clock tick passes).'''
+        self.clock.advance()
+        self.log.record(self.clock.now(), command, value, text)
+
+    def __threshold(self, name: str, default: float) -> float:
+        '''Returns the value of a parameter (default if there are no parameters).'''
+        if self.parameters is None:
+            return default
+        return getattr(self.parameters, name).value
+
+    def warmup(self) -> None:
+        '''
+        Initializes all devices and subsystems now, instead of on first use.
+        '''
+
     # movement
     def just_move(self, direction: str = "forward") -> None:
         """
         Move forward/backwards.
         Param: direction: the direction to be headed to.
         """
-        print('Just moving.')
+        self.__record('just_move', text=direction)
 
     def move_distance(self, dist: float, direction: str = "forward") -> None:
         '''
@@ -21,24 +70,26 @@ class FossBot(robot_interface.FossBotInterface):
         Param: dist: the distance to be moved (in cm).
                direction: the direction to be moved towards.
         '''
-        print('Moving distance.')
+        self.__record('move_distance', dist, direction)
+        self.pose_tracker.advance(dist if direction == "forward" else -dist, 0.0)
 
     def reset_dir(self) -> None:
         '''
         Resets all motors direction to default (forward).
         '''
-        print('Direction reset.')
+        self.__record('reset_dir')
 
     def stop(self) -> None:
         """ Stop moving. """
-        print('Stop.')
+        self.__record('stop')
 
     def wait(self, time_s: int) -> None:
         '''
-        Waits (sleeps) for an amount of time.
+        Waits for an amount of (virtual) time, without sleeping.
         Param: time_s: the time (seconds) of sleep.
         '''
-        print('Sleeping...')
+        self.__record('wait', time_s)
+        self.clock.advance(time_s)
 
     # moving forward
     def move_forward_distance(self, dist: float) -> None:
@@ -46,19 +97,19 @@ class FossBot(robot_interface.FossBotInterface):
         Moves robot forward input distance.
         Param: dist: the distance (cm) to be moved by robot.
         '''
-        print('Moving forward distance.')
+        self.move_distance(dist)
 
     def move_forward_default(self) -> None:
         '''
         Moves robot forward default distance.
         '''
-        print('Moving forward default distance.')
+        self.move_distance(self.__threshold('default_step', 15))
 
     def move_forward(self) -> None:
         '''
         Moves robot forwards.
         '''
-        print('Moving forward.')
+        self.just_move()
 
     # moving reverse
     def move_reverse_distance(self, dist: float) -> None:
@@ -66,19 +117,19 @@ class FossBot(robot_interface.FossBotInterface):
         Moves robot input distance in reverse.
         Param: dist: the distance (cm) to be moved by robot.
         '''
-        print('Moving distance in reverse.')
+        self.move_distance(dist, direction="reverse")
 
     def move_reverse_default(self) -> None:
         '''
         Moves robot default distance in reverse.
         '''
-        print('Moving default distance in reverse.')
+        self.move_distance(self.__threshold('default_step', 15), direction="reverse")
 
     def move_reverse(self) -> None:
         '''
         Moves robot in reverse.
         '''
-        print('Moving in reverse.')
+        self.just_move(direction="reverse")
 
     # rotation
     def just_rotate(self, dir_id: int) -> None:
@@ -88,7 +139,7 @@ class FossBot(robot_interface.FossBotInterface):
                 - counterclockwise: dir_id == 0
                 - clockwise: dir_id == 1
         '''
-        print('Just rotating.')
+        self.__record('just_rotate', dir_id)
 
     def rotate_90(self, dir_id: int) -> None:
         '''
@@ -97,48 +148,90 @@ class FossBot(robot_interface.FossBotInterface):
                 - counterclockwise: dir_id == 0
                 - clockwise: dir_id == 1
         '''
-        print('Rotating 90 degrees.')
+        self.__record('rotate_90', dir_id)
+        self.pose_tracker.advance(0.0, -90.0 if dir_id == 1 else 90.0)
 
     def rotate_clockwise(self) -> None:
         '''
         Rotates robot clockwise.
         '''
-        print('Rotating clockwise.')
+        self.just_rotate(1)
 
     def rotate_counterclockwise(self) -> None:
         '''
         Rotates robot counterclockwise.
         '''
-        print('Rotating counterclockwise.')
+        self.just_rotate(0)
 
     def rotate_clockwise_90(self) -> None:
         '''
         Rotates robot 90 degrees clockwise.
         '''
-        print('Rotating clockwise 90 degrees.')
+        self.rotate_90(1)
 
     def rotate_counterclockwise_90(self) -> None:
         '''
         Rotates robot 90 degrees counterclockwise.
         '''
-        print('Rotating counterclockwise 90 degrees.')
+        self.rotate_90(0)
+
+    def rotate_degrees(self, angle: float) -> None:
+        '''
+        Rotates robot by an angle, stopping on the estimated heading.
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+        '''
+        self.__record('rotate_degrees', angle)
+        self.pose_tracker.advance(0.0, angle)
+
+    # heading
+    def get_heading(self) -> float:
+        '''
+        Returns the estimated heading of the robot in degrees
+        (counterclockwise positive, not wrapped).
+        '''
+        return self.pose_tracker.pose[3]
+
+    # pose
+    def get_pose(self) -> dict:
+        '''
+        Returns the dead reckoning pose of the robot: a dictionary with time,
+        x, y (cm) and theta (degrees, counterclockwise positive).
+        '''
+        return self.pose_tracker.get_pose()
+
+    def get_pose_history(self, count: int) -> list:
+        '''
+        Returns the newest poses (oldest first, one per movement).
+        Param: count: the number of poses.
+        '''
+        return self.pose_tracker.get_history(count)
+
+    def reset_pose(self, x: float = 0.0, y: float = 0.0, theta: float = 0.0) -> None:
+        '''
+        Sets the pose.
+        Param: x, y: the position (cm).
+               theta: the heading (degrees).
+        '''
+        self.pose_tracker.reset(x, y, theta)
 
     # ultrasonic sensor
     def get_distance(self) -> float:
         '''Returns distance of nearest obstacle in cm.'''
-        return random.random()
+        return self.ultrasonic.get_distance()
 
     def check_for_obstacle(self) -> bool:
         '''Returns True only if an obstacle is detected.'''
-        return bool(random.randint(0, 1))
+        return self.get_distance() <= self.__threshold('sensor_distance', 15)
 
     # sound
-    def play_sound(self, audio_path: str) -> None:
+    def play_sound(self, audio_path: str, wait: bool = True) -> None:
         '''
         Plays mp3 file specified by input audio_path.
         Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends, else returns immediately.
         '''
-        print('Playing sound.')
+        self.__record('play_sound', float(wait), audio_path)
 
     # floor sensors
     def get_floor_sensor(self, sensor_id: int) -> float:
@@ -147,7 +240,7 @@ class FossBot(robot_interface.FossBotInterface):
         Param: sensor_id: the id of the wanted floor - line sensor.
         Returns: the reading of input floor - line sensor.
         '''
-        return random.random()
+        return self.analogue_reader.get_reading(sensor_id)
 
     def check_on_line(self, sensor_id: int) -> bool:
         '''
@@ -155,7 +248,10 @@ class FossBot(robot_interface.FossBotInterface):
         Param: sensor_id: the id of the wanted floor - line sensor.
         Returns: True if sensor is on line, else False.
         '''
-        return bool(random.randint(0, 1))
+        names = {3: 'line_sensor_left', 1: 'line_sensor_center', 2: 'line_sensor_right'}
+        if sensor_id not in names:
+            return False
+        return self.get_floor_sensor(sensor_id) >= self.__threshold(names[sensor_id], 50)
 
     # accelerometer
     def get_acceleration(self, axis: str) -> float:
@@ -164,7 +260,7 @@ class FossBot(robot_interface.FossBotInterface):
         Param: axis: the axis to get the acceleration from.
         Returns: the acceleration of specified axis.
         '''
-        return random.random()
+        return self.accelerometer.get_acceleration(axis)
 
     def get_gyroscope(self, axis: str) -> float:
         '''
@@ -172,7 +268,7 @@ class FossBot(robot_interface.FossBotInterface):
         Param: axis: the axis to get the gyroscope from.
         Returns: the gyroscope of specified axis.
         '''
-        return random.random()
+        return self.accelerometer.get_gyro(axis)
 
     # rgb
     def rgb_set_color(self, color: str) -> None:
@@ -180,40 +276,78 @@ class FossBot(robot_interface.FossBotInterface):
         Sets a led to input color.
         Param: color: the wanted color.
         '''
-        print('Led color set.')
+        self.rgb_led.set_on(color)
 
     # light sensor
     def get_light_sensor(self) -> float:
         '''
         Returns the reading of the light sensor.
         '''
-        return random.random()
+        return self.analogue_reader.get_reading(0)
 
     def check_for_dark(self) -> bool:
         '''
         Returns True only if light sensor detects dark.
         '''
-        return bool(random.randint(0, 1))
+        return self.get_light_sensor() >= self.__threshold('light_sensor', 700)
 
     # noise detection
     def get_noise_detection(self) -> bool:
         """ Returns True only if noise is detected """
-        return bool(random.randint(0, 1))
+        return self.noise.detect_noise()
+
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the (virtual) times of the newest noise events.
+        Param: since: only events after this time.
+        '''
+        return self.noise.get_noise_events(since)
 
     # exit
+    def update_parameters(self, parameters: configuration.RobotParameters) -> None:
+        '''
+        Swaps in new parameters (see parameters_parser.watcher).
+        Param: parameters: the new parameters.
+        '''
+        self.parameters = parameters
+
     def exit(self) -> None:
         ''' Exits. '''
-        print('Exit.')
+        self.__record('exit')
 
     # timer:
-    def stop_timer(self) -> None:
-        '''Stops the timer.'''
-        print('Timer stopped.')
+    def stop_timer(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.stop_timer(name)
 
-    def start_timer(self) -> None:
-        '''Starts the timer.'''
-        print('Timer started.')
+    def start_timer(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.start_timer(name)
 
-    def get_elapsed(self) -> int:
-        '''Returns the time from start.'''
-        return random.randint(0, 10000)
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the (virtual) time from start (seconds).
+        Param: name: the timer name.
+        '''
+        return self.timer.get_elapsed(name)
+
+    def lap_timer(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a timer.
+        Param: name: the timer name.
+        Returns: the seconds since the previous lap (or the start).
+        '''
+        return self.timer.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the split times (seconds) of the recorded laps of a timer.
+        Param: name: the timer name.
+        '''
+        return self.timer.get_laps(name)
@@ -0,0 +1,369 @@
+"""
+Replay of recorded robot calls (see real_robot.recorder.RecordingFossBot)
+"""
+
+import builtins
+import json
+import time
+from collections import deque
+from fossbot_lib.common.data_structures import call_log
+from fossbot_lib.common.interfaces import robot_interface
+
+# methods whose arguments are times of the recorded run (get_noise_events(since)),
+# which a replay can not reproduce: their calls are matched by method only
+TIME_ARGUMENT_METHODS = ('get_noise_events',)
+
+class ReplayFossBot(robot_interface.FossBotInterface):
+    """
+    Robot that serves the calls recorded on another robot, without hardware.
+    Every call returns the result of the next recorded call of the same method with
+    the same arguments (the last one is held when the recording runs out). Methods of
+    TIME_ARGUMENT_METHODS take perf_counter times, which differ in every run, so their
+    calls are matched by method only, in order. A call that raised in the recording
+    raises the same exception type (a RuntimeError if it is not a builtin exception).
+    At speed 1 each call returns when it returned in the recording (relative to the
+    first call), other speeds scale the recorded times, speed None replays as fast as
+    possible. Calls that were never recorded raise a KeyError.
+    Param: recording: the path of a saved recording, or a call_log.CallLog.
+           speed: the replay speed (None: as fast as possible).
+    Functions:
+    get_unmatched() Returns the number of calls served by a held result.
+    """
+
+    def __init__(self, recording, speed: float = 1.0) -> None:
+        if isinstance(recording, call_log.CallLog):
+            self.log = recording
+        else:
+            self.log = call_log.CallLog.load(recording)
+        self.speed = speed
+        self.origin = None      # perf_counter time of the recording start
+        self.queues = {}        # (method code, args index or None) -> rows of the recorded calls
+        time_methods = {self.log.method_codes.get(name) for name in TIME_ARGUMENT_METHODS}
+        for row, key in enumerate(zip(self.log.methods, self.log.args)):
+            if key[0] in time_methods:
+                key = (key[0], None)
+            self.queues.setdefault(key, deque()).append(row)
+        self.held = {}          # key -> last served row
+        self.unmatched = 0
+
+    def __replay(self, method: str, args: tuple = ()):
+        '''Returns the result of the next recorded call of method with args.'''
+        if method in TIME_ARGUMENT_METHODS:
+            key = (self.log.method_codes.get(method), None)
+        else:
+            key = (self.log.method_codes.get(method),
+                   self.log.table_index.get(json.dumps(list(args))))
+        queue = self.queues.get(key)
+        if queue:
+            row = queue.popleft()
+            self.held[key] = row
+        elif key in self.held:
+            row = self.held[key]
+            self.unmatched += 1
+        else:
+            print(f'No recorded call of {method}{args}.')
+            raise KeyError
+        if self.speed:
+            if self.origin is None:
+                self.origin = time.perf_counter() - self.log.times[row] / self.speed
+            delay = (self.origin + (self.log.times[row] + self.log.durations[row]) / self.speed
+                     - time.perf_counter())
+            if delay > 0:
+                time.sleep(delay)
+        error = self.log.get_error(row)
+        if error is not None:
+            self.__raise(*error)
+        return self.log.get_entry(row)[4]
+
+    @staticmethod
+    def __raise(name: str, message: str) -> None:
+        '''Raises a recorded exception (a RuntimeError if its type is not a builtin one).'''
+        error_type = getattr(builtins, name, None)
+        if not isinstance(error_type, type) or not issubclass(error_type, Exception):
+            raise RuntimeError(f'{name}: {message}')
+        raise error_type(message)
+
+    def get_unmatched(self) -> int:
+        '''
+        Returns the number of calls served by a held result (the program made
+        more calls than the recording).
+        '''
+        return self.unmatched
+
+    def warmup(self) -> None:
+        '''
+        Nothing to open.
+        '''
+
+    # movement
+    def just_move(self, direction: str = "forward") -> None:
+        """
+        Move forward/backwards.
+        Param: direction: the direction to be headed to.
+        """
+        return self.__replay('just_move', (direction,))
+
+    def move_distance(self, dist: float, direction: str = "forward") -> None:
+        '''
+        Moves to input direction (default == forward) a specified - input distance (cm).
+        Param: dist: the distance to be moved (in cm).
+               direction: the direction to be moved towards.
+        '''
+        return self.__replay('move_distance', (dist, direction))
+
+    def reset_dir(self) -> None:
+        '''
+        Resets all motors direction to default (forward).
+        '''
+        return self.__replay('reset_dir')
+
+    def stop(self) -> None:
+        """ Stop moving. """
+        return self.__replay('stop')
+
+    def wait(self, time_s: int) -> None:
+        '''
+        Waits (sleeps) for an amount of time.
+        Param: time_s: the time (seconds) of sleep.
+        '''
+        return self.__replay('wait', (time_s,))
+
+    # moving forward
+    def move_forward_distance(self, dist: float) -> None:
+        '''
+        Moves robot forward input distance.
+        Param: dist: the distance (cm) to be moved by robot.
+        '''
+        return self.__replay('move_forward_distance', (dist,))
+
+    def move_forward_default(self) -> None:
+        '''
+        Moves robot forward default distance.
+        '''
+        return self.__replay('move_forward_default')
+
+    def move_forward(self) -> None:
+        '''
+        Moves robot forwards.
+        '''
+        return self.__replay('move_forward')
+
+    # moving reverse
+    def move_reverse_distance(self, dist: float) -> None:
+        '''
+        Moves robot input distance in reverse.
+        Param: dist: the distance (cm) to be moved by robot.
+        '''
+        return self.__replay('move_reverse_distance', (dist,))
+
+    def move_reverse_default(self) -> None:
+        '''
+        Moves robot default distance in reverse.
+        '''
+        return self.__replay('move_reverse_default')
+
+    def move_reverse(self) -> None:
+        '''
+        Moves robot in reverse.
+        '''
+        return self.__replay('move_reverse')
+
+    # rotation
+    def just_rotate(self, dir_id: int) -> None:
+        '''
+        Rotates fossbot towards the specified dir_id.
+        Param: dir_id: the direction id to rotate to:
+                - counterclockwise: dir_id == 0
+                - clockwise: dir_id == 1
+        '''
+        return self.__replay('just_rotate', (dir_id,))
+
+    def rotate_90(self, dir_id: int) -> None:
+        '''
+        Rotates fossbot 90 degrees towards the specified dir_id.
+        Param: dir_id: the direction id to rotate 90 degrees:
+                - counterclockwise: dir_id == 0
+                - clockwise: dir_id == 1
+        '''
+        return self.__replay('rotate_90', (dir_id,))
+
+    def rotate_clockwise(self) -> None:
+        '''
+        Rotates robot clockwise.
+        '''
+        return self.__replay('rotate_clockwise')
+
+    def rotate_counterclockwise(self) -> None:
+        '''
+        Rotates robot counterclockwise.
+        '''
+        return self.__replay('rotate_counterclockwise')
+
+    def rotate_clockwise_90(self) -> None:
+        '''
+        Rotates robot 90 degrees clockwise.
+        '''
+        return self.__replay('rotate_clockwise_90')
+
+    def rotate_counterclockwise_90(self) -> None:
+        '''
+        Rotates robot 90 degrees counterclockwise.
+        '''
+        return self.__replay('rotate_counterclockwise_90')
+
+    def rotate_degrees(self, angle: float) -> None:
+        '''
+        Rotates robot by an angle, stopping on the estimated heading.
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+        '''
+        return self.__replay('rotate_degrees', (angle,))
+
+    # heading
+    def get_heading(self) -> float:
+        '''
+        Returns the recorded heading of the robot in degrees.
+        '''
+        return self.__replay('get_heading')
+
+    # pose
+    def get_pose(self) -> dict:
+        '''
+        Returns the recorded pose of the robot: a dictionary with time,
+        x, y (cm) and theta (degrees, counterclockwise positive).
+        '''
+        return self.__replay('get_pose')
+
+    def get_pose_history(self, count: int) -> list:
+        '''
+        Returns the recorded newest poses (oldest first).
+        Param: count: the number of poses.
+        '''
+        return self.__replay('get_pose_history', (count,))
+
+    # ultrasonic sensor
+    def get_distance(self) -> float:
+        '''Returns distance of nearest obstacle in cm.'''
+        return self.__replay('get_distance')
+
+    def check_for_obstacle(self) -> bool:
+        '''Returns True only if an obstacle is detected.'''
+        return self.__replay('check_for_obstacle')
+
+    # sound
+    def play_sound(self, audio_path: str, wait: bool = True) -> None:
+        '''
+        Plays mp3 file specified by input audio_path.
+        Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends, else returns immediately.
+        '''
+        return self.__replay('play_sound', (audio_path, wait))
+
+    # floor sensors
+    def get_floor_sensor(self, sensor_id: int) -> float:
+        '''
+        Gets reading of a floor - line sensor specified by sensor_id.
+        Param: sensor_id: the id of the wanted floor - line sensor.
+        Returns: the reading of input floor - line sensor.
+        '''
+        return self.__replay('get_floor_sensor', (sensor_id,))
+
+    def check_on_line(self, sensor_id: int) -> bool:
+        '''
+        Checks if line sensor (specified by sensor_id) is on black line.
+        Param: sensor_id: the id of the wanted floor - line sensor.
+        Returns: True if sensor is on line, else False.
+        '''
+        return self.__replay('check_on_line', (sensor_id,))
+
+    # accelerometer
+    def get_acceleration(self, axis: str) -> float:
+        '''
+        Gets acceleration of specified axis.
+        Param: axis: the axis to get the acceleration from.
+        Returns: the acceleration of specified axis.
+        '''
+        return self.__replay('get_acceleration', (axis,))
+
+    def get_gyroscope(self, axis: str) -> float:
+        '''
+        Gets gyroscope of specified axis.
+        Param: axis: the axis to get the gyroscope from.
+        Returns: the gyroscope of specified axis.
+        '''
+        return self.__replay('get_gyroscope', (axis,))
+
+    # rgb
+    def rgb_set_color(self, color: str) -> None:
+        '''
+        Sets a led to input color.
+        Param: color: the wanted color.
+        '''
+        return self.__replay('rgb_set_color', (color,))
+
+    # light sensor
+    def get_light_sensor(self) -> float:
+        '''
+        Returns the reading of the light sensor.
+        '''
+        return self.__replay('get_light_sensor')
+
+    def check_for_dark(self) -> bool:
+        '''
+        Returns True only if light sensor detects dark.
+        '''
+        return self.__replay('check_for_dark')
+
+    # noise detection
+    def get_noise_detection(self) -> bool:
+        """ Returns True only if noise is detected """
+        return self.__replay('get_noise_detection')
+
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the recorded times of the newest noise events.
+        Param: since: only events after this time.
+        '''
+        return self.__replay('get_noise_events', (since,))
+
+    # exit
+    def exit(self) -> None:
+        ''' Exits. '''
+        return self.__replay('exit')
+
+    # timer:
+    def stop_timer(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
+        return self.__replay('stop_timer', (name,))
+
+    def start_timer(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer.
+        Param: name: the timer name.
+        '''
+        return self.__replay('start_timer', (name,))
+
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the recorded time from start (seconds).
+        Param: name: the timer name.
+        '''
+        return self.__replay('get_elapsed', (name,))
+
+    def lap_timer(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a timer.
+        Param: name: the timer name.
+        Returns: the recorded seconds since the previous lap (or the start).
+        '''
+        return self.__replay('lap_timer', (name,))
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the recorded split times (seconds) of the laps of a timer.
+        Param: name: the timer name.
+        '''
+        return self.__replay('get_laps', (name,))
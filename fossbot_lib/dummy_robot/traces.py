@@ -0,0 +1,216 @@
+"""
+Scripted sensor traces, actuator log and virtual clock of the dummy robot
+"""
+
+import csv
+import math
+import random
+from array import array
+from typing import Iterable
+
+# default ranges (low, high) of the seeded uniform readings of unscripted channels
+DEFAULT_RANGES = {
+    'distance': (0.0, 200.0),
+    'floor_1': (0.0, 1023.0), 'floor_2': (0.0, 1023.0), 'floor_3': (0.0, 1023.0),
+    'light': (0.0, 1023.0),
+    'accel_x': (0.0, 1.0), 'accel_y': (0.0, 1.0), 'accel_z': (0.0, 1.0),
+    'gyro_x': (0.0, 1.0), 'gyro_y': (0.0, 1.0), 'gyro_z': (0.0, 1.0),
+    'steps_left': (0.0, 1000.0), 'steps_right': (0.0, 1000.0),
+    'velocity_left': (0.0, 1.0), 'velocity_right': (0.0, 1.0),
+    'noise': (0.0, 1.0), 'input': (0.0, 1.0),
+}
+BINARY = ('noise', 'input')    # channels rounded to 0 or 1
+
+class VirtualClock:
+    '''
+    Class VirtualClock(tick) -> Clock of the dummy robot, which never sleeps.
+    Time only advances when the robot waits, and by tick seconds at every
+    sensor reading or command, so polling loops end at full CPU speed.
+    Functions:
+    now() Returns the virtual time in seconds.
+    now_ns() Returns the virtual time in nanoseconds.
+    advance(seconds) Advances the virtual time.
+    '''
+    def __init__(self, tick: float = 0.001) -> None:
+        self.tick_ns = round(tick * 1e9)
+        self.time_ns = 0
+
+    def now(self) -> float:
+        '''Returns the virtual time in seconds.'''
+        return self.time_ns * 1e-9
+
+    def now_ns(self) -> int:
+        '''Returns the virtual time in nanoseconds.'''
+        return self.time_ns
+
+    def advance(self, seconds: float = None) -> None:
+        '''
+        Advances the virtual time.
+        Param: seconds: the time to advance (default: one tick).
+        '''
+        self.time_ns += self.tick_ns if seconds is None else round(seconds * 1e9)
+
+
+class SensorTraces:
+    '''
+    Class SensorTraces(seed,clock) -> Sensor readings of the dummy robot.
+    Every channel (see DEFAULT_RANGES) returns the next value of its trace at every
+    reading and holds the last value when the trace ends. Channels without a trace
+    return seeded uniform values, so runs are reproducible.
+    Functions:
+    set_trace(name,values) Scripts a channel with an iterable (list, generator...).
+    load_csv(path) Scripts the channels of the columns of a csv file.
+    load_npz(path) Scripts the channels of the arrays of a numpy npz file.
+    read(name) Returns the next reading of a channel.
+    peek(name) Returns the last reading of a channel.
+    '''
+    def __init__(self, seed: int = 0, clock: VirtualClock = None) -> None:
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.traces = {}    # name -> iterator (None: the trace ended, the last reading is held)
+        self.last = {}      # name -> last reading
+
+    def set_trace(self, name: str, values: Iterable[float]) -> None:
+        '''
+        Scripts a channel.
+        Param: name: the channel name.
+               values: the readings, one per read (any iterable, a generator can be endless).
+        '''
+        if name not in DEFAULT_RANGES:
+            print(f'Unknown sensor channel {name}.')
+            raise KeyError
+        self.traces[name] = iter(values)
+
+    def load_csv(self, path: str) -> None:
+        '''
+        Scripts the channels named in the header of a csv file, a row per reading
+        (empty cells are skipped).
+        Param: path: the path of the csv file.
+        '''
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            reader = csv.reader(csv_file)
+            names = [name.strip() for name in next(reader)]
+            columns = [[] for _ in names]
+            for row in reader:
+                for column, cell in zip(columns, row):
+                    if cell.strip():
+                        column.append(float(cell))
+        for name, column in zip(names, columns):
+            self.set_trace(name, column)
+
+    def load_npz(self, path: str) -> None:
+        '''
+        Scripts the channels of the arrays (named by channel) of a numpy npz file.
+        Param: path: the path of the npz file.
+        '''
+        try:
+            import numpy
+        except ImportError:
+            print('Loading npz traces needs numpy (pip install numpy).')
+            raise
+        with numpy.load(path) as arrays:
+            for name in arrays.files:
+                self.set_trace(name, arrays[name].astype(float).tolist())
+
+    def read(self, name: str) -> float:
+        '''
+        Returns the next reading of a channel (one clock tick passes).
+        Param: name: the channel name.
+        '''
+        if self.clock is not None:
+            self.clock.advance()
+        if name in self.traces:
+            trace = self.traces[name]
+            value = None if trace is None else next(trace, None)
+            if value is None:
+                self.traces[name] = None
+                value = self.last.get(name)
+            if value is not None:
+                self.last[name] = value
+                return value
+        low, high = DEFAULT_RANGES[name]
+        value = self.rng.uniform(low, high)
+        if name in BINARY:
+            value = float(value >= 0.5)
+        self.last[name] = value
+        return value
+
+    def peek(self, name: str) -> float:
+        '''
+        Returns the last reading of a channel (reads one if there is none).
+        Param: name: the channel name.
+        '''
+        if name not in self.last:
+            return self.read(name)
+        return self.last[name]
+
+
+class ActuatorLog:
+    '''
+    Class ActuatorLog(verbose) -> In-memory log of the actuator commands of the dummy robot.
+    Entries are stored in columns (arrays of times, command codes and numeric arguments,
+    and a list of text arguments), so logging costs a few appends.
+    If verbose, every command is also printed.
+    Functions:
+    record(time,command,value,text) Logs a command.
+    get_entries(command) Returns the logged commands.
+    count(command) Returns the number of logged commands.
+    clear() Forgets the logged commands.
+    '''
+    def __init__(self, verbose: bool = False) -> None:
+        self.verbose = verbose
+        self.codes = {}        # command name -> code
+        self.commands = []     # code -> command name
+        self.clear()
+
+    def record(self, time: float, command: str, value: float = math.nan, text: str = None) -> None:
+        '''
+        Logs a command.
+        Param: time: the (virtual) time of the command in seconds.
+               command: the command name.
+               value: its numeric argument.
+               text: its text argument.
+        '''
+        code = self.codes.get(command)
+        if code is None:
+            code = self.codes[command] = len(self.commands)
+            self.commands.append(command)
+        self.times.append(time)
+        self.command_codes.append(code)
+        self.values.append(value)
+        self.texts.append(text)
+        if self.verbose:
+            print(command, '' if math.isnan(value) else value, text or '')
+
+    def get_entries(self, command: str = None) -> list:
+        '''
+        Returns the logged commands: tuples of (time, command, value, text), oldest first.
+        Param: command: only entries of this command (default: all).
+        '''
+        entries = zip(self.times, (self.commands[code] for code in self.command_codes),
+                      self.values, self.texts)
+        if command is None:
+            return list(entries)
+        return [entry for entry in entries if entry[1] == command]
+
+    def count(self, command: str = None) -> int:
+        '''
+        Returns the number of logged commands.
+        Param: command: only entries of this command (default: all).
+        '''
+        if command is None:
+            return len(self.times)
+        code = self.codes.get(command)
+        if code is None:
+            return 0
+        return self.command_codes.count(code)
+
+    def clear(self) -> None:
+        '''Forgets the logged commands.'''
+        self.times = array('d')
+        self.command_codes = array('H')
+        self.values = array('d')
+        self.texts = []
+
+    def __len__(self) -> int:
+        return len(self.times)
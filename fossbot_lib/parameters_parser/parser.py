@@ -1,9 +1,14 @@
 """ Configuration yaml parser. """
 
+import os
 from typing import Optional
 import yaml
 
-def load_parameters(path: str = "admin_parameters.yaml") -> Optional[str]:
+# the C (libyaml) loader is several times faster, when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+def load_parameters(path: str = "admin_parameters.yaml") -> Optional[dict]:
     """
     Loads parameters from yaml file.
     Param: path: the path to parameters file.
@@ -11,7 +16,19 @@ def load_parameters(path: str = "admin_parameters.yaml") -> Optional[str]:
     """
     try:
         with open(path, 'r', encoding="utf-8") as file:
-            parameters = yaml.load(file, Loader=yaml.FullLoader)
+            parameters = yaml.load(file, Loader=Loader)
         return parameters
     except FileNotFoundError:
         return None
+
+def save_parameters(parameters: dict, path: str = "admin_parameters.yaml") -> None:
+    """
+    Saves parameters to yaml file. The file is replaced in one step (a reader,
+    like parameters_parser.watcher, never sees it half written).
+    Param: parameters: the parameters (as returned by load_parameters).
+           path: the path to parameters file.
+    """
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding="utf-8") as file:
+        yaml.dump(parameters, file, Dumper=Dumper, allow_unicode=True, sort_keys=False)
+    os.replace(temporary, path)
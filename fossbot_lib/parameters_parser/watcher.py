@@ -0,0 +1,203 @@
+""" Live reload of the parameters file. """
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from functools import partial
+from typing import Callable
+import yaml
+from fossbot_lib.common.data_structures import configuration
+
+# inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+# an editor saves in place (close after write) or renames a new file over the old one
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT = struct.Struct('iIII')   # wd, mask, cookie, len (the name follows)
+
+def _open_inotify(directory: str):
+    '''
+    Starts watching a directory with inotify.
+    Param: directory: the watched directory.
+    Returns: the inotify file descriptor (None if inotify is not available).
+    '''
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        inotify_init1, inotify_add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    descriptor = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if descriptor < 0:
+        return None
+    if inotify_add_watch(descriptor, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(descriptor)
+        return None
+    return descriptor
+
+def _event_names(data: bytes) -> list:
+    '''Returns the file names of a read of inotify events.'''
+    names, offset = [], 0
+    while offset + EVENT.size <= len(data):
+        _, _, _, length = EVENT.unpack_from(data, offset)
+        offset += EVENT.size
+        names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+        offset += length
+    return names
+
+
+class ParameterWatcher:
+    '''
+    Class ParameterWatcher(path,parameters_class,debounce,interval) -> Reloads the
+    parameters file when it changes.
+    The directory of the file is watched with inotify (the file is polled every
+    interval where inotify is not available). A changed file is loaded and validated
+    by parameters_class.from_file, the new parameters replace the old ones in one
+    assignment and every subscriber is called with them. An invalid file is reported
+    and the running parameters are kept.
+    Param: path: the parameters file.
+           parameters_class: the parameters dataclass (RobotParameters or SimRobotParameters).
+           debounce: the wait after a change for more writes of the same save (seconds).
+           interval: the polling period without inotify (seconds).
+    Functions:
+    get() Returns the current parameters.
+    subscribe(callback) Calls callback(parameters) on every reload.
+    unsubscribe(callback) Stops calling a callback.
+    reload() Loads the file now.
+    start() Starts watching in a background thread.
+    stop() Stops watching.
+    '''
+    def __init__(self, path: str = "admin_parameters.yaml",
+                 parameters_class: type = configuration.RobotParameters,
+                 debounce: float = 0.05, interval: float = 0.5) -> None:
+        self.path = os.path.abspath(path)
+        self.parameters_class = parameters_class
+        self.debounce = debounce
+        self.interval = interval
+        self.parameters = parameters_class.from_file(self.path)
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.wake = None    # pipe waking the watch thread on stop
+
+    def get(self) -> configuration.RobotParameters:
+        '''Returns the current parameters.'''
+        return self.parameters
+
+    def subscribe(self, callback: Callable) -> None:
+        '''
+        Calls callback(parameters) with the new parameters on every reload
+        (from the watch thread).
+        Param: callback: the callback.
+        '''
+        with self.lock:
+            self.callbacks = self.callbacks + [callback]
+
+    def unsubscribe(self, callback: Callable) -> None:
+        '''
+        Stops calling a callback.
+        Param: callback: the subscribed callback.
+        '''
+        with self.lock:
+            self.callbacks = [other for other in self.callbacks if other != callback]
+
+    def reload(self) -> bool:
+        '''
+        Loads the file and, if it changed and is valid, swaps in the new parameters
+        and calls the subscribers.
+        Returns: True if new parameters were swapped in.
+        '''
+        try:
+            parameters = self.parameters_class.from_file(self.path)
+        except (OSError, ValueError, yaml.YAMLError) as error:
+            # an invalid value, or a file saved half edited: the watch thread goes on
+            print(f'Parameters not reloaded ({type(error).__name__}), keeping the running ones.')
+            return False
+        if parameters is self.parameters or parameters == self.parameters:
+            return False
+        self.parameters = parameters
+        for callback in self.callbacks:
+            try:
+                callback(parameters)
+            except Exception as error:     # pylint: disable=broad-except
+                print(f'Parameters subscriber failed: {error!r}')
+        print(f'Parameters reloaded from {self.path}.')
+        return True
+
+    def start(self) -> None:
+        '''Starts watching in a background thread.'''
+        if self.thread is not None:
+            return
+        self.wake = os.pipe()
+        descriptor = _open_inotify(os.path.dirname(self.path))
+        if descriptor is None:
+            # the first version is taken now: a save right after start() is not missed
+            target = partial(self.__poll, self.__version())
+        else:
+            target = partial(self.__watch, descriptor)
+        self.thread = threading.Thread(target=target, daemon=True, name='parameter_watcher')
+        self.thread.start()
+
+    def __watch(self, descriptor: int) -> None:
+        '''Reloads the file on its inotify events, until stopped (watch thread).'''
+        name = os.path.basename(self.path)
+        try:
+            while True:
+                ready, _, _ = select.select([descriptor, self.wake[0]], [], [])
+                if self.wake[0] in ready:
+                    return
+                try:
+                    data = os.read(descriptor, 4096)
+                except BlockingIOError:
+                    continue
+                if name not in _event_names(data):
+                    continue
+                # a save may be several writes: reload after they settle
+                while True:
+                    ready, _, _ = select.select([descriptor, self.wake[0]], [], [], self.debounce)
+                    if not ready:
+                        break
+                    if self.wake[0] in ready:
+                        return
+                    try:
+                        os.read(descriptor, 4096)
+                    except BlockingIOError:
+                        pass
+                self.reload()
+        finally:
+            os.close(descriptor)
+
+    def __version(self) -> tuple:
+        '''Returns the modification time and size of the file (None if it is missing).'''
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def __poll(self, last: tuple) -> None:
+        '''
+        Reloads the file when its modification time changes, until stopped (watch thread).
+        Param: last: the version of the file when watching started.
+        '''
+        while not select.select([self.wake[0]], [], [], self.interval)[0]:
+            current = self.__version()
+            if current != last:
+                last = current
+                self.reload()
+
+    def stop(self) -> None:
+        '''Stops watching.'''
+        if self.thread is None:
+            return
+        os.write(self.wake[1], b'\0')
+        self.thread.join()
+        self.thread = None
+        for descriptor in self.wake:
+            os.close(descriptor)
+        self.wake = None
@@ -0,0 +1,373 @@
+"""
+Client of the real robot hardware daemon (see real_robot.daemon)
+"""
+
+import time
+from fossbot_lib.common.data_structures import configuration, pose, ring_buffer
+from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.real_robot import daemon
+from fossbot_lib.real_robot.control import Timer
+
+class FossBot(robot_interface.FossBotInterface):
+    """
+    Real robot, owned by a hardware daemon running in another process.
+    Sensors are read from the shared memory frame of the daemon (no system calls,
+    no copies but the unpacked values), so any number of clients can observe the robot.
+    Commands go through a command slot of the daemon, claimed on the first command
+    (read only clients, like dashboards, never claim one).
+    """
+
+    def __init__(self, parameters: configuration.RobotParameters, name: str = 'fossbot',
+                 poll_period: float = 0.001, history: int = 256) -> None:
+        self.parameters = parameters
+        self.name = name
+        self.poll_period = poll_period
+        self.memory = daemon.attach(name)
+        self.frame = daemon.SeqLock(self.memory.buf)
+        self.queue = None
+        self.lock_file = None
+        self.poses = ring_buffer.RingBuffer(history, None)
+        self.noise_seen = int(self.__field('noise_count'))
+        self.timer = Timer()
+
+    # shared memory
+    def read_frame(self) -> dict:
+        '''
+        Returns the newest sensor frame of the daemon (see daemon.FRAME_FIELDS).
+        '''
+        return dict(zip(daemon.FRAME_FIELDS, self.frame.read()[1]))
+
+    def __field(self, name: str) -> float:
+        '''Returns a value of the newest frame.'''
+        return self.frame.read()[1][daemon.FIELD_INDEX[name]]
+
+    def __command(self, name: str, args: tuple = (), text: str = '', wait: bool = False) -> None:
+        '''
+        Sends a command to the daemon.
+        Param: name: the command (see daemon.OPCODES).
+               args: its numeric arguments.
+               text: its text argument.
+               wait: if True, returns when the daemon has completed the command.
+        '''
+        if self.queue is None:
+            slot, self.lock_file = daemon.claim_slot(self.name)
+            self.queue = daemon.CommandQueue(self.memory.buf, slot)
+        command_id = self.queue.push(daemon.OPCODE[name], args, text)
+        while command_id is None:
+            time.sleep(self.poll_period)
+            command_id = self.queue.push(daemon.OPCODE[name], args, text)
+        while wait and self.queue.get_done() < command_id:
+            time.sleep(self.poll_period)
+
+    def warmup(self) -> None:
+        '''
+        The daemon has opened all devices.
+        '''
+
+    # movement
+    def just_move(self, direction: str = "forward") -> None:
+        """
+        Move forward/backwards.
+        Param: direction: the direction to be headed to.
+        """
+        self.__command('just_move', (daemon.DIRECTIONS.index(direction),))
+
+    def move_distance(self, dist: float, direction: str = "forward") -> None:
+        '''
+        Moves to input direction (default == forward) a specified - input distance (cm).
+        Param: dist: the distance to be moved (in cm).
+               direction: the direction to be moved towards.
+        '''
+        self.__command('move_distance', (dist, daemon.DIRECTIONS.index(direction)), wait=True)
+
+    def reset_dir(self) -> None:
+        '''
+        Resets all motors direction to default (forward).
+        '''
+        self.__command('reset_dir')
+
+    def stop(self) -> None:
+        """ Stop moving. """
+        self.__command('stop', wait=True)
+
+    def wait(self, time_s: int) -> None:
+        '''
+        Waits (sleeps) for an amount of time.
+        Param: time_s: the time (seconds) of sleep.
+        '''
+        time.sleep(time_s)
+
+    # moving forward
+    def move_forward_distance(self, dist: float) -> None:
+        '''
+        Moves robot forward input distance.
+        Param: dist: the distance (cm) to be moved by robot.
+        '''
+        self.move_distance(dist)
+
+    def move_forward_default(self) -> None:
+        '''
+        Moves robot forward default distance.
+        '''
+        self.move_distance(self.parameters.default_step.value)
+
+    def move_forward(self) -> None:
+        '''
+        Moves robot forwards.
+        '''
+        self.just_move()
+
+    # moving reverse
+    def move_reverse_distance(self, dist: float) -> None:
+        '''
+        Moves robot input distance in reverse.
+        Param: dist: the distance (cm) to be moved by robot.
+        '''
+        self.move_distance(dist, direction="reverse")
+
+    def move_reverse_default(self) -> None:
+        '''
+        Moves robot default distance in reverse.
+        '''
+        self.move_distance(self.parameters.default_step.value, direction="reverse")
+
+    def move_reverse(self) -> None:
+        '''
+        Moves robot in reverse.
+        '''
+        self.just_move(direction="reverse")
+
+    # rotation
+    def just_rotate(self, dir_id: int) -> None:
+        '''
+        Rotates fossbot towards the specified dir_id.
+        Param: dir_id: the direction id to rotate to:
+                - counterclockwise: dir_id == 0
+                - clockwise: dir_id == 1
+        '''
+        self.__command('just_rotate', (dir_id,))
+
+    def rotate_90(self, dir_id: int) -> None:
+        '''
+        Rotates fossbot 90 degrees towards the specified dir_id.
+        Param: dir_id: the direction id to rotate 90 degrees:
+                - counterclockwise: dir_id == 0
+                - clockwise: dir_id == 1
+        '''
+        self.__command('rotate_90', (dir_id,), wait=True)
+
+    def rotate_clockwise(self) -> None:
+        '''
+        Rotates robot clockwise.
+        '''
+        self.just_rotate(1)
+
+    def rotate_counterclockwise(self) -> None:
+        '''
+        Rotates robot counterclockwise.
+        '''
+        self.just_rotate(0)
+
+    def rotate_clockwise_90(self) -> None:
+        '''
+        Rotates robot 90 degrees clockwise.
+        '''
+        self.rotate_90(1)
+
+    def rotate_counterclockwise_90(self) -> None:
+        '''
+        Rotates robot 90 degrees counterclockwise.
+        '''
+        self.rotate_90(0)
+
+    def rotate_degrees(self, angle: float) -> None:
+        '''
+        Rotates robot by an angle, stopping on the estimated heading.
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+        '''
+        self.__command('rotate_degrees', (angle,), wait=True)
+
+    # heading
+    def get_heading(self) -> float:
+        '''
+        Returns the estimated heading of the robot in degrees
+        (counterclockwise positive, not wrapped).
+        '''
+        return self.__field('heading')
+
+    def reset_heading(self, value: float = 0.0) -> None:
+        '''
+        Sets the estimated heading.
+        Param: value: the new heading (degrees).
+        '''
+        self.__command('reset_heading', (value,), wait=True)
+
+    # pose
+    def get_pose(self) -> dict:
+        '''
+        Returns the dead reckoning pose of the robot: a dictionary with time,
+        x, y (cm) and theta (degrees, counterclockwise positive).
+        '''
+        values = self.frame.read()[1]
+        current = tuple(values[daemon.FIELD_INDEX[name]] for name in pose.FIELDS)
+        if current != self.poses.latest():
+            self.poses.append(current)
+        return dict(zip(pose.FIELDS, current))
+
+    def get_pose_history(self, count: int) -> list:
+        '''
+        Returns the newest poses read by this client (oldest first).
+        Param: count: the number of poses.
+        '''
+        return [dict(zip(pose.FIELDS, current)) for current in self.poses.last(count)]
+
+    def reset_pose(self, x: float = 0.0, y: float = 0.0, theta: float = 0.0) -> None:
+        '''
+        Sets the pose.
+        Param: x, y: the position (cm).
+               theta: the heading (degrees).
+        '''
+        self.__command('reset_pose', (x, y, theta), wait=True)
+
+    # ultrasonic sensor
+    def get_distance(self) -> float:
+        '''Returns distance of nearest obstacle in cm.'''
+        return self.__field('distance')
+
+    def check_for_obstacle(self) -> bool:
+        '''Returns True only if an obstacle is detected.'''
+        return bool(self.get_distance() <= self.parameters.sensor_distance.value)
+
+    # sound
+    def play_sound(self, audio_path: str, wait: bool = True) -> None:
+        '''
+        Plays mp3 file specified by input audio_path (on the robot).
+        Param: audio_path: the path to the wanted mp3 file (on the robot).
+               wait: if True, blocks until playback ends, else returns immediately.
+        '''
+        self.__command('play_sound', text=audio_path, wait=wait)
+
+    # floor sensors
+    def get_floor_sensor(self, sensor_id: int) -> float:
+        '''
+        Gets reading of a floor - line sensor specified by sensor_id.
+        Param: sensor_id: the id of the wanted floor - line sensor.
+        Returns: the reading of input floor - line sensor.
+        '''
+        return self.__field(f'adc_{sensor_id}')
+
+    def check_on_line(self, sensor_id: int) -> bool:
+        '''
+        Checks if line sensor (specified by sensor_id) is on black line.
+        Param: sensor_id: the id of the wanted floor - line sensor.
+        Returns: True if sensor is on line, else False.
+        '''
+        threshold = self.parameters.line_thresholds.get(sensor_id)
+        if threshold is None:
+            return False
+        return bool(self.get_floor_sensor(sensor_id) >= threshold)
+
+    # accelerometer
+    def get_acceleration(self, axis: str) -> float:
+        '''
+        Gets acceleration of specified axis.
+        Param: axis: the axis to get the acceleration from.
+        Returns: the acceleration of specified axis.
+        '''
+        return self.__field(f'accel_{axis}')
+
+    def get_gyroscope(self, axis: str) -> float:
+        '''
+        Gets gyroscope of specified axis.
+        Param: axis: the axis to get the gyroscope from.
+        Returns: the gyroscope of specified axis.
+        '''
+        return self.__field(f'gyro_{axis}')
+
+    # rgb
+    def rgb_set_color(self, color: str) -> None:
+        '''
+        Sets a led to input color.
+        Param: color: the wanted color.
+        '''
+        self.__command('rgb_set_color', text=color)
+
+    # light sensor
+    def get_light_sensor(self) -> float:
+        '''
+        Returns the reading of the light sensor.
+        '''
+        return self.__field('adc_0')
+
+    def check_for_dark(self) -> bool:
+        '''
+        Returns True only if light sensor detects dark.
+        '''
+        return bool(self.get_light_sensor() >= self.parameters.dark_threshold)
+
+    # noise detection
+    def get_noise_detection(self) -> bool:
+        """ Returns True only if noise was detected since the previous call (latched). """
+        count = int(self.__field('noise_count'))
+        detected = count > self.noise_seen
+        self.noise_seen = count
+        return detected
+
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the time (time.perf_counter() seconds, the clock is shared with the daemon)
+        of the newest noise event, only the newest one is shared by the daemon.
+        Param: since: only an event after this time.
+        '''
+        noise_time = self.__field('noise_time')
+        if noise_time != noise_time or (since is not None and noise_time <= since):
+            return []
+        return [noise_time]
+
+    # exit
+    def exit(self) -> None:
+        ''' Detaches from the daemon (it keeps running). '''
+        if self.queue is not None:
+            self.stop()
+            self.queue = None
+            self.lock_file.close()
+        self.frame = None
+        self.memory.close()
+
+    # timer:
+    def stop_timer(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.stop_timer(name)
+
+    def start_timer(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.start_timer(name)
+
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the time from start (seconds).
+        Param: name: the timer name.
+        '''
+        return self.timer.get_elapsed(name)
+
+    def lap_timer(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a timer.
+        Param: name: the timer name.
+        Returns: the seconds since the previous lap (or the start).
+        '''
+        return self.timer.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the split times (seconds) of the recorded laps of a timer.
+        Param: name: the timer name.
+        '''
+        return self.timer.get_laps(name)
@@ -3,12 +3,18 @@ Implementation of electronic parts control
 """
 
 import math
+import os
+import statistics
+import subprocess
+import threading
 import time
-from datetime import datetime
-import RPi.GPIO as GPIO
-from mpu6050 import mpu6050
-import Adafruit_MCP3008
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable
+from fossbot_lib.common.data_structures import event_latch, ring_buffer, timer_service
 from fossbot_lib.common.interfaces import control_interfaces
+from fossbot_lib.real_robot import hal, imu, pwm
+from fossbot_lib.real_robot.hal import GPIO
 
 # General functions
 def start_lib() -> None:
@@ -26,68 +32,85 @@ def clean() -> None:
 
 class Timer(control_interfaces.TimerInterface):
     '''
-    Class timer()
+    Class Timer(clock) -> Named timers on a monotonic clock (time.perf_counter_ns by default).
     Functions:
-    stop_timer() Stops a timer.
-    start_timer() Starts a timer.
-    elapsed() Prints elapsed time from start.
-    get_elapsed() Returns the elapsed time between start time and that moment in sec.
+    stop_timer(name) Stops a timer.
+    start_timer(name) Starts a timer.
+    elapsed(name) Prints elapsed time from start.
+    get_elapsed(name) Returns the elapsed time between start time and that moment in sec.
+    lap(name) Records a lap and returns its split time in sec.
+    get_laps(name) Returns the split times of the recorded laps.
+    now() Returns the time of the timer clock in sec.
     '''
-    def __init__(self):
-        self.start = 0
+    def __init__(self, clock: Callable[[], int] = time.perf_counter_ns) -> None:
+        self.service = timer_service.TimerService(clock)
 
-    def stop_timer(self) -> None:
+    def stop_timer(self, name: str = 'default') -> None:
         '''Stops timer.'''
-        self.start = 0
+        self.service.stop(name)
 
-    def start_timer(self) -> None:
+    def start_timer(self, name: str = 'default') -> None:
         '''Starts timer.'''
-        self.start = datetime.now()
+        self.service.start(name)
 
-    def elapsed(self) -> None:
+    def elapsed(self, name: str = 'default') -> None:
         '''Prints elapsed time from start.'''
-        if self.start == 0:
+        if not self.service.is_running(name):
             print("Timer not started")
         else:
-            dif = datetime.now() - self.start
-            print(f'The elapsed time in sec is {dif}')
+            print(f'The elapsed time in sec is {self.service.elapsed(name):.6f}')
 
-    def get_elapsed(self) -> int:
-        '''Returns the elapsed time in seconds.'''
-        if self.start == 0:
-            return 0
-        else:
-            format_data = "%d/%m/%y %H:%M:%S"
-            start_time = datetime.strptime(self.start.strftime(format_data), format_data)
-            now_time = datetime.now().strftime(format_data)
-            now_time = datetime.strptime(now_time, format_data)
-            elapsed = now_time - start_time
-            elapsed = elapsed.total_seconds()
-            elapsed = int(elapsed)
-            return elapsed
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''Returns the elapsed time in seconds (0 if the timer is not started).'''
+        return self.service.elapsed(name)
+
+    def lap(self, name: str = 'default') -> float:
+        '''Records a lap, returns the seconds since the previous lap (or the start).'''
+        return self.service.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''Returns the split times (seconds) of the recorded laps.'''
+        return self.service.get_laps(name)
+
+    def now(self) -> float:
+        '''Returns the time of the timer clock in seconds.'''
+        return self.service.now()
 
 class Motor(control_interfaces.MotorInterface):
     """
-    Motor(speed_pin,terma_pin,termb_pinfreq=17,dc=70) -> Motor control.
+    Motor(speed_pin,terma_pin,termb_pin,dc_value=70,freq=17,pwm_backend='software') -> Motor control.
+    pwm_backend is one of pwm.BACKENDS ('software', 'hardware' or 'fake').
     Functions:
     dir_control(direction) Change motor direction to input direction.
     move(direction) Start moving motor with default speed towards input direction.
     set_speed(speed) Set speed immediately 0-100 range.
+    apply_duty(duty) Set the duty cycle without changing the default speed.
+    set_frequency(freq) Change the pwm frequency.
     stop() Stops the motor.
     """
 
-    def __init__(self, speed_pin: int, terma_pin: int, termb_pin: int, dc_value: int = 70) -> None:
-        GPIO.setup(speed_pin, GPIO.OUT)
+    def __init__(self, speed_pin: int, terma_pin: int, termb_pin: int, dc_value: int = 70,
+                 freq: float = 17, pwm_backend: str = 'software') -> None:
         GPIO.setup(terma_pin, GPIO.OUT)
         GPIO.setup(termb_pin, GPIO.OUT)
         self.terma_pin = terma_pin
         self.termb_pin = termb_pin
-        self.freq = 17
-        self.mot = GPIO.PWM(speed_pin, self.freq)
+        self.freq = freq
+        self.mot = pwm.create_pwm(pwm_backend, speed_pin, freq)
         self.dc_value = dc_value
+        self.direction = 1          # 1 forward, -1 reverse (the direction pins)
+        self.drive_direction = 1    # direction of the last powered movement (wheels may coast)
+        self.duty = 0.0             # the current duty cycle
         self.dir_control("forward")
         self.mot.start(0)
 
+    def __set_duty(self, duty: float) -> None:
+        '''Sets the duty cycle and records the driving state.'''
+        self.duty = duty
+        if duty > 0:
+            self.drive_direction = self.direction
+        self.mot.set_duty_cycle(duty)
+
     def set_speed(self, speed: int) -> None:
         '''
         Set speed immediately 0-100 range.
@@ -98,7 +121,7 @@ class Motor(control_interfaces.MotorInterface):
                 "The motor speed is a percentage of total motor power. Accepted values 0-100.")
         else:
             self.dc_value = speed
-            self.mot.ChangeDutyCycle(speed)
+            self.__set_duty(speed)
 
     def dir_control(self, direction: str) -> None:
         '''
@@ -108,9 +131,11 @@ class Motor(control_interfaces.MotorInterface):
         if direction == "forward":
             GPIO.output(self.terma_pin, GPIO.HIGH)
             GPIO.output(self.termb_pin, GPIO.LOW)
+            self.direction = 1
         elif direction == "reverse":
             GPIO.output(self.terma_pin, GPIO.LOW)
             GPIO.output(self.termb_pin, GPIO.HIGH)
+            self.direction = -1
         else:
             print("Motor accepts only forward and reverse values")
 
@@ -120,29 +145,58 @@ class Motor(control_interfaces.MotorInterface):
         Param: direction: the direction to be headed to.
         '''
         self.dir_control(direction)
-        self.mot.ChangeDutyCycle(self.dc_value)
+        self.__set_duty(self.dc_value)
+
+    def apply_duty(self, duty: float) -> None:
+        '''
+        Set the duty cycle immediately, without changing the default speed (used by controllers).
+        Param: duty: the duty cycle (it is clamped to the range 0 - 100).
+        '''
+        self.__set_duty(min(max(duty, 0), 100))
+
+    def set_frequency(self, freq: float) -> None:
+        '''
+        Change the pwm frequency.
+        Param: freq: the frequency (Hz).
+        '''
+        self.freq = freq
+        self.mot.set_frequency(freq)
 
     def stop(self) -> None:
         '''Stops the motor.'''
-        self.mot.ChangeDutyCycle(0)
+        self.__set_duty(0)
 
 
 class Odometer(control_interfaces.OdometerInterface):
     '''
-    Class Odometer(pin) -> Odometer control.
+    Class Odometer(pin,history) -> Odometer control.
     (Event triggered counter).
+    The gpio callback stores the timestamp of every step in a ring buffer
+    (its only write), steps and velocity are derived from it without locking.
     Functions:
     count_revolutions() Increases the counter of revolutions.
     get_revolutions() Returns the number of revolutions.
     get_distance() Returns the traveled distance in cm.
+    get_total_steps() Returns the steps since the odometer was opened.
+    get_step_distance() Returns the distance traveled in one step.
+    get_velocity() Returns the wheel speed in cm/s.
+    get_rpm() Returns the wheel speed in revolutions per minute.
+    steps_for_distance(dist) Returns the steps needed to travel a distance.
+    notify_at_steps(steps,action) Runs action from the callback when steps are reached.
+    cancel_target() Drops the pending target of notify_at_steps.
+    add_listener(listener) Calls listener(odometer) from the callback at every step.
     reset() Resets the steps counter.
     '''
-    def __init__(self, pin: int) -> None:
+    def __init__(self, pin: int, history: int = 64) -> None:
         self.pin = pin
         self.sensor_disc = 20
-        self.steps = 0
         self.wheel_diameter = 6.65
         self.precision = 2
+        self.edges = ring_buffer.RingBuffer(history, 'q')   # step timestamps (ns)
+        self.reset_count = 0
+        self.target = None    # (steps, action, future) of notify_at_steps
+        self.target_lock = threading.Lock()
+        self.listeners = ()
         GPIO.setup(pin, GPIO.IN)
         GPIO.add_event_detect(
             self.pin,
@@ -150,14 +204,96 @@ class Odometer(control_interfaces.OdometerInterface):
             callback=self.count_revolutions,
             bouncetime=1)
 
-    def count_revolutions(self,channel) -> None:
+    def count_revolutions(self, channel=None) -> None:
         '''Increase total steps by one.'''
-        self.steps += 1
+        self.edges.append(time.perf_counter_ns())
+        for listener in self.listeners:
+            listener(self)
+        target = self.target
+        if target is not None and self.steps >= target[0]:
+            self.__fire_target(target)
+
+    def __fire_target(self, target: tuple) -> None:
+        '''
+        Runs the action of a reached target and resolves its future (only once).
+        Param: target: the (steps, action, future) registered by notify_at_steps.
+        '''
+        with self.target_lock:
+            if self.target is not target:
+                return
+            self.target = None
+        steps, action, future = target
+        try:
+            if action is not None:
+                action()
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(self.steps)
+
+    def notify_at_steps(self, steps: int, action: Callable = None) -> Future:
+        '''
+        Registers a target step count (replacing a pending one, which is cancelled).
+        When the steps are reached, action runs directly in the gpio callback thread,
+        so the reaction latency is the interrupt latency instead of a polling period.
+        Param: steps: the target number of steps since the last reset.
+               action: a function to run when the target is reached (for example stop).
+        Returns: a future resolved with the step count when the target is reached.
+        '''
+        future = Future()
+        target = (steps, action, future)
+        with self.target_lock:
+            previous = self.target
+            self.target = target
+        if previous is not None:
+            previous[2].cancel()
+        if self.steps >= steps:
+            self.__fire_target(target)
+        return future
+
+    def cancel_target(self) -> None:
+        '''
+        Drops the pending target of notify_at_steps: its action does not run
+        and its future is cancelled.
+        '''
+        with self.target_lock:
+            target, self.target = self.target, None
+        if target is not None:
+            target[2].cancel()
+
+    def add_listener(self, listener: Callable) -> None:
+        '''
+        Registers a function called with the odometer at every step
+        (in the gpio callback thread, so it must be short).
+        Param: listener: the function.
+        '''
+        self.listeners = self.listeners + (listener,)
+
+    def get_step_distance(self) -> float:
+        ''' Returns the distance (cm) traveled in one step. '''
+        return self.wheel_diameter * math.pi / self.sensor_disc
+
+    def steps_for_distance(self, dist: float) -> int:
+        '''
+        Returns the number of steps needed to travel a distance.
+        Param: dist: the distance (in cm).
+        '''
+        circumference = self.wheel_diameter * math.pi
+        return math.ceil(round(dist / circumference * self.sensor_disc, 9))
+
+    @property
+    def steps(self) -> int:
+        ''' Steps since the last reset. '''
+        return self.edges.count - self.reset_count
 
     def get_steps(self) -> int:
         ''' Returns total number of steps. '''
         return self.steps
 
+    def get_total_steps(self) -> int:
+        ''' Returns the number of steps since the odometer was opened (not affected by reset). '''
+        return self.edges.count
+
     def get_revolutions(self) -> float:
         ''' Returns total number of revolutions. '''
         return self.steps / self.sensor_disc
@@ -169,57 +305,251 @@ class Odometer(control_interfaces.OdometerInterface):
         distance = revolutions * circumference
         return round(distance, self.precision)
 
+    def get_step_rate(self, window: int = 4) -> float:
+        '''
+        Returns the steps per second over the last window step intervals.
+        The rate is bounded by the time since the last step, so it falls to 0 when the wheel stops.
+        Param: window: the number of step intervals to average.
+        '''
+        stamps = self.edges.last(window + 1)
+        if len(stamps) < 2:
+            return 0.0
+        rate = (len(stamps) - 1) * 1e9 / max(stamps[-1] - stamps[0], 1)
+        since_last = time.perf_counter_ns() - stamps[-1]
+        return min(rate, 1e9 / max(since_last, 1))
+
+    def get_velocity(self, window: int = 4) -> float:
+        '''
+        Returns the wheel speed (in cm/s, the encoder does not sense direction).
+        Param: window: the number of step intervals to average.
+        '''
+        circumference = self.wheel_diameter * math.pi
+        return self.get_step_rate(window) / self.sensor_disc * circumference
+
+    def get_rpm(self, window: int = 4) -> float:
+        '''
+        Returns the wheel speed in revolutions per minute.
+        Param: window: the number of step intervals to average.
+        '''
+        return self.get_step_rate(window) / self.sensor_disc * 60
+
     def reset(self) -> None:
         ''' Reset the total traveled distance and revolutions. '''
-        self.steps = 0
+        self.reset_count = self.edges.count
 
 
 class UltrasonicSensor(control_interfaces.UltrasonicSensorInterface):
     '''
-    Class UltrasonicSensor(echo_pin,trig_pin) -> Ultrasonic sensor control.
+    Class UltrasonicSensor(echo_pin,trig_pin,timeout) -> Ultrasonic sensor control.
+    The echo pulse is timed by an edge interrupt (perf_counter_ns timestamps)
+    and a lost echo gives up after timeout seconds.
+    A ping arms the interrupt: the first edge after it is the rise of the echo and
+    the second one its fall. The edges are told by their order, not by the pin level
+    (the callback runs well after the edge, when a close echo has already ended),
+    and edges outside the window of a ping are ignored. The measurements (ping,
+    sample, measure) are serialized by a lock, so a sampler and a program thread
+    never reset each other's echo.
     Functions:
     get_distance() return distance in cm.
+    measure() Triggers one measurement and returns the distance in cm.
+    ping() Starts a measurement without waiting.
+    echo_distance() Returns the distance of the last ping.
+    sample() Returns the distance of the previous ping and pings again.
+    start_ranging(rate,window) Starts measuring in the background.
+    stop_ranging() Stops the background measurements.
     '''
+    max_dist = 999.9    # returned when no echo is received
+    speed_of_sound = 34300  # cm/s
+    trigger_pulse_ns = 10_000
 
-    def __init__(self, echo_pin: int = 14, trig_pin: int = 15) -> None:
+    def __init__(self, echo_pin: int = 14, trig_pin: int = 15, timeout: float = 0.04) -> None:
         self.echo_pin = echo_pin
         self.trig_pin = trig_pin
+        self.timeout = timeout
+        self.window_ns = round(timeout * 1e9)
+        self.ping_ns = 0      # time of the armed ping (0: not armed)
+        self.rise_ns = 0
+        self.fall_ns = 0
+        self.echo_done = threading.Event()
+        self.pinged = False
+        self.lock = threading.RLock()
+        self.latest = None
+        self.ranging = None
+        self.ranging_stop = threading.Event()
         GPIO.setup(self.echo_pin, GPIO.IN)
         GPIO.setup(self.trig_pin, GPIO.OUT)
         GPIO.output(self.trig_pin, False)
+        GPIO.add_event_detect(self.echo_pin, GPIO.BOTH, callback=self.echo_edge)
 
-    def get_distance(self) -> float:
+    def echo_edge(self, channel) -> None:
         '''
-        Gets the distance to the closest obstacle.
-        Returns: the distance to the closest obstacle (in cm).
+        Timestamps the rising and the falling edge of the echo pulse of the armed ping
+        (the first and the second edge after it, edges outside its window are ignored).
         '''
+        now = time.perf_counter_ns()
+        ping_ns = self.ping_ns
+        if ping_ns == 0 or now - ping_ns > self.window_ns:
+            return
+        if self.rise_ns == 0:
+            self.rise_ns = now
+        else:
+            self.fall_ns = now
+            self.ping_ns = 0
+            self.echo_done.set()
+
+    def __trigger(self) -> None:
+        '''Sends the trigger pulse (busy waits, since sleep is far longer than 10 us).'''
         GPIO.output(self.trig_pin, True)
-        time.sleep(0.00001)
+        end = time.perf_counter_ns() + self.trigger_pulse_ns
+        while time.perf_counter_ns() < end:
+            pass
         GPIO.output(self.trig_pin, False)
-        starttime = time.time()
-        stoptime = time.time()
-        while GPIO.input(self.echo_pin) == 0:
-            starttime = time.time()
 
-        while GPIO.input(self.echo_pin) == 1:
-            stoptime = time.time()
-        timeelasped = stoptime - starttime
-        distance = (timeelasped * 34300) / 2
-        return distance
+    def ping(self) -> None:
+        '''
+        Starts a measurement and returns immediately (the echo is timed by the interrupt),
+        echo_distance() returns its result.
+        The sensor ignores triggers while an echo is high: a ping first waits for the
+        echo of the previous ping (within its window), and if the echo pin is still high
+        after that (a lost echo longer than the window) the ping is not sent and counts
+        as lost (so the late fall is not taken for an echo).
+        '''
+        with self.lock:
+            ping_ns = self.ping_ns
+            if ping_ns != 0:
+                self.echo_done.wait(max(0, ping_ns + self.window_ns - time.perf_counter_ns()) / 1e9)
+            self.ping_ns = 0
+            self.rise_ns = 0
+            self.fall_ns = 0
+            self.echo_done.clear()
+            self.pinged = True
+            if GPIO.input(self.echo_pin):
+                return
+            self.ping_ns = time.perf_counter_ns()
+            self.__trigger()
+
+    def sample(self) -> float:
+        '''
+        Returns the distance of the previous ping (None before the first one)
+        and pings again, so a sampler does not wait for its echo.
+        '''
+        with self.lock:
+            distance = self.echo_distance() if self.pinged else None
+            self.ping()
+            return distance
+
+    def echo_distance(self) -> float:
+        '''
+        Returns the distance of the last ping (in cm),
+        or max_dist if its echo has not been received.
+        '''
+        if not self.echo_done.is_set():
+            return self.max_dist
+        elapsed = (self.fall_ns - self.rise_ns) / 1e9
+        return (elapsed * self.speed_of_sound) / 2
+
+    def measure(self) -> float:
+        '''
+        Triggers one measurement.
+        Returns: the distance to the closest obstacle (in cm),
+                 or max_dist if no echo was received within timeout.
+        '''
+        with self.lock:
+            self.ping()
+            self.echo_done.wait(self.timeout)
+            return self.echo_distance()
+
+    def __ranging_loop(self, period: float, window: int) -> None:
+        '''
+        Measures every period seconds and publishes the median of the last window distances.
+        '''
+        samples = deque(maxlen=window)
+        next_time = time.perf_counter()
+        while not self.ranging_stop.is_set():
+            samples.append(self.measure())
+            self.latest = statistics.median(samples)
+            next_time += period
+            self.ranging_stop.wait(max(0.0, next_time - time.perf_counter()))
+
+    def start_ranging(self, rate: float = 15, window: int = 3) -> None:
+        '''
+        Starts measuring in the background, so get_distance() returns immediately.
+        Param: rate: measurements per second (the sensor needs ~60 ms between pings).
+               window: number of measurements of the median filter.
+        '''
+        if self.ranging is not None and self.ranging.is_alive():
+            return
+        self.ranging_stop.clear()
+        self.latest = self.measure()
+        self.ranging = threading.Thread(
+            target=self.__ranging_loop, args=(1 / rate, window), daemon=True)
+        self.ranging.start()
+
+    def stop_ranging(self) -> None:
+        '''Stops the background measurements.'''
+        self.ranging_stop.set()
+        if self.ranging is not None:
+            self.ranging.join()
+        self.ranging = None
+        self.latest = None
+
+    def get_distance(self) -> float:
+        '''
+        Gets the distance to the closest obstacle
+        (the latest filtered distance if background ranging is running).
+        Returns: the distance to the closest obstacle (in cm).
+        '''
+        latest = self.latest
+        if latest is not None:
+            return latest
+        return self.measure()
 
 
 class Accelerometer(control_interfaces.AccelerometerInterface):
     '''
     Class Accelerometer(address) -> Handles accelerometer and gyroscope.
+    While streaming, readings come from the newest FIFO sample of an imu.ImuService
+    instead of an i2c transaction.
     Functions:
     get_acceleration(dimension) Returns the acceleration for a specific dimension.
     get_gyro(dimension) Returns the gyroscope for a specific dimension.
+    start_streaming(rate) Starts sampling through the FIFO in the background.
+    stop_streaming() Stops the background sampling.
     '''
 
     #!FIXME what datatype is address (hexademical)?
     def __init__(self, address: int = 0x68) -> None:
         #hex(104) == 0x68
-        self.sensor = mpu6050(address)
+        self.sensor = hal.get_board().mpu6050(address)
+        self.service = None
+
+    def start_streaming(self, rate: float = 100, history: int = 512,
+                        background: bool = True) -> imu.ImuService:
+        '''
+        Starts sampling through the FIFO in the background.
+        Param: rate: the sample rate (Hz).
+               history: the number of samples kept.
+               background: if False, the FIFO is drained by the caller (see ImuService.start).
+        Returns: the imu service (get_imu(), get_imu_window(count), get_average(count)).
+        '''
+        self.stop_streaming()
+        self.service = imu.ImuService(self.sensor, rate=rate, history=history)
+        self.service.start(background=background)
+        return self.service
+
+    def stop_streaming(self) -> None:
+        '''Stops the background sampling.'''
+        if self.service is not None:
+            self.service.stop()
+            self.service = None
+
+    def __latest(self) -> dict:
+        '''Returns the newest streamed sample (waits for the first one).'''
+        sample = self.service.get_imu()
+        while sample is None:
+            time.sleep(self.service.drain_period / 4)
+            sample = self.service.get_imu()
+        return sample
 
     def get_acceleration(self, dimension: str) -> float:
         '''
@@ -227,11 +557,12 @@ class Accelerometer(control_interfaces.AccelerometerInterface):
         Param: dimension: the dimension requested.
         Returns: the acceleration for a specific dimension.
         '''
-        accel = self.sensor.get_accel_data()
-        if dimension in ('x', 'y', 'z'):
-            return accel[dimension]
-        print("Dimension not recognized!!")
-        return 0.0
+        if dimension not in ('x', 'y', 'z'):
+            print("Dimension not recognized!!")
+            return 0.0
+        if self.service is not None:
+            return self.__latest()[f'accel_{dimension}']
+        return self.sensor.get_accel_data()[dimension]
 
     def get_gyro(self, dimension: str) -> float:
         '''
@@ -239,11 +570,12 @@ class Accelerometer(control_interfaces.AccelerometerInterface):
         Param: dimension: the dimension requested.
         Returns: the gyroscope for a specific dimension.
         '''
-        gyro = self.sensor.get_gyro_data()
-        if dimension in ('x', 'y', 'z'):
-            return gyro[dimension]
-        print("Dimension not recognized!!")
-        return 0.0
+        if dimension not in ('x', 'y', 'z'):
+            print("Dimension not recognized!!")
+            return 0.0
+        if self.service is not None:
+            return self.__latest()[f'gyro_{dimension}']
+        return self.sensor.get_gyro_data()[dimension]
 
 
 class AnalogueReadings(control_interfaces.AnalogueReadingsInterface):
@@ -251,10 +583,11 @@ class AnalogueReadings(control_interfaces.AnalogueReadingsInterface):
     Class AnalogueReadings(clk_p,miso_p,mosi_p,cs_p) -> Handles Analogue Readings.
     Functions:
     get_reading(pin) Gets reading of a specific sensor specified by input pin.
+    read_channels(channels) Reads several channels (without printing).
     '''
 
     def __init__(self, clk_p: int = 11, miso_p: int = 9, mosi_p: int = 10, cs_p: int = 8) -> None:
-        self.mcp = Adafruit_MCP3008.MCP3008(clk=clk_p, cs=cs_p, miso=miso_p, mosi=mosi_p)
+        self.mcp = hal.get_board().mcp3008(clk=clk_p, cs=cs_p, miso=miso_p, mosi=mosi_p)
 
     def get_reading(self, pin: int) -> float:
         '''
@@ -266,21 +599,53 @@ class AnalogueReadings(control_interfaces.AnalogueReadingsInterface):
         print(f'ADC {pin}: {value}')
         return value
 
+    def read_channels(self, channels: tuple = (0, 1, 2, 3)) -> tuple:
+        '''
+        Reads several channels (without printing, for samplers).
+        Param: channels: the adc channels.
+        Returns: the readings, in the order of channels.
+        '''
+        return tuple(self.mcp.read_adc(channel) for channel in channels)
+
 
 class Noise(control_interfaces.NoiseInterface):
     '''
-    Class Noise(pin).
+    Class Noise(pin,debounce,history).
     Default pin 4
+    The rising edges of the sensor output are counted by an interrupt (one event per
+    debounce seconds), so short claps between polls are never missed.
     Functions:
-    detect_noise(): Returns True only if noise is detected.
+    detect_noise(): Returns True only if noise was detected since the previous call.
+    get_noise_events(since) Returns the times of the noise events.
+    get_level() Returns the current sensor output.
     '''
-    def __init__(self, pin: int = 4) -> None:
+    def __init__(self, pin: int = 4, debounce: float = 0.1, history: int = 64) -> None:
         self.pin = pin
+        self.events = event_latch.EventLatch(history)
         GPIO.setup(self.pin, GPIO.IN)
+        GPIO.add_event_detect(self.pin, GPIO.RISING, callback=self.noise_edge,
+                              bouncetime=max(1, int(debounce * 1000)))
+
+    def noise_edge(self, channel) -> None:
+        '''Records a noise event.'''
+        self.events.record()
 
     def detect_noise(self) -> bool:
         '''
-        Returns True only if noise was detected.
+        Returns True only if noise was detected since the previous call (latched).
+        '''
+        return self.events.consume()
+
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the times of the newest noise events (oldest first).
+        Param: since: only events after this time.perf_counter() time.
+        '''
+        return self.events.get_events(since)
+
+    def get_level(self) -> bool:
+        '''
+        Returns the current sensor output.
         '''
         return bool(GPIO.input(self.pin))
 
@@ -377,3 +742,133 @@ class LedRGB(control_interfaces.LedRGBInterface):
             self.p_r.set_off()
             self.p_b.set_off()
             self.p_g.set_off()
+
+
+class AudioPlayer(control_interfaces.AudioPlayerInterface):
+    '''
+    Class AudioPlayer(cache_size) -> Long-lived mpg123 player in remote control mode.
+    A single mpg123 process is started on first use and receives LOAD commands,
+    so playing a sound does not spawn a new process.
+    Functions:
+    start() Starts the mpg123 process.
+    preload(audio_path) Resolves a sound and warms it in the file cache.
+    play(audio_path,wait) Plays a sound (blocks until it ends only if wait is True).
+    stop() Stops the sound that is currently playing.
+    is_playing() Returns True while a sound is playing.
+    close() Terminates the mpg123 process.
+    '''
+    def __init__(self, cache_size: int = 16) -> None:
+        self.cache_size = cache_size
+        self.sounds = OrderedDict()   # LRU of resolved sound paths
+        self.process = None
+        self.lock = threading.Lock()
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self.finished.set()
+
+    def __start_process(self) -> None:
+        '''Starts mpg123 in remote control mode (if it is not already running).'''
+        if self.process is not None and self.process.poll() is None:
+            return
+        self.process = subprocess.Popen(
+            ["mpg123", "-R"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        # frame progress messages are not needed, only playback state:
+        self.__send("SILENCE")
+        reader = threading.Thread(target=self.__read_status, args=(self.process,), daemon=True)
+        reader.start()
+
+    def __send(self, command: str) -> None:
+        '''
+        Sends a command to the mpg123 process.
+        Param: command: the remote control command.
+        '''
+        self.process.stdin.write(command + "\n")
+        self.process.stdin.flush()
+
+    def __read_status(self, process: subprocess.Popen) -> None:
+        '''
+        Reads mpg123 status messages and updates the playback events.
+        Param: process: the mpg123 process to read from.
+        '''
+        for line in process.stdout:
+            if line.startswith("@P 2"):
+                self.started.set()
+            elif line.startswith("@P 0") and self.started.is_set():
+                self.finished.set()
+            elif line.startswith("@E"):
+                print(f'mpg123: {line.strip()}')
+                self.finished.set()
+        self.finished.set()
+
+    def __resolve(self, audio_path: str) -> str:
+        '''
+        Returns the cached absolute path of a sound (checking it once).
+        Param: audio_path: the path to the wanted mp3 file.
+        '''
+        audio_path = os.path.abspath(os.path.normpath(audio_path))
+        if audio_path in self.sounds:
+            self.sounds.move_to_end(audio_path)
+            return audio_path
+        if not os.path.isfile(audio_path):
+            print(f'Cannot find sound file {audio_path}.')
+            raise FileNotFoundError
+        # reading the file once keeps it in the OS page cache for mpg123:
+        with open(audio_path, 'rb') as file:
+            file.read()
+        self.sounds[audio_path] = True
+        if len(self.sounds) > self.cache_size:
+            self.sounds.popitem(last=False)
+        return audio_path
+
+    def start(self) -> None:
+        '''Starts the mpg123 process ahead of the first sound.'''
+        with self.lock:
+            self.__start_process()
+
+    def preload(self, audio_path: str) -> None:
+        '''
+        Resolves a sound and warms it in the file cache so the first play starts without delay.
+        Param: audio_path: the path to the wanted mp3 file.
+        '''
+        with self.lock:
+            self.__resolve(audio_path)
+            self.__start_process()
+
+    def play(self, audio_path: str, wait: bool = True) -> None:
+        '''
+        Plays mp3 file specified by input audio_path.
+        Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends.
+        '''
+        with self.lock:
+            audio_path = self.__resolve(audio_path)
+            self.__start_process()
+            self.started.clear()
+            self.finished.clear()
+            self.__send(f"LOAD {audio_path}")
+        if wait:
+            self.finished.wait()
+
+    def stop(self) -> None:
+        '''Stops the sound that is currently playing.'''
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                self.__send("STOP")
+        self.finished.set()
+
+    def is_playing(self) -> bool:
+        '''Returns True while a sound is playing.'''
+        return not self.finished.is_set()
+
+    def close(self) -> None:
+        '''Terminates the mpg123 process.'''
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                self.__send("QUIT")
+                try:
+                    self.process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+            self.process = None
+        self.finished.set()
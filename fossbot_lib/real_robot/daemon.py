@@ -0,0 +1,382 @@
+"""
+Hardware daemon of the real robot: it owns the devices and shares them with other
+processes through shared memory (see real_robot.client for the client side).
+Run it with: python -m fossbot_lib.real_robot.daemon --parameters admin_parameters.yaml
+"""
+
+import argparse
+import fcntl
+import math
+import os
+import signal
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from fossbot_lib.common.data_structures import configuration, loop_stats
+
+# sensor frame, published with a seqlock (sequence, frame, checksum)
+FRAME_FIELDS = ('time', 'distance', 'adc_0', 'adc_1', 'adc_2', 'adc_3', 'noise_count', 'noise_time',
+                'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z',
+                'steps_left', 'steps_right', 'velocity_left', 'velocity_right',
+                'x', 'y', 'theta', 'heading')
+FIELD_INDEX = {name: index for index, name in enumerate(FRAME_FIELDS)}
+SEQUENCE = struct.Struct('<Q')
+FRAME = struct.Struct('<' + 'd' * len(FRAME_FIELDS))
+FRAME_OFFSET = SEQUENCE.size
+CHECKSUM = struct.Struct('<Q')      # crc32 of the sequence and the frame
+CHECKSUM_OFFSET = FRAME_OFFSET + FRAME.size
+
+# command queues: one single producer / single consumer ring per client slot
+TEXT_SIZE = 112
+COMMAND = struct.Struct(f'<QI4x3d{TEXT_SIZE}s')    # id, opcode, 3 arguments, text (utf-8)
+SLOT_HEADER = struct.Struct('<QQQ')       # head (client), tail (daemon), done (daemon)
+SLOTS = 4
+CAPACITY = 16
+SLOT_SIZE = SLOT_HEADER.size + CAPACITY * COMMAND.size
+SLOTS_OFFSET = CHECKSUM_OFFSET + CHECKSUM.size
+SIZE = SLOTS_OFFSET + SLOTS * SLOT_SIZE
+
+OPCODES = ('stop', 'just_move', 'just_rotate', 'move_distance', 'rotate_90', 'rotate_degrees',
+           'rgb_set_color', 'play_sound', 'reset_dir', 'reset_pose', 'reset_heading')
+OPCODE = {name: index for index, name in enumerate(OPCODES)}
+DIRECTIONS = ('forward', 'reverse')
+
+
+class SeqLock:
+    '''
+    Class SeqLock(buffer) -> Sensor frame in shared memory, guarded by a sequence counter.
+    The single writer makes the counter odd, writes the frame and its checksum and makes
+    the counter even again; readers copy the frame and retry if the counter was odd or
+    changed meanwhile, so readers never block the writer and never take a lock (or make
+    a system call). Python gives no memory fences: the counter alone is only safe where
+    stores become visible in program order (x86). On weakly ordered CPUs (the ARM of
+    the Raspberry Pi) a reader can see the new counter with part of an old frame, so the
+    frame carries a crc32 of itself and its sequence, and torn copies are retried too.
+    Functions:
+    write(values) Publishes a frame.
+    read() Returns the newest complete frame.
+    '''
+    def __init__(self, buffer: memoryview) -> None:
+        self.buffer = buffer
+
+    @staticmethod
+    def checksum(sequence: int, frame: bytes) -> int:
+        '''
+        Returns the checksum of a frame.
+        Param: sequence: the (even) sequence of the frame.
+               frame: the packed frame.
+        '''
+        return zlib.crc32(frame, zlib.crc32(SEQUENCE.pack(sequence)))
+
+    def write(self, values: tuple) -> None:
+        '''
+        Publishes a frame (single writer).
+        Param: values: the values of FRAME_FIELDS.
+        '''
+        sequence = SEQUENCE.unpack_from(self.buffer, 0)[0]
+        frame = FRAME.pack(*values)
+        SEQUENCE.pack_into(self.buffer, 0, sequence + 1)
+        self.buffer[FRAME_OFFSET:CHECKSUM_OFFSET] = frame
+        CHECKSUM.pack_into(self.buffer, CHECKSUM_OFFSET, self.checksum(sequence + 2, frame))
+        SEQUENCE.pack_into(self.buffer, 0, sequence + 2)
+
+    def read(self) -> tuple:
+        '''
+        Returns the newest complete frame: (sequence, values), the sequence is
+        twice the number of published frames (0: nothing published yet).
+        '''
+        spins = 0
+        while True:
+            before = SEQUENCE.unpack_from(self.buffer, 0)[0]
+            if not before & 1:
+                data = bytes(self.buffer[FRAME_OFFSET:SLOTS_OFFSET])
+                if SEQUENCE.unpack_from(self.buffer, 0)[0] == before:
+                    frame = data[:FRAME.size]
+                    if before == 0 or (CHECKSUM.unpack_from(data, FRAME.size)[0]
+                                       == self.checksum(before, frame)):
+                        return before, FRAME.unpack(frame)
+            spins += 1
+            if spins % 100 == 0:
+                time.sleep(0)   # let a descheduled writer finish
+
+
+class CommandQueue:
+    '''
+    Class CommandQueue(buffer,slot) -> Lock free command ring of a client slot.
+    The client only writes head (after the command), the daemon only writes tail and done,
+    so neither side ever waits for the other. done only grows: commands completed
+    by callbacks (like a sound played in the background) can finish out of order.
+    Functions:
+    push(opcode,args,text) Adds a command (client side).
+    pop() Removes the oldest command (daemon side).
+    set_done(command_id) Records a completed command (daemon side).
+    get_done() Returns the highest completed command id.
+    '''
+    def __init__(self, buffer: memoryview, slot: int) -> None:
+        self.buffer = buffer
+        self.offset = SLOTS_OFFSET + slot * SLOT_SIZE
+        self.done_lock = threading.Lock()   # the daemon completes commands from many threads
+
+    def __header(self) -> tuple:
+        return SLOT_HEADER.unpack_from(self.buffer, self.offset)
+
+    def push(self, opcode: int, args: tuple = (), text: str = '') -> int:
+        '''
+        Adds a command (client side).
+        Param: opcode: the command (index of OPCODES).
+               args: up to 3 numeric arguments.
+               text: a text argument (up to TEXT_SIZE utf-8 bytes).
+        Returns: the command id, or None if the queue is full.
+        '''
+        encoded = text.encode()
+        if len(encoded) > TEXT_SIZE:
+            print(f'Text argument too long ({len(encoded)} bytes, at most {TEXT_SIZE}): {text}')
+            raise ValueError
+        head, tail, _ = self.__header()
+        if head - tail >= CAPACITY:
+            return None
+        command_id = head + 1
+        args = tuple(args) + (0.0,) * (3 - len(args))
+        record = self.offset + SLOT_HEADER.size + (head % CAPACITY) * COMMAND.size
+        COMMAND.pack_into(self.buffer, record, command_id, opcode, *args, encoded)
+        struct.pack_into('<Q', self.buffer, self.offset, head + 1)
+        return command_id
+
+    def pop(self) -> tuple:
+        '''
+        Removes the oldest command (daemon side).
+        Returns: (command_id, opcode, args, text), or None if the queue is empty.
+        '''
+        head, tail, _ = self.__header()
+        if tail >= head:
+            return None
+        record = self.offset + SLOT_HEADER.size + (tail % CAPACITY) * COMMAND.size
+        command_id, opcode, arg0, arg1, arg2, text = COMMAND.unpack_from(self.buffer, record)
+        struct.pack_into('<Q', self.buffer, self.offset + 8, tail + 1)
+        # a text can only be cut by a client that does not check its length:
+        # the command still runs (with a replacement character) and completes
+        return command_id, opcode, (arg0, arg1, arg2), text.rstrip(b'\0').decode(errors='replace')
+
+    def set_done(self, command_id: int) -> None:
+        '''
+        Records a completed command (daemon side). A command completing after a newer
+        one does not move done back, so a waiting client always sees its command done.
+        '''
+        with self.done_lock:
+            if command_id > self.__header()[2]:
+                struct.pack_into('<Q', self.buffer, self.offset + 16, command_id)
+
+    def get_done(self) -> int:
+        '''Returns the id of the highest completed command.'''
+        return self.__header()[2]
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    '''
+    Attaches to the shared memory of a running daemon (without unlinking it at exit).
+    Param: name: the daemon name.
+    '''
+    memory = shared_memory.SharedMemory(name=name)
+    # the resource tracker would unlink the daemon's memory when this process exits
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+def claim_slot(name: str) -> tuple:
+    '''
+    Claims a free command slot of a daemon (released when the process exits).
+    Param: name: the daemon name.
+    Returns: (slot, lock file).
+    '''
+    for slot in range(SLOTS):
+        path = os.path.join(tempfile.gettempdir(), f'{name}-slot{slot}.lock')
+        lock_file = open(path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+        return slot, lock_file
+    print(f'All {SLOTS} command slots of {name} are in use!!')
+    raise ConnectionError
+
+
+class HardwareDaemon:
+    '''
+    Class HardwareDaemon(robot,name,rate,command_period) -> Shares a real robot with other processes.
+    The daemon owns the devices: it starts the sensor sampler, the pose and the heading
+    estimators of the robot, publishes a sensor frame rate times per second into shared
+    memory and executes the commands of the client slots.
+    Functions:
+    start() Creates the shared memory and starts the threads.
+    stop() Stops the threads, stops the robot and removes the shared memory.
+    serve_forever() Runs until SIGINT or SIGTERM.
+    get_stats() Returns the publisher loop statistics.
+    '''
+    def __init__(self, robot, name: str = 'fossbot', rate: float = 100,
+                 command_period: float = 0.002) -> None:
+        self.robot = robot
+        self.name = name
+        self.period = 1 / rate
+        self.command_period = command_period
+        self.memory = None
+        self.frame = None
+        self.queues = ()
+        self.audio = ThreadPoolExecutor(max_workers=1)
+        self.stats = loop_stats.LoopStats(self.period)
+        self.threads = []
+        self.halt = threading.Event()
+
+    def __frame_values(self) -> tuple:
+        '''Collects the newest sensor values (nan where a value is missing).'''
+        robot = self.robot
+        store = robot.sensor_store
+        distance = store.get_value('ultrasonic')
+        adc = store.get_value('adc') or (math.nan,) * 4
+        noise_time = robot.noise.events.get_last_time()
+        sample = store.get('imu') or (math.nan,) * 7
+        odometers = (robot.odometer_left, robot.odometer_right)
+        _, x, y, theta = robot.pose_tracker.pose
+        return ((time.perf_counter(), math.nan if distance is None else distance) + tuple(adc)
+                + (float(robot.noise.events.get_count()),
+                   math.nan if noise_time is None else noise_time) + tuple(sample[1:7])
+                + tuple(float(odometer.get_total_steps()) for odometer in odometers)
+                + tuple(odometer.get_velocity() for odometer in odometers)
+                + (x, y, theta, robot.heading_estimator.get_heading()))
+
+    def __publish_loop(self) -> None:
+        '''Publishes a frame every period seconds until stop().'''
+        next_time = time.perf_counter()
+        while not self.halt.is_set():
+            self.stats.tick()
+            self.frame.write(self.__frame_values())
+            self.stats.done()
+            next_time += self.period
+            self.halt.wait(max(0.0, next_time - time.perf_counter()))
+
+    def __execute(self, queue: CommandQueue, command: tuple) -> None:
+        '''Runs a command, its slot is told when it has completed.'''
+        command_id, opcode, args, text = command
+        robot = self.robot
+        result = None
+        try:
+            name = OPCODES[opcode]
+            if name == 'stop':
+                robot.stop()
+            elif name == 'just_move':
+                robot.just_move(DIRECTIONS[int(args[0])])
+            elif name == 'just_rotate':
+                robot.just_rotate(int(args[0]))
+            elif name == 'move_distance':
+                result = robot.start_move_distance(args[0], DIRECTIONS[int(args[1])])
+            elif name == 'rotate_90':
+                result = robot.start_rotate_90(int(args[0]))
+            elif name == 'rotate_degrees':
+                result = robot.start_rotate_degrees(args[0])
+            elif name == 'rgb_set_color':
+                robot.rgb_set_color(text)
+            elif name == 'play_sound':
+                result = self.audio.submit(robot.play_sound, text)
+            elif name == 'reset_dir':
+                robot.reset_dir()
+            elif name == 'reset_pose':
+                robot.reset_pose(*args)
+            elif name == 'reset_heading':
+                robot.reset_heading(args[0])
+        except Exception as error:
+            print(f'Command {opcode} failed: {error}')
+        if isinstance(result, Future):
+            result.add_done_callback(lambda _: queue.set_done(command_id))
+        else:
+            queue.set_done(command_id)
+
+    def __command_loop(self) -> None:
+        '''Polls the command queues every command_period seconds until stop().'''
+        while not self.halt.is_set():
+            for queue in self.queues:
+                command = queue.pop()
+                while command is not None:
+                    try:
+                        self.__execute(queue, command)
+                    except Exception as error:     # pylint: disable=broad-except
+                        print(f'Command {command[1]} failed: {error}')
+                        queue.set_done(command[0])
+                    command = queue.pop()
+            self.halt.wait(self.command_period)
+
+    def start(self) -> None:
+        '''Creates the shared memory, starts the robot services and the threads.'''
+        try:
+            self.memory = shared_memory.SharedMemory(name=self.name, create=True, size=SIZE)
+        except FileExistsError:
+            # left by a daemon that did not exit cleanly
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self.memory = shared_memory.SharedMemory(name=self.name, create=True, size=SIZE)
+        self.memory.buf[:SIZE] = bytes(SIZE)
+        self.frame = SeqLock(self.memory.buf)
+        self.queues = tuple(CommandQueue(self.memory.buf, slot) for slot in range(SLOTS))
+        self.robot.start_sampler()
+        self.robot.get_pose()
+        self.robot.get_heading()
+        self.halt.clear()
+        self.stats.reset()
+        self.threads = [threading.Thread(target=self.__publish_loop, daemon=True),
+                        threading.Thread(target=self.__command_loop, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self) -> None:
+        '''Stops the threads, stops the robot and removes the shared memory.'''
+        self.halt.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.robot.stop()
+        self.audio.shutdown(wait=False)
+        if self.memory is not None:
+            self.frame = None
+            self.queues = ()
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def serve_forever(self) -> None:
+        '''Starts the daemon and runs until SIGINT or SIGTERM.'''
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+        self.start()
+        try:
+            stopped.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def get_stats(self) -> dict:
+        '''Returns the publisher loop statistics (see LoopStats.get_stats).'''
+        return self.stats.get_stats()
+
+
+def main() -> None:
+    ''' Runs the hardware daemon of the real robot. '''
+    parser = argparse.ArgumentParser(description='FossBot hardware daemon')
+    parser.add_argument('--parameters', default='admin_parameters.yaml')
+    parser.add_argument('--name', default='fossbot', help='shared memory name')
+    parser.add_argument('--rate', type=float, default=100, help='frames per second')
+    args = parser.parse_args()
+    # imported here, so clients can import this module without the gpio stack
+    from fossbot_lib.real_robot.fossbot import FossBot
+    parameters = configuration.RobotParameters.from_file(args.parameters)
+    robot = FossBot(parameters=parameters)
+    print(f'FossBot daemon {args.name} running')
+    HardwareDaemon(robot, name=args.name, rate=args.rate).serve_forever()
+    robot.exit()
+
+if __name__ == "__main__":
+    main()
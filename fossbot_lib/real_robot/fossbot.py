@@ -1,32 +1,126 @@
 """
 Real robot implementation
 """
+import threading
 import time
-import os
-import subprocess
-from fossbot_lib.common.data_structures import configuration
+from concurrent.futures import CancelledError, Future
+from functools import cached_property, partial
+from fossbot_lib.common.data_structures import configuration, pose
 from fossbot_lib.common.interfaces import robot_interface
-from fossbot_lib.real_robot import control
-
+from fossbot_lib.parameters_parser import watcher
+from fossbot_lib.real_robot import control, heading, imu, motion_plan, sampler, speed_controller
+
+# lazily opened devices of the robot (in the order warmup() opens them):
+DEVICES = ('motor_right', 'motor_left', 'ultrasonic', 'odometer_right', 'odometer_left',
+           'rgb_led', 'analogue_reader', 'accelerometer', 'noise', 'timer', 'audio')
+
+class device_property(cached_property):     # pylint: disable=invalid-name
+    '''
+    cached_property opened under the devices lock of the robot, so two threads
+    touching a device first (the program and a sampler, estimator, planner or
+    parameter watcher thread) never open it twice (cached_property has no lock
+    since Python 3.12). The lock is reentrant: a device can open the devices it uses.
+    '''
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.attrname, self)
+        if value is not self:
+            return value
+        with instance.devices_lock:
+            return super().__get__(instance, owner)
 
 class FossBot(robot_interface.FossBotInterface):
-    """ Real robot """
-
-    def __init__(self, parameters: configuration.RobotParameters) -> None:
+    """
+    Real robot.
+    Devices are opened on first use (so a program that only uses the led
+    does not open the accelerometer, the adc or the motors),
+    call warmup() to open all of them in advance.
+    pwm_backend selects the motors pwm backend ('software', 'hardware' or 'fake')
+    and motor_freq the pwm frequency (Hz) of the left and the right motor.
+    """
+
+    def __init__(self, parameters: configuration.RobotParameters,
+                 pwm_backend: str = 'software', motor_freq: tuple = (17, 17)) -> None:
         control.start_lib()
-        self.motor_right = control.Motor(speed_pin=23, terma_pin=27, termb_pin=22,
-                                         dc_value=parameters.motor_right_speed.value)
-        self.motor_left = control.Motor(speed_pin=25, terma_pin=17, termb_pin=24,
-                                        dc_value=parameters.motor_left_speed.value)
-        self.ultrasonic = control.UltrasonicSensor(echo_pin=5, trig_pin=6)
-        self.odometer_right = control.Odometer(pin=21)
-        self.odometer_left = control.Odometer(pin=20)
-        self.rgb_led = control.LedRGB()
-        self.analogue_reader = control.AnalogueReadings()
-        self.accelerometer = control.Accelerometer()
-        self.noise = control.Noise(pin=4)
-        self.timer = control.Timer()
+        self.devices_lock = threading.RLock()
         self.parameters = parameters
+        self.pwm_backend = pwm_backend
+        self.motor_freq = motor_freq
+        self.speed_controller = None
+        self.control_speed = 0.0
+        self.sampler = None
+        self.sensor_store = None
+        self.sampler_drains_imu = False
+        self.parameter_watcher = None
+        self.exited = False
+
+    @device_property
+    def motor_right(self) -> control.Motor:
+        '''Right motor (opened on first use).'''
+        return control.Motor(speed_pin=23, terma_pin=27, termb_pin=22,
+                             dc_value=self.parameters.motor_right_duty,
+                             freq=self.motor_freq[1], pwm_backend=self.pwm_backend)
+
+    @device_property
+    def motor_left(self) -> control.Motor:
+        '''Left motor (opened on first use).'''
+        return control.Motor(speed_pin=25, terma_pin=17, termb_pin=24,
+                             dc_value=self.parameters.motor_left_duty,
+                             freq=self.motor_freq[0], pwm_backend=self.pwm_backend)
+
+    @device_property
+    def ultrasonic(self) -> control.UltrasonicSensor:
+        '''Ultrasonic sensor (opened on first use).'''
+        return control.UltrasonicSensor(echo_pin=5, trig_pin=6)
+
+    @device_property
+    def odometer_right(self) -> control.Odometer:
+        '''Right odometer (opened on first use).'''
+        return control.Odometer(pin=21)
+
+    @device_property
+    def odometer_left(self) -> control.Odometer:
+        '''Left odometer (opened on first use).'''
+        return control.Odometer(pin=20)
+
+    @device_property
+    def rgb_led(self) -> control.LedRGB:
+        '''Rgb led (opened on first use).'''
+        return control.LedRGB()
+
+    @device_property
+    def analogue_reader(self) -> control.AnalogueReadings:
+        '''Adc of the floor and light sensors (opened on first use).'''
+        return control.AnalogueReadings()
+
+    @device_property
+    def accelerometer(self) -> control.Accelerometer:
+        '''Accelerometer and gyroscope (opened on first use).'''
+        return control.Accelerometer()
+
+    @device_property
+    def noise(self) -> control.Noise:
+        '''Noise sensor (opened on first use).'''
+        return control.Noise(pin=4)
+
+    @device_property
+    def timer(self) -> control.Timer:
+        '''Timer (created on first use).'''
+        return control.Timer()
+
+    @device_property
+    def audio(self) -> control.AudioPlayer:
+        '''Audio player (created on first use).'''
+        return control.AudioPlayer()
+
+    def warmup(self) -> None:
+        '''
+        Opens all devices now, instead of on first use.
+        '''
+        for device in DEVICES:
+            getattr(self, device)
+        self.audio.start()
 
     # movement
     def just_move(self, direction: str = "forward") -> None:
@@ -34,9 +128,78 @@ class FossBot(robot_interface.FossBotInterface):
         Move forward/backwards.
         Param: direction: the direction to be headed to.
         """
+        self.__cancel_targets()
         self.odometer_right.reset()
-        self.motor_left.move(direction=direction)
-        self.motor_right.move(direction=direction)
+        self.__drive(direction, direction)
+
+    def __cancel_targets(self) -> None:
+        '''
+        Drops the pending targets of a started move (see start_move_distance and
+        start_rotate_degrees), so the action of an earlier move never stops a later one:
+        only the start_* moves arm a target, stop() and the continuous moves drop it.
+        '''
+        if 'odometer_right' in self.__dict__:
+            self.odometer_right.cancel_target()
+        if 'heading_estimator' in self.__dict__:
+            self.heading_estimator.cancel_target()
+
+    @staticmethod
+    def __wait_motion(future: Future):
+        '''
+        Waits for a started move (a move ended early by stop() or another move
+        returns None).
+        Param: future: the future of the move.
+        '''
+        try:
+            return future.result()
+        except CancelledError:
+            return None
+
+    def __drive(self, left_dir: str, right_dir: str) -> None:
+        '''
+        Starts both motors (through the speed controller, if it is enabled).
+        Param: left_dir: the direction of the left motor.
+               right_dir: the direction of the right motor.
+        '''
+        if self.speed_controller is None:
+            self.motor_left.move(direction=left_dir)
+            self.motor_right.move(direction=right_dir)
+            return
+        self.motor_left.dir_control(left_dir)
+        self.motor_right.dir_control(right_dir)
+        self.speed_controller.set_targets(self.control_speed, self.control_speed)
+
+    # closed loop speed control
+    def enable_speed_control(self, speed: float = 15.0, rate: float = 50, **options) -> None:
+        '''
+        Starts a background controller that holds both wheels at a target speed
+        (used by all movements until disable_speed_control()).
+        Param: speed: the target wheel speed in cm/s.
+               rate: the control loop rate in Hz.
+               options: gains of speed_controller.SpeedController.
+        '''
+        self.disable_speed_control()
+        self.control_speed = speed
+        self.speed_controller = speed_controller.SpeedController(
+            self.motor_left, self.motor_right, self.odometer_left, self.odometer_right,
+            rate=rate, **options)
+        self.speed_controller.start()
+
+    def disable_speed_control(self) -> None:
+        '''
+        Stops the speed controller (and the motors), movements use the default duty again.
+        '''
+        if self.speed_controller is not None:
+            self.speed_controller.stop()
+            self.speed_controller = None
+
+    def get_speed_control_stats(self) -> dict:
+        '''
+        Returns the loop timing statistics of the speed controller (empty if it is disabled).
+        '''
+        if self.speed_controller is None:
+            return {}
+        return self.speed_controller.get_stats()
 
     def move_distance(self, dist: float, direction: str = "forward") -> None:
         '''
@@ -44,10 +207,20 @@ class FossBot(robot_interface.FossBotInterface):
         Param: dist: the distance to be moved (in cm).
                direction: the direction to be moved towards.
         '''
+        self.__wait_motion(self.start_move_distance(dist, direction=direction))
+
+    def start_move_distance(self, dist: float, direction: str = "forward") -> Future:
+        '''
+        Starts moving to input direction and returns immediately.
+        The motors are stopped from the odometer callback when the distance is reached.
+        Param: dist: the distance to be moved (in cm).
+               direction: the direction to be moved towards.
+        Returns: a future that is resolved when the robot has stopped
+                 (cancelled if stop() or another move comes first).
+        '''
         self.just_move(direction=direction)
-        while self.odometer_right.get_distance() < dist:
-            time.sleep(0.01)
-        self.stop()
+        steps = self.odometer_right.steps_for_distance(dist)
+        return self.odometer_right.notify_at_steps(steps, self.stop)
 
     def reset_dir(self) -> None:
         '''
@@ -58,6 +231,9 @@ class FossBot(robot_interface.FossBotInterface):
 
     def stop(self) -> None:
         """ Stop moving. """
+        self.__cancel_targets()
+        if self.speed_controller is not None:
+            self.speed_controller.set_targets(0, 0)
         self.motor_left.stop()
         self.motor_right.stop()
         self.reset_dir()
@@ -117,11 +293,11 @@ class FossBot(robot_interface.FossBotInterface):
                 - counterclockwise: dir_id == 0
                 - clockwise: dir_id == 1
         '''
+        self.__cancel_targets()
         self.odometer_right.reset()
         left_dir = "reverse" if dir_id == 1 else "forward"
         right_dir = "reverse" if dir_id == 0 else "forward"
-        self.motor_left.move(direction=left_dir)
-        self.motor_right.move(direction=right_dir)
+        self.__drive(left_dir, right_dir)
 
     def rotate_90(self, dir_id: int) -> None:
         '''
@@ -130,11 +306,21 @@ class FossBot(robot_interface.FossBotInterface):
                 - counterclockwise: dir_id == 0
                 - clockwise: dir_id == 1
         '''
+        self.__wait_motion(self.start_rotate_90(dir_id))
+
+    def start_rotate_90(self, dir_id: int) -> Future:
+        '''
+        Starts rotating 90 degrees towards the specified dir_id and returns immediately.
+        The motors are stopped from the odometer callback when the rotation is reached.
+        Param: dir_id: the direction id to rotate 90 degrees:
+                - counterclockwise: dir_id == 0
+                - clockwise: dir_id == 1
+        Returns: a future that is resolved when the robot has stopped
+                 (cancelled if stop() or another move comes first).
+        '''
         self.just_rotate(dir_id)
         rotations = self.parameters.rotate_90.value
-        while self.odometer_right.get_steps() <= rotations:
-            time.sleep(0.01)
-        self.stop()
+        return self.odometer_right.notify_at_steps(rotations + 1, self.stop)
 
     def rotate_clockwise(self) -> None:
         '''
@@ -160,23 +346,172 @@ class FossBot(robot_interface.FossBotInterface):
         '''
         self.rotate_90(0)
 
+    def rotate_degrees(self, angle: float) -> None:
+        '''
+        Rotates robot by an angle, stopping on the estimated heading (see get_heading).
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+        '''
+        self.__wait_motion(self.start_rotate_degrees(angle))
+        self.heading_estimator.sync()
+
+    def start_rotate_degrees(self, angle: float) -> Future:
+        '''
+        Starts rotating by an angle and returns immediately.
+        The motors are stopped from the heading estimator when the heading is reached.
+        Param: angle: the angle in degrees (positive: counterclockwise,
+                      negative: clockwise).
+        Returns: a future that is resolved with the heading when the robot has stopped
+                 (cancelled if stop() or another move comes first).
+        '''
+        estimator = self.heading_estimator
+        if angle == 0:
+            future = Future()
+            future.set_result(estimator.get_heading())
+            return future
+        target = estimator.get_heading() + angle
+        self.just_rotate(0 if angle > 0 else 1)
+        return estimator.notify_at_heading(target, self.stop)
+
+    # motion plans
+    @device_property
+    def motion_planner(self) -> motion_plan.MotionPlanner:
+        '''Motion planner (its executor is created on first use).'''
+        return motion_plan.MotionPlanner(
+            self.__drive, self.stop, self.odometer_right, self.parameters.rotate_90.value)
+
+    def submit_plan(self, plan: list, blend: bool = True) -> Future:
+        '''
+        Queues a motion plan and returns immediately (see motion_plan.MotionPlanner).
+        Param: plan: a list of steps: ('forward', cm), ('reverse', cm),
+                     ('rotate', degrees), ('clockwise', degrees), ('counterclockwise', degrees).
+               blend: if True, segments follow each other without intermediate stops
+                      where a wheel keeps its direction.
+        Returns: a future resolved when the plan has run (it raises CancelledError if
+                 cancel_plans(), stop() or another move ends the plan).
+        '''
+        return self.motion_planner.submit(plan, blend)
+
+    def run_plan(self, plan: list, blend: bool = True) -> None:
+        '''
+        Runs a motion plan (see submit_plan) and returns when it has run (or was ended).
+        '''
+        self.__wait_motion(self.submit_plan(plan, blend))
+
+    def cancel_plans(self) -> None:
+        '''
+        Stops the running motion plan and cancels the queued ones.
+        '''
+        if 'motion_planner' in self.__dict__:
+            self.motion_planner.cancel()
+
+    # heading
+    @device_property
+    def heading_estimator(self) -> heading.HeadingEstimator:
+        '''
+        Heading estimator (started on first use, together with the imu streaming).
+        The odometry wheel base is derived from the rotate_90 calibration.
+        '''
+        if self.accelerometer.service is None:
+            self.start_imu()
+        estimator = heading.HeadingEstimator(
+            self.accelerometer.service, (self.motor_left, self.motor_right),
+            (self.odometer_left, self.odometer_right),
+            wheel_base=heading.wheel_base_from_rotation(
+                self.odometer_right, self.parameters.rotate_90.value))
+        estimator.start()
+        return estimator
+
+    def get_heading(self) -> float:
+        '''
+        Returns the estimated heading of the robot in degrees (counterclockwise positive,
+        not wrapped), fusing the gyroscope with the wheel odometry.
+        The heading is 0 when it is first requested.
+        '''
+        return self.heading_estimator.get_heading()
+
+    def reset_heading(self, value: float = 0.0) -> None:
+        '''
+        Sets the estimated heading.
+        Param: value: the new heading (degrees).
+        '''
+        self.heading_estimator.reset(value)
+
+    # pose
+    @device_property
+    def pose_tracker(self) -> pose.PoseTracker:
+        '''
+        Dead reckoning of the pose (started on first use): every encoder step is
+        integrated from the odometer callback, the odometers are never reset for it.
+        The odometry wheel base is derived from the rotate_90 calibration.
+        '''
+        tracker = pose.PoseTracker(wheel_base=heading.wheel_base_from_rotation(
+            self.odometer_right, self.parameters.rotate_90.value))
+        # clockwise turns drive the right motor forward (see just_rotate),
+        # so for the geometry the right motor is the wheel on the left side
+        self.odometer_left.add_listener(partial(self.__wheel_step, tracker, self.motor_left, 1))
+        self.odometer_right.add_listener(partial(self.__wheel_step, tracker, self.motor_right, 0))
+        return tracker
+
+    @staticmethod
+    def __wheel_step(tracker: pose.PoseTracker, motor: control.Motor, side: int,
+                     odometer: control.Odometer) -> None:
+        '''
+        Integrates a wheel step (called by the odometer of the wheel).
+        Param: tracker: the pose tracker.
+               motor: the motor of the wheel (for the direction).
+               side: 0 for the wheel on the left side, 1 for the right side.
+               odometer: the odometer of the wheel.
+        '''
+        step = odometer.get_step_distance() * motor.drive_direction
+        if side == 0:
+            tracker.update(step, 0.0)
+        else:
+            tracker.update(0.0, step)
+
+    def get_pose(self) -> dict:
+        '''
+        Returns the dead reckoning pose of the robot: a dictionary with time,
+        x, y (cm) and theta (degrees, counterclockwise positive).
+        The pose is (0, 0, 0) when it is first requested.
+        '''
+        return self.pose_tracker.get_pose()
+
+    def get_pose_history(self, count: int) -> list:
+        '''
+        Returns the newest poses (oldest first, one per encoder step).
+        Param: count: the number of poses.
+        '''
+        return self.pose_tracker.get_history(count)
+
+    def reset_pose(self, x: float = 0.0, y: float = 0.0, theta: float = 0.0) -> None:
+        '''
+        Sets the pose.
+        Param: x, y: the position (cm).
+               theta: the heading (degrees).
+        '''
+        self.pose_tracker.reset(x, y, theta)
+
     # ultrasonic sensor
     def get_distance(self) -> float:
         '''Returns distance of nearest obstacle in cm.'''
+        value = self.__sampled('ultrasonic')
+        if value is not None:
+            return value
         return self.ultrasonic.get_distance()
 
     def check_for_obstacle(self) -> bool:
         '''Returns True only if an obstacle is detected.'''
-        return bool(self.ultrasonic.get_distance() <= self.parameters.sensor_distance.value)
+        return bool(self.get_distance() <= self.parameters.sensor_distance.value)
 
     # sound
-    def play_sound(self, audio_path: str) -> None:
+    def play_sound(self, audio_path: str, wait: bool = True) -> None:
         '''
         Plays mp3 file specified by input audio_path.
         Param: audio_path: the path to the wanted mp3 file.
+               wait: if True, blocks until playback ends, else returns immediately.
         '''
-        audio_path = os.path.normpath(audio_path)
-        subprocess.run(["mpg123",audio_path])
+        self.audio.play(audio_path, wait=wait)
 
     # floor sensors
     def get_floor_sensor(self, sensor_id: int) -> float:
@@ -185,7 +520,7 @@ class FossBot(robot_interface.FossBotInterface):
         Param: sensor_id: the id of the wanted floor - line sensor.
         Returns: the reading of input floor - line sensor.
         '''
-        return self.analogue_reader.get_reading(sensor_id)
+        return self.__adc(sensor_id)
 
     def check_on_line(self, sensor_id: int) -> bool:
         '''
@@ -193,19 +528,10 @@ class FossBot(robot_interface.FossBotInterface):
         Param: sensor_id: the id of the wanted floor - line sensor.
         Returns: True if sensor is on line, else False.
         '''
-        sensor_left = self.parameters.line_sensor_left.value
-        sensor_center = self.parameters.line_sensor_center.value
-        sensor_right = self.parameters.line_sensor_right.value
-        if sensor_id == 3:
-            if self.analogue_reader.get_reading(sensor_id) >= sensor_left:
-                return True
-        elif sensor_id == 1:
-            if self.analogue_reader.get_reading(sensor_id) >= sensor_center:
-                return True
-        elif sensor_id == 2:
-            if self.analogue_reader.get_reading(sensor_id) >= sensor_right:
-                return True
-        return False
+        threshold = self.parameters.line_thresholds.get(sensor_id)
+        if threshold is None:
+            return False
+        return bool(self.__adc(sensor_id) >= threshold)
 
     # accelerometer
     def get_acceleration(self, axis: str) -> float:
@@ -228,6 +554,118 @@ class FossBot(robot_interface.FossBotInterface):
         print(value)
         return value
 
+    def start_imu(self, rate: float = 100) -> None:
+        '''
+        Starts sampling the imu in the background (through its FIFO),
+        so imu readings never wait for the i2c bus.
+        Param: rate: the sample rate (Hz).
+        '''
+        self.accelerometer.start_streaming(rate=rate)
+
+    def stop_imu(self) -> None:
+        '''
+        Stops the background imu sampling.
+        '''
+        self.accelerometer.stop_streaming()
+
+    def __imu_service(self) -> imu.ImuService:
+        '''Returns the imu service (starting it with the default rate if needed).'''
+        if self.accelerometer.service is None:
+            self.start_imu()
+        return self.accelerometer.service
+
+    def get_imu(self) -> dict:
+        '''
+        Returns the newest imu sample: time, accel_x, accel_y, accel_z (m/s^2)
+        and gyro_x, gyro_y, gyro_z (deg/s).
+        '''
+        return self.__imu_service().get_imu()
+
+    def get_imu_window(self, count: int) -> list:
+        '''
+        Returns the newest imu samples (oldest first).
+        Param: count: the number of samples.
+        '''
+        return self.__imu_service().get_imu_window(count)
+
+    def get_imu_average(self, count: int) -> dict:
+        '''
+        Returns the average of the newest imu samples.
+        Param: count: the number of samples.
+        '''
+        return self.__imu_service().get_average(count)
+
+    # sensor sampling
+    def start_sampler(self, ultrasonic: float = 20, adc: float = 200, imu_rate: float = 100,
+                      history: int = 32) -> None:
+        '''
+        Starts sampling every sensor at its own rate on one background thread
+        (so the buses are never accessed concurrently). The samples are published,
+        with their time, to sensor_store, and the sensor getters become lookups
+        that never wait for a device (only for the first sample). A rate of 0 leaves
+        a sensor out (the noise sensor is interrupt driven and needs no sampling).
+        Param: ultrasonic: the ultrasonic measurements per second.
+               adc: the readings per second of the floor and light sensors.
+               imu_rate: the imu sample rate (its FIFO is drained by the sampler).
+               history: the number of samples kept per sensor.
+        '''
+        self.stop_sampler()
+        store = sampler.SensorStore()
+        scheduler = sampler.SensorScheduler(store)
+        if ultrasonic:
+            self.ultrasonic.stop_ranging()
+            scheduler.add_task('ultrasonic', self.ultrasonic.sample, ultrasonic, history)
+        if adc:
+            scheduler.add_task('adc', self.analogue_reader.read_channels, adc, history)
+        if imu_rate:
+            if self.accelerometer.service is None:
+                self.accelerometer.start_streaming(rate=imu_rate, background=False)
+                self.sampler_drains_imu = True
+                service = self.accelerometer.service
+                scheduler.add_task('imu', service.drain, 1 / service.drain_period, 0)
+            store.attach('imu', self.accelerometer.service.samples)
+        self.sensor_store = store
+        self.sampler = scheduler
+        scheduler.start()
+
+    def stop_sampler(self) -> None:
+        '''
+        Stops the sensor sampler (the getters read the devices again,
+        the imu keeps streaming on its own thread).
+        '''
+        if self.sampler is None:
+            return
+        self.sampler.stop()
+        self.sampler = None
+        if self.sampler_drains_imu:
+            self.sampler_drains_imu = False
+            self.accelerometer.service.start()
+
+    def get_sampler_stats(self) -> dict:
+        '''
+        Returns the statistics of every sampled sensor (empty if the sampler is stopped).
+        '''
+        if self.sampler is None:
+            return {}
+        return self.sampler.get_stats()
+
+    def __sampled(self, name: str, timeout: float = 1.0):
+        '''
+        Returns the newest sampled value of a sensor (None if it is not sampled).
+        A sampled sensor is never read directly: until its first sample is published
+        the getter waits for it (TimeoutError after timeout seconds).
+        '''
+        if self.sampler is None:
+            return None
+        return self.sensor_store.wait_value(name, timeout)
+
+    def __adc(self, channel: int) -> float:
+        '''Returns the sampled (or else the read) value of an adc channel.'''
+        values = self.__sampled('adc')
+        if values is not None:
+            return values[channel]
+        return self.analogue_reader.get_reading(channel)
+
     # rgb
     def rgb_set_color(self, color: str) -> None:
         '''
@@ -241,15 +679,15 @@ class FossBot(robot_interface.FossBotInterface):
         '''
         Returns the reading of the light sensor.
         '''
-        return self.analogue_reader.get_reading(0)
+        return self.__adc(0)
 
     def check_for_dark(self) -> bool:
         '''
         Returns True only if light sensor detects dark.
         '''
-        value = self.analogue_reader.get_reading(0)
+        value = self.__adc(0)
         print(value)
-        return bool(value >= self.parameters.light_sensor.value)
+        return bool(value >= self.parameters.dark_threshold)
 
     # noise detection
     def get_noise_detection(self) -> bool:
@@ -258,25 +696,109 @@ class FossBot(robot_interface.FossBotInterface):
         print(state)
         return state
 
+    def get_noise_events(self, since: float = None) -> list:
+        '''
+        Returns the times (time.perf_counter() seconds) of the newest noise events.
+        Param: since: only events after this time.
+        '''
+        return self.noise.get_noise_events(since)
+
+    # parameters
+    def update_parameters(self, parameters: configuration.RobotParameters) -> None:
+        '''
+        Swaps in new parameters while running. The thresholds are read from the
+        parameters on every check, the opened devices take the new motor duty cycles
+        (from the next move) and the new rotate_90 calibration.
+        Param: parameters: the new parameters.
+        '''
+        self.parameters = parameters
+        if 'motor_left' in self.__dict__:
+            self.motor_left.dc_value = parameters.motor_left_duty
+        if 'motor_right' in self.__dict__:
+            self.motor_right.dc_value = parameters.motor_right_duty
+        rotate_90 = parameters.rotate_90.value
+        if 'motion_planner' in self.__dict__:
+            self.motion_planner.rotate_90 = rotate_90
+        for name in ('heading_estimator', 'pose_tracker'):
+            if name in self.__dict__:
+                self.__dict__[name].wheel_base = heading.wheel_base_from_rotation(
+                    self.odometer_right, rotate_90)
+
+    def watch_parameters(self, path: str = "admin_parameters.yaml") -> watcher.ParameterWatcher:
+        '''
+        Reloads the parameters whenever the parameters file changes (see
+        parameters_parser.watcher), until exit.
+        Param: path: the parameters file.
+        Returns: the watcher.
+        '''
+        if self.parameter_watcher is None:
+            self.parameter_watcher = watcher.ParameterWatcher(path, type(self.parameters))
+            self.parameter_watcher.subscribe(self.update_parameters)
+            self.parameter_watcher.start()
+            self.update_parameters(self.parameter_watcher.get())
+        return self.parameter_watcher
+
     # exit
     def exit(self) -> None:
         ''' Exits. '''
+        if self.parameter_watcher is not None:
+            self.parameter_watcher.stop()
+        if 'motion_planner' in self.__dict__:
+            self.motion_planner.close()
+        self.stop_sampler()
+        self.disable_speed_control()
+        if 'audio' in self.__dict__:
+            self.audio.close()
+        if 'ultrasonic' in self.__dict__:
+            self.ultrasonic.stop_ranging()
+        if 'heading_estimator' in self.__dict__:
+            self.heading_estimator.stop()
+        if 'accelerometer' in self.__dict__:
+            self.accelerometer.stop_streaming()
         control.clean()
+        self.exited = True
 
     def __del__(self) -> None:
-        control.clean()
+        # the motion planner keeps the robot in a reference cycle, so an exited robot
+        # can be collected after a new one was created: it must not release its pins
+        if not getattr(self, 'exited', False):
+            control.clean()
 
     # timer:
-    def stop_timer(self) -> None:
-        '''Stops the timer.'''
-        self.timer.stop_timer()
+    def stop_timer(self, name: str = 'default') -> None:
+        '''
+        Stops a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.stop_timer(name)
 
-    def start_timer(self) -> None:
-        '''Starts the timer.'''
-        self.timer.start_timer()
+    def start_timer(self, name: str = 'default') -> None:
+        '''
+        Starts (or restarts) a timer.
+        Param: name: the timer name.
+        '''
+        self.timer.start_timer(name)
 
-    def get_elapsed(self) -> int:
-        '''Returns the time from start.'''
-        value = self.timer.get_elapsed()
+    def get_elapsed(self, name: str = 'default') -> float:
+        '''
+        Returns the time from start (seconds).
+        Param: name: the timer name.
+        '''
+        value = self.timer.get_elapsed(name)
         print('elapsed time in sec:', value)
         return value
+
+    def lap_timer(self, name: str = 'default') -> float:
+        '''
+        Records a lap of a timer.
+        Param: name: the timer name.
+        Returns: the seconds since the previous lap (or the start).
+        '''
+        return self.timer.lap(name)
+
+    def get_laps(self, name: str = 'default') -> list:
+        '''
+        Returns the split times (seconds) of the recorded laps of a timer.
+        Param: name: the timer name.
+        '''
+        return self.timer.get_laps(name)
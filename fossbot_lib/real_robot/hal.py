@@ -0,0 +1,594 @@
+"""
+Hardware abstraction layer of the real robot.
+control.py talks to the active board only through this module:
+GPIO (RPi.GPIO style calls), get_board().mpu6050() (I2C imu) and
+get_board().mcp3008() (SPI adc).
+The active board is RaspberryPiBoard, or VirtualBoard when the FOSSBOT_BOARD
+environment variable is 'virtual' or after set_board(VirtualBoard.fossbot()).
+"""
+
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+import traceback
+from fossbot_lib.real_robot import imu
+
+BOARD_ENV = 'FOSSBOT_BOARD'
+
+_board = None
+
+def get_board():
+    '''
+    Returns the active board (created on first use).
+    '''
+    global _board
+    if _board is None:
+        if os.environ.get(BOARD_ENV) == 'virtual':
+            _board = VirtualBoard.fossbot()
+        else:
+            _board = RaspberryPiBoard()
+    return _board
+
+def set_board(board) -> None:
+    '''
+    Sets the active board (call it before creating a FossBot).
+    Param: board: a RaspberryPiBoard or a VirtualBoard.
+    '''
+    global _board
+    _board = board
+
+
+class _GPIOProxy:
+    '''Forwards RPi.GPIO style calls and constants to the gpio of the active board.'''
+    def __getattr__(self, name: str):
+        return getattr(get_board().gpio, name)
+
+GPIO = _GPIOProxy()
+
+
+class RaspberryPiBoard:
+    '''
+    Class RaspberryPiBoard() -> The FossBot hardware (RPi.GPIO, mpu6050, Adafruit_MCP3008).
+    Functions:
+    mpu6050(address) Opens the accelerometer / gyroscope.
+    mcp3008(clk,cs,miso,mosi) Opens the adc.
+    '''
+    def __init__(self) -> None:
+        import RPi.GPIO
+        self.gpio = RPi.GPIO
+
+    def mpu6050(self, address: int):
+        '''
+        Opens the accelerometer / gyroscope.
+        Param: address: the i2c address.
+        '''
+        # imported here, so programs that do not use the imu do not load the i2c stack
+        from mpu6050 import mpu6050
+        return mpu6050(address)
+
+    def mcp3008(self, clk: int, cs: int, miso: int, mosi: int):
+        '''
+        Opens the adc.
+        Param: clk, cs, miso, mosi: the spi pins.
+        '''
+        # imported here, so programs that do not use the adc do not load the spi stack
+        import Adafruit_MCP3008
+        return Adafruit_MCP3008.MCP3008(clk=clk, cs=cs, miso=miso, mosi=mosi)
+
+
+class _EventLoop:
+    '''
+    Runs scheduled functions at perf_counter deadlines on a single thread
+    (the thread that calls the event detect callbacks, like the RPi.GPIO callback thread).
+    The last millisecond before a deadline is busy waited, for microsecond accuracy.
+    '''
+    spin_time = 0.001
+
+    def __init__(self) -> None:
+        self.events = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, deadline: float, function, *args) -> None:
+        '''
+        Runs function(*args) at deadline (perf_counter seconds).
+        '''
+        with self.condition:
+            heapq.heappush(self.events, (deadline, next(self.counter), function, args))
+            self.condition.notify()
+
+    def __run(self) -> None:
+        while True:
+            with self.condition:
+                while self.running and not self.events:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                deadline = self.events[0][0]
+                remaining = deadline - time.perf_counter()
+                if remaining > self.spin_time:
+                    self.condition.wait(remaining - self.spin_time)
+                    continue
+            while time.perf_counter() < deadline:
+                pass
+            with self.condition:
+                _, _, function, args = heapq.heappop(self.events)
+            try:
+                function(*args)
+            except Exception:  # pylint: disable=broad-except
+                # like the RPi.GPIO callback thread, a failing callback does not stop the events
+                traceback.print_exc()
+
+    def close(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+
+class _Wheel:
+    '''A motor with its encoder (steps per second follow the pwm duty cycle).'''
+    def __init__(self, side: str, speed_pin: int, terma_pin: int, termb_pin: int,
+                 encoder_pin: int, max_step_rate: float, deadband: float) -> None:
+        self.side = side
+        self.speed_pin = speed_pin
+        self.terma_pin = terma_pin
+        self.termb_pin = termb_pin
+        self.encoder_pin = encoder_pin
+        self.max_step_rate = max_step_rate
+        self.deadband = deadband
+        self.duty = 0.0
+        self.direction = 0
+        self.stepping = 0         # the id of the latest scheduled step
+        self.last_step = None     # the time of the last step (None: the wheel is stopped)
+        self.steps = 0
+
+    def step_rate(self) -> float:
+        '''Returns the unsigned steps per second of the current duty cycle.'''
+        if self.direction == 0 or self.duty <= self.deadband:
+            return 0.0
+        return (self.duty - self.deadband) / (100 - self.deadband) * self.max_step_rate
+
+
+class _VirtualPWM:
+    '''RPi.GPIO.PWM of a virtual board.'''
+    def __init__(self, board, pin: int, freq: float) -> None:
+        self.board = board
+        self.pin = pin
+        self.freq = freq
+
+    def start(self, duty: float) -> None:
+        self.board.set_duty(self.pin, duty)
+
+    def ChangeDutyCycle(self, duty: float) -> None:
+        self.board.set_duty(self.pin, duty)
+
+    def ChangeFrequency(self, freq: float) -> None:
+        self.freq = freq
+
+    def stop(self) -> None:
+        self.board.set_duty(self.pin, 0)
+
+
+class _VirtualGPIO:
+    '''RPi.GPIO module of a virtual board.'''
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, board) -> None:
+        self.board = board
+
+    def setmode(self, mode: int) -> None:
+        self.board.mode = mode
+
+    def setwarnings(self, flag: bool) -> None:
+        pass
+
+    def setup(self, pin: int, direction: int, pull_up_down: int = PUD_OFF,
+              initial: int = LOW) -> None:
+        self.board.directions[pin] = direction
+        if direction == self.OUT:
+            self.board.levels[pin] = int(bool(initial))
+
+    def output(self, pin: int, value) -> None:
+        self.board.write(pin, int(bool(value)))
+
+    def input(self, pin: int) -> int:
+        return self.board.levels.get(pin, 0)
+
+    def add_event_detect(self, pin: int, edge: int, callback=None, bouncetime: int = None) -> None:
+        self.board.detects[pin] = [edge, callback, (bouncetime or 0) / 1000, -math.inf]
+
+    def remove_event_detect(self, pin: int) -> None:
+        self.board.detects.pop(pin, None)
+
+    def PWM(self, pin: int, freq: float) -> _VirtualPWM:
+        return _VirtualPWM(self.board, pin, freq)
+
+    def cleanup(self) -> None:
+        self.board.detects.clear()
+        self.board.directions.clear()
+        for wheel in self.board.wheels.values():
+            wheel.duty = 0.0
+
+
+class _VirtualSMBus:
+    '''
+    smbus of the virtual mpu6050 (each transaction waits for the i2c latency).
+    Emulates the registers used by imu.ImuService: sample rate, full scale ranges and
+    the 1024 byte FIFO, which is filled at the sample rate with the board imu readings.
+    '''
+    fifo_size = 1024
+
+    def __init__(self, board) -> None:
+        self.board = board
+        self.registers = {}
+        self.fifo = bytearray()
+        self.last_fill = None
+        self.lock = threading.Lock()
+
+    def __fill(self) -> None:
+        '''Adds the samples taken since the last fill to the FIFO.'''
+        enabled = self.registers.get(imu.USER_CTRL, 0) & imu.USER_CTRL_FIFO_EN
+        if not enabled or not self.registers.get(imu.FIFO_EN, 0) or self.last_fill is None:
+            return
+        rate = imu.GYRO_OUTPUT_RATE / (1 + self.registers.get(imu.SMPLRT_DIV, 0))
+        count = int((time.perf_counter() - self.last_fill) * rate)
+        self.last_fill += count / rate
+        accel_scale = 16384.0 / (1 << ((self.registers.get(imu.ACCEL_CONFIG, 0) >> 3) & 3))
+        gyro_scale = 131.0 / (1 << ((self.registers.get(imu.GYRO_CONFIG, 0) >> 3) & 3))
+        for _ in range(min(count, self.fifo_size // imu.SAMPLE_SIZE + 1)):
+            accel = self.board.read_accel()
+            gyro = self.board.read_gyro()
+            values = [accel[axis] / imu.GRAVITY * accel_scale for axis in 'xyz']
+            values += [gyro[axis] * gyro_scale for axis in 'xyz']
+            for value in values:
+                value = max(-32768, min(32767, int(round(value)))) & 0xFFFF
+                self.fifo += bytes((value >> 8, value & 0xFF))
+        if len(self.fifo) > self.fifo_size:
+            del self.fifo[:len(self.fifo) - self.fifo_size]
+            self.registers[imu.INT_STATUS] = imu.INT_STATUS_FIFO_OFLOW
+
+    def sync(self) -> None:
+        '''Samples the readings up to now (called before the board motion changes).'''
+        with self.lock:
+            self.__fill()
+
+    def write_byte_data(self, address: int, register: int, value: int) -> None:
+        time.sleep(self.board.i2c_latency)
+        with self.lock:
+            self.__fill()
+            self.registers[register] = value
+            if register == imu.USER_CTRL:
+                if value & imu.USER_CTRL_FIFO_RESET:
+                    self.fifo.clear()
+                    self.registers[imu.INT_STATUS] = 0
+                if value & imu.USER_CTRL_FIFO_EN and self.last_fill is None:
+                    self.last_fill = time.perf_counter()
+                elif not value & imu.USER_CTRL_FIFO_EN:
+                    self.last_fill = None
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        time.sleep(self.board.i2c_latency)
+        with self.lock:
+            self.__fill()
+            value = self.registers.get(register, 0)
+            if register == imu.INT_STATUS:
+                self.registers[imu.INT_STATUS] = 0
+            return value
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> list:
+        time.sleep(self.board.i2c_latency)
+        with self.lock:
+            self.__fill()
+            if register == imu.FIFO_COUNTH:
+                return [len(self.fifo) >> 8, len(self.fifo) & 0xFF][:length]
+            if register == imu.FIFO_R_W:
+                data = list(self.fifo[:length])
+                del self.fifo[:length]
+                return data + [0] * (length - len(data))
+            return [self.registers.get(register + i, 0) for i in range(length)]
+
+
+class _VirtualMPU6050:
+    '''mpu6050 driver of a virtual board (each read waits for the i2c latency).'''
+    def __init__(self, board, address: int) -> None:
+        self.board = board
+        self.address = address
+        self.bus = _VirtualSMBus(board)
+
+    def get_accel_data(self, g: bool = False) -> dict:
+        time.sleep(self.board.i2c_latency)
+        accel = self.board.read_accel()
+        if g:
+            return {axis: value / 9.80665 for axis, value in accel.items()}
+        return accel
+
+    def get_gyro_data(self) -> dict:
+        time.sleep(self.board.i2c_latency)
+        return self.board.read_gyro()
+
+    def get_temp(self) -> float:
+        time.sleep(self.board.i2c_latency)
+        return 25.0
+
+
+class _VirtualMCP3008:
+    '''Adafruit_MCP3008 driver of a virtual board (each read waits for the spi latency).'''
+    def __init__(self, board) -> None:
+        self.board = board
+
+    def read_adc(self, channel: int) -> int:
+        time.sleep(self.board.spi_latency)
+        return self.board.adc.get(channel, 0)
+
+
+class VirtualBoard:
+    '''
+    Class VirtualBoard(i2c_latency,spi_latency,wheel_base,noise,seed) -> Emulated hardware.
+    Pins keep their level and input edges call the event detect callbacks from a single
+    event thread. Motors drive encoder pulse trains that follow the pwm duty cycle,
+    the ultrasonic sensor answers a trigger pulse (of at least 10 us) with an echo pulse
+    as long as the obstacle distance takes, and the i2c imu / spi adc reads take
+    realistic time. The gyroscope z axis follows the wheel speeds.
+    Functions:
+    attach_wheel(side,speed_pin,terma_pin,termb_pin,encoder_pin) Emulates a motor with an encoder.
+    attach_ultrasonic(trig_pin,echo_pin) Emulates an ultrasonic sensor.
+    set_distance(dist) Sets the obstacle distance in cm (None for a lost echo).
+    set_input(pin,level) Drives an input pin.
+    pulse(pin,width) Drives a high pulse on an input pin.
+    set_adc(channel,value) Sets an adc reading.
+    set_imu(accel,gyro) Sets the imu readings (the wheel motion is added to gyro z).
+    mpu6050(address) Opens the emulated accelerometer / gyroscope.
+    mcp3008(clk,cs,miso,mosi) Opens the emulated adc.
+    close() Stops the event thread.
+    fossbot() Returns a board wired like the FossBot.
+    '''
+    speed_of_sound = 34300  # cm/s
+    echo_delay = 0.0004     # time between the trigger and the echo rising edge (s)
+
+    def __init__(self, i2c_latency: float = 0.0015, spi_latency: float = 0.0002,
+                 wheel_base: float = 12.0, noise: float = 0.0, seed: int = 0) -> None:
+        self.i2c_latency = i2c_latency
+        self.spi_latency = spi_latency
+        self.wheel_base = wheel_base
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.gpio = _VirtualGPIO(self)
+        self.mode = None
+        self.levels = {}
+        self.directions = {}
+        self.detects = {}
+        self.wheels = {}        # speed pin -> wheel
+        self.trig_pins = {}     # trigger pin -> echo pin
+        self.trig_rise = {}
+        self.distance = 100.0
+        self.adc = {}
+        self.accel = {'x': 0.0, 'y': 0.0, 'z': 9.80665}
+        self.gyro = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        self.buses = []         # smbus of the opened imus
+        self.events = _EventLoop()
+
+    @classmethod
+    def fossbot(cls, **options) -> 'VirtualBoard':
+        '''
+        Returns a board wired like the FossBot (see real_robot.fossbot.FossBot).
+        Param: options: arguments of VirtualBoard.
+        '''
+        board = cls(**options)
+        board.attach_wheel('right', speed_pin=23, terma_pin=27, termb_pin=22, encoder_pin=21)
+        board.attach_wheel('left', speed_pin=25, terma_pin=17, termb_pin=24, encoder_pin=20)
+        board.attach_ultrasonic(trig_pin=6, echo_pin=5)
+        return board
+
+    # wiring
+    def attach_wheel(self, side: str, speed_pin: int, terma_pin: int, termb_pin: int,
+                     encoder_pin: int, max_step_rate: float = 60.0, deadband: float = 10.0) -> None:
+        '''
+        Emulates a motor with an encoder.
+        Param: side: 'left' or 'right' (used by the gyroscope).
+               speed_pin, terma_pin, termb_pin: the motor pins.
+               encoder_pin: the encoder pin.
+               max_step_rate: encoder steps per second at 100% duty.
+               deadband: the duty cycle below which the motor does not turn.
+        '''
+        self.wheels[speed_pin] = _Wheel(side, speed_pin, terma_pin, termb_pin,
+                                        encoder_pin, max_step_rate, deadband)
+
+    def attach_ultrasonic(self, trig_pin: int, echo_pin: int) -> None:
+        '''
+        Emulates an ultrasonic sensor.
+        Param: trig_pin: the trigger pin.
+               echo_pin: the echo pin.
+        '''
+        self.trig_pins[trig_pin] = echo_pin
+
+    # environment
+    def set_distance(self, dist: float) -> None:
+        '''
+        Sets the obstacle distance.
+        Param: dist: the distance in cm (None: the echo is lost).
+        '''
+        self.distance = dist
+
+    def set_input(self, pin: int, level: int) -> None:
+        '''
+        Drives an input pin (edges call the callbacks from the event thread).
+        Param: pin: the pin.
+               level: 0 or 1.
+        '''
+        self.events.schedule(time.perf_counter(), self.__set_level, pin, int(bool(level)))
+
+    def pulse(self, pin: int, width: float = 0.001) -> None:
+        '''
+        Drives a high pulse on an input pin.
+        Param: pin: the pin.
+               width: the pulse width in seconds.
+        '''
+        now = time.perf_counter()
+        self.events.schedule(now, self.__set_level, pin, 1)
+        self.events.schedule(now + width, self.__set_level, pin, 0)
+
+    def set_adc(self, channel: int, value: int) -> None:
+        '''
+        Sets an adc reading.
+        Param: channel: the adc channel.
+               value: the reading (0-1023).
+        '''
+        self.adc[channel] = value
+
+    def set_imu(self, accel: dict = None, gyro: dict = None) -> None:
+        '''
+        Sets the imu readings.
+        Param: accel: the x, y, z acceleration (m/s^2).
+               gyro: the x, y, z angular rate (deg/s), the wheel motion is added to z.
+        '''
+        if accel is not None:
+            self.accel.update(accel)
+        if gyro is not None:
+            self.gyro.update(gyro)
+
+    # devices
+    def mpu6050(self, address: int) -> _VirtualMPU6050:
+        '''
+        Opens the emulated accelerometer / gyroscope.
+        Param: address: the i2c address.
+        '''
+        sensor = _VirtualMPU6050(self, address)
+        self.buses.append(sensor.bus)
+        return sensor
+
+    def mcp3008(self, clk: int, cs: int, miso: int, mosi: int) -> _VirtualMCP3008:
+        '''
+        Opens the emulated adc.
+        Param: clk, cs, miso, mosi: the spi pins.
+        '''
+        return _VirtualMCP3008(self)
+
+    def close(self) -> None:
+        '''Stops the event thread.'''
+        self.events.close()
+
+    # emulation
+    def wheel_velocity(self, wheel: _Wheel) -> float:
+        '''Returns the signed speed of a wheel (cm/s).'''
+        return wheel.direction * wheel.step_rate() / 20 * 6.65 * math.pi
+
+    def read_accel(self) -> dict:
+        '''Returns the emulated acceleration (m/s^2).'''
+        return {axis: value + self.random.gauss(0, self.noise) for axis, value in self.accel.items()}
+
+    def read_gyro(self) -> dict:
+        '''Returns the emulated angular rate (deg/s), gyro z includes the wheel motion.'''
+        gyro = {axis: value + self.random.gauss(0, self.noise) for axis, value in self.gyro.items()}
+        speeds = {wheel.side: self.wheel_velocity(wheel) for wheel in self.wheels.values()}
+        if 'left' in speeds and 'right' in speeds:
+            # the right motor turns forward in clockwise turns of the FossBot
+            gyro['z'] += math.degrees((speeds['left'] - speeds['right']) / self.wheel_base)
+        return gyro
+
+    def write(self, pin: int, level: int) -> None:
+        '''Sets an output pin (called by GPIO.output).'''
+        previous = self.levels.get(pin, 0)
+        self.levels[pin] = level
+        if pin in self.trig_pins:
+            self.__trigger_edge(pin, previous, level)
+        for wheel in self.wheels.values():
+            if pin in (wheel.terma_pin, wheel.termb_pin):
+                self.__sync_imu()
+                terma = self.levels.get(wheel.terma_pin, 0)
+                termb = self.levels.get(wheel.termb_pin, 0)
+                wheel.direction = terma - termb
+                self.__wheel_changed(wheel)
+
+    def set_duty(self, pin: int, duty: float) -> None:
+        '''Sets the duty cycle of a pwm pin (called by GPIO.PWM).'''
+        wheel = self.wheels.get(pin)
+        if wheel is not None:
+            self.__sync_imu()
+            wheel.duty = duty
+            self.__wheel_changed(wheel)
+
+    def __sync_imu(self) -> None:
+        '''Fills the imu FIFOs with the motion before a change of the wheels.'''
+        for bus in self.buses:
+            bus.sync()
+
+    def __wheel_changed(self, wheel: _Wheel) -> None:
+        '''Reschedules the next step of a wheel at its new rate (a slow step is not waited for).'''
+        rate = wheel.step_rate()
+        if rate <= 0:
+            return
+        now = time.perf_counter()
+        if wheel.last_step is None:
+            wheel.last_step = now
+        step_time = max(wheel.last_step + 1 / rate, now)
+        wheel.stepping += 1
+        self.events.schedule(step_time, self.__step, wheel, wheel.stepping)
+
+    def __step(self, wheel: _Wheel, stepping: int) -> None:
+        '''Emits an encoder pulse and schedules the next one at the current rate.'''
+        rate = wheel.step_rate()
+        if stepping != wheel.stepping:
+            return
+        if rate <= 0:
+            wheel.last_step = None
+            return
+        wheel.steps += 1
+        now = time.perf_counter()
+        wheel.last_step = now
+        period = 1 / rate
+        self.__set_level(wheel.encoder_pin, 1)
+        self.events.schedule(now + period / 2, self.__set_level, wheel.encoder_pin, 0)
+        self.events.schedule(now + period, self.__step, wheel, stepping)
+
+    def __trigger_edge(self, pin: int, previous: int, level: int) -> None:
+        now = time.perf_counter()
+        if level and not previous:
+            self.trig_rise[pin] = now
+        elif previous and not level:
+            width = now - self.trig_rise.get(pin, now)
+            distance = self.distance
+            if width < 10e-6 or distance is None:
+                return
+            rise = now + self.echo_delay
+            echo_pin = self.trig_pins[pin]
+            self.events.schedule(rise, self.__set_level, echo_pin, 1)
+            self.events.schedule(rise + 2 * distance / self.speed_of_sound,
+                                 self.__set_level, echo_pin, 0)
+
+    def __set_level(self, pin: int, level: int) -> None:
+        '''Changes an input level and calls its event detect callback (on the event thread).'''
+        previous = self.levels.get(pin, 0)
+        self.levels[pin] = level
+        detect = self.detects.get(pin)
+        if detect is None or previous == level:
+            return
+        edge, callback, bouncetime, last = detect
+        if edge == _VirtualGPIO.RISING and not level:
+            return
+        if edge == _VirtualGPIO.FALLING and level:
+            return
+        now = time.perf_counter()
+        if now - last < bouncetime:
+            return
+        detect[3] = now
+        if callback is not None:
+            callback(pin)
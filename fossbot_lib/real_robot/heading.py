@@ -0,0 +1,221 @@
+"""
+Heading estimation of the real robot (gyroscope and odometry)
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+from fossbot_lib.common.data_structures import heading_filter, loop_stats
+from fossbot_lib.real_robot import control, imu
+
+class HeadingEstimator:
+    '''
+    HeadingEstimator(service,motors,odometers,wheel_base,...) -> Background heading estimator.
+    At every tick the gyroscope z samples streamed since the previous tick are integrated,
+    and the signed step deltas of both wheels give the odometry rotation, both are fused
+    by a heading_filter.HeadingFilter. While the wheels are still the gyroscope bias is
+    learned and the heading is held (so it does not drift while the robot waits).
+    The odometry uses the direction of the last powered movement of each motor,
+    so steps of coasting wheels are counted in the right direction.
+    Headings are in degrees, counterclockwise positive (clockwise turns decrease them).
+    Functions:
+    start() Starts the estimator thread.
+    stop() Stops the estimator thread.
+    get_heading() Returns the estimated heading.
+    sync() Waits until the samples taken up to now are integrated.
+    reset(heading) Sets the heading.
+    notify_at_heading(target,action) Runs action from the estimator when target is passed.
+    cancel_target() Drops the pending target.
+    get_stats() Returns the loop timing statistics.
+    '''
+    def __init__(self, service: imu.ImuService, motors: tuple, odometers: tuple,
+                 wheel_base: float, rate: float = 100, gyro_weight: float = 0.98,
+                 still_time: float = 0.2, bias_gain: float = 0.02) -> None:
+        self.service = service
+        self.motors = motors          # (left, right)
+        self.odometers = odometers    # (left, right)
+        self.wheel_base = wheel_base  # effective distance of the wheels (cm)
+        self.period = 1 / rate
+        self.still_time = still_time  # seconds without steps before the wheels are still
+        self.bias_gain = bias_gain
+        self.filter = heading_filter.HeadingFilter(gyro_weight)
+        self.bias = 0.0
+        self.last_steps = (0, 0)
+        self.last_sample = 0.0        # time of the last integrated gyroscope sample
+        self.last_rate = 0.0          # its unbiased angular rate (deg/s)
+        self.target = None            # (target, sign, action, future) of notify_at_heading
+        self.target_lock = threading.Lock()
+        self.stats = loop_stats.LoopStats(self.period)
+        self.thread = None
+        self.halt = threading.Event()
+
+    def __odometry_delta(self) -> float:
+        '''Returns the rotation (degrees) of the wheel odometry since the last tick.'''
+        steps = tuple(odometer.get_total_steps() for odometer in self.odometers)
+        left, right = (
+            (new - old) * motor.drive_direction * math.pi * odometer.wheel_diameter
+            / odometer.sensor_disc
+            for new, old, motor, odometer in zip(steps, self.last_steps, self.motors,
+                                                 self.odometers))
+        self.last_steps = steps
+        # the right motor turns forward in clockwise turns (see FossBot.just_rotate)
+        return math.degrees((left - right) / self.wheel_base)
+
+    def __gyro_delta(self, still: bool) -> float:
+        '''Returns the integrated gyroscope rotation (degrees) of the new samples.'''
+        period = 1 / self.service.rate
+        count = int((time.perf_counter() - self.last_sample) / period) + 2
+        delta = 0.0
+        for sample in self.service.samples.last(count):
+            if sample[0] <= self.last_sample:
+                continue
+            self.last_sample = sample[0]
+            rate = sample[6]
+            self.last_rate = rate - self.bias
+            if still:
+                self.bias += self.bias_gain * (rate - self.bias)
+            else:
+                delta += (rate - self.bias) * period
+        return delta
+
+    def __is_still(self) -> bool:
+        '''Returns True if no motor is driven and no wheel has stepped for still_time seconds.'''
+        if any(motor.duty > 0 for motor in self.motors):
+            return False
+        now = time.perf_counter_ns()
+        for odometer in self.odometers:
+            stamp = odometer.edges.latest()
+            if stamp is not None and now - stamp < self.still_time * 1e9:
+                return False
+        return True
+
+    def __update(self) -> None:
+        '''Fuses the measurements since the last tick and checks the target.'''
+        odometry_delta = self.__odometry_delta()
+        gyro_delta = self.__gyro_delta(self.__is_still())
+        heading = self.filter.update(gyro_delta, odometry_delta)
+        target = self.target
+        if target is None:
+            return
+        # the gyroscope samples arrive in FIFO bursts: targets are checked against the
+        # heading extrapolated to now, so the reaction does not wait for the next burst
+        lead = self.last_rate * (time.perf_counter() - self.last_sample)
+        if (heading + lead - target[0]) * target[1] >= 0:
+            self.__fire_target(target, heading)
+
+    def __fire_target(self, target: tuple, heading: float) -> None:
+        '''Runs the action of a reached target and resolves its future (only once).'''
+        with self.target_lock:
+            if self.target is not target:
+                return
+            self.target = None
+        _, _, action, future = target
+        try:
+            if action is not None:
+                action()
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(heading)
+
+    def __loop(self) -> None:
+        '''Estimator loop (runs every period seconds until stop()).'''
+        next_time = time.perf_counter()
+        while not self.halt.is_set():
+            self.stats.tick()
+            self.__update()
+            self.stats.done()
+            next_time += self.period
+            self.halt.wait(max(0.0, next_time - time.perf_counter()))
+
+    def start(self) -> None:
+        '''Starts the estimator thread (the imu service must be streaming).'''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.last_steps = tuple(odometer.get_total_steps() for odometer in self.odometers)
+        self.last_sample = time.perf_counter()
+        self.last_rate = 0.0
+        self.halt.clear()
+        self.stats.reset()
+        self.thread = threading.Thread(target=self.__loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''Stops the estimator thread (a pending target is cancelled).'''
+        self.halt.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        self.cancel_target()
+
+    def get_heading(self) -> float:
+        '''Returns the estimated heading (degrees, counterclockwise positive).'''
+        return self.filter.heading
+
+    def sync(self, timeout: float = 0.5) -> float:
+        '''
+        Waits until the gyroscope samples taken up to now are integrated
+        (they arrive in FIFO bursts, so the heading lags up to a drain period).
+        Param: timeout: the maximum wait (seconds).
+        Returns: the estimated heading.
+        '''
+        now = time.perf_counter()
+        deadline = now + timeout
+        while self.last_sample < now and time.perf_counter() < deadline:
+            self.halt.wait(self.period)
+        return self.filter.heading
+
+    def reset(self, heading: float = 0.0) -> None:
+        '''
+        Sets the heading.
+        Param: heading: the new heading (degrees).
+        '''
+        self.filter.reset(heading)
+
+    def notify_at_heading(self, target: float, action: Callable = None) -> Future:
+        '''
+        Registers a target heading (replacing a pending one, which is cancelled).
+        When the heading passes the target (from the current side), action runs
+        in the estimator thread.
+        Param: target: the target heading (degrees).
+               action: a function to run when the target is passed (for example stop).
+        Returns: a future resolved with the heading when the target is passed.
+        '''
+        future = Future()
+        sign = 1 if target >= self.filter.heading else -1
+        entry = (target, sign, action, future)
+        with self.target_lock:
+            previous = self.target
+            self.target = entry
+        if previous is not None:
+            previous[3].cancel()
+        return future
+
+    def cancel_target(self) -> None:
+        '''
+        Drops the pending target of notify_at_heading: its action does not run
+        and its future is cancelled.
+        '''
+        with self.target_lock:
+            target, self.target = self.target, None
+        if target is not None:
+            target[3].cancel()
+
+    def get_stats(self) -> dict:
+        '''Returns the loop timing statistics (see LoopStats.get_stats) and the gyroscope bias.'''
+        stats = self.stats.get_stats()
+        stats['gyro_bias'] = self.bias
+        return stats
+
+
+def wheel_base_from_rotation(odometer: control.Odometer, rotate_90: int) -> float:
+    '''
+    Returns the effective wheel base of the rotate_90 calibration
+    (each wheel travels rotate_90 + 1 steps on a quarter circle of half the wheel base).
+    Param: odometer: an odometer (for the wheel size).
+           rotate_90: the steps of the rotate_90 calibration.
+    '''
+    arc = (rotate_90 + 1) * math.pi * odometer.wheel_diameter / odometer.sensor_disc
+    return 4 * arc / math.pi
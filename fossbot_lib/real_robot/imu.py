@@ -0,0 +1,185 @@
+"""
+MPU6050 FIFO streaming of the real robot
+"""
+
+import threading
+import time
+from fossbot_lib.common.data_structures import loop_stats, ring_buffer
+
+# MPU6050 registers
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+GYRO_CONFIG = 0x1B
+ACCEL_CONFIG = 0x1C
+FIFO_EN = 0x23
+INT_STATUS = 0x3A
+USER_CTRL = 0x6A
+PWR_MGMT_1 = 0x6B
+FIFO_COUNTH = 0x72
+FIFO_R_W = 0x74
+
+FIFO_EN_ACCEL_GYRO = 0x78   # accel x, y, z and gyro x, y, z (12 bytes per sample)
+USER_CTRL_FIFO_EN = 0x40
+USER_CTRL_FIFO_RESET = 0x04
+INT_STATUS_FIFO_OFLOW = 0x10
+SAMPLE_SIZE = 12
+BURST_SIZE = 24     # smbus block reads are limited to 32 bytes
+GYRO_OUTPUT_RATE = 1000     # Hz, with the digital low pass filter enabled
+GRAVITY = 9.80665
+
+FIELDS = ('time', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z')
+
+def _to_int16(high: int, low: int) -> int:
+    '''Returns the signed 16 bit value of two bytes.'''
+    value = (high << 8) | low
+    return value - 0x10000 if value & 0x8000 else value
+
+
+class ImuService:
+    '''
+    Class ImuService(sensor,rate,history,drain_period,gyro_range) -> Background MPU6050 sampler.
+    The MPU6050 samples at rate into its FIFO, a background thread drains the FIFO in
+    bursts every drain_period seconds into a timestamped ring buffer, so readings never
+    wait for the i2c bus. Accelerations are in m/s^2 and angular rates in deg/s.
+    gyro_range selects the gyroscope full scale (0: 250, 1: 500, 2: 1000, 3: 2000 deg/s),
+    in-place turns of the robot saturate the default 250 deg/s.
+    Functions:
+    start(background) Configures the sensor and starts the background thread.
+    drain() Reads the FIFO (when it is drained by another thread, like a sampler).
+    stop() Stops the background thread (the FIFO is disabled).
+    get_imu() Returns the newest sample.
+    get_imu_window(count) Returns the newest samples.
+    get_average(count) Returns the average of the newest samples.
+    get_stats() Returns the drain loop statistics and the FIFO overflows.
+    '''
+    def __init__(self, sensor, rate: float = 100, history: int = 512,
+                 drain_period: float = 0.05, gyro_range: int = 2) -> None:
+        self.bus = sensor.bus
+        self.address = sensor.address
+        self.divider = max(0, min(255, round(GYRO_OUTPUT_RATE / rate) - 1))
+        self.rate = GYRO_OUTPUT_RATE / (self.divider + 1)
+        self.samples = ring_buffer.RingBuffer(history, None)
+        self.stats = loop_stats.LoopStats(drain_period)
+        self.drain_period = drain_period
+        self.gyro_range = gyro_range
+        self.accel_scale = 16384.0
+        self.gyro_scale = 131.0
+        self.overflows = 0
+        self.thread = None
+        self.halt = threading.Event()
+
+    def __configure(self) -> None:
+        '''Sets the sample rate and the gyroscope range, reads the accelerometer range and enables the FIFO.'''
+        self.bus.write_byte_data(self.address, PWR_MGMT_1, 0x00)
+        self.bus.write_byte_data(self.address, CONFIG, 0x01)    # 184 Hz low pass, 1 kHz
+        self.bus.write_byte_data(self.address, SMPLRT_DIV, self.divider)
+        self.bus.write_byte_data(self.address, GYRO_CONFIG, self.gyro_range << 3)
+        accel_range = (self.bus.read_byte_data(self.address, ACCEL_CONFIG) >> 3) & 0x03
+        self.accel_scale = 16384.0 / (1 << accel_range)
+        self.gyro_scale = 131.0 / (1 << self.gyro_range)
+        self.bus.write_byte_data(self.address, FIFO_EN, FIFO_EN_ACCEL_GYRO)
+        self.__reset_fifo()
+
+    def __reset_fifo(self) -> None:
+        '''Empties the FIFO.'''
+        self.bus.write_byte_data(self.address, USER_CTRL, USER_CTRL_FIFO_RESET)
+        self.bus.write_byte_data(self.address, USER_CTRL, USER_CTRL_FIFO_EN)
+
+    def drain(self) -> None:
+        '''Reads all the complete samples of the FIFO and stores them with their time.'''
+        if self.bus.read_byte_data(self.address, INT_STATUS) & INT_STATUS_FIFO_OFLOW:
+            # the FIFO lost samples, older samples can not be timed correctly
+            self.overflows += 1
+            self.__reset_fifo()
+            return
+        high, low = self.bus.read_i2c_block_data(self.address, FIFO_COUNTH, 2)
+        count = ((high << 8) | low) // SAMPLE_SIZE
+        now = time.perf_counter()
+        data = []
+        remaining = count * SAMPLE_SIZE
+        while remaining > 0:
+            size = min(BURST_SIZE, remaining)
+            data.extend(self.bus.read_i2c_block_data(self.address, FIFO_R_W, size))
+            remaining -= size
+        period = 1 / self.rate
+        for index in range(count):
+            raw = data[index * SAMPLE_SIZE:(index + 1) * SAMPLE_SIZE]
+            values = [_to_int16(raw[i], raw[i + 1]) for i in range(0, SAMPLE_SIZE, 2)]
+            self.samples.append((
+                now - (count - 1 - index) * period,
+                values[0] / self.accel_scale * GRAVITY,
+                values[1] / self.accel_scale * GRAVITY,
+                values[2] / self.accel_scale * GRAVITY,
+                values[3] / self.gyro_scale,
+                values[4] / self.gyro_scale,
+                values[5] / self.gyro_scale))
+
+    def __loop(self) -> None:
+        '''Drains the FIFO every drain_period seconds until stop().'''
+        next_time = time.perf_counter()
+        while not self.halt.is_set():
+            self.stats.tick()
+            self.drain()
+            self.stats.done()
+            next_time += self.drain_period
+            self.halt.wait(max(0.0, next_time - time.perf_counter()))
+
+    def start(self, background: bool = True) -> None:
+        '''
+        Configures the sensor and starts the background thread.
+        Param: background: if False, no thread is started and the FIFO must be
+                           drained by calling drain() every drain_period seconds.
+        '''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.__configure()
+        if not background:
+            return
+        self.halt.clear()
+        self.thread = threading.Thread(target=self.__loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''Stops the background thread (the FIFO is disabled).'''
+        self.halt.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        self.bus.write_byte_data(self.address, USER_CTRL, 0x00)
+
+    def get_imu(self) -> dict:
+        '''
+        Returns the newest sample: a dictionary with time (perf_counter seconds),
+        accel_x, accel_y, accel_z (m/s^2) and gyro_x, gyro_y, gyro_z (deg/s).
+        None if no sample has been read yet.
+        '''
+        sample = self.samples.latest()
+        if sample is None:
+            return None
+        return dict(zip(FIELDS, sample))
+
+    def get_imu_window(self, count: int) -> list:
+        '''
+        Returns the newest samples (oldest first).
+        Param: count: the number of samples.
+        '''
+        return [dict(zip(FIELDS, sample)) for sample in self.samples.last(count)]
+
+    def get_average(self, count: int) -> dict:
+        '''
+        Returns the average of the newest samples (time is the newest sample time).
+        Param: count: the number of samples.
+        '''
+        samples = self.samples.last(count)
+        if not samples:
+            return None
+        average = [sum(values) / len(samples) for values in zip(*samples)]
+        average[0] = samples[-1][0]
+        return dict(zip(FIELDS, average))
+
+    def get_stats(self) -> dict:
+        '''Returns the drain loop statistics (see LoopStats.get_stats) and the FIFO overflows.'''
+        stats = self.stats.get_stats()
+        stats['overflows'] = self.overflows
+        stats['sample_rate'] = self.rate
+        return stats
@@ -0,0 +1,174 @@
+"""
+Motion plans of the real robot (blended sequences of moves and turns)
+"""
+
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+from fossbot_lib.real_robot import control
+
+# wheel directions (left, right) of the segment kinds, as in FossBot.just_move / just_rotate
+WHEELS = {
+    ('move', 1): ('forward', 'forward'),
+    ('move', -1): ('reverse', 'reverse'),
+    ('rotate', 1): ('forward', 'reverse'),     # counterclockwise (dir_id 0)
+    ('rotate', -1): ('reverse', 'forward'),    # clockwise (dir_id 1)
+}
+
+class MotionPlanner:
+    '''
+    Class MotionPlanner(drive,stop,odometer,rotate_90,settle) -> Runs motion plans
+    on a background executor (plans submitted meanwhile are queued).
+    A plan is a list of steps:
+        ('forward', cm), ('reverse', cm), ('rotate', degrees) (positive: counterclockwise),
+        ('clockwise', degrees), ('counterclockwise', degrees) (90 degrees if omitted).
+    The whole plan is compiled in advance: consecutive steps of the same kind and
+    direction are merged, and the step targets of every segment are computed.
+    With blend, a segment that keeps at least one wheel turning in the same direction
+    starts directly from the odometer callback that ends the previous one, without a
+    stop, a direction reset or an odometer reset (the steps of the previous segment
+    carry over). Only when both wheels must reverse does the robot stop, for settle seconds.
+    A segment target dropped by the robot (its stop() or another move) ends the running
+    plan, the queued plans still run.
+    Functions:
+    compile(plan,blend) Returns the segment groups of a plan.
+    submit(plan,blend) Queues a plan, returns a future resolved when it has run.
+    cancel() Stops the running plan and cancels the queued ones.
+    close() Cancels all plans and stops the executor.
+    '''
+    def __init__(self, drive: Callable, stop: Callable, odometer: control.Odometer,
+                 rotate_90: int, settle: float = 0.05) -> None:
+        self.drive = drive          # drive(left_dir, right_dir) starts both motors
+        self.stop = stop
+        self.odometer = odometer
+        self.rotate_90 = rotate_90
+        self.settle = settle
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='motion_plan')
+        self.lock = threading.RLock()   # segments can chain synchronously
+        self.plans = []             # futures of the submitted plans
+        self.group_done = None      # future of the running group of segments
+        self.generation = 0         # increased by cancel()
+
+    def __segment_steps(self, kind: str, amount: float) -> int:
+        '''Returns the odometer steps of a segment.'''
+        if kind == 'move':
+            return self.odometer.steps_for_distance(abs(amount))
+        return round(abs(amount) / 90 * (self.rotate_90 + 1))
+
+    def compile(self, plan: list, blend: bool = True) -> list:
+        '''
+        Returns the segment groups of a plan: lists of (wheel directions, end steps),
+        the end steps counted from the start of the group.
+        Param: plan: the steps of the plan.
+               blend: if False, every segment is a group of its own (full stops).
+        '''
+        merged = []     # [kind, direction, amount]
+        for step in plan:
+            command, amount = step[0], step[1] if len(step) > 1 else 90
+            if command == 'forward':
+                kind, sign = 'move', 1
+            elif command == 'reverse':
+                kind, sign = 'move', -1
+            elif command == 'counterclockwise':
+                kind, sign = 'rotate', 1
+            elif command == 'clockwise':
+                kind, sign = 'rotate', -1
+            elif command == 'rotate':
+                kind, sign = 'rotate', 1 if amount >= 0 else -1
+            else:
+                print(f'Unknown motion {command}.')
+                raise ValueError
+            amount = abs(amount)
+            if amount == 0:
+                continue
+            if blend and merged and merged[-1][:2] == [kind, sign]:
+                merged[-1][2] += amount
+            else:
+                merged.append([kind, sign, amount])
+        groups = []
+        for kind, sign, amount in merged:
+            steps = self.__segment_steps(kind, amount)
+            if steps == 0:
+                continue
+            wheels = WHEELS[(kind, sign)]
+            group = groups[-1] if groups else None
+            if blend and group and (group[-1][0][0] == wheels[0] or group[-1][0][1] == wheels[1]):
+                group.append((wheels, group[-1][1] + steps))
+            else:
+                groups.append([(wheels, steps)])
+        return groups
+
+    def submit(self, plan: list, blend: bool = True) -> Future:
+        '''
+        Queues a plan.
+        Param: plan: the steps of the plan.
+               blend: if False, the robot stops after every segment.
+        Returns: a future resolved when the plan has run (it raises CancelledError if
+                 the plan is cancelled or ended early).
+        '''
+        groups = self.compile(plan, blend)
+        future = self.executor.submit(self.__run, groups, self.generation)
+        with self.lock:
+            self.plans = [plan_future for plan_future in self.plans if not plan_future.done()]
+            self.plans.append(future)
+        return future
+
+    def __run(self, groups: list, generation: int) -> None:
+        '''Runs the segment groups of a plan (executor thread).'''
+        for index, group in enumerate(groups):
+            if index:
+                time.sleep(self.settle)
+            done = Future()
+            with self.lock:
+                if self.generation != generation:
+                    raise CancelledError
+                self.group_done = done
+            self.odometer.reset()
+            self.__start_segment(group, 0, done)
+            done.result()
+
+    def __start_segment(self, group: list, index: int, done: Future) -> None:
+        '''Starts a segment and arms the odometer target that ends it.'''
+        wheels, end_steps = group[index]
+        with self.lock:
+            if done.done():
+                return
+            self.drive(*wheels)
+            target = self.odometer.notify_at_steps(
+                end_steps, partial(self.__end_segment, group, index, done))
+            # a target dropped by the robot (stop() or another move) ends the plan
+            target.add_done_callback(partial(self.__target_done, done))
+
+    @staticmethod
+    def __target_done(done: Future, target: Future) -> None:
+        '''Cancels the running group of segments when its odometer target is dropped.'''
+        if target.cancelled():
+            done.cancel()
+
+    def __end_segment(self, group: list, index: int, done: Future) -> None:
+        '''Starts the next segment of a group, or stops (odometer callback).'''
+        if index + 1 < len(group):
+            self.__start_segment(group, index + 1, done)
+            return
+        self.stop()
+        if done.set_running_or_notify_cancel():
+            done.set_result(None)
+
+    def cancel(self) -> None:
+        '''Stops the running plan and cancels the queued ones.'''
+        with self.lock:
+            self.generation += 1
+            plans, self.plans = self.plans, []
+            done = self.group_done
+            if done is not None and done.cancel():
+                self.odometer.cancel_target()
+            self.stop()
+        for plan_future in plans:
+            plan_future.cancel()
+
+    def close(self) -> None:
+        '''Cancels all plans and stops the executor.'''
+        self.cancel()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,180 @@
+"""
+PWM backends of the real robot motors
+"""
+
+import time
+from collections import deque
+from fossbot_lib.common.interfaces import control_interfaces
+from fossbot_lib.real_robot.hal import GPIO
+
+# pins that the Raspberry Pi can drive with its hardware PWM peripheral
+HARDWARE_PWM_PINS = (12, 13, 18, 19)
+
+class SoftwarePWM(control_interfaces.PWMInterface):
+    '''
+    Class SoftwarePWM(pin,freq) -> RPi.GPIO software PWM (timed by a thread per pin).
+    Functions:
+    start(duty) Starts the output with a duty cycle.
+    set_duty_cycle(duty) Changes the duty cycle (0-100).
+    set_frequency(freq) Changes the frequency (Hz).
+    stop() Stops the output.
+    '''
+    def __init__(self, pin: int, freq: float) -> None:
+        self.pin = pin
+        self.freq = freq
+        GPIO.setup(pin, GPIO.OUT)
+        self.pwm = GPIO.PWM(pin, freq)
+
+    def start(self, duty: float) -> None:
+        '''
+        Starts the output with a duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+        self.pwm.start(duty)
+
+    def set_duty_cycle(self, duty: float) -> None:
+        '''
+        Changes the duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+        self.pwm.ChangeDutyCycle(duty)
+
+    def set_frequency(self, freq: float) -> None:
+        '''
+        Changes the frequency.
+        Param: freq: the frequency (Hz).
+        '''
+        self.freq = freq
+        self.pwm.ChangeFrequency(freq)
+
+    def stop(self) -> None:
+        '''Stops the output.'''
+        self.pwm.stop()
+
+
+class HardwarePWM(control_interfaces.PWMInterface):
+    '''
+    Class HardwarePWM(pin,freq) -> PWM timed by the pigpio daemon.
+    Uses the hardware PWM peripheral on pins 12, 13, 18 and 19
+    and DMA timed PWM on every other pin, so no python thread toggles the pin.
+    Requires the pigpio package and a running pigpiod.
+    Functions:
+    start(duty) Starts the output with a duty cycle.
+    set_duty_cycle(duty) Changes the duty cycle (0-100).
+    set_frequency(freq) Changes the frequency (Hz).
+    stop() Stops the output.
+    '''
+    def __init__(self, pin: int, freq: float) -> None:
+        # imported here, pigpio is only needed by this backend
+        import pigpio
+        self.pi = pigpio.pi()
+        if not self.pi.connected:
+            print('Cannot connect to pigpiod, start it with: sudo pigpiod')
+            raise ConnectionError
+        self.pin = pin
+        self.freq = freq
+        self.duty = 0.0
+        self.hardware = pin in HARDWARE_PWM_PINS
+        if not self.hardware:
+            self.pi.set_PWM_range(pin, 1000)   # 0.1% duty resolution
+            self.pi.set_PWM_frequency(pin, int(freq))
+
+    def start(self, duty: float) -> None:
+        '''
+        Starts the output with a duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+        self.set_duty_cycle(duty)
+
+    def set_duty_cycle(self, duty: float) -> None:
+        '''
+        Changes the duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+        self.duty = duty
+        if self.hardware:
+            # hardware duty cycle range is 0 - 1_000_000
+            self.pi.hardware_PWM(self.pin, int(self.freq), int(duty * 10_000))
+        else:
+            self.pi.set_PWM_dutycycle(self.pin, int(duty * 10))
+
+    def set_frequency(self, freq: float) -> None:
+        '''
+        Changes the frequency.
+        Param: freq: the frequency (Hz).
+        '''
+        self.freq = freq
+        if self.hardware:
+            self.set_duty_cycle(self.duty)
+        else:
+            self.pi.set_PWM_frequency(self.pin, int(freq))
+
+    def stop(self) -> None:
+        '''Stops the output.'''
+        self.set_duty_cycle(0)
+        self.pi.stop()
+
+
+class FakePWM(control_interfaces.PWMInterface):
+    '''
+    Class FakePWM(pin,freq,history) -> In-memory PWM (records the changes, drives no pin).
+    Functions:
+    start(duty) Starts the output with a duty cycle.
+    set_duty_cycle(duty) Changes the duty cycle (0-100).
+    set_frequency(freq) Changes the frequency (Hz).
+    stop() Stops the output.
+    '''
+    def __init__(self, pin: int, freq: float, history: int = 1024) -> None:
+        self.pin = pin
+        self.freq = freq
+        self.duty = 0.0
+        self.running = False
+        self.history = deque(maxlen=history)   # (perf_counter, duty) of the last changes
+
+    def start(self, duty: float) -> None:
+        '''
+        Starts the output with a duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+        self.running = True
+        self.set_duty_cycle(duty)
+
+    def set_duty_cycle(self, duty: float) -> None:
+        '''
+        Changes the duty cycle.
+        Param: duty: the duty cycle (0-100).
+        '''
+        self.duty = duty
+        self.history.append((time.perf_counter(), duty))
+
+    def set_frequency(self, freq: float) -> None:
+        '''
+        Changes the frequency.
+        Param: freq: the frequency (Hz).
+        '''
+        self.freq = freq
+
+    def stop(self) -> None:
+        '''Stops the output.'''
+        self.running = False
+        self.set_duty_cycle(0)
+
+
+BACKENDS = {
+    'software': SoftwarePWM,
+    'hardware': HardwarePWM,
+    'fake': FakePWM,
+}
+
+def create_pwm(backend: str, pin: int, freq: float) -> control_interfaces.PWMInterface:
+    '''
+    Creates a PWM output.
+    Param: backend: the backend name ('software', 'hardware' or 'fake').
+           pin: the gpio pin (BCM numbering).
+           freq: the frequency (Hz).
+    Returns: the PWM output.
+    '''
+    if backend not in BACKENDS:
+        print(f'Unknown pwm backend {backend}, accepted values: {", ".join(BACKENDS)}.')
+        raise ValueError
+    return BACKENDS[backend](pin, freq)
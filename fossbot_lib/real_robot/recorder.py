@@ -0,0 +1,62 @@
+"""
+Recording of the calls of a robot program (replayed by dummy_robot.replay.ReplayFossBot)
+"""
+
+import abc
+import inspect
+import time
+from fossbot_lib.common.data_structures import call_log
+from fossbot_lib.common.interfaces import robot_interface
+
+class RecordingFossBot(robot_interface.FossBotInterface):
+    """
+    Robot that records every call of a program to another robot.
+    Each call of the robot interface (sensor readings and actuator commands) is
+    forwarded to robot and logged, with its monotonic time, duration, arguments and
+    result, to log (a call_log.CallLog). A call that raises is logged with its exception,
+    which is raised again. Other attributes (for example start_sampler) are forwarded
+    without recording.
+    Param: robot: the recorded robot (normally a real_robot.fossbot.FossBot).
+    Functions:
+    save(path) Writes the recorded calls to a file.
+    """
+    def __init__(self, robot: robot_interface.FossBotInterface) -> None:
+        self.robot = robot
+        self.log = call_log.CallLog()
+
+    def save(self, path: str) -> None:
+        '''
+        Writes the recorded calls to a file.
+        Param: path: the file path.
+        '''
+        self.log.save(path)
+
+    def __getattr__(self, name: str):
+        return getattr(self.robot, name)
+
+
+def _recorded(name: str):
+    '''Returns a method of RecordingFossBot that forwards and records the method name.'''
+    interface_method = getattr(robot_interface.FossBotInterface, name)
+    signature = inspect.signature(interface_method)
+
+    def method(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()    # calls are logged with all their arguments
+        args = bound.args[1:]
+        start = time.perf_counter()
+        try:
+            result = getattr(self.robot, name)(*args)
+        except Exception as error:
+            self.log.record_error(name, args, error, start, time.perf_counter())
+            raise
+        self.log.record(name, args, result, start, time.perf_counter())
+        return result
+    method.__name__ = name
+    method.__qualname__ = f'RecordingFossBot.{name}'
+    method.__doc__ = interface_method.__doc__
+    return method
+
+for _name in sorted(robot_interface.FossBotInterface.__abstractmethods__):
+    setattr(RecordingFossBot, _name, _recorded(_name))
+abc.update_abstractmethods(RecordingFossBot)
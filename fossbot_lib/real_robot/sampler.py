@@ -0,0 +1,207 @@
+"""
+Rate scheduled sensor sampling of the real robot
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable
+from fossbot_lib.common.data_structures import ring_buffer
+
+class SensorStore:
+    '''
+    Class SensorStore() -> Shared in-memory store of timestamped sensor samples.
+    Every channel is a ring buffer of samples, tuples whose first item is the
+    perf_counter time of the sample. Channels are written by a single producer
+    (the sampler thread), so reads never lock and never wait for a device
+    (only wait_value waits, for the first sample of a channel).
+    Functions:
+    add_channel(name,history) Creates a channel.
+    attach(name,buffer) Publishes an existing ring buffer as a channel.
+    publish(name,value,timestamp) Stores a (timestamp, value) sample.
+    get(name) Returns the newest sample of a channel.
+    get_value(name) Returns the value of the newest sample of a channel.
+    wait_value(name,timeout) Returns the value of the newest sample, waiting for the first one.
+    get_history(name,count) Returns the newest samples of a channel.
+    '''
+    def __init__(self) -> None:
+        self.channels = {}
+        self.first_samples = {}     # channel name -> event set by its first published sample
+
+    def add_channel(self, name: str, history: int = 32) -> ring_buffer.RingBuffer:
+        '''
+        Creates a channel.
+        Param: name: the channel name.
+               history: the number of samples kept.
+        Returns: the ring buffer of the channel.
+        '''
+        buffer = ring_buffer.RingBuffer(history, None)
+        self.first_samples[name] = threading.Event()
+        self.channels[name] = buffer
+        return buffer
+
+    def attach(self, name: str, buffer: ring_buffer.RingBuffer) -> None:
+        '''
+        Publishes an existing ring buffer of timestamped tuples as a channel (no copies).
+        Param: name: the channel name.
+               buffer: the ring buffer.
+        '''
+        self.channels[name] = buffer
+
+    def publish(self, name: str, value, timestamp: float = None) -> None:
+        '''
+        Stores a sample.
+        Param: name: the channel name.
+               value: the sample value.
+               timestamp: the perf_counter time of the sample (default: now).
+        '''
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self.channels[name].append((timestamp, value))
+        first_sample = self.first_samples[name]
+        if not first_sample.is_set():
+            first_sample.set()
+
+    def get(self, name: str) -> tuple:
+        '''
+        Returns the newest sample of a channel (None if the channel is empty or unknown).
+        Param: name: the channel name.
+        '''
+        buffer = self.channels.get(name)
+        if buffer is None:
+            return None
+        return buffer.latest()
+
+    def get_value(self, name: str):
+        '''
+        Returns the value of the newest (timestamp, value) sample of a channel (None if there is none).
+        Param: name: the channel name.
+        '''
+        sample = self.get(name)
+        if sample is None:
+            return None
+        return sample[1]
+
+    def wait_value(self, name: str, timeout: float = None):
+        '''
+        Returns the value of the newest sample of a channel, waiting for the first
+        sample of a created channel that has none yet (so a sampler that has just
+        started is not bypassed). Raises TimeoutError if it does not come in time.
+        Param: name: the channel name.
+               timeout: the longest wait (seconds, default: no limit).
+        Returns: the value (None if the channel is unknown or an attached one is empty).
+        '''
+        first_sample = self.first_samples.get(name)
+        if first_sample is not None and not first_sample.wait(timeout):
+            print(f'No {name} sample was published in {timeout} seconds.')
+            raise TimeoutError
+        return self.get_value(name)
+
+    def get_history(self, name: str, count: int) -> list:
+        '''
+        Returns the newest samples of a channel (oldest first).
+        Param: name: the channel name.
+               count: the number of samples.
+        '''
+        buffer = self.channels.get(name)
+        if buffer is None:
+            return []
+        return buffer.last(count)
+
+
+class SensorScheduler:
+    '''
+    Class SensorScheduler(store) -> Samples every sensor at its own rate on one thread.
+    Tasks run at their perf_counter deadlines, earliest first, and their values are
+    published to the store. Since a single thread reads all the devices, accesses to
+    the i2c, spi and gpio buses are serialized and never contend with each other.
+    A task that misses its deadlines skips the missed periods (counted as overruns).
+    Functions:
+    add_task(name,read,rate,history) Samples read() rate times per second.
+    start() Starts the sampler thread.
+    stop() Stops the sampler thread.
+    get_stats() Returns the statistics of every task.
+    '''
+    def __init__(self, store: SensorStore) -> None:
+        self.store = store
+        self.tasks = []
+        self.thread = None
+        self.halt = threading.Event()
+
+    def add_task(self, name: str, read: Callable, rate: float, history: int = 32) -> None:
+        '''
+        Samples read() rate times per second and publishes its value to the channel name
+        (a task that returns None publishes nothing, for example while a measurement runs).
+        Param: name: the channel name (a channel without history is not created).
+               read: the function that reads the device.
+               rate: the samples per second.
+               history: the number of samples kept (0: the task only runs, for
+                        devices that publish their own channel).
+        '''
+        if history:
+            self.store.add_channel(name, history)
+        self.tasks.append({'name': name, 'read': read, 'period': 1 / rate,
+                           'publish': bool(history), 'samples': 0, 'overruns': 0,
+                           'read_sum': 0.0, 'read_max': 0.0})
+
+    def __run(self, task: dict) -> None:
+        '''Reads the device of a task and publishes the value.'''
+        start = time.perf_counter()
+        value = task['read']()
+        elapsed = time.perf_counter() - start
+        task['samples'] += 1
+        task['read_sum'] += elapsed
+        task['read_max'] = max(task['read_max'], elapsed)
+        if task['publish'] and value is not None:
+            self.store.publish(task['name'], value, start)
+
+    def __loop(self) -> None:
+        '''Runs the tasks at their deadlines until stop().'''
+        now = time.perf_counter()
+        queue = [(now, index) for index in range(len(self.tasks))]
+        heapq.heapify(queue)
+        while not self.halt.is_set():
+            deadline, index = queue[0]
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                self.halt.wait(delay)
+                continue
+            task = self.tasks[index]
+            self.__run(task)
+            deadline += task['period']
+            now = time.perf_counter()
+            if deadline < now:
+                missed = int((now - deadline) / task['period']) + 1
+                task['overruns'] += missed
+                deadline += missed * task['period']
+            heapq.heapreplace(queue, (deadline, index))
+
+    def start(self) -> None:
+        '''Starts the sampler thread.'''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        if not self.tasks:
+            return
+        self.halt.clear()
+        self.thread = threading.Thread(target=self.__loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''Stops the sampler thread.'''
+        self.halt.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+
+    def get_stats(self) -> dict:
+        '''
+        Returns the statistics of every task: a dictionary of task names to
+        rate, samples, overruns, mean_read and max_read (read durations in seconds).
+        '''
+        return {task['name']: {
+                    'rate': 1 / task['period'],
+                    'samples': task['samples'],
+                    'overruns': task['overruns'],
+                    'mean_read': task['read_sum'] / task['samples'] if task['samples'] else 0.0,
+                    'max_read': task['read_max']}
+                for task in self.tasks}
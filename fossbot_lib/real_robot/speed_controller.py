@@ -0,0 +1,148 @@
+"""
+Closed loop wheel speed control of the real robot
+"""
+
+import math
+import threading
+import time
+from fossbot_lib.common.data_structures import loop_stats
+from fossbot_lib.real_robot import control
+
+class PID:
+    '''
+    Class PID(kp,ki,kd,limit) -> PID controller with anti-windup.
+    Functions:
+    update(error,dt) Returns the controller output for an error.
+    reset() Resets the integral and derivative state.
+    '''
+    def __init__(self, kp: float, ki: float, kd: float, limit: float = 100.0) -> None:
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.limit = limit
+        self.integral = 0.0
+        self.prev_error = None
+
+    def update(self, error: float, dt: float) -> float:
+        '''
+        Returns the controller output for an error.
+        Param: error: target minus measured value.
+               dt: the time since the previous update (in seconds).
+        '''
+        derivative = 0.0
+        if self.prev_error is not None and dt > 0:
+            derivative = (error - self.prev_error) / dt
+        self.prev_error = error
+        integral = self.integral + error * dt
+        output = self.kp * error + self.ki * integral + self.kd * derivative
+        # anti-windup: the integral only grows while the output is not saturated
+        if -self.limit < output < self.limit:
+            self.integral = integral
+        return min(max(output, -self.limit), self.limit)
+
+    def reset(self) -> None:
+        '''Resets the integral and derivative state.'''
+        self.integral = 0.0
+        self.prev_error = None
+
+
+class SpeedController:
+    '''
+    SpeedController(motor_left,motor_right,odometer_left,odometer_right,...) ->
+    Fixed rate background thread that holds the wheel speeds.
+    Each wheel runs a PID on its encoder velocity (on top of a feedforward duty),
+    and a sync term on the difference of the distances traveled since the targets were
+    set keeps both wheels together.
+    Functions:
+    start() Starts the control thread.
+    stop() Stops the control thread (and the motors).
+    set_targets(left,right) Sets the target wheel speeds in cm/s.
+    get_stats() Returns the loop timing statistics.
+    '''
+    def __init__(self, motor_left: control.Motor, motor_right: control.Motor,
+                 odometer_left: control.Odometer, odometer_right: control.Odometer,
+                 rate: float = 50, feedforward: float = 3.0,
+                 gains: tuple = (2.0, 8.0, 0.0), sync_gain: float = 4.0) -> None:
+        self.motors = (motor_left, motor_right)
+        self.odometers = (odometer_left, odometer_right)
+        self.period = 1 / rate
+        self.feedforward = feedforward   # duty (%) per cm/s of target speed
+        self.pids = (PID(*gains), PID(*gains))
+        self.sync_gain = sync_gain       # duty (%) per cm of distance difference
+        self.targets = (0.0, 0.0)
+        self.start_steps = (0, 0)
+        self.stats = loop_stats.LoopStats(self.period)
+        self.thread = None
+        self.halt = threading.Event()
+        self.lock = threading.Lock()   # targets are never changed while duties are applied
+
+    def set_targets(self, left: float, right: float) -> None:
+        '''
+        Sets the target wheel speeds (the direction is set on the motors).
+        Param: left: the left wheel speed in cm/s.
+               right: the right wheel speed in cm/s.
+        '''
+        with self.lock:
+            self.start_steps = tuple(
+                odometer.get_total_steps() for odometer in self.odometers)
+            for pid in self.pids:
+                pid.reset()
+            self.targets = (abs(left), abs(right))
+            if left == 0 and right == 0:
+                for motor in self.motors:
+                    motor.apply_duty(0)
+
+    def __sync_error(self) -> float:
+        '''Returns the distance the left wheel is ahead of the right one (normalized by target).'''
+        left, right = self.targets
+        if left == 0 or right == 0:
+            return 0.0
+        traveled = [
+            (odometer.get_total_steps() - start) / odometer.sensor_disc
+            * odometer.wheel_diameter * math.pi
+            for odometer, start in zip(self.odometers, self.start_steps)]
+        # compare progress relative to each wheel's own target (so turns with
+        # different wheel speeds stay in proportion)
+        return (traveled[0] / left - traveled[1] / right) * (left + right) / 2
+
+    def __loop(self) -> None:
+        '''Control loop (runs every period seconds until stop()).'''
+        next_time = time.perf_counter()
+        while not self.halt.is_set():
+            self.stats.tick()
+            with self.lock:
+                targets = self.targets
+                if targets != (0.0, 0.0):
+                    sync = self.sync_gain * self.__sync_error()
+                    for motor, odometer, pid, target, sign in zip(
+                            self.motors, self.odometers, self.pids, targets, (-1, 1)):
+                        if target == 0:
+                            motor.apply_duty(0)
+                            continue
+                        error = target - odometer.get_velocity()
+                        duty = self.feedforward * target + pid.update(error, self.period)
+                        motor.apply_duty(duty + sign * sync)
+            self.stats.done()
+            next_time += self.period
+            self.halt.wait(max(0.0, next_time - time.perf_counter()))
+
+    def start(self) -> None:
+        '''Starts the control thread.'''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.halt.clear()
+        self.stats.reset()
+        self.thread = threading.Thread(target=self.__loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''Stops the control thread (and the motors).'''
+        self.halt.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        self.set_targets(0, 0)
+
+    def get_stats(self) -> dict:
+        '''Returns the loop timing statistics (see LoopStats.get_stats).'''
+        return self.stats.get_stats()
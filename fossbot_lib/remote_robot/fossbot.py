@@ -0,0 +1,278 @@
+"""
+Client of a robot served over the network (see remote_robot.server)
+"""
+
+import abc
+import builtins
+import inspect
+import itertools
+import socket
+import threading
+from concurrent.futures import Future
+from typing import Callable
+from fossbot_lib.common.data_structures import ring_buffer
+from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.remote_robot import protocol
+
+def _remote_error(method: str, error: list) -> Exception:
+    '''Returns the exception of a remote error ([type name, message]).'''
+    name, message = error
+    print(f'Remote {method} failed: {name}: {message}')
+    error_type = getattr(builtins, name, None)
+    if isinstance(error_type, type) and issubclass(error_type, Exception):
+        try:
+            return error_type(message)
+        except Exception:     # pylint: disable=broad-except
+            pass    # a type with other arguments (like UnicodeDecodeError)
+    return RuntimeError(f'{name}: {message}')
+
+
+class Stream:
+    '''
+    Class Stream(client,stream_id,method,history,callback) -> Readings of a method
+    pushed by the server at a fixed rate.
+    Every reading is a (time, value) tuple, time being the server wall clock.
+    Functions:
+    get() Returns the newest reading.
+    get_value() Returns the newest value.
+    get_history(count) Returns the newest readings.
+    wait(timeout) Waits for the next reading.
+    close() Stops the stream.
+    '''
+    def __init__(self, client: 'FossBot', stream_id: int, method: str, history: int = 256,
+                 callback: Callable = None) -> None:
+        self.client = client
+        self.stream_id = stream_id
+        self.method = method
+        self.callback = callback
+        self.readings = ring_buffer.RingBuffer(history, None)
+        self.arrived = threading.Condition()
+
+    def push(self, timestamp: float, value) -> None:
+        '''Stores a reading (receiver thread).'''
+        with self.arrived:
+            self.readings.append((timestamp, value))
+            self.arrived.notify_all()
+        if self.callback is not None:
+            try:
+                self.callback(timestamp, value)
+            except Exception as error:     # pylint: disable=broad-except
+                print(f'Stream callback of {self.method} failed: {error!r}')
+
+    def get(self) -> tuple:
+        '''Returns the newest reading (None before the first one).'''
+        return self.readings.latest()
+
+    def get_value(self):
+        '''Returns the newest value (None before the first one).'''
+        reading = self.readings.latest()
+        return None if reading is None else reading[1]
+
+    def get_history(self, count: int) -> list:
+        '''
+        Returns the newest readings (oldest first).
+        Param: count: the number of readings.
+        '''
+        return self.readings.last(count)
+
+    def wait(self, timeout: float = None) -> tuple:
+        '''
+        Waits for the next reading.
+        Param: timeout: the longest wait (seconds).
+        Returns: the reading, or None on timeout.
+        '''
+        with self.arrived:
+            count = self.readings.count
+            if not self.arrived.wait_for(lambda: self.readings.count > count, timeout):
+                return None
+            return self.readings.latest()
+
+    def close(self) -> None:
+        '''Stops the stream.'''
+        self.client.unsubscribe(self)
+
+
+class FossBot(robot_interface.FossBotInterface):
+    """
+    Robot served by a remote_robot.server.RobotServer (over TCP or a Unix socket).
+    Every method of the robot interface is a call on the served robot. Calls can be
+    pipelined with call_async (all requests are sent at once, replies come back in
+    order), grouped in one round trip with batch, and sensors can be streamed by the
+    server with subscribe. exit() stops the robot and disconnects (the server keeps
+    the robot).
+    Param: address: a (host, port) tuple, or the path of a Unix socket.
+           timeout: the longest wait for a reply (seconds, None: no limit).
+    Functions:
+    call(method,*args) Calls a method of the served robot.
+    call_async(method,*args) Sends a call, returns a future of its result.
+    batch(calls) Runs many calls in one round trip.
+    subscribe(method,*args,rate,history,callback) Starts a stream of readings.
+    unsubscribe(stream) Stops a stream.
+    close() Disconnects.
+    """
+
+    def __init__(self, address=('127.0.0.1', protocol.DEFAULT_PORT),
+                 timeout: float = None) -> None:
+        self.address = address
+        self.timeout = timeout
+        self.sock = protocol.create_socket(address)
+        self.sock.connect(address)
+        protocol.tune_socket(self.sock)
+        self.ids = itertools.count()
+        self.send_lock = threading.Lock()
+        self.pending = {}       # message id -> (future, method)
+        self.streams = {}       # stream id -> Stream
+        self.closed = False
+        self.receiver = threading.Thread(target=self.__receive, daemon=True,
+                                         name='remote_robot')
+        self.receiver.start()
+
+    def __send(self, message: list, future: Future, method: str) -> None:
+        '''Sends a message whose response resolves future.'''
+        frame = protocol.encode_frame(message)
+        self.pending[message[1]] = (future, method)
+        try:
+            with self.send_lock:
+                if self.closed:
+                    raise ConnectionError('the robot connection is closed')
+                self.sock.sendall(frame)
+        except OSError:
+            self.pending.pop(message[1], None)
+            raise
+
+    def __receive(self) -> None:
+        '''Resolves the responses and stores the pushes of the server (receiver thread).'''
+        error = ConnectionError('the robot server closed the connection')
+        try:
+            while True:
+                message = protocol.recv_message(self.sock)
+                if message is None:
+                    break
+                if message[0] == protocol.PUSH:
+                    stream = self.streams.get(message[1])
+                    if stream is not None:
+                        stream.push(message[2], message[3])
+                    continue
+                future, method = self.pending.pop(message[1], (None, None))
+                if future is None:
+                    continue
+                if message[2] is not None:
+                    future.set_exception(_remote_error(method, message[2]))
+                else:
+                    future.set_result(message[3])
+        except Exception as receive_error:     # pylint: disable=broad-except
+            if not self.closed:
+                error = ConnectionError(f'the robot connection failed: {receive_error!r}')
+        self.closed = True
+        for future, _ in list(self.pending.values()):
+            if not future.done():
+                future.set_exception(error)
+        self.pending = {}
+
+    def call_async(self, method: str, *args) -> Future:
+        '''
+        Sends a call without waiting for its reply (pipelining).
+        Param: method: the method name.
+               args: its positional arguments.
+        Returns: a future of the result.
+        '''
+        future = Future()
+        self.__send([protocol.REQUEST, next(self.ids), method, args], future, method)
+        return future
+
+    def call(self, method: str, *args):
+        '''
+        Calls a method of the served robot.
+        Param: method: the method name.
+               args: its positional arguments.
+        Returns: the result.
+        '''
+        return self.call_async(method, *args).result(self.timeout)
+
+    def batch(self, calls: list) -> list:
+        '''
+        Runs many calls in one round trip, in order.
+        Param: calls: tuples of (method, *args).
+        Returns: the list of results (raises the error of the first failed call).
+        '''
+        future = Future()
+        self.__send([protocol.BATCH, next(self.ids), [[call[0], call[1:]] for call in calls]],
+                    future, 'batch')
+        results = []
+        for call, (error, result) in zip(calls, future.result(self.timeout)):
+            if error is not None:
+                raise _remote_error(call[0], error)
+            results.append(result)
+        return results
+
+    def subscribe(self, method: str, *args, rate: float = 20, history: int = 256,
+                  callback: Callable = None) -> Stream:
+        '''
+        Starts a stream: the server calls method at rate and pushes the results.
+        Param: method: the method name (normally a sensor reading).
+               args: its positional arguments.
+               rate: the readings per second.
+               history: the number of readings kept.
+               callback: callback(time, value), called at every reading (receiver thread).
+        Returns: the stream.
+        '''
+        stream_id = next(self.ids)
+        stream = self.streams[stream_id] = Stream(self, stream_id, method, history, callback)
+        future = Future()
+        self.__send([protocol.SUBSCRIBE, stream_id, method, args, rate], future, method)
+        try:
+            future.result(self.timeout)
+        except Exception:
+            self.streams.pop(stream_id, None)
+            raise
+        return stream
+
+    def unsubscribe(self, stream: Stream) -> None:
+        '''
+        Stops a stream.
+        Param: stream: the stream returned by subscribe.
+        '''
+        if self.streams.pop(stream.stream_id, None) is None or self.closed:
+            return
+        future = Future()
+        self.__send([protocol.UNSUBSCRIBE, next(self.ids), stream.stream_id], future,
+                    'unsubscribe')
+        future.result(self.timeout)
+
+    def close(self) -> None:
+        '''Disconnects (pending calls fail with a ConnectionError).'''
+        with self.send_lock:
+            if self.closed:
+                return
+            self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.receiver.join()
+        self.sock.close()
+
+    def exit(self) -> None:
+        '''Stops the robot and disconnects.'''
+        if not self.closed:
+            self.call('stop')
+        self.close()
+
+
+def _remote(name: str):
+    '''Returns a method of FossBot that calls the method name of the served robot.'''
+    interface_method = getattr(robot_interface.FossBotInterface, name)
+    signature = inspect.signature(interface_method)
+
+    def method(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()    # the server only takes positional arguments
+        return self.call(name, *bound.args[1:])
+    method.__name__ = name
+    method.__qualname__ = f'FossBot.{name}'
+    method.__doc__ = interface_method.__doc__
+    return method
+
+for _name in sorted(robot_interface.FossBotInterface.__abstractmethods__ - {'exit'}):
+    setattr(FossBot, _name, _remote(_name))
+abc.update_abstractmethods(FossBot)
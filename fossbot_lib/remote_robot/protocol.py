@@ -0,0 +1,279 @@
+"""
+Wire protocol of the remote robot: msgpack encoded messages in length-prefixed frames
+"""
+
+import socket
+import struct
+
+# message types (the first item of every message)
+REQUEST = 0         # [REQUEST, id, method, args]
+RESPONSE = 1        # [RESPONSE, id, error, result]   error: None or [type name, message]
+PUSH = 2            # [PUSH, stream id, time, value]
+BATCH = 3           # [BATCH, id, [[method, args], ...]] -> RESPONSE with [[error, result], ...]
+SUBSCRIBE = 4       # [SUBSCRIBE, stream id, method, args, rate] -> RESPONSE, then PUSH messages
+UNSUBSCRIBE = 5     # [UNSUBSCRIBE, id, stream id] -> RESPONSE
+
+HEADER = struct.Struct('>I')        # payload length of a frame
+MAX_FRAME = 16 * 1024 * 1024
+DEFAULT_PORT = 8765
+
+_UINT8, _UINT16, _UINT32, _UINT64 = (struct.Struct(code) for code in ('>B', '>H', '>I', '>Q'))
+_INT8, _INT16, _INT32, _INT64 = (struct.Struct(code) for code in ('>b', '>h', '>i', '>q'))
+_FLOAT64 = struct.Struct('>d')
+_FLOAT32 = struct.Struct('>f')
+
+
+class ProtocolError(ValueError):
+    '''Raised on malformed frames or messages.'''
+
+
+def _pack_int(value: int, out: bytearray) -> None:
+    '''Appends the msgpack encoding of an int.'''
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xff)
+    elif value >= 0:
+        if value <= 0xff:
+            out.append(0xcc)
+            out += _UINT8.pack(value)
+        elif value <= 0xffff:
+            out.append(0xcd)
+            out += _UINT16.pack(value)
+        elif value <= 0xffffffff:
+            out.append(0xce)
+            out += _UINT32.pack(value)
+        elif value <= 0xffffffffffffffff:
+            out.append(0xcf)
+            out += _UINT64.pack(value)
+        else:
+            raise ProtocolError(f'Integer {value} is too large.')
+    elif value >= -0x80:
+        out.append(0xd0)
+        out += _INT8.pack(value)
+    elif value >= -0x8000:
+        out.append(0xd1)
+        out += _INT16.pack(value)
+    elif value >= -0x80000000:
+        out.append(0xd2)
+        out += _INT32.pack(value)
+    elif value >= -0x8000000000000000:
+        out.append(0xd3)
+        out += _INT64.pack(value)
+    else:
+        raise ProtocolError(f'Integer {value} is too small.')
+
+def _pack_length(length: int, fix: int, fix_max: int, codes: tuple, out: bytearray) -> None:
+    '''Appends the header of a str, bin, array or map of length items.'''
+    if fix is not None and length <= fix_max:
+        out.append(fix | length)
+    elif codes[0] is not None and length <= 0xff:
+        out.append(codes[0])
+        out += _UINT8.pack(length)
+    elif length <= 0xffff:
+        out.append(codes[1])
+        out += _UINT16.pack(length)
+    else:
+        out.append(codes[2])
+        out += _UINT32.pack(length)
+
+def _pack(value, out: bytearray) -> None:
+    '''Appends the msgpack encoding of value.'''
+    kind = type(value)
+    if value is None:
+        out.append(0xc0)
+    elif kind is bool:
+        out.append(0xc3 if value else 0xc2)
+    elif kind is int:
+        _pack_int(value, out)
+    elif kind is float:
+        out.append(0xcb)
+        out += _FLOAT64.pack(value)
+    elif kind is str:
+        data = value.encode('utf-8')
+        _pack_length(len(data), 0xa0, 31, (0xd9, 0xda, 0xdb), out)
+        out += data
+    elif kind in (list, tuple):
+        _pack_length(len(value), 0x90, 15, (None, 0xdc, 0xdd), out)
+        for item in value:
+            _pack(item, out)
+    elif kind is dict:
+        _pack_length(len(value), 0x80, 15, (None, 0xde, 0xdf), out)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    elif kind in (bytes, bytearray, memoryview):
+        data = bytes(value)
+        _pack_length(len(data), None, 0, (0xc4, 0xc5, 0xc6), out)
+        out += data
+    elif isinstance(value, bool):
+        out.append(0xc3 if value else 0xc2)
+    elif hasattr(value, '__index__'):      # int subclasses, numpy integers...
+        _pack_int(value.__index__(), out)
+    elif hasattr(value, '__float__'):      # float subclasses, numpy floats...
+        out.append(0xcb)
+        out += _FLOAT64.pack(float(value))
+    elif hasattr(value, 'tolist'):         # arrays
+        _pack(value.tolist(), out)
+    else:
+        raise ProtocolError(f'Cannot encode {kind.__name__} values.')
+
+def pack(value) -> bytes:
+    '''
+    Encodes a value in msgpack (None, bool, int, float, str, bytes, lists,
+    tuples and dictionaries).
+    Param: value: the value.
+    Returns: the encoding.
+    '''
+    out = bytearray()
+    _pack(value, out)
+    return bytes(out)
+
+
+class _Reader:
+    '''Decodes msgpack values from a buffer.'''
+    __slots__ = ('data', 'offset')
+
+    def __init__(self, data) -> None:
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def take(self, size: int) -> memoryview:
+        '''Returns the next size bytes.'''
+        start = self.offset
+        end = start + size
+        if end > len(self.data):
+            raise ProtocolError('Truncated message.')
+        self.offset = end
+        return self.data[start:end]
+
+    def number(self, codec: struct.Struct):
+        '''Returns the next number encoded by codec.'''
+        start = self.offset
+        if start + codec.size > len(self.data):
+            raise ProtocolError('Truncated message.')
+        self.offset = start + codec.size
+        return codec.unpack_from(self.data, start)[0]
+
+    def value(self):
+        '''Returns the next value.'''
+        code = self.number(_UINT8)
+        if code < 0x80:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if code <= 0x8f:
+            return self.map(code & 0x0f)
+        if code <= 0x9f:
+            return self.array(code & 0x0f)
+        if code <= 0xbf:
+            return str(self.take(code & 0x1f), 'utf-8')
+        decode = _DECODERS.get(code)
+        if decode is None:
+            raise ProtocolError(f'Unsupported type code 0x{code:02x}.')
+        return decode(self)
+
+    def array(self, length: int) -> list:
+        '''Returns the next array of length items.'''
+        return [self.value() for _ in range(length)]
+
+    def map(self, length: int) -> dict:
+        '''Returns the next map of length items.'''
+        result = {}
+        for _ in range(length):
+            key = self.value()
+            result[key] = self.value()
+        return result
+
+_DECODERS = {
+    0xc0: lambda reader: None,
+    0xc2: lambda reader: False,
+    0xc3: lambda reader: True,
+    0xc4: lambda reader: bytes(reader.take(reader.number(_UINT8))),
+    0xc5: lambda reader: bytes(reader.take(reader.number(_UINT16))),
+    0xc6: lambda reader: bytes(reader.take(reader.number(_UINT32))),
+    0xca: lambda reader: reader.number(_FLOAT32),
+    0xcb: lambda reader: reader.number(_FLOAT64),
+    0xcc: lambda reader: reader.number(_UINT8),
+    0xcd: lambda reader: reader.number(_UINT16),
+    0xce: lambda reader: reader.number(_UINT32),
+    0xcf: lambda reader: reader.number(_UINT64),
+    0xd0: lambda reader: reader.number(_INT8),
+    0xd1: lambda reader: reader.number(_INT16),
+    0xd2: lambda reader: reader.number(_INT32),
+    0xd3: lambda reader: reader.number(_INT64),
+    0xd9: lambda reader: str(reader.take(reader.number(_UINT8)), 'utf-8'),
+    0xda: lambda reader: str(reader.take(reader.number(_UINT16)), 'utf-8'),
+    0xdb: lambda reader: str(reader.take(reader.number(_UINT32)), 'utf-8'),
+    0xdc: lambda reader: reader.array(reader.number(_UINT16)),
+    0xdd: lambda reader: reader.array(reader.number(_UINT32)),
+    0xde: lambda reader: reader.map(reader.number(_UINT16)),
+    0xdf: lambda reader: reader.map(reader.number(_UINT32)),
+}
+
+def unpack(data):
+    '''
+    Decodes a msgpack value (arrays are decoded as lists).
+    Param: data: the encoding (bytes-like).
+    Returns: the value.
+    '''
+    reader = _Reader(data)
+    value = reader.value()
+    if reader.offset != len(reader.data):
+        raise ProtocolError('Trailing bytes after the message.')
+    return value
+
+
+def encode_frame(message) -> bytes:
+    '''
+    Returns the frame of a message: its length (4 bytes, big endian) and its encoding.
+    Param: message: the message (a list, see the message types).
+    '''
+    payload = pack(message)
+    return HEADER.pack(len(payload)) + payload
+
+def recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    '''
+    Receives exactly size bytes.
+    Returns: the bytes, or None if the connection was closed before.
+    '''
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return data
+
+def recv_message(sock: socket.socket):
+    '''
+    Receives a framed message.
+    Returns: the message, or None if the connection was closed.
+    '''
+    header = recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    length = HEADER.unpack(header)[0]
+    if length > MAX_FRAME:
+        raise ProtocolError(f'Frame of {length} bytes is too large.')
+    payload = recv_exactly(sock, length)
+    if payload is None:
+        return None
+    return unpack(payload)
+
+def create_socket(address) -> socket.socket:
+    '''
+    Returns an unconnected stream socket for an address.
+    Param: address: a (host, port) tuple for TCP, or the path of a Unix socket.
+    '''
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET6 if ':' in address[0] else socket.AF_INET,
+                         socket.SOCK_STREAM)
+
+def tune_socket(sock: socket.socket) -> None:
+    '''Disables Nagle's algorithm on a TCP socket (small frames are sent at once).'''
+    if sock.family != socket.AF_UNIX:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
@@ -0,0 +1,216 @@
+"""
+Server exposing a robot of any backend over the network (see remote_robot.protocol)
+"""
+
+import os
+import socket
+import threading
+import time
+from fossbot_lib.common.interfaces import robot_interface
+from fossbot_lib.remote_robot import protocol
+
+# methods of the robot interface served by default (exit belongs to the server)
+SERVED_METHODS = frozenset(robot_interface.FossBotInterface.__abstractmethods__) - {'exit'}
+
+class Connection:
+    '''
+    Class Connection(server,sock) -> A client connection of the robot server.
+    Requests are read and run one after the other, in the order they were sent,
+    so a client can send many requests without waiting (pipelining) and the robot
+    sees them in order. Stream pushes are sent by a thread per stream.
+    '''
+    def __init__(self, server: 'RobotServer', sock: socket.socket) -> None:
+        self.server = server
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.streams = {}           # stream id -> stop event
+        self.thread = threading.Thread(target=self.__serve, daemon=True, name='robot_connection')
+
+    def send(self, message: list) -> None:
+        '''Sends a message (from any thread).'''
+        frame = protocol.encode_frame(message)
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def respond(self, message_id: int, error: list, result) -> None:
+        '''Sends a response (an error response if the result cannot be encoded).'''
+        try:
+            frame = protocol.encode_frame([protocol.RESPONSE, message_id, error, result])
+        except protocol.ProtocolError as encode_error:
+            frame = protocol.encode_frame([protocol.RESPONSE, message_id,
+                                           ['TypeError', str(encode_error)], None])
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def __serve(self) -> None:
+        '''Reads and runs the requests of the client until it disconnects.'''
+        try:
+            while True:
+                message = protocol.recv_message(self.sock)
+                if message is None:
+                    break
+                self.__handle(message)
+        except (OSError, LookupError, TypeError, ValueError) as error:
+            if not self.server.closing.is_set():
+                print(f'Robot connection closed: {error!r}')
+        finally:
+            self.close()
+
+    def __handle(self, message: list) -> None:
+        '''Runs a request and sends its response.'''
+        kind, message_id = message[0], message[1]
+        if kind == protocol.REQUEST:
+            error, result = self.server.call(message[2], message[3])
+            self.respond(message_id, error, result)
+        elif kind == protocol.BATCH:
+            results = [list(self.server.call(method, args)) for method, args in message[2]]
+            self.respond(message_id, None, results)
+        elif kind == protocol.SUBSCRIBE:
+            error = self.__subscribe(message_id, message[2], message[3], message[4])
+            self.respond(message_id, error, None)
+        elif kind == protocol.UNSUBSCRIBE:
+            stop = self.streams.pop(message[2], None)
+            if stop is not None:
+                stop.set()
+            self.respond(message_id, None, stop is not None)
+        else:
+            raise protocol.ProtocolError(f'Unknown message type {kind}.')
+
+    def __subscribe(self, stream_id: int, method: str, args: list, rate: float) -> list:
+        '''Starts a stream. Returns the error (None if it started).'''
+        if method not in self.server.methods:
+            return ['AttributeError', f'{method} is not served']
+        if stream_id in self.streams or not 0 < rate <= self.server.max_rate:
+            return ['ValueError', f'invalid stream {stream_id} at {rate} Hz']
+        stop = self.streams[stream_id] = threading.Event()
+        threading.Thread(target=self.__stream, args=(stream_id, method, args, 1 / rate, stop),
+                         daemon=True, name='robot_stream').start()
+        return None
+
+    def __stream(self, stream_id: int, method: str, args: list, period: float,
+                 stop: threading.Event) -> None:
+        '''Pushes a reading of a stream every period, until it is stopped.'''
+        next_push = time.perf_counter()
+        while not stop.is_set():
+            error, value = self.server.call(method, args)
+            if error is not None:
+                print(f'Stream of {method} stopped: {error[1]}')
+                break
+            try:
+                self.send([protocol.PUSH, stream_id, time.time(), value])
+            except (OSError, ValueError):     # disconnected, or a value that cannot be sent
+                break
+            next_push += period
+            stop.wait(max(next_push - time.perf_counter(), 0))
+
+    def close(self) -> None:
+        '''Stops the streams and closes the connection.'''
+        for stop in self.streams.values():
+            stop.set()
+        self.streams = {}
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self.server.forget(self)
+
+
+class RobotServer:
+    '''
+    Class RobotServer(robot,address,methods,max_rate) -> Serves the methods of a robot.
+    Any number of clients (see remote_robot.fossbot.FossBot) can connect. Each
+    client gets its own connection thread, so the calls of different clients can
+    overlap (like calls from different threads on the robot itself).
+    Param: robot: the served robot (any backend).
+           address: a (host, port) tuple for TCP (port 0: any free port), or the path
+                    of a Unix socket.
+           methods: the names of the served methods (default: SERVED_METHODS).
+           max_rate: the highest rate of a stream (Hz).
+    Functions:
+    start() Accepts clients in a background thread.
+    serve_forever() Accepts clients in the calling thread.
+    get_address() Returns the bound address.
+    call(method,args) Runs a call of a client.
+    close() Disconnects the clients and stops the server.
+    '''
+    def __init__(self, robot: robot_interface.FossBotInterface,
+                 address=('127.0.0.1', protocol.DEFAULT_PORT), methods=None,
+                 max_rate: float = 200) -> None:
+        self.robot = robot
+        self.methods = frozenset(SERVED_METHODS if methods is None else methods)
+        self.max_rate = max_rate
+        self.closing = threading.Event()
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        self.thread = None
+        self.sock = protocol.create_socket(address)
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)      # left by a server that did not close
+        else:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(address)
+        self.sock.listen()
+
+    def get_address(self):
+        '''Returns the bound address (with the actual port of port 0).'''
+        return self.sock.getsockname()
+
+    def call(self, method: str, args: list) -> tuple:
+        '''
+        Runs a call of a client.
+        Param: method: the method name.
+               args: its positional arguments.
+        Returns: (error, result), error is None or [exception type name, message].
+        '''
+        if method not in self.methods:
+            return ['AttributeError', f'{method} is not served'], None
+        try:
+            return None, getattr(self.robot, method)(*args)
+        except Exception as error:     # pylint: disable=broad-except
+            return [type(error).__name__, str(error)], None
+
+    def serve_forever(self) -> None:
+        '''Accepts clients until the server is closed.'''
+        while not self.closing.is_set():
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                break
+            protocol.tune_socket(sock)
+            connection = Connection(self, sock)
+            with self.connections_lock:
+                self.connections.add(connection)
+            connection.thread.start()
+
+    def start(self) -> None:
+        '''Accepts clients in a background thread.'''
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever, daemon=True,
+                                           name='robot_server')
+            self.thread.start()
+
+    def forget(self, connection: Connection) -> None:
+        '''Forgets a closed connection.'''
+        with self.connections_lock:
+            self.connections.discard(connection)
+
+    def close(self) -> None:
+        '''Disconnects the clients and stops the server (the robot is not exited).'''
+        self.closing.set()
+        address = self.sock.getsockname()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        with self.connections_lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
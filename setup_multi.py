@@ -4,7 +4,11 @@ from setuptools.command.install import install as _install
 
 cur_packages = ['fossbot_lib/common/data_structures',
                 'fossbot_lib/common/interfaces',
-                'fossbot_lib/parameters_parser']
+                'fossbot_lib/common/behaviors',
+                'fossbot_lib/common/fleet',
+                'fossbot_lib/common/calibration',
+                'fossbot_lib/parameters_parser',
+                'fossbot_lib/remote_robot']
 
 requirements = []
 class Install(_install):
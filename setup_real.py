@@ -5,7 +5,7 @@ setup(
    version='0.1.3',
    author='Christos Chronis & Manousos Linardakis',
    author_email='chronis@hua.gr',
-   packages= ['fossbot_lib/common/data_structures','fossbot_lib/common/interfaces','fossbot_lib/parameters_parser','fossbot_lib/real_robot/'],
+   packages= ['fossbot_lib/common/data_structures','fossbot_lib/common/interfaces','fossbot_lib/common/behaviors','fossbot_lib/common/fleet','fossbot_lib/common/calibration','fossbot_lib/parameters_parser','fossbot_lib/remote_robot','fossbot_lib/real_robot/'],
 #    scripts=['bin/script1','bin/script2'],
 #    url='http://pypi.python.org/pypi/PackageName/',
 #    license='LICENSE.txt',
@@ -0,0 +1,25 @@
+""" Shared fixtures of the tests (run from the repository root: python -m pytest) """
+
+import os
+import pytest
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.real_robot import hal
+from fossbot_lib.real_robot.fossbot import FossBot as RealFossBot
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+VIRTUAL_PARAMETERS = os.path.join(EXAMPLES, 'virtual', 'admin_parameters.yaml')
+
+@pytest.fixture
+def board():
+    '''A virtual board wired like the FossBot, used by the real robot code.'''
+    virtual_board = hal.VirtualBoard.fossbot()
+    hal.set_board(virtual_board)
+    yield virtual_board
+    virtual_board.close()
+
+@pytest.fixture
+def virtual_robot(board):
+    '''The real robot running on the virtual board.'''
+    robot = RealFossBot(parameters=configuration.RobotParameters.from_file(VIRTUAL_PARAMETERS))
+    yield robot
+    robot.exit()
@@ -0,0 +1,87 @@
+""" Tests of the persistent audio player (with a stand-in mpg123 on the PATH) """
+
+import os
+import sys
+import time
+import pytest
+from fossbot_lib.real_robot import control
+
+# answers the remote control commands used by AudioPlayer, a sound plays for 0.1 s
+FAKE_MPG123 = f'''#!{sys.executable}
+import os, sys, time
+with open(os.environ['MPG123_LOG'], 'a') as log:
+    log.write('start\\n')
+for line in sys.stdin:
+    with open(os.environ['MPG123_LOG'], 'a') as log:
+        log.write(line)
+    if line.startswith('LOAD'):
+        print('@P 2', flush=True)
+        time.sleep(0.1)
+        print('@P 0', flush=True)
+    elif line.startswith('QUIT'):
+        break
+'''
+
+@pytest.fixture
+def player(tmp_path, monkeypatch):
+    '''An audio player whose commands are logged to tmp_path/mpg123.log.'''
+    executable = tmp_path / 'mpg123'
+    executable.write_text(FAKE_MPG123)
+    executable.chmod(0o755)
+    monkeypatch.setenv('PATH', f'{tmp_path}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('MPG123_LOG', str(tmp_path / 'mpg123.log'))
+    audio = control.AudioPlayer(cache_size=2)
+    yield audio
+    audio.close()
+
+def sound(tmp_path, name: str) -> str:
+    '''Creates a sound file.'''
+    path = tmp_path / name
+    path.write_bytes(b'ID3' + bytes(64))
+    return str(path)
+
+def commands(tmp_path) -> list:
+    '''Returns the lines received by the stand-in mpg123.'''
+    return (tmp_path / 'mpg123.log').read_text().split('\n')[:-1]
+
+def test_one_process_for_all_sounds(tmp_path, player):
+    first, second = sound(tmp_path, 'a.mp3'), sound(tmp_path, 'b.mp3')
+    player.play(first)
+    process = player.process
+    player.play(second)
+    player.play(first)
+    assert player.process is process
+    assert commands(tmp_path) == ['start', 'SILENCE', f'LOAD {first}', f'LOAD {second}',
+                                  f'LOAD {first}']
+
+def test_play_without_waiting(tmp_path, player):
+    start = time.perf_counter()
+    player.play(sound(tmp_path, 'a.mp3'), wait=False)
+    assert time.perf_counter() - start < 0.1
+    assert player.is_playing()
+    deadline = time.perf_counter() + 5
+    while player.is_playing() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert not player.is_playing()
+
+def test_missing_sound(tmp_path, player):
+    with pytest.raises(FileNotFoundError):
+        player.play(str(tmp_path / 'missing.mp3'))
+    assert player.process is None
+
+def test_sound_cache(tmp_path, player):
+    paths = [sound(tmp_path, f'{name}.mp3') for name in 'abc']
+    for path in paths:
+        player.preload(path)
+    assert list(player.sounds) == paths[1:]    # the least recently used one is dropped
+    player.play(paths[1])
+    assert list(player.sounds) == [paths[2], paths[1]]
+
+def test_stop_and_close(tmp_path, player):
+    player.start()
+    player.stop()
+    assert not player.is_playing()
+    process = player.process
+    player.close()
+    assert process.poll() == 0
+    assert commands(tmp_path)[-2:] == ['STOP', 'QUIT']
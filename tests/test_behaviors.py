@@ -0,0 +1,125 @@
+""" Tests of the event driven behavior engine """
+
+import pytest
+from fossbot_lib.common.behaviors import engine
+
+class FakeRobot:
+    '''A robot whose sensor readings are set by the test.'''
+    def __init__(self) -> None:
+        self.line = False
+        self.distance = 100.0
+        self.noise = False
+        self.acceleration = {'x': 0.0, 'y': 0.0, 'z': 9.81}
+        self.reads = 0
+
+    def check_on_line(self, sensor_id: int) -> bool:
+        self.reads += 1
+        return self.line
+
+    def get_distance(self) -> float:
+        self.reads += 1
+        return self.distance
+
+    def get_noise_detection(self) -> bool:
+        noise, self.noise = self.noise, False
+        return noise
+
+    def get_acceleration(self, axis: str) -> float:
+        return self.acceleration[axis]
+
+def test_unknown_edge():
+    with pytest.raises(ValueError):
+        engine.Binding('line', bool, print, edge='up')
+
+@pytest.mark.parametrize('edge, calls', [('rising', [1, 3]), ('falling', [2]),
+                                         ('both', [1, 2, 3])])
+def test_edges(edge, calls):
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot)
+    ticks = []
+    behaviors.on_line(1, lambda snapshot: ticks.append(tick), edge)
+    for tick, line in enumerate((False, True, False, True, True)):
+        robot.line = line
+        behaviors.tick()
+    assert ticks == calls
+
+def test_pulse():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot)
+    calls = []
+    behaviors.on_noise(calls.append)
+    for noise in (True, True, False, True):
+        robot.noise = noise
+        behaviors.tick()
+    assert len(calls) == 3
+
+def test_one_read_per_tick():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot)
+    near, far = [], []
+    behaviors.on_obstacle(20, near.append)
+    behaviors.on_obstacle(50, far.append)
+    robot.distance = 30.0
+    snapshot = behaviors.tick()
+    assert robot.reads == 1 and snapshot['distance'] == 30.0
+    assert not near and len(far) == 1
+    robot.distance = 10.0
+    behaviors.tick()
+    assert robot.reads == 2 and len(near) == 1 and len(far) == 1
+    assert behaviors.get_stats()['readings'] == 1
+
+def test_shared_handler_once_per_tick():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot)
+    calls = []
+    behaviors.on_line(1, calls.append)
+    behaviors.on_obstacle(20, calls.append)
+    robot.line, robot.distance = True, 5.0
+    behaviors.tick()
+    assert len(calls) == 1
+
+def test_remove():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot)
+    calls = []
+    binding = behaviors.on_line(1, calls.append)
+    behaviors.remove(binding)
+    robot.line = True
+    behaviors.tick()
+    assert not calls and robot.reads == 0 and 'line_1' not in behaviors.readers
+
+def test_collision_from_acceleration():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot)
+    calls = []
+    behaviors.on_collision(calls.append, threshold=10.0)
+    robot.acceleration.update(x=8.0, y=-9.0)
+    behaviors.tick()
+    robot.acceleration.update(x=3.0, y=4.0)
+    behaviors.tick()
+    assert len(calls) == 1 and calls[0]['acceleration'] == pytest.approx(145 ** 0.5)
+
+def test_run_until_and_stop_from_handler():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot, rate=1000)
+    ticks = []
+    behaviors.run(until=lambda snapshot: ticks.append(snapshot) or len(ticks) == 3)
+    assert len(ticks) == 3
+    robot.line = True
+    behaviors.on_line(1, lambda snapshot: behaviors.stop())
+    behaviors.run(duration=5.0)
+    assert behaviors.get_stats()['iterations'] == 4
+
+def test_background_error():
+    robot = FakeRobot()
+    behaviors = engine.BehaviorEngine(robot, rate=1000)
+    def fail(snapshot):
+        raise RuntimeError('handler failed')
+    behaviors.on_line(1, fail)
+    robot.line = True
+    behaviors.start()
+    behaviors.thread.join(timeout=2.0)
+    assert not behaviors.thread.is_alive()
+    with pytest.raises(RuntimeError):
+        behaviors.stop()
+    behaviors.stop()     # the error is raised once
@@ -0,0 +1,65 @@
+""" Tests of the calibration of the real robot on the virtual board """
+
+import dataclasses
+import os
+import shutil
+import pytest
+from fossbot_lib.common.calibration.calibrator import Calibrator
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.parameters_parser import parser
+from conftest import VIRTUAL_PARAMETERS
+
+@pytest.fixture
+def calibrator(tmp_path, virtual_robot):
+    '''A calibrator of the virtual robot, saving to a copy of its parameters file.'''
+    path = tmp_path / 'admin_parameters.yaml'
+    shutil.copy(VIRTUAL_PARAMETERS, path)
+    return Calibrator(virtual_robot, str(path))
+
+def test_calibrate_line(board, virtual_robot, calibrator):
+    for surface, readings in (('line', (800, 760, 820)), ('floor', (200, 260, 150))):
+        for channel, value in zip((1, 2, 3), readings):
+            board.set_adc(channel, value)
+        calibrator.sample_surface(surface, count=5, interval=0)
+    result = calibrator.calibrate_line()
+    assert virtual_robot.parameters == calibrator.get_parameters()
+    board.set_adc(1, 600)     # the threshold is half way between 800 and 200
+    assert virtual_robot.check_on_line(1)
+    board.set_adc(1, 400)
+    assert not virtual_robot.check_on_line(1)
+    assert all(error < 0.01 for error in result['line_error'].values())
+
+def test_save(board, calibrator):
+    for surface, value in (('line', 900), ('floor', 100)):
+        for channel in (1, 2, 3):
+            board.set_adc(channel, value)
+        calibrator.sample_surface(surface, count=3, interval=0)
+    calibrator.calibrate_line()
+    calibrator.save()
+    saved = configuration.RobotParameters.from_file(calibrator.path)
+    assert saved == calibrator.get_parameters()
+    original = configuration.RobotParameters.from_file(VIRTUAL_PARAMETERS)
+    assert saved.rotate_90 == original.rotate_90
+    assert saved.line_sensor_center.value != original.line_sensor_center.value
+
+def test_sample_first(calibrator):
+    with pytest.raises(RuntimeError):
+        calibrator.calibrate_line()
+    with pytest.raises(ValueError):
+        calibrator.sample_surface('carpet')
+
+def test_balance_needs_a_trial(calibrator):
+    with pytest.raises(ValueError):
+        calibrator.calibrate_balance(trials=0)
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'admin_parameters.yaml')
+    shutil.copy(VIRTUAL_PARAMETERS, path)
+    parameters = configuration.RobotParameters.from_file(path)
+    file_param = parser.load_parameters(path)
+    file_param['rotate_90']['value'] = 321
+    parser.save_parameters(file_param, path)
+    loaded = configuration.RobotParameters.from_file(path)
+    assert loaded == dataclasses.replace(
+        parameters, rotate_90=dataclasses.replace(parameters.rotate_90, value=321))
+    assert not os.path.exists(path + '.tmp')
@@ -0,0 +1,70 @@
+""" Tests of the validated, cached robot parameters """
+
+import dataclasses
+import os
+import shutil
+import pytest
+import yaml
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.parameters_parser import parser
+from conftest import EXAMPLES, VIRTUAL_PARAMETERS
+
+SIM_PARAMETERS = os.path.join(EXAMPLES, 'coppelia', 'admin_parameters.yaml')
+
+@pytest.fixture
+def path(tmp_path):
+    '''A copy of the parameters file of the virtual robot.'''
+    copy = tmp_path / 'admin_parameters.yaml'
+    shutil.copy(VIRTUAL_PARAMETERS, copy)
+    return str(copy)
+
+def test_invalid_value():
+    file_param = parser.load_parameters(VIRTUAL_PARAMETERS)
+    file_param['motor_left']['value'] = 250
+    with pytest.raises(ValueError):
+        configuration.RobotParameters.from_dict(file_param)
+
+def test_all_problems_are_reported(capsys):
+    file_param = parser.load_parameters(VIRTUAL_PARAMETERS)
+    file_param['motor_left']['value'] = 'fast'
+    file_param['rotate_90']['speed'] = 10
+    del file_param['light_sensor']
+    problems = configuration.RobotParameters.validate(file_param)
+    assert len(problems) == 3
+    with pytest.raises(ValueError):
+        configuration.RobotParameters.from_dict(file_param)
+    assert capsys.readouterr().out.count('Invalid parameter') == 3
+    assert configuration.RobotParameters.validate(None)
+
+def test_simulator_ids():
+    file_param = parser.load_parameters(SIM_PARAMETERS)
+    parameters = configuration.SimRobotParameters.from_dict(file_param)
+    assert parameters.simulation.client_id is None
+    assert parameters.motor_left_duty == file_param['motor_left']['value'] / 100
+    del file_param['simulator_ids']['fossbot_name']
+    assert configuration.SimRobotParameters.validate(file_param) == \
+        ['simulator_ids.fossbot_name: missing']
+    assert not configuration.RobotParameters.validate(file_param)
+
+def test_derived_values():
+    parameters = configuration.RobotParameters.from_file(VIRTUAL_PARAMETERS)
+    assert parameters.line_thresholds[1] == parameters.line_sensor_center.value
+    assert parameters.dark_threshold == parameters.light_sensor.value
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        parameters.rotate_90 = None
+    with pytest.raises(TypeError):
+        parameters.line_thresholds[1] = 0
+
+def test_cache(path):
+    parameters = configuration.RobotParameters.from_file(path)
+    assert configuration.RobotParameters.from_file(path) is parameters
+    file_param = parser.load_parameters(path)
+    file_param['rotate_90']['value'] = 1234
+    with open(path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump(file_param, file, allow_unicode=True)
+    loaded = configuration.RobotParameters.from_file(path)
+    assert loaded is not parameters and loaded.rotate_90.value == 1234
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        configuration.RobotParameters.from_file(str(tmp_path / 'missing.yaml'))
@@ -0,0 +1,35 @@
+""" Tests of the command queues shared by the daemon and its clients """
+
+import pytest
+from fossbot_lib.real_robot import daemon
+
+@pytest.fixture
+def queue():
+    '''The command queue of slot 1, on a plain buffer instead of shared memory.'''
+    return daemon.CommandQueue(memoryview(bytearray(daemon.SIZE)), 1)
+
+def test_push_pop(queue):
+    first = queue.push(daemon.OPCODE['move_distance'], (10.0,), 'forward')
+    second = queue.push(daemon.OPCODE['play_sound'], (), 'é' * 56)
+    assert queue.pop() == (first, daemon.OPCODE['move_distance'], (10.0, 0.0, 0.0), 'forward')
+    assert queue.pop() == (second, daemon.OPCODE['play_sound'], (0.0, 0.0, 0.0), 'é' * 56)
+    assert queue.pop() is None
+
+def test_full_queue(queue):
+    for _ in range(daemon.CAPACITY):
+        assert queue.push(daemon.OPCODE['stop']) is not None
+    assert queue.push(daemon.OPCODE['stop']) is None
+    queue.pop()
+    assert queue.push(daemon.OPCODE['stop']) == daemon.CAPACITY + 1
+
+def test_done_is_monotonic(queue):
+    queue.set_done(3)
+    queue.set_done(2)     # a command completing after a newer one
+    assert queue.get_done() == 3
+    queue.set_done(4)
+    assert queue.get_done() == 4
+
+def test_text_too_long(queue):
+    with pytest.raises(ValueError):
+        queue.push(daemon.OPCODE['play_sound'], (), 'x' * (daemon.TEXT_SIZE + 1))
+    assert queue.pop() is None
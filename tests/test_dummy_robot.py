@@ -0,0 +1,69 @@
+""" Tests of the dummy robot, its sensor traces and its command log """
+
+import dataclasses
+import pytest
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.dummy_robot import traces
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyBot
+from conftest import VIRTUAL_PARAMETERS
+
+def test_obstacle_routine():
+    dummy = DummyBot(seed=1)
+    dummy.sensors.set_trace('distance', range(100, 0, -10))
+    dummy.just_move()
+    while not dummy.check_for_obstacle():
+        dummy.wait(0.1)
+    dummy.stop()
+    assert dummy.log.count('wait') == 9
+    commands = [entry[1] for entry in dummy.log.get_entries()]
+    assert commands[0] == 'just_move' and commands[-1] == 'stop'
+    # the waits take virtual time, the readings one tick each
+    assert 0.9 <= dummy.clock.now() < 0.95
+
+def test_trace_holds_last_value():
+    sensors = traces.SensorTraces(seed=1, clock=traces.VirtualClock())
+    sensors.set_trace('light', [1.0, 2.0])
+    assert [sensors.read('light') for _ in range(4)] == [1.0, 2.0, 2.0, 2.0]
+
+def test_seeded_readings():
+    first, second = DummyBot(seed=3), DummyBot(seed=3)
+    readings = [(first.get_distance(), second.get_distance()) for _ in range(20)]
+    assert all(a == b for a, b in readings)
+    assert all(0.0 <= a <= 200.0 for a, _ in readings)
+    assert len({a for a, _ in readings}) > 1
+
+def test_binary_channel():
+    sensors = traces.SensorTraces(seed=2, clock=traces.VirtualClock())
+    assert {sensors.read('input') for _ in range(50)} <= {0.0, 1.0}
+
+def test_virtual_clock():
+    clock = traces.VirtualClock(tick=0.01)
+    clock.advance(2.5)
+    clock.advance()
+    assert clock.now() == pytest.approx(2.51)
+    assert clock.now_ns() == 2_510_000_000
+
+def test_actuator_log():
+    log = traces.ActuatorLog()
+    log.record(0.0, 'just_move', text='forward')
+    log.record(0.5, 'stop')
+    log.record(1.0, 'just_move', text='reverse')
+    assert log.count('just_move') == 2 and len(log) == 3
+    assert [entry[3] for entry in log.get_entries('just_move')] == ['forward', 'reverse']
+    log.clear()
+    assert len(log) == 0
+
+def test_floor_readings_are_adc_values():
+    dummy = DummyBot(seed=4)
+    readings = [dummy.get_floor_sensor(1) for _ in range(50)]
+    assert all(0.0 <= value <= 1023.0 for value in readings)
+    assert max(readings) > 500       # unscripted readings reach the adc thresholds
+
+def test_check_on_line():
+    parameters = configuration.RobotParameters.from_file(VIRTUAL_PARAMETERS)
+    parameters = dataclasses.replace(parameters, line_sensor_center=dataclasses.replace(
+        parameters.line_sensor_center, value=500))
+    dummy = DummyBot(parameters=parameters)
+    dummy.sensors.set_trace('floor_1', [100.0, 499.0, 500.0, 900.0])
+    assert [dummy.check_on_line(1) for _ in range(4)] == [False, False, True, True]
+    assert not dummy.check_on_line(4)
@@ -0,0 +1,100 @@
+""" Tests of the fleet controller """
+
+import math
+import threading
+import time
+import pytest
+from fossbot_lib.common.fleet.controller import Fleet
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyBot
+
+class SlowBot(DummyBot):
+    '''A dummy robot whose distance readings take wall time.'''
+    def __init__(self, delay: float, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.running = 0
+        self.overlapped = False
+
+    def get_distance(self) -> float:
+        self.running += 1
+        self.overlapped |= self.running > 1
+        time.sleep(self.delay)
+        self.running -= 1
+        return super().get_distance()
+
+@pytest.fixture
+def fleet():
+    robots = [DummyBot(seed=seed) for seed in range(3)]
+    for index, robot in enumerate(robots):
+        robot.sensors.set_trace('distance', [10.0 * (index + 1)])
+    fleet = Fleet(robots)
+    yield fleet
+    fleet.close()
+
+def test_call(fleet):
+    assert len(fleet) == 3 and fleet.names == ['robot_0', 'robot_1', 'robot_2']
+    result = fleet.get_distance()
+    assert result.ok()
+    assert list(result.get_values()) == [10.0, 20.0, 30.0]
+    assert result.get('robot_1') == 20.0
+    stats = result.get_stats()
+    assert stats['robots'] == 3 and stats['failed'] == 0
+    assert stats['min_latency'] <= stats['mean_latency'] <= stats['max_latency']
+
+def test_call_each(fleet):
+    result = fleet.call_each('rgb_set_color', [('red',), ('green',), ('blue',)])
+    assert result.ok()
+    assert [robot.log.get_entries()[-1][3] for robot in fleet.robots] == \
+        ['red', 'green', 'blue']
+    with pytest.raises(ValueError):
+        fleet.call_each('rgb_set_color', [('red',)])
+
+def test_errors_are_kept(fleet):
+    def fail():
+        raise OSError('unreachable')
+    fleet['robot_2'].get_distance = fail
+    result = fleet.get_distance()
+    assert not result.ok()
+    assert result.get('robot_0') == 10.0
+    assert list(result.get_errors()) == ['robot_2']
+    with pytest.raises(OSError):
+        result.get('robot_2')
+    assert math.isnan(result.get_values()[2])
+    assert result.get_stats()['failed'] == 1
+
+def test_unknown_attribute(fleet):
+    with pytest.raises(AttributeError):
+        fleet.not_a_method()     # pylint: disable=not-callable
+
+def test_no_robots():
+    with pytest.raises(ValueError):
+        Fleet([])
+
+def test_concurrent_calls():
+    robots = {name: SlowBot(0.2, seed=index) for index, name in enumerate('abcd')}
+    fleet = Fleet(robots)
+    result = fleet.get_distance()
+    fleet.close()
+    assert result.ok() and result.wall < 0.6
+
+def test_timeout():
+    robots = [SlowBot(0.0), SlowBot(0.5)]
+    fleet = Fleet(robots, timeout=0.2)
+    result = fleet.get_distance()
+    assert result.get_errors().keys() == {'robot_1'}
+    assert isinstance(result.get_errors()['robot_1'], TimeoutError)
+    assert math.isnan(result.get_latency('robot_1'))
+    fleet.close()
+
+def test_select_shares_the_locks():
+    robots = {'a': SlowBot(0.05), 'b': SlowBot(0.05)}
+    fleet = Fleet(robots)
+    part = fleet.select(['b'])
+    threads = [threading.Thread(target=target.get_distance) for target in (fleet, part) * 3]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    part.close()
+    fleet.close()
+    assert not robots['b'].overlapped
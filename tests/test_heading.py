@@ -0,0 +1,52 @@
+""" Tests of the heading filter and the heading estimator """
+
+import threading
+import time
+import pytest
+from fossbot_lib.common.data_structures import heading_filter
+
+def test_filter_follows_the_gyroscope():
+    fusion = heading_filter.HeadingFilter(gyro_weight=0.98)
+    for _ in range(10):
+        fusion.update(1.0, 1.0)
+    assert fusion.heading == pytest.approx(10.0)
+    assert fusion.updates == 10
+
+def test_filter_pulls_towards_the_odometry():
+    fusion = heading_filter.HeadingFilter(gyro_weight=0.9)
+    fusion.update(0.0, 20.0)
+    assert fusion.heading == pytest.approx(2.0)
+    for _ in range(200):
+        fusion.update(0.0, 0.0)
+    assert fusion.heading == pytest.approx(20.0, abs=0.01)
+    fusion.reset(-5.0)
+    assert fusion.heading == fusion.odometry_heading == -5.0 and fusion.updates == 0
+
+def test_rotate_degrees(virtual_robot):
+    virtual_robot.rotate_degrees(45)
+    assert virtual_robot.get_heading() == pytest.approx(45, abs=5)
+    virtual_robot.rotate_degrees(-90)
+    assert virtual_robot.get_heading() == pytest.approx(-45, abs=5)
+
+def test_stop_drops_the_target(virtual_robot):
+    future = virtual_robot.start_rotate_degrees(90)
+    virtual_robot.stop()
+    assert future.cancelled()
+    virtual_robot.just_rotate(0)
+    time.sleep(0.5)
+    assert virtual_robot.motor_left.duty > 0      # the old target does not stop this turn
+    virtual_robot.stop()
+
+def test_new_moves_drop_the_target(virtual_robot):
+    future = virtual_robot.start_rotate_degrees(-90)
+    virtual_robot.just_move()
+    assert future.cancelled()
+    virtual_robot.stop()
+
+def test_stop_ends_a_blocking_rotation(virtual_robot):
+    virtual_robot.get_heading()
+    timer = threading.Timer(0.2, virtual_robot.stop)
+    timer.start()
+    virtual_robot.rotate_degrees(720)
+    timer.join()
+    assert virtual_robot.get_heading() < 90
@@ -0,0 +1,48 @@
+""" Tests of the MPU6050 FIFO streaming """
+
+import time
+import pytest
+from fossbot_lib.real_robot import imu
+
+def test_to_int16():
+    assert imu._to_int16(0x12, 0x34) == 0x1234
+    assert imu._to_int16(0xFF, 0xFE) == -2
+    assert imu._to_int16(0x80, 0x00) == -32768
+
+def test_streaming(board, virtual_robot):
+    board.set_imu(accel={'x': 1.5, 'y': -2.0, 'z': 9.81}, gyro={'x': 10.0})
+    virtual_robot.start_imu(rate=200)
+    time.sleep(0.3)
+    sample = virtual_robot.get_imu()
+    assert sample['accel_x'] == pytest.approx(1.5, abs=0.01)
+    assert sample['accel_y'] == pytest.approx(-2.0, abs=0.01)
+    assert sample['accel_z'] == pytest.approx(9.81, abs=0.01)
+    assert sample['gyro_x'] == pytest.approx(10.0, abs=0.1)
+    assert sample['time'] <= time.perf_counter()
+    window = virtual_robot.get_imu_window(20)
+    assert len(window) == 20 and window[-1] == sample
+    periods = [new['time'] - old['time'] for old, new in zip(window, window[1:])]
+    assert periods == pytest.approx([1 / 200] * 19, abs=1e-3)
+    average = virtual_robot.get_imu_average(20)
+    assert average['time'] == sample['time']
+    assert average['accel_z'] == pytest.approx(9.81, abs=0.01)
+    service = virtual_robot.accelerometer.service
+    assert service.get_stats()['overflows'] == 0
+    assert service.get_stats()['sample_rate'] == 200
+    virtual_robot.stop_imu()
+
+def test_gyro_follows_the_wheels(virtual_robot):
+    virtual_robot.start_imu(rate=100)
+    virtual_robot.just_rotate(1)
+    time.sleep(0.3)
+    turning = virtual_robot.get_imu()['gyro_z']
+    virtual_robot.stop()
+    time.sleep(0.2)
+    assert abs(turning) > 50
+    assert virtual_robot.get_imu()['gyro_z'] == pytest.approx(0, abs=0.1)
+
+def test_readings_start_the_service(virtual_robot):
+    assert virtual_robot.accelerometer.service is None
+    virtual_robot.get_imu_window(1)
+    assert virtual_robot.accelerometer.service is not None
+    virtual_robot.stop_imu()
@@ -0,0 +1,104 @@
+""" Tests of the motion plans of the real robot """
+
+import gc
+import threading
+import time
+from concurrent.futures import CancelledError
+import pytest
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.real_robot.fossbot import FossBot
+from conftest import VIRTUAL_PARAMETERS
+
+FORWARD = ('forward', 'forward')
+REVERSE = ('reverse', 'reverse')
+COUNTERCLOCKWISE = ('forward', 'reverse')
+CLOCKWISE = ('reverse', 'forward')
+
+@pytest.fixture
+def planner(virtual_robot):
+    return virtual_robot.motion_planner
+
+def counted_stops(planner) -> list:
+    '''Counts the stops of the planner (between and after the segments).'''
+    stops = []
+    stop = planner.stop
+    def counting_stop():
+        stops.append(time.perf_counter())
+        stop()
+    planner.stop = counting_stop
+    return stops
+
+def test_compile_merges_steps(planner):
+    steps = planner.odometer.steps_for_distance
+    assert planner.compile([('forward', 10), ('forward', 5)]) == [[(FORWARD, steps(15))]]
+    assert planner.compile([('forward', 10), ('forward', 5)], blend=False) == [
+        [(FORWARD, steps(10))], [(FORWARD, steps(5))]]
+
+def test_compile_blends_segments_sharing_a_wheel(planner):
+    quarter = planner.rotate_90 + 1
+    groups = planner.compile([('forward', 10), ('counterclockwise',), ('clockwise', 180)])
+    forward = planner.odometer.steps_for_distance(10)
+    # forward -> counterclockwise keeps the left wheel, counterclockwise -> clockwise reverses both
+    assert groups == [[(FORWARD, forward), (COUNTERCLOCKWISE, forward + quarter)],
+                      [(CLOCKWISE, 2 * quarter)]]
+    assert planner.compile([('rotate', -90), ('reverse', 0), ('rotate', 90)]) == [
+        [(CLOCKWISE, quarter)], [(COUNTERCLOCKWISE, quarter)]]
+
+def test_compile_rejects_unknown_steps(planner):
+    with pytest.raises(ValueError):
+        planner.compile([('jump', 10)])
+
+def test_blended_plan_stops_once(virtual_robot, planner):
+    stops = counted_stops(planner)
+    start = virtual_robot.odometer_right.get_total_steps()
+    virtual_robot.run_plan([('forward', 5), ('counterclockwise', 45)])
+    expected = planner.compile([('forward', 5), ('counterclockwise', 45)])[0][-1][1]
+    assert virtual_robot.odometer_right.get_total_steps() - start >= expected
+    assert len(stops) == 1
+    assert virtual_robot.motor_left.duty == virtual_robot.motor_right.duty == 0
+
+def test_unblended_plan_stops_after_every_segment(virtual_robot, planner):
+    stops = counted_stops(planner)
+    virtual_robot.run_plan([('forward', 5), ('counterclockwise', 45)], blend=False)
+    assert len(stops) == 2
+
+def test_cancel_plans(virtual_robot):
+    running = virtual_robot.submit_plan([('forward', 200)])
+    queued = virtual_robot.submit_plan([('reverse', 10)])
+    time.sleep(0.2)
+    virtual_robot.cancel_plans()
+    with pytest.raises(CancelledError):
+        running.result(1.0)
+    assert queued.cancelled()
+    assert virtual_robot.motor_left.duty == virtual_robot.motor_right.duty == 0
+
+def test_stop_ends_the_running_plan(virtual_robot):
+    running = virtual_robot.submit_plan([('forward', 200)])
+    queued = virtual_robot.submit_plan([('forward', 3)])
+    time.sleep(0.2)
+    virtual_robot.stop()
+    with pytest.raises(CancelledError):
+        running.result(1.0)
+    assert queued.result(5.0) is None      # the queued plans still run
+
+def test_run_plan_returns_when_stopped(virtual_robot):
+    start = time.perf_counter()
+    timer = threading.Timer(0.2, virtual_robot.stop)
+    timer.start()
+    virtual_robot.run_plan([('forward', 200)])
+    timer.join()
+    assert time.perf_counter() - start < 1.0
+
+def test_collected_robot_keeps_the_pins_of_a_new_one(board):
+    parameters = configuration.RobotParameters.from_file(VIRTUAL_PARAMETERS)
+    old = FossBot(parameters=parameters)
+    old.submit_plan([('forward', 1)]).result(5.0)     # the planner refers back to the robot
+    old.exit()
+    robot = FossBot(parameters=parameters)
+    try:
+        robot.odometer_right.get_total_steps()
+        del old
+        gc.collect()
+        assert 21 in board.detects
+    finally:
+        robot.exit()
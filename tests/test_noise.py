@@ -0,0 +1,52 @@
+""" Tests of the latched noise detection """
+
+import time
+from fossbot_lib.common.data_structures import event_latch
+
+def test_latch():
+    latch = event_latch.EventLatch(history=4)
+    assert not latch.consume() and latch.get_last_time() is None
+    latch.record(1.0)
+    latch.record(2.0)
+    assert latch.consume()
+    assert not latch.consume()       # cleared until the next event
+    latch.record(3.0)
+    assert latch.consume()
+    assert latch.get_count() == 3 and latch.get_last_time() == 3.0
+
+def test_event_history():
+    latch = event_latch.EventLatch(history=4)
+    for stamp in range(1, 7):
+        latch.record(float(stamp))
+    assert latch.get_events() == [3.0, 4.0, 5.0, 6.0]
+    assert latch.get_events(since=4.0) == [5.0, 6.0]
+    assert latch.get_count() == 6
+
+def clap(board, pause: float = 0.15) -> None:
+    '''A short pulse of the noise sensor (on pin 4), then a pause longer than the debounce.'''
+    board.pulse(4, 0.005)
+    time.sleep(pause)
+
+def test_clap_between_polls_is_latched(board, virtual_robot):
+    assert not virtual_robot.get_noise_detection()
+    clap(board)
+    assert not virtual_robot.noise.get_level()    # the pulse is over
+    assert virtual_robot.get_noise_detection()
+    assert not virtual_robot.get_noise_detection()
+
+def test_noise_events(board, virtual_robot):
+    virtual_robot.get_noise_detection()           # opens the sensor
+    start = time.perf_counter()
+    clap(board)
+    middle = time.perf_counter()
+    clap(board)
+    events = virtual_robot.get_noise_events()
+    assert len(events) == 2 and start < events[0] < middle < events[1]
+    assert virtual_robot.get_noise_events(since=middle) == events[1:]
+
+def test_bounces_count_once(board, virtual_robot):
+    virtual_robot.get_noise_detection()
+    for _ in range(3):
+        clap(board, pause=0.01)
+    time.sleep(0.15)
+    assert len(virtual_robot.get_noise_events()) == 1
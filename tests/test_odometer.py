@@ -0,0 +1,112 @@
+""" Tests of the odometers of the real robot on the virtual board """
+
+import math
+import threading
+import time
+import pytest
+
+STEP_RATE = (60 - 10) / (100 - 10) * 60    # steps/s of the virtual wheels at duty 60
+
+def test_velocity(virtual_robot):
+    odometer = virtual_robot.odometer_left
+    assert odometer.get_velocity() == 0.0
+    virtual_robot.just_move()
+    time.sleep(0.4)
+    expected = STEP_RATE / odometer.sensor_disc * math.pi * odometer.wheel_diameter
+    assert odometer.get_velocity() == pytest.approx(expected, rel=0.1)
+    assert odometer.get_rpm() == pytest.approx(STEP_RATE / odometer.sensor_disc * 60, rel=0.1)
+    virtual_robot.stop()
+    time.sleep(0.3)
+    assert odometer.get_velocity() < expected / 5     # falls with the time since the last step
+
+def test_step_history(virtual_robot):
+    odometer = virtual_robot.odometer_right
+    virtual_robot.just_move()
+    time.sleep(0.2)
+    virtual_robot.stop()
+    stamps = odometer.edges.last(odometer.get_total_steps())
+    assert len(stamps) == odometer.get_total_steps() > 3
+    assert stamps == sorted(stamps)
+    intervals = [(b - a) / 1e9 for a, b in zip(stamps, stamps[1:])]
+    assert sum(intervals) / len(intervals) == pytest.approx(1 / STEP_RATE, rel=0.1)
+
+def test_steps_and_distance(virtual_robot):
+    odometer = virtual_robot.odometer_right
+    virtual_robot.just_move()
+    time.sleep(0.2)
+    virtual_robot.stop()
+    steps = odometer.get_steps()
+    assert odometer.get_distance() == round(steps / 20 * math.pi * 6.65, 2)
+    odometer.reset()
+    assert odometer.get_steps() == 0 and odometer.get_total_steps() == steps
+
+def steps(board, count: int, pin: int = 21) -> None:
+    '''Drives encoder pulses (the odometers debounce 1 ms).'''
+    for _ in range(count):
+        board.pulse(pin, 0.0005)
+        time.sleep(0.002)
+
+def test_notify_at_steps(board, virtual_robot):
+    odometer, actions = virtual_robot.odometer_right, []
+    future = odometer.notify_at_steps(3, lambda: actions.append(odometer.get_steps()))
+    steps(board, 2)
+    assert not future.done()
+    steps(board, 3)
+    assert future.result(timeout=1) == 3 and actions == [3]     # the action runs once
+    assert odometer.notify_at_steps(2).result(timeout=1) == 5   # already reached
+
+def test_replaced_and_cancelled_targets(board, virtual_robot):
+    odometer, actions = virtual_robot.odometer_right, []
+    first = odometer.notify_at_steps(2, lambda: actions.append('first'))
+    second = odometer.notify_at_steps(2, lambda: actions.append('second'))
+    assert first.cancelled()
+    odometer.cancel_target()
+    assert second.cancelled()
+    steps(board, 3)
+    assert actions == []
+
+def test_move_distance(virtual_robot):
+    virtual_robot.get_pose()    # the dead reckoning starts on first use
+    start = virtual_robot.odometer_right.get_total_steps()
+    virtual_robot.move_distance(10)
+    moved = virtual_robot.odometer_right.get_total_steps() - start
+    assert moved >= virtual_robot.odometer_right.steps_for_distance(10)
+    assert moved <= virtual_robot.odometer_right.steps_for_distance(10) + 2
+    assert virtual_robot.motor_right.duty == 0
+    assert virtual_robot.get_pose()['x'] == pytest.approx(10, abs=1.5)
+
+def test_rotate_90(virtual_robot):
+    virtual_robot.rotate_clockwise_90()
+    assert virtual_robot.odometer_right.get_steps() >= virtual_robot.parameters.rotate_90.value + 1
+    assert virtual_robot.motor_left.duty == virtual_robot.motor_right.duty == 0
+
+def test_stop_drops_the_target(virtual_robot):
+    future = virtual_robot.start_move_distance(10)
+    time.sleep(0.1)
+    virtual_robot.stop()
+    assert future.cancelled()
+    virtual_robot.move_forward()
+    time.sleep(0.5)     # past the steps of the stopped move
+    assert virtual_robot.motor_right.duty > 0
+    assert virtual_robot.odometer_right.get_steps() > virtual_robot.odometer_right.steps_for_distance(10)
+    virtual_robot.stop()
+
+def test_new_moves_drop_the_target(virtual_robot):
+    move = virtual_robot.start_move_distance(10)
+    virtual_robot.rotate_clockwise()
+    assert move.cancelled()
+    turn = virtual_robot.start_rotate_90(0)
+    virtual_robot.move_reverse()
+    assert turn.cancelled()
+    time.sleep(0.5)
+    assert virtual_robot.motor_left.duty > 0
+    virtual_robot.stop()
+
+def test_stop_ends_a_blocking_move(virtual_robot):
+    timer = threading.Timer(0.1, virtual_robot.stop)
+    timer.start()
+    start = time.perf_counter()
+    virtual_robot.move_distance(100)
+    assert time.perf_counter() - start < 1
+    assert virtual_robot.motor_right.duty == 0
+    timer.join()
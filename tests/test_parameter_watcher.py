@@ -0,0 +1,97 @@
+""" Tests of the live reload of the parameters file """
+
+import dataclasses
+import shutil
+import threading
+import pytest
+import yaml
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.parameters_parser import parser
+from fossbot_lib.parameters_parser.watcher import ParameterWatcher
+from fossbot_lib.real_robot.fossbot import FossBot as RealFossBot
+from conftest import VIRTUAL_PARAMETERS
+
+@pytest.fixture
+def path(tmp_path):
+    '''A copy of the parameters file of the virtual robot.'''
+    copy = tmp_path / 'admin_parameters.yaml'
+    shutil.copy(VIRTUAL_PARAMETERS, copy)
+    return str(copy)
+
+def save(path, section, value):
+    '''Saves the parameters of the virtual robot, with another value of a parameter.'''
+    file_param = parser.load_parameters(VIRTUAL_PARAMETERS)
+    file_param[section]['value'] = value
+    with open(path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump(file_param, file, allow_unicode=True)
+
+def test_reload(path):
+    watcher = ParameterWatcher(path)
+    assert not watcher.reload()     # unchanged
+    save(path, 'rotate_90', 123)
+    assert watcher.reload()
+    assert watcher.get().rotate_90.value == 123
+
+def test_invalid_file_keeps_parameters(path):
+    watcher = ParameterWatcher(path)
+    parameters = watcher.get()
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('motor_left: [not a number\n')
+    assert not watcher.reload()
+    save(path, 'motor_left', 250)   # out of range
+    assert not watcher.reload()
+    assert watcher.get() is parameters
+
+def test_failing_subscriber(path):
+    watcher = ParameterWatcher(path)
+    received = []
+    def fail(parameters):
+        raise RuntimeError('subscriber failed')
+    watcher.subscribe(fail)
+    watcher.subscribe(received.append)
+    save(path, 'rotate_90', 55)
+    assert watcher.reload()
+    assert received == [watcher.get()]
+    watcher.unsubscribe(received.append)
+    save(path, 'rotate_90', 56)
+    assert watcher.reload() and len(received) == 1
+
+@pytest.mark.parametrize('interval', [0.5, 0.02])
+def test_watch(path, interval, monkeypatch):
+    if interval < 0.5:      # the polling fallback
+        monkeypatch.setattr('fossbot_lib.parameters_parser.watcher._open_inotify', lambda _: None)
+    watcher = ParameterWatcher(path, interval=interval)
+    reloaded = threading.Event()
+    watcher.subscribe(lambda parameters: reloaded.set())
+    watcher.start()
+    try:
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('motor_left: [not a number\n')
+        save(path, 'rotate_90', 77)
+        assert reloaded.wait(5)
+        assert watcher.get().rotate_90.value == 77
+    finally:
+        watcher.stop()
+    assert watcher.thread is None
+
+def test_update_parameters(virtual_robot):
+    parameters = virtual_robot.parameters
+    virtual_robot.motor_left.stop()
+    half = dataclasses.replace(parameters.motor_left_speed,
+                               value=parameters.motor_left_speed.value / 2)
+    virtual_robot.update_parameters(dataclasses.replace(parameters, motor_left_speed=half))
+    assert virtual_robot.motor_left.dc_value == half.value
+
+def test_watch_parameters(path, board):
+    robot = RealFossBot(parameters=configuration.RobotParameters.from_file(path))
+    try:
+        watcher = robot.watch_parameters(path)
+        assert robot.watch_parameters(path) is watcher
+        reloaded = threading.Event()
+        watcher.subscribe(lambda parameters: reloaded.set())
+        save(path, 'sensor_distance', 42)
+        assert reloaded.wait(5)
+        assert robot.parameters.sensor_distance.value == 42
+    finally:
+        robot.exit()
+    assert watcher.thread is None
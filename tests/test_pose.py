@@ -0,0 +1,52 @@
+""" Tests of the dead reckoning pose """
+
+import math
+import pytest
+from fossbot_lib.common.data_structures import pose
+
+def test_straight_line():
+    tracker = pose.PoseTracker(wheel_base=10.0)
+    for _ in range(10):
+        tracker.update(1.0, 1.0)
+    current = tracker.get_pose()
+    assert (current['x'], current['y'], current['theta']) == pytest.approx((10.0, 0.0, 0.0))
+
+def test_arc():
+    tracker = pose.PoseTracker(wheel_base=10.0)
+    # a quarter circle of radius 20 cm (counterclockwise), in small steps
+    steps = 100
+    for _ in range(steps):
+        tracker.update(15 * math.pi / 2 / steps, 25 * math.pi / 2 / steps)
+    current = tracker.get_pose()
+    assert current['theta'] == pytest.approx(90.0)
+    assert current['x'] == pytest.approx(20.0, abs=0.01)
+    assert current['y'] == pytest.approx(20.0, abs=0.01)
+
+def test_advance_and_reset():
+    tracker = pose.PoseTracker(history=4)
+    tracker.reset(1.0, 2.0, 90.0)
+    tracker.advance(5.0, 0.0)
+    assert tracker.get_pose()['x'] == pytest.approx(1.0)
+    assert tracker.get_pose()['y'] == pytest.approx(7.0)
+    for _ in range(5):
+        tracker.advance(0.0, -10.0)
+    history = tracker.get_history(10)
+    assert len(history) == 4
+    assert [entry['theta'] for entry in history] == pytest.approx([70, 60, 50, 40])
+    assert history[-1] == tracker.get_pose()
+
+def test_pose_of_a_move(virtual_robot):
+    assert virtual_robot.get_pose()['x'] == 0.0
+    virtual_robot.move_distance(10)
+    current = virtual_robot.get_pose()
+    assert current['x'] == pytest.approx(10, abs=1.5)
+    assert current['y'] == pytest.approx(0, abs=0.5)
+    assert current['theta'] == pytest.approx(0, abs=3)
+    assert len(virtual_robot.get_pose_history(100)) > 5
+
+def test_pose_of_a_reverse_move(virtual_robot):
+    virtual_robot.reset_pose(theta=90.0)
+    virtual_robot.move_distance(10, direction='reverse')
+    current = virtual_robot.get_pose()
+    assert current['x'] == pytest.approx(0, abs=0.5)
+    assert current['y'] == pytest.approx(-10, abs=1.5)
@@ -0,0 +1,60 @@
+""" Tests of the motor pwm backends """
+
+import pytest
+from fossbot_lib.common.data_structures import configuration
+from fossbot_lib.real_robot import control, pwm
+from fossbot_lib.real_robot.fossbot import FossBot
+from conftest import VIRTUAL_PARAMETERS
+
+def test_fake_pwm():
+    output = pwm.create_pwm('fake', 18, 17)
+    assert isinstance(output, pwm.FakePWM)
+    output.start(30)
+    output.set_duty_cycle(55)
+    output.set_frequency(1000)
+    assert output.running and output.duty == 55 and output.freq == 1000
+    output.stop()
+    assert not output.running
+    assert [duty for _, duty in output.history] == [30, 55, 0]
+
+def test_fake_pwm_history_is_bounded():
+    output = pwm.FakePWM(18, 17, history=3)
+    for duty in range(10):
+        output.set_duty_cycle(duty)
+    assert [duty for _, duty in output.history] == [7, 8, 9]
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        pwm.create_pwm('analog', 18, 17)
+
+def test_software_pwm_drives_the_pin(board):
+    output = pwm.create_pwm('software', 23, 17)
+    output.start(40)
+    assert board.wheels[23].duty == 40
+    output.stop()
+    assert board.wheels[23].duty == 0
+
+def test_motor_duty(board):
+    motor = control.Motor(speed_pin=23, terma_pin=27, termb_pin=22, dc_value=60,
+                          freq=100, pwm_backend='fake')
+    motor.move('reverse')
+    assert motor.mot.duty == 60 and motor.drive_direction == -1
+    assert board.levels[27] == 0 and board.levels[22] == 1
+    motor.apply_duty(130)
+    assert motor.duty == 100 and motor.dc_value == 60
+    motor.set_frequency(200)
+    assert motor.mot.freq == 200
+    motor.stop()
+    assert motor.mot.duty == 0
+    assert 23 not in board.levels       # the fake backend drives no pin
+
+def test_robot_backend(board):
+    robot = FossBot(parameters=configuration.RobotParameters.from_file(VIRTUAL_PARAMETERS),
+                    pwm_backend='fake', motor_freq=(50, 60))
+    try:
+        robot.just_move()
+        assert robot.motor_left.mot.duty == robot.motor_right.mot.duty == 60
+        assert (robot.motor_left.mot.freq, robot.motor_right.mot.freq) == (50, 60)
+        assert board.wheels[23].duty == 0
+    finally:
+        robot.exit()
@@ -0,0 +1,40 @@
+""" Tests of the real robot construction and its lazily opened devices """
+
+import threading
+from fossbot_lib.real_robot import control, fossbot
+
+def opened(robot) -> set:
+    '''Returns the names of the opened devices of a robot.'''
+    return set(fossbot.DEVICES) & set(vars(robot))
+
+def test_nothing_is_opened_at_construction(board, virtual_robot):
+    assert not opened(virtual_robot)
+    assert not board.detects and not board.buses
+
+def test_devices_open_on_first_use(board, virtual_robot):
+    virtual_robot.rgb_set_color('red')
+    assert opened(virtual_robot) == {'rgb_led'}
+    assert board.levels[16] == 1
+    virtual_robot.get_distance()
+    assert opened(virtual_robot) == {'rgb_led', 'ultrasonic'}
+    assert virtual_robot.ultrasonic is virtual_robot.ultrasonic
+
+def test_warmup(board, virtual_robot, monkeypatch):
+    started = []
+    monkeypatch.setattr(control.AudioPlayer, 'start', lambda player: started.append(player))
+    virtual_robot.warmup()
+    assert opened(virtual_robot) == set(fossbot.DEVICES)
+    assert started == [virtual_robot.audio]
+    assert set(board.detects) == {4, 5, 20, 21}     # noise, echo and the encoders
+
+def test_devices_are_opened_once(virtual_robot):
+    devices, barrier = [], threading.Barrier(8)
+    def touch():
+        barrier.wait()
+        devices.append(virtual_robot.odometer_left)
+    threads = [threading.Thread(target=touch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(device) for device in devices}) == 1
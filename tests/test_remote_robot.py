@@ -0,0 +1,74 @@
+""" Tests of the remote robot (server and client) on loopback """
+
+import pytest
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyBot
+from fossbot_lib.remote_robot import protocol
+from fossbot_lib.remote_robot.fossbot import FossBot as RemoteFossBot
+from fossbot_lib.remote_robot.server import RobotServer
+
+class FaultyBot(DummyBot):
+    '''A dummy robot whose readings fail.'''
+    def get_light_sensor(self) -> float:
+        raise ValueError('no light')
+
+    def get_noise_detection(self) -> bool:
+        b'\xff'.decode()
+
+@pytest.fixture(params=['tcp', 'unix'])
+def served(request, tmp_path):
+    '''(dummy robot, remote robot) connected through a server on loopback.'''
+    dummy = FaultyBot(seed=1)
+    server = RobotServer(dummy, str(tmp_path / 'robot.sock') if request.param == 'unix'
+                         else ('127.0.0.1', 0))
+    server.start()
+    remote = RemoteFossBot(server.get_address(), timeout=5)
+    yield dummy, remote
+    remote.exit()
+    server.close()
+
+def test_pack_round_trip():
+    values = [None, True, 0, -1, 127, -33, 2**40, -2**63, 2**64 - 1, 0.5, '', 'é' * 40,
+              b'\0' * 300, [1, [2, 'three']], {'x': 1.5, 'y': [None]}]
+    assert protocol.unpack(protocol.pack(values)) == values
+
+def test_call(served):
+    dummy, remote = served
+    dummy.sensors.set_trace('distance', [10.0, 20.0])
+    remote.move_distance(10)
+    assert remote.get_distance() == 10.0
+    assert remote.call('get_distance') == 20.0
+    assert dummy.log.count('move_distance') == 1
+
+def test_call_async(served):
+    dummy, remote = served
+    dummy.sensors.set_trace('floor_2', [80.0])
+    futures = [remote.call_async('get_floor_sensor', sensor_id) for sensor_id in (2, 2, 2)]
+    assert [future.result(timeout=5) for future in futures] == [80.0, 80.0, 80.0]
+
+def test_batch(served):
+    dummy, remote = served
+    dummy.sensors.set_trace('distance', [5.0])
+    remote.batch([('just_move',), ('stop',)])
+    assert remote.batch([('get_distance',), ('check_for_obstacle',)]) == [5.0, True]
+    assert [entry[1] for entry in dummy.log.get_entries()] == ['just_move', 'stop']
+
+def test_stream(served):
+    dummy, remote = served
+    dummy.sensors.set_trace('distance', [float(value) for value in range(1, 1000)])
+    stream = remote.subscribe('get_distance', rate=100)
+    first = stream.wait(timeout=5)
+    assert first is not None
+    values = [value for _, value in stream.get_history(100)]
+    stream.close()
+    assert values == sorted(values)
+
+def test_errors(served):
+    _, remote = served
+    with pytest.raises(ValueError, match='no light'):
+        remote.get_light_sensor()
+    with pytest.raises(AttributeError):
+        remote.call('exit_now')
+    # an exception that cannot be rebuilt from its message, and the client still works
+    with pytest.raises(RuntimeError, match='UnicodeDecodeError'):
+        remote.get_noise_detection()
+    assert remote.check_for_obstacle() in (True, False)
@@ -0,0 +1,95 @@
+""" Tests of the recording of a robot program and its replay """
+
+import time
+import pytest
+from fossbot_lib.dummy_robot.fossbot import FossBot as DummyBot
+from fossbot_lib.dummy_robot.replay import ReplayFossBot
+from fossbot_lib.real_robot.recorder import RecordingFossBot
+
+def program(robot) -> list:
+    '''A routine mixing commands and readings, returning the readings.'''
+    readings = []
+    robot.just_move()
+    while not robot.check_for_obstacle():
+        readings.append(robot.get_distance())
+        readings.append(robot.get_floor_sensor(2))
+    robot.stop()
+    robot.rotate_degrees(90)
+    readings.append(robot.get_gyroscope('z'))
+    readings.append(robot.check_on_line(1))
+    return readings
+
+def record():
+    '''Records the program on a dummy robot.'''
+    dummy = DummyBot(seed=7)
+    dummy.sensors.set_trace('distance', range(100, 0, -10))
+    recording = RecordingFossBot(dummy)
+    return recording, program(recording)
+
+def test_replay_is_equivalent():
+    recording, readings = record()
+    replay = ReplayFossBot(recording.log, speed=None)
+    assert program(replay) == readings
+    assert replay.get_unmatched() == 0
+
+def test_saved_recording(tmp_path):
+    recording, readings = record()
+    recording.save(tmp_path / 'recording.log')
+    replay = ReplayFossBot(tmp_path / 'recording.log', speed=None)
+    assert program(replay) == readings
+
+def test_held_and_unrecorded_calls():
+    recording, readings = record()
+    replay = ReplayFossBot(recording.log, speed=None)
+    program(replay)
+    assert replay.check_on_line(1) == readings[-1]    # the last result is held
+    assert replay.get_unmatched() == 1
+    with pytest.raises(KeyError):
+        replay.get_floor_sensor(3)
+
+def noise_program(robot, since) -> list:
+    '''Polls the noise sensor and reads the events after since().'''
+    events = []
+    for _ in range(3):
+        robot.get_noise_detection()
+        events.append(robot.get_noise_events(since()))
+    return events
+
+def test_time_arguments_match_by_method():
+    dummy = DummyBot(seed=7)
+    dummy.sensors.set_trace('noise', [1.0, 0.0, 1.0])
+    recording = RecordingFossBot(dummy)
+    recorded = noise_program(recording, lambda: dummy.clock.now() - 1)
+    assert recorded[-1]
+    replay = ReplayFossBot(recording.log, speed=None)
+    # the times of the replay run differ from the recorded ones
+    assert noise_program(replay, time.perf_counter) == recorded
+    assert replay.get_unmatched() == 0
+
+class UserError(Exception):
+    '''An exception that is not a builtin one.'''
+
+class FailingBot(DummyBot):
+    '''A dummy robot whose ultrasonic sensor times out and whose line sensors fail.'''
+    def get_distance(self) -> float:
+        raise TimeoutError('no echo')
+
+    def check_on_line(self, sensor_id: int) -> bool:
+        raise UserError('line sensor unplugged')
+
+def test_recorded_exceptions_are_raised(tmp_path):
+    recording = RecordingFossBot(FailingBot())
+    with pytest.raises(TimeoutError):
+        recording.get_distance()
+    with pytest.raises(UserError):
+        recording.check_on_line(1)
+    recording.stop()
+    assert recording.log.get_error(0) == ('TimeoutError', 'no echo')
+    assert recording.log.get_entry(0)[4] is None and recording.log.get_error(2) is None
+    recording.save(tmp_path / 'recording.log')
+    replay = ReplayFossBot(tmp_path / 'recording.log', speed=None)
+    with pytest.raises(TimeoutError, match='no echo'):
+        replay.get_distance()
+    with pytest.raises(RuntimeError, match='UserError: line sensor unplugged'):
+        replay.check_on_line(1)
+    replay.stop()
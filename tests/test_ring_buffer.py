@@ -0,0 +1,26 @@
+""" Tests of the fixed size ring buffer """
+
+from fossbot_lib.common.data_structures import ring_buffer
+
+def test_typed_buffer():
+    buffer = ring_buffer.RingBuffer(4, 'q')
+    assert len(buffer) == 0 and buffer.latest() is None and buffer.last(3) == []
+    for value in range(1, 7):
+        buffer.append(value)
+    assert len(buffer) == 4 and buffer.count == 6
+    assert buffer.latest() == 6
+    assert buffer.last(3) == [4, 5, 6]
+    assert buffer.last(10) == [3, 4, 5, 6]     # only the stored values
+
+def test_object_buffer():
+    buffer = ring_buffer.RingBuffer(2, None)
+    buffer.append((1.0, 'a'))
+    buffer.append((2.0, 'b'))
+    buffer.append((3.0, 'c'))
+    assert buffer.last(2) == [(2.0, 'b'), (3.0, 'c')]
+
+def test_clear():
+    buffer = ring_buffer.RingBuffer(3)
+    buffer.append(1.5)
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.last(1) == []
@@ -0,0 +1,80 @@
+""" Tests of the rate scheduled sensor sampling """
+
+import threading
+import time
+import pytest
+from fossbot_lib.common.data_structures import ring_buffer
+from fossbot_lib.real_robot import sampler
+
+def test_store():
+    store = sampler.SensorStore()
+    store.add_channel('adc', history=2)
+    assert store.get('adc') is None and store.get_value('adc') is None
+    for value in range(3):
+        store.publish('adc', value, timestamp=float(value))
+    assert store.get('adc') == (2.0, 2)
+    assert store.get_history('adc', 5) == [(1.0, 1), (2.0, 2)]
+    assert store.get('unknown') is None and store.get_history('unknown', 1) == []
+
+def test_attached_channel():
+    store = sampler.SensorStore()
+    buffer = ring_buffer.RingBuffer(4, None)
+    store.attach('imu', buffer)
+    assert store.wait_value('imu', timeout=0) is None
+    buffer.append((1.0, 0.5))
+    assert store.get('imu') == (1.0, 0.5)
+
+def test_wait_for_the_first_sample():
+    store = sampler.SensorStore()
+    store.add_channel('ultrasonic')
+    timer = threading.Timer(0.1, store.publish, ('ultrasonic', 42.0))
+    timer.start()
+    start = time.perf_counter()
+    assert store.wait_value('ultrasonic', timeout=2) == 42.0
+    assert time.perf_counter() - start >= 0.09
+    assert store.wait_value('unknown', timeout=0) is None
+    with pytest.raises(TimeoutError):
+        store.add_channel('adc')
+        store.wait_value('adc', timeout=0.05)
+
+def test_scheduler_rates():
+    store = sampler.SensorStore()
+    scheduler = sampler.SensorScheduler(store)
+    counter = iter(range(1000))
+    scheduler.add_task('fast', lambda: next(counter), 200)
+    scheduler.add_task('slow', lambda: 'slow', 20)
+    scheduler.add_task('pending', lambda: None, 50)
+    scheduler.start()
+    time.sleep(0.5)
+    scheduler.stop()
+    stats = scheduler.get_stats()
+    assert stats['fast']['samples'] == pytest.approx(100, abs=10)
+    assert stats['slow']['samples'] == pytest.approx(10, abs=2)
+    assert store.get_value('slow') == 'slow'
+    assert store.get('pending') is None and stats['pending']['samples'] > 0
+    values = [value for _, value in store.get_history('fast', 5)]
+    assert values == list(range(values[0], values[0] + 5))
+
+def test_getters_wait_for_the_sampler(board, virtual_robot, monkeypatch):
+    board.set_distance(35.0)
+    board.set_adc(0, 700)
+    def direct_read(*_):
+        raise AssertionError('a sampled sensor was read directly')
+    monkeypatch.setattr(virtual_robot.ultrasonic, 'get_distance', direct_read)
+    monkeypatch.setattr(virtual_robot.analogue_reader, 'get_reading', direct_read)
+    virtual_robot.start_sampler(ultrasonic=20, adc=100, imu_rate=0)
+    try:
+        assert virtual_robot.get_distance() == pytest.approx(35.0, abs=2.0)
+        assert virtual_robot.get_light_sensor() == 700
+        stats = virtual_robot.get_sampler_stats()
+        assert set(stats) == {'ultrasonic', 'adc'}
+    finally:
+        virtual_robot.stop_sampler()
+    assert virtual_robot.get_sampler_stats() == {}
+
+def test_stopped_sampler(board, virtual_robot):
+    board.set_adc(0, 300)
+    virtual_robot.start_sampler(ultrasonic=0, adc=100, imu_rate=0)
+    virtual_robot.stop_sampler()
+    board.set_adc(0, 400)
+    assert virtual_robot.get_light_sensor() == 400
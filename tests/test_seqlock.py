@@ -0,0 +1,54 @@
+""" Tests of the sensor frame shared by the daemon and its clients """
+
+import threading
+import pytest
+from fossbot_lib.real_robot import daemon
+
+@pytest.fixture
+def frame():
+    '''The sensor frame, on a plain buffer instead of shared memory.'''
+    return daemon.SeqLock(memoryview(bytearray(daemon.SIZE)))
+
+def values(value: float) -> tuple:
+    '''A frame whose fields are all value.'''
+    return (value,) * len(daemon.FRAME_FIELDS)
+
+def test_nothing_published(frame):
+    assert frame.read() == (0, values(0.0))
+
+def test_write_read(frame):
+    frame.write(values(1.5))
+    frame.write(values(2.5))
+    assert frame.read() == (4, values(2.5))
+
+def test_torn_frame_is_retried(frame):
+    frame.write(values(1.0))
+    # the new sequence with part of an old frame, as a weakly ordered cpu can show it
+    offset = daemon.FRAME_OFFSET + daemon.FIELD_INDEX['distance'] * 8
+    frame.buffer[offset:offset + 8] = bytes(8)
+    result = []
+    reader = threading.Thread(target=lambda: result.append(frame.read()))
+    reader.start()
+    reader.join(0.1)
+    assert reader.is_alive()
+    frame.write(values(2.0))
+    reader.join(1.0)
+    assert result == [(4, values(2.0))]
+
+def test_concurrent_reads_are_consistent(frame):
+    halt = threading.Event()
+    def writer():
+        count = 0
+        while not halt.is_set():
+            count += 1
+            frame.write(values(float(count)))
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            sequence, frame_values = frame.read()
+            assert len(set(frame_values)) == 1
+            assert sequence == 2 * frame_values[0]
+    finally:
+        halt.set()
+        thread.join()
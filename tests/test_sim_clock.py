@@ -0,0 +1,88 @@
+""" Tests of the simulation clock of the simulated robot (against a fake simulator) """
+
+import os
+import threading
+import time
+import pytest
+
+# sim.py loads the remote api library from lib/ of the working directory
+COPPELIASIM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'fossbot_lib', 'coppeliasim_robot')
+_cwd = os.getcwd()
+os.chdir(COPPELIASIM)
+try:
+    from fossbot_lib.coppeliasim_robot import sim, sim_clock
+finally:
+    os.chdir(_cwd)
+
+class FakeSimulator:
+    '''Simulation time in steps of step_ms, running speed times faster than real time.'''
+    def __init__(self, speed: float = 2.0, step_ms: int = 50) -> None:
+        self.speed = speed
+        self.step_ms = step_ms
+        self.start = time.perf_counter()
+        self.paused_at = None
+
+    def last_cmd_time(self, client_id: int) -> int:
+        now = time.perf_counter() if self.paused_at is None else self.paused_at
+        sim_ms = int((now - self.start) * 1000 * self.speed)
+        return sim_ms // self.step_ms * self.step_ms
+
+    def pause(self) -> None:
+        self.paused_at = time.perf_counter()
+
+@pytest.fixture
+def simulator(monkeypatch):
+    fake = FakeSimulator()
+    monkeypatch.setattr(sim, 'simxGetLastCmdTime', fake.last_cmd_time)
+    monkeypatch.setattr(sim, 'simxGetPingTime', lambda client_id: (0, 0))
+    monkeypatch.setattr(sim, 'simxGetFloatSignal', lambda *args: (1, 0.0))
+    return fake
+
+@pytest.fixture
+def clock(simulator):
+    simulated_clock = sim_clock.SimClock(client_id=0)
+    yield simulated_clock
+    simulated_clock.stop()
+
+def test_now(simulator, clock):
+    time.sleep(0.12)
+    assert clock.now() == pytest.approx(simulator.last_cmd_time(0) / 1000)
+    assert clock.now_ns() == simulator.last_cmd_time(0) * 1_000_000
+
+def test_sleep_follows_the_simulation_speed(clock):
+    clock.sleep(0.1)       # learns the real time factor
+    start_real, start = time.perf_counter(), clock.now()
+    assert clock.sleep(0.6)
+    assert clock.now() - start >= 0.6
+    assert time.perf_counter() - start_real == pytest.approx(0.3, abs=0.08)
+    assert clock.get_rate() == pytest.approx(2.0, rel=0.3)
+
+def test_paused_simulation_times_out(simulator, clock):
+    simulator.pause()
+    start = time.perf_counter()
+    assert not clock.sleep(0.1, timeout=0.2)
+    assert time.perf_counter() - start == pytest.approx(0.2, abs=0.06)
+
+def test_every(clock):
+    times = []
+    for tick in clock.every(0.1):
+        times.append(tick)
+        if len(times) == 4:
+            break
+    assert [later - earlier for earlier, later in zip(times, times[1:])] == pytest.approx([0.1] * 3)
+
+def test_schedule(clock):
+    start = clock.now()
+    done = threading.Event()
+    future = clock.schedule(0.2, lambda: (done.set(), clock.now())[1])
+    assert done.wait(1.0)
+    assert future.result() - start >= 0.2
+    failing = clock.schedule(0.05, lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        failing.result(1.0)
+
+def test_stop_cancels_pending_actions(clock):
+    future = clock.schedule(10.0, lambda: None)
+    clock.stop()
+    assert future.cancelled()
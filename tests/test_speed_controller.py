@@ -0,0 +1,65 @@
+""" Tests of the closed loop wheel speed controller """
+
+import math
+import time
+import pytest
+from fossbot_lib.real_robot import hal
+from fossbot_lib.real_robot.speed_controller import PID
+
+@pytest.fixture
+def board():
+    '''A virtual FossBot whose left motor is a third faster than the right one.'''
+    virtual_board = hal.VirtualBoard()
+    virtual_board.attach_wheel('right', speed_pin=23, terma_pin=27, termb_pin=22, encoder_pin=21)
+    virtual_board.attach_wheel('left', speed_pin=25, terma_pin=17, termb_pin=24, encoder_pin=20,
+                               max_step_rate=80)
+    virtual_board.attach_ultrasonic(trig_pin=6, echo_pin=5)
+    hal.set_board(virtual_board)
+    yield virtual_board
+    virtual_board.close()
+
+def test_pid():
+    pid = PID(kp=2.0, ki=1.0, kd=0.0, limit=10.0)
+    assert pid.update(1.0, 0.5) == pytest.approx(2.5)
+    assert pid.update(1.0, 0.5) == pytest.approx(3.0)
+    assert pid.update(100.0, 0.5) == 10.0     # saturated: the integral does not grow
+    assert pid.integral == pytest.approx(1.0)
+    pid.reset()
+    assert pid.integral == 0.0 and pid.prev_error is None
+
+def test_pid_derivative():
+    pid = PID(kp=0.0, ki=0.0, kd=1.0)
+    assert pid.update(1.0, 0.1) == 0.0
+    assert pid.update(2.0, 0.1) == pytest.approx(10.0)
+
+def wheel_steps(robot) -> tuple:
+    '''Returns the total steps of the left and the right wheel.'''
+    return robot.odometer_left.get_total_steps(), robot.odometer_right.get_total_steps()
+
+def test_open_loop_wheels_differ(virtual_robot):
+    wheel_steps(virtual_robot)             # opens the encoders
+    virtual_robot.just_move()
+    time.sleep(1.0)
+    left, right = wheel_steps(virtual_robot)
+    virtual_robot.stop()
+    assert left - right > 8
+
+def test_wheels_hold_the_target_speed(virtual_robot):
+    virtual_robot.enable_speed_control(speed=15)
+    try:
+        virtual_robot.just_move()
+        time.sleep(0.5)
+        start = wheel_steps(virtual_robot)
+        time.sleep(2.0)
+        left, right = wheel_steps(virtual_robot)
+        odometer = virtual_robot.odometer_right
+        step_rate = 15 / (odometer.wheel_diameter * math.pi) * odometer.sensor_disc
+        assert (left - start[0]) / 2 == pytest.approx(step_rate, rel=0.25)
+        assert (right - start[1]) / 2 == pytest.approx(step_rate, rel=0.25)
+        assert abs(left - right) <= 3
+        assert virtual_robot.get_speed_control_stats()['iterations'] > 50
+        virtual_robot.stop()
+        assert virtual_robot.motor_left.duty == virtual_robot.motor_right.duty == 0
+    finally:
+        virtual_robot.disable_speed_control()
+    assert virtual_robot.get_speed_control_stats() == {}
@@ -0,0 +1,76 @@
+""" Tests of the monotonic named timers """
+
+import pytest
+from fossbot_lib.common.data_structures import timer_service
+from fossbot_lib.real_robot import control
+
+class FakeClock:
+    '''A nanosecond clock that only moves when told to.'''
+    def __init__(self) -> None:
+        self.time_ns = 1_000_000_000
+
+    def __call__(self) -> int:
+        return self.time_ns
+
+    def advance(self, seconds: float) -> None:
+        self.time_ns += round(seconds * 1e9)
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_elapsed(clock):
+    timers = timer_service.TimerService(clock)
+    assert timers.elapsed() == 0.0 and not timers.is_running()
+    timers.start()
+    clock.advance(1.5)
+    assert timers.is_running()
+    assert timers.elapsed() == pytest.approx(1.5)
+    timers.stop()
+    assert timers.elapsed() == 0.0 and not timers.is_running()
+    assert timers.now() == pytest.approx(2.5)
+
+def test_named_timers(clock):
+    timers = timer_service.TimerService(clock)
+    timers.start('a')
+    clock.advance(1.0)
+    timers.start('b')
+    clock.advance(0.25)
+    assert timers.elapsed('a') == pytest.approx(1.25)
+    assert timers.elapsed('b') == pytest.approx(0.25)
+    timers.start('a')            # a restart
+    assert timers.elapsed('a') == 0.0
+
+def test_laps(clock):
+    timers = timer_service.TimerService(clock)
+    timers.start()
+    for split in (0.5, 0.25, 1.0):
+        clock.advance(split)
+        assert timers.lap() == pytest.approx(split)
+    assert timers.get_laps() == pytest.approx([0.5, 0.25, 1.0])
+    assert timers.elapsed() == pytest.approx(1.75)
+    timers.start()
+    assert timers.get_laps() == []
+    with pytest.raises(KeyError):
+        timers.lap('unknown')
+    assert timers.get_laps('unknown') == []
+
+def test_robot_timer(clock, capsys):
+    timer = control.Timer(clock)
+    timer.elapsed()
+    assert 'Timer not started' in capsys.readouterr().out
+    timer.start_timer()
+    clock.advance(2.0)
+    assert timer.get_elapsed() == pytest.approx(2.0)
+    timer.elapsed()
+    assert '2.000000' in capsys.readouterr().out
+    assert timer.lap() == pytest.approx(2.0)
+    assert timer.get_laps() == pytest.approx([2.0])
+    timer.stop_timer()
+    assert timer.get_elapsed() == 0.0
+
+def test_default_clock_is_monotonic():
+    timers = timer_service.TimerService()
+    timers.start()
+    first = timers.elapsed()
+    assert timers.elapsed() >= first >= 0.0
@@ -0,0 +1,93 @@
+""" Tests of the interrupt timed ultrasonic sensor on the virtual board """
+
+import statistics
+import threading
+import time
+import pytest
+
+def median_distance(robot) -> float:
+    '''The median of 5 readings (the echo is timed by a thread, which can be descheduled).'''
+    return statistics.median(robot.get_distance() for _ in range(5))
+
+def test_distance(board, virtual_robot):
+    board.set_distance(42.0)
+    assert median_distance(virtual_robot) == pytest.approx(42.0, abs=2.0)
+
+def test_lost_echo(board, virtual_robot):
+    board.set_distance(None)
+    start = time.perf_counter()
+    assert virtual_robot.get_distance() == 999.9
+    assert time.perf_counter() - start < 0.1
+    board.set_distance(30.0)
+    assert median_distance(virtual_robot) == pytest.approx(30.0, abs=2.0)
+
+def test_late_callbacks_of_a_close_echo(board, virtual_robot):
+    sensor = virtual_robot.ultrasonic
+    board.set_distance(None)
+    sensor.ping()
+    # a 100 us echo whose callbacks both run after it ended (the pin reads low)
+    sensor.echo_edge(sensor.echo_pin)
+    time.sleep(0.0001)
+    sensor.echo_edge(sensor.echo_pin)
+    assert sensor.echo_done.is_set()
+    assert sensor.echo_distance() < 5
+    assert virtual_robot.parameters.sensor_distance.value > 5     # an obstacle
+
+def test_edges_outside_a_ping_are_ignored(board, virtual_robot):
+    sensor = virtual_robot.ultrasonic
+    sensor.echo_edge(sensor.echo_pin)
+    sensor.echo_edge(sensor.echo_pin)
+    assert not sensor.echo_done.is_set()
+    board.set_distance(None)
+    sensor.ping()
+    sensor.ping_ns -= round(sensor.timeout * 1e9) + 1     # the window of the ping is over
+    sensor.echo_edge(sensor.echo_pin)
+    sensor.echo_edge(sensor.echo_pin)
+    assert sensor.echo_distance() == 999.9
+
+def test_echo_still_high(board, virtual_robot):
+    sensor = virtual_robot.ultrasonic
+    board.set_distance(20.0)
+    board.set_input(sensor.echo_pin, 1)     # the long echo of an earlier ping
+    time.sleep(0.005)
+    assert sensor.measure() == 999.9
+    board.set_input(sensor.echo_pin, 0)     # its late fall is not an echo
+    time.sleep(0.005)
+    assert not sensor.echo_done.is_set()
+    assert median_distance(virtual_robot) == pytest.approx(20.0, abs=2.0)
+
+def test_sample(board, virtual_robot):
+    sensor = virtual_robot.ultrasonic
+    board.set_distance(25.0)
+    assert sensor.sample() is None
+    time.sleep(0.01)
+    assert sensor.sample() == pytest.approx(25.0, abs=2.0)
+
+def test_sampler_and_program_share_the_sensor(board, virtual_robot):
+    sensor = virtual_robot.ultrasonic
+    board.set_distance(35.0)
+    halt = threading.Event()
+    def sampler():
+        while not halt.is_set():
+            sensor.sample()
+            time.sleep(0.002)
+    thread = threading.Thread(target=sampler)
+    thread.start()
+    try:
+        distances = [sensor.measure() for _ in range(20)]
+    finally:
+        halt.set()
+        thread.join()
+    assert 999.9 not in distances
+    assert statistics.median(distances) == pytest.approx(35.0, abs=2.0)
+
+def test_ranging(board, virtual_robot):
+    sensor = virtual_robot.ultrasonic
+    board.set_distance(60.0)
+    sensor.start_ranging(rate=50)
+    try:
+        time.sleep(0.1)
+        assert sensor.get_distance() == pytest.approx(60.0, abs=2.0)
+    finally:
+        sensor.stop_ranging()
+    assert sensor.latest is None
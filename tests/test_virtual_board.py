@@ -0,0 +1,96 @@
+""" Tests of the virtual board of the hardware abstraction layer """
+
+import time
+import pytest
+from fossbot_lib.real_robot import hal
+
+def edges(board, pin, edge) -> list:
+    '''Records the (level, time) of the edges of a pin reported to its callback.'''
+    recorded = []
+    board.gpio.setup(pin, board.gpio.IN)
+    board.gpio.add_event_detect(pin, edge, callback=lambda channel: recorded.append(
+        (board.gpio.input(channel), time.perf_counter())))
+    return recorded
+
+def trigger(board, pin=6) -> None:
+    '''Sends a 20 us trigger pulse.'''
+    board.gpio.output(pin, 1)
+    end = time.perf_counter() + 20e-6
+    while time.perf_counter() < end:
+        pass
+    board.gpio.output(pin, 0)
+
+def test_board_selection(monkeypatch):
+    monkeypatch.setattr(hal, '_board', None)
+    monkeypatch.setenv(hal.BOARD_ENV, 'virtual')
+    board = hal.get_board()
+    assert isinstance(board, hal.VirtualBoard)
+    assert hal.get_board() is board
+    board.close()
+
+def test_input_edges(board):
+    rising = edges(board, 12, board.gpio.RISING)
+    board.pulse(12, width=0.002)
+    board.set_input(12, 1)      # no edge: the level does not change
+    time.sleep(0.01)
+    assert [level for level, _ in rising] == [1]
+    board.gpio.remove_event_detect(12)
+    board.pulse(12)
+    time.sleep(0.01)
+    assert len(rising) == 1
+
+def test_echo_pulse(board):
+    board.gpio.setup(6, board.gpio.OUT)
+    echo = edges(board, 5, board.gpio.BOTH)
+    board.set_distance(50.0)
+    trigger(board)
+    time.sleep(0.02)
+    assert [level for level, _ in echo] == [1, 0]
+    width = echo[1][1] - echo[0][1]
+    assert width * board.speed_of_sound / 2 == pytest.approx(50.0, abs=2.0)
+
+def test_lost_echo(board):
+    board.gpio.setup(6, board.gpio.OUT)
+    echo = edges(board, 5, board.gpio.BOTH)
+    board.set_distance(None)
+    trigger(board)
+    board.set_distance(50.0)
+    board.gpio.output(6, 1)     # a trigger shorter than 10 us is ignored
+    board.gpio.output(6, 0)
+    time.sleep(0.02)
+    assert not echo
+
+def test_wheel_steps(board):
+    steps = edges(board, 21, board.gpio.RISING)
+    for pin in (23, 27, 22):
+        board.gpio.setup(pin, board.gpio.OUT)
+    pwm = board.gpio.PWM(23, 17)
+    pwm.start(60)
+    board.gpio.output(27, 1)
+    time.sleep(0.3)
+    pwm.stop()
+    rate = (60 - 10) / (100 - 10) * 60    # above the deadband, up to 60 steps/s
+    assert len(steps) == pytest.approx(rate * 0.3, abs=2)
+    assert board.read_gyro()['z'] == 0.0
+    count = len(steps)
+    time.sleep(0.1)
+    assert len(steps) == count
+
+def test_wheel_follows_the_duty(board):
+    steps = edges(board, 21, board.gpio.RISING)
+    for pin in (23, 27, 22):
+        board.gpio.setup(pin, board.gpio.OUT)
+    pwm = board.gpio.PWM(23, 17)
+    pwm.start(11)                          # a step every 1.5 s
+    board.gpio.output(27, 1)
+    time.sleep(0.1)
+    pwm.ChangeDutyCycle(100)
+    time.sleep(0.3)
+    pwm.stop()
+    assert len(steps) == pytest.approx(60 * 0.3, abs=2)
+
+def test_adc(board):
+    adc = board.mcp3008(clk=11, cs=8, miso=9, mosi=10)
+    board.set_adc(2, 640)
+    assert adc.read_adc(2) == 640
+    assert adc.read_adc(3) == 0